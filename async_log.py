@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Async Log - Buffered, non-blocking JSON-lines logging for the bridge
+
+`log_backend` used to open the log file, pretty-print JSON, write, flush and
+print to stdout synchronously, 6-10 times per message. This moves all of
+that to a writer thread: callers only pay for a level check and a queue put.
+
+Key principles:
+- The message path NEVER blocks on disk: if the queue is full the record is
+  dropped and counted, and the writer logs how many were lost
+- One compact JSON object per line (easy to grep, tail and parse)
+- Verbosity levels: error < warning < info < debug. Bulky fields (full
+  headers, request payloads, response bodies) are only kept at debug
+- Size and/or age based rotation with a fixed number of backups
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+LEVELS = {"error": 40, "warning": 30, "info": 20, "debug": 10}
+
+# Only written at debug level
+BULKY_FIELDS = ("headers", "payload", "response_body")
+
+_STOP = object()
+
+
+def _redact_api_key(key: str) -> str:
+    return f"{key[:10]}...{key[-10:]}" if len(key) > 20 else "***REDACTED***"
+
+
+class AsyncLogWriter:
+    """
+    Queue-backed log writer with its own thread.
+
+    Example:
+        >>> log = AsyncLogWriter("logs/backend_communication.log", level="info")
+        >>> log.log("📤 OUTGOING REQUEST to backend", {"message_id": 42})
+        >>> log.stats()
+        {'written': 1, 'dropped': 0, 'queued': 0, 'rotations': 0}
+    """
+
+    def __init__(self, path, level: str = "info", max_bytes: int = 10 * 1024 * 1024,
+                 backups: int = 5, rotate_seconds: Optional[float] = None,
+                 queue_size: int = 10000, echo: bool = True, flush_interval: float = 0.05):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotate_seconds = rotate_seconds
+        self.echo = echo
+        self.flush_interval = flush_interval
+        self.set_level(level)
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._opened_at = 0.0
+        self._reported_dropped = 0
+        self._drop_lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def set_level(self, level: str) -> None:
+        self.level = level.lower() if level.lower() in LEVELS else "info"
+        self._threshold = LEVELS[self.level]
+
+    def log(self, message: str, data: Optional[Dict] = None, level: str = "info") -> bool:
+        """
+        Queue a record. Never blocks.
+
+        Returns:
+            False if the record was filtered out or dropped
+        """
+        if LEVELS.get(level, 20) < self._threshold:
+            return False
+        try:
+            self._queue.put_nowait((time.time(), level, message, data))
+            return True
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+            return False
+
+    # ---------- writer thread ----------
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            if item is not _STOP and self.flush_interval:
+                # Let the burst accumulate instead of waking up per record
+                time.sleep(self.flush_interval)
+            # Drain whatever else is waiting so one write() covers the burst
+            while len(batch) < 4096:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(entry is _STOP for entry in batch)
+            records = [entry for entry in batch if entry is not _STOP]
+            try:
+                self._write(records)
+            except Exception as e:
+                # Logging must never take the bridge down
+                try:
+                    print(f"[LOG] ⚠️ Failed to write log records: {e}", file=sys.stderr)
+                except (BrokenPipeError, IOError):
+                    pass
+            if stop:
+                self._close_file()
+                return
+
+    def _format(self, record) -> Dict:
+        ts, level, message, data = record
+        entry = {
+            "ts": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "level": level,
+            "msg": message,
+        }
+        if data:
+            data = dict(data)
+            if self._threshold > LEVELS["debug"]:
+                for field in BULKY_FIELDS:
+                    data.pop(field, None)
+            elif isinstance(data.get("headers"), dict) and "X-API-Key" in data["headers"]:
+                headers = dict(data["headers"])
+                headers["X-API-Key"] = _redact_api_key(headers["X-API-Key"])
+                data["headers"] = headers
+            entry.update(data)
+        return entry
+
+    def _write(self, records):
+        dropped = self.dropped
+        if dropped != self._reported_dropped:
+            records.append((time.time(), "warning", "⚠️ Log records dropped (queue full)",
+                            {"dropped_total": dropped, "dropped_since_last_report": dropped - self._reported_dropped}))
+            self._reported_dropped = dropped
+        if not records:
+            return
+
+        lines = [json.dumps(self._format(r), ensure_ascii=False, separators=(",", ":"), default=str) for r in records]
+        self._maybe_rotate()
+        if self._file is None:
+            self._open()
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        self.written += len(lines)
+
+        if self.echo:
+            try:
+                for record in records:
+                    print(f"[{datetime.fromtimestamp(record[0]).strftime('%H:%M:%S.%f')[:-3]}] {record[2]}")
+                sys.stdout.flush()
+            except (BrokenPipeError, IOError):
+                # stdout is closed - that's okay, we logged to file
+                pass
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            try:
+                size = self.path.stat().st_size
+            except FileNotFoundError:
+                return
+            too_old = False
+        else:
+            size = self._file.tell()
+            too_old = bool(self.rotate_seconds) and time.time() - self._opened_at >= self.rotate_seconds
+
+        if (self.max_bytes and size >= self.max_bytes) or (too_old and size > 0):
+            self._close_file()
+            for n in range(self.backups - 1, 0, -1):
+                older = self.path.with_name(f"{self.path.name}.{n}")
+                if older.exists():
+                    os.replace(older, self.path.with_name(f"{self.path.name}.{n + 1}"))
+            if self.backups > 0:
+                os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+            else:
+                self.path.unlink()
+            self.rotations += 1
+
+    # ---------- lifecycle ----------
+
+    def stats(self) -> Dict:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "rotations": self.rotations,
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush everything queued so far and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Automation - Run the bridge's AppleScripts without spawning osascript per call
+
+`send_imessage`, `show_typing_indicator` and `send_tapback` used to run
+`osascript <file>` for every call: a fork/exec plus a fresh compile of the
+.applescript source, several times per reply. Executors hide how a script is
+run so the bridge code doesn't care:
+
+- SubprocessExecutor: the old behavior, one osascript process per call
+- WorkerExecutor: one long-lived automation_worker.py process that keeps the
+  scripts compiled and takes requests over stdin/stdout (JSON lines)
+
+Key principles:
+- Same contract as subprocess.run(..., capture_output=True, text=True):
+  returns CompletedProcess, raises TimeoutExpired / CalledProcessError
+- One request at a time per worker (GUI scripting fights over focus anyway)
+- A worker that hangs past the timeout is killed and replaced on the next
+  call; a request is only retried if it provably never reached the worker
+  (a retried send could double-send an iMessage)
+- If the worker can't start at all, fall back to per-call subprocess
+"""
+
+import json
+import queue
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+WORKER_SCRIPT = str(Path(__file__).parent / "automation_worker.py")
+
+
+class AutomationExecutor:
+    """Runs an AppleScript file with arguments."""
+
+    name = "base"
+
+    def run_applescript(self, script: str, args: Sequence[str] = (), timeout: float = 10,
+                        check: bool = True) -> subprocess.CompletedProcess:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class SubprocessExecutor(AutomationExecutor):
+    """One `osascript` process per call (the original behavior)."""
+
+    name = "subprocess"
+
+    def __init__(self, osascript: str = "osascript"):
+        self.osascript = osascript
+
+    def run_applescript(self, script, args=(), timeout=10, check=True):
+        return subprocess.run(
+            [self.osascript, script, *args],
+            capture_output=True,
+            text=True,
+            check=check,
+            timeout=timeout
+        )
+
+
+class WorkerStartError(RuntimeError):
+    """The automation worker did not come up."""
+
+
+class WorkerExecutor(AutomationExecutor):
+    """
+    Talks to a long-lived worker process over a JSON-lines pipe.
+
+    Protocol (one JSON object per line):
+        worker -> {"ready": true, "engine": "..."}                  once, at startup
+        parent -> {"id": 1, "script": "/path.applescript", "args": [...], "timeout": 10}
+        worker -> {"id": 1, "rc": 0, "stdout": "sent", "stderr": ""}
+
+    Example:
+        >>> executor = WorkerExecutor()
+        >>> executor.run_applescript(ASCRIPT, [target, text], timeout=10).stdout
+        'sent'
+    """
+
+    name = "worker"
+
+    def __init__(self, command: Optional[List[str]] = None, start_timeout: float = 10.0):
+        self.command = command or [sys.executable, WORKER_SCRIPT]
+        self.start_timeout = start_timeout
+        self.engine = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._responses: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+        self.requests = 0
+        self.restarts = 0
+        self.timeouts = 0
+        self.crashes = 0
+
+    # ---------- worker lifecycle ----------
+
+    def _start(self):
+        self._responses = queue.Queue()
+        try:
+            proc = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=None,  # worker diagnostics go to the bridge's stderr log
+                text=True,
+                bufsize=1,
+            )
+        except OSError as e:
+            raise WorkerStartError(f"Could not launch automation worker: {e}") from e
+
+        threading.Thread(target=self._read_loop, args=(proc, self._responses),
+                         name="automation-reader", daemon=True).start()
+        try:
+            hello = self._responses.get(timeout=self.start_timeout)
+        except queue.Empty:
+            self._kill(proc)
+            raise WorkerStartError(f"Automation worker not ready after {self.start_timeout}s")
+        if not hello or not hello.get("ready"):
+            self._kill(proc)
+            raise WorkerStartError("Automation worker exited during startup")
+
+        if self._proc is not None:
+            self.restarts += 1
+        self._proc = proc
+        self.engine = hello.get("engine")
+
+    @staticmethod
+    def _read_loop(proc, responses):
+        """Forward each line the worker prints; None means it exited."""
+        for line in proc.stdout:
+            try:
+                responses.put(json.loads(line))
+            except ValueError:
+                continue  # stray output, not part of the protocol
+        responses.put(None)
+
+    @staticmethod
+    def _kill(proc):
+        try:
+            proc.kill()
+            proc.wait(timeout=5)
+        except Exception:
+            pass
+
+    def _ensure_worker(self):
+        if self._proc is None or self._proc.poll() is not None:
+            self._start()
+
+    # ---------- requests ----------
+
+    def run_applescript(self, script, args=(), timeout=10, check=True):
+        args = [str(a) for a in args]
+        argv = ["osascript", script, *args]
+        with self._lock:
+            self._ensure_worker()
+            self._next_id += 1
+            request_id = self._next_id
+            line = json.dumps({"id": request_id, "script": script, "args": args, "timeout": timeout})
+            try:
+                self._proc.stdin.write(line + "\n")
+                self._proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                # Never delivered, so it's safe to hand it to a fresh worker
+                self._kill(self._proc)
+                self._start()
+                self._proc.stdin.write(line + "\n")
+                self._proc.stdin.flush()
+            self.requests += 1
+
+            response = self._wait_for(request_id, timeout)
+            if response is None:
+                # Worker died mid-request: the script may or may not have run, don't retry
+                self.crashes += 1
+                self._kill(self._proc)  # reap it so the next call starts a fresh one
+                result = subprocess.CompletedProcess(argv, -1, "", "automation worker exited during request")
+            elif response.get("timed_out"):
+                # The worker enforced the timeout itself and is still healthy
+                self.timeouts += 1
+                raise subprocess.TimeoutExpired(argv, timeout)
+            else:
+                result = subprocess.CompletedProcess(
+                    argv, response.get("rc", 1), response.get("stdout", ""), response.get("stderr", ""))
+
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, argv, result.stdout, result.stderr)
+        return result
+
+    def _wait_for(self, request_id: int, timeout: float) -> Optional[Dict]:
+        deadline = None if timeout is None else timeout + 0.5  # small allowance for the pipe round trip
+        while True:
+            try:
+                response = self._responses.get(timeout=deadline)
+            except queue.Empty:
+                # Hung (Messages.app stuck, modal dialog...): kill it, the next call gets a new one
+                self.timeouts += 1
+                self._kill(self._proc)
+                raise subprocess.TimeoutExpired(self.command, timeout)
+            if response is None or response.get("id") == request_id:
+                return response
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.name,
+            "engine": self.engine,
+            "pid": self._proc.pid if self._proc and self._proc.poll() is None else None,
+            "requests": self.requests,
+            "restarts": self.restarts,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=2)
+                except Exception:
+                    self._kill(self._proc)
+
+
+def create_executor(backend: str = "worker") -> AutomationExecutor:
+    """
+    Build the configured executor.
+
+    Args:
+        backend: "worker" (persistent process) or "subprocess" (osascript per call)
+
+    Returns:
+        The executor; "worker" falls back to subprocess if the worker can't start
+    """
+    if backend == "worker":
+        executor = WorkerExecutor()
+        try:
+            with executor._lock:
+                executor._start()
+            return executor
+        except WorkerStartError as e:
+            print(f"[AUTOMATION] ⚠️ {e} - falling back to one osascript per call")
+    return SubprocessExecutor()
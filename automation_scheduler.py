@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Automation Scheduler - One queue for every script that drives Messages.app
+
+Replies are sent from conversation workers, their typing indicators from the
+timeline's pool, tapbacks from the reply path and receipts from the POST /send
+jobs - all calling run_script whenever they liked. Two GUI scripts driving
+Messages.app at once fight over focus, one fails, and its retry sleeps 1s.
+Every caller now takes a turn from this scheduler instead.
+
+Priority classes (lowest rank first):
+    reply       typing indicator + bubbles of an interactive reply
+    proactive   POST /send receipts
+    reaction    tapbacks
+
+Key principles:
+- `slots` scripts at a time (1: Messages.app has one focused window)
+- Per-target order: calls for one conversation run in the order they were
+  submitted, whatever their class; a conversation is ranked by the best class
+  it has waiting, so a reply queued behind its own tapback isn't stuck
+  behind other people's receipts
+- Fairness: between conversations of the same rank, the one served least
+  recently goes first (round-robin), so one busy chat can't starve the rest
+- Aging: anything waiting longer than `starvation_after` jumps ahead of the
+  classes, so tapbacks still go out under constant reply traffic
+- The granted call runs on the caller's own thread; exceptions propagate
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set
+
+REPLY = "reply"
+PROACTIVE = "proactive"
+REACTION = "reaction"
+PRIORITIES = (REPLY, PROACTIVE, REACTION)
+
+
+class _Ticket:
+    __slots__ = ("rank", "priority", "seq", "enqueued", "granted")
+
+    def __init__(self, priority: str, seq: int, enqueued: float):
+        self.rank = PRIORITIES.index(priority)
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = enqueued
+        self.granted = False
+
+
+class AutomationScheduler:
+    """
+    Grants turns at Messages.app by priority, per-target order and fairness.
+
+    Example:
+        >>> gui = AutomationScheduler()
+        >>> gui.run(automation.run_applescript, ASCRIPT, [target, text], priority=REPLY, target=target)
+    """
+
+    def __init__(self, slots: int = 1, starvation_after: float = 10.0,
+                 on_grant: Optional[Callable[[str, float], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            slots: scripts allowed to run at the same time
+            starvation_after: seconds after which a waiting call outranks every class
+            on_grant: called with (priority, seconds waited) whenever a call starts
+        """
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.slots = slots
+        self.starvation_after = starvation_after
+        self.on_grant = on_grant
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._waiting: Dict[str, Deque[_Ticket]] = {}  # target -> FIFO of tickets
+        self._busy: Set[str] = set()                    # targets with a call running
+        self._running = 0
+        self._seq = itertools.count()
+        self._grants = itertools.count(1)
+        self._last_served: Dict[str, int] = {}
+
+        self.runs = {p: 0 for p in PRIORITIES}
+        self.wait_seconds = {p: 0.0 for p in PRIORITIES}
+        self.max_wait = {p: 0.0 for p in PRIORITIES}
+        self.aged = 0
+
+    def run(self, fn: Callable, *args, priority: str = REPLY, target: str = "", **kwargs):
+        """Wait for a turn, then call fn(*args, **kwargs) on this thread and return its result."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r} (expected one of {', '.join(PRIORITIES)})")
+        with self._cond:
+            ticket = _Ticket(priority, next(self._seq), self.clock())
+            self._waiting.setdefault(target, deque()).append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+            waited = self.clock() - ticket.enqueued
+        if self.on_grant:
+            self.on_grant(priority, waited)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._busy.discard(target)
+                self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the best waiting targets. Caller holds the lock."""
+        granted = False
+        while self._running < self.slots:
+            target = self._pick()
+            if target is None:
+                break
+            queue = self._waiting[target]
+            ticket = queue.popleft()
+            if not queue:
+                del self._waiting[target]
+            ticket.granted = True
+            self._running += 1
+            self._busy.add(target)
+            self._last_served[target] = next(self._grants)
+
+            waited = self.clock() - ticket.enqueued
+            self.runs[ticket.priority] += 1
+            self.wait_seconds[ticket.priority] += waited
+            self.max_wait[ticket.priority] = max(self.max_wait[ticket.priority], waited)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _pick(self) -> Optional[str]:
+        now = self.clock()
+        best, best_key = None, None
+        for target, queue in self._waiting.items():
+            if target in self._busy:
+                continue  # keep this conversation's calls in order
+            rank = min(t.rank for t in queue)
+            if now - queue[0].enqueued >= self.starvation_after:
+                rank = -1
+            key = (rank, self._last_served.get(target, 0), queue[0].seq)
+            if best_key is None or key < best_key:
+                best, best_key = target, key
+        if best is not None and best_key[0] == -1 and min(t.rank for t in self._waiting[best]) > 0:
+            self.aged += 1
+        return best
+
+    def queued(self) -> int:
+        with self._cond:
+            return sum(len(q) for q in self._waiting.values())
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "running": self._running,
+                "queued": sum(len(q) for q in self._waiting.values()),
+                "runs": dict(self.runs),
+                "avg_wait_ms": {p: round(self.wait_seconds[p] / self.runs[p] * 1000, 1) if self.runs[p] else 0.0
+                                for p in PRIORITIES},
+                "max_wait_ms": {p: round(self.max_wait[p] * 1000, 1) for p in PRIORITIES},
+                "aged": self.aged,
+            }
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Automation Worker - Long-lived AppleScript runner for WorkerExecutor
+
+Started once by the bridge (see automation.py). Reads one JSON request per
+line on stdin and answers with one JSON line on stdout:
+
+    {"id": 1, "script": "/path/x.applescript", "args": ["+1555...", "hi"], "timeout": 10}
+    {"id": 1, "rc": 0, "stdout": "sent", "stderr": ""}
+
+Engines (best available is picked at startup):
+- nsapplescript: PyObjC's NSAppleScript, in-process. Each script is compiled
+  once and its `on run argv` handler is invoked with an Apple event, so no
+  process is spawned per call
+- osascript: scripts are precompiled once with osacompile (cached .scpt,
+  rebuilt when the source changes) and run with osascript. Still a spawn, but
+  no per-call compile. Used when PyObjC isn't installed
+
+stdout is reserved for the protocol; anything else goes to stderr.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "sf-bridge-compiled-scripts")
+
+
+def _fourcc(code: str) -> int:
+    return int.from_bytes(code.encode("ascii"), "big")
+
+
+class NSAppleScriptEngine:
+    name = "nsapplescript"
+
+    def __init__(self):
+        import Foundation  # PyObjC; ImportError => fall back
+        self.Foundation = Foundation
+        self._scripts: Dict[str, tuple] = {}
+
+    def _compiled(self, path: str):
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._scripts.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        F = self.Foundation
+        url = F.NSURL.fileURLWithPath_(path)
+        script, error = F.NSAppleScript.alloc().initWithContentsOfURL_error_(url, None)
+        if script is None:
+            raise RuntimeError(f"cannot load {path}: {error}")
+        ok, error = script.compileAndReturnError_(None)
+        if not ok:
+            raise RuntimeError(f"{path}: {error.get('NSAppleScriptErrorMessage', error)}")
+        self._scripts[path] = (mtime, script)
+        return script
+
+    def run(self, path: str, args, timeout: float) -> Dict:
+        F = self.Foundation
+        script = self._compiled(path)
+        # `run` Apple event with argv as the direct parameter (what osascript does)
+        event = F.NSAppleEventDescriptor.appleEventWithEventClass_eventID_targetDescriptor_returnID_transactionID_(
+            _fourcc("aevt"), _fourcc("oapp"), F.NSAppleEventDescriptor.currentProcessDescriptor(), -1, 0)
+        argv = F.NSAppleEventDescriptor.listDescriptor()
+        for i, arg in enumerate(args, 1):
+            argv.insertDescriptor_atIndex_(F.NSAppleEventDescriptor.descriptorWithString_(arg), i)
+        event.setParamDescriptor_forKeyword_(argv, _fourcc("----"))
+
+        result, error = script.executeAppleEvent_error_(event, None)
+        if result is None:
+            message = error.get("NSAppleScriptErrorMessage", str(error))
+            number = error.get("NSAppleScriptErrorNumber", -1)
+            return {"rc": 1, "stdout": "", "stderr": f"execution error: {message} ({number})"}
+        text = result.stringValue()
+        return {"rc": 0, "stdout": (text + "\n") if text is not None else "", "stderr": ""}
+
+
+class OsascriptEngine:
+    name = "osascript"
+
+    def __init__(self):
+        self.osacompile = shutil.which("osacompile")
+        if self.osacompile:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+
+    def _compiled(self, path: str) -> str:
+        if not self.osacompile:
+            return path
+        st = os.stat(path)
+        key = hashlib.sha1(f"{os.path.abspath(path)}:{st.st_mtime_ns}".encode()).hexdigest()[:16]
+        target = os.path.join(CACHE_DIR, f"{key}.scpt")
+        if not os.path.exists(target):
+            result = subprocess.run([self.osacompile, "-o", target, path], capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"[WORKER] osacompile failed for {path}: {result.stderr.strip()}", file=sys.stderr)
+                return path
+        return target
+
+    def run(self, path: str, args, timeout: float) -> Dict:
+        result = subprocess.run(["osascript", self._compiled(path), *args],
+                                capture_output=True, text=True, timeout=timeout)
+        return {"rc": result.returncode, "stdout": result.stdout, "stderr": result.stderr}
+
+
+def pick_engine():
+    try:
+        return NSAppleScriptEngine()
+    except ImportError:
+        return OsascriptEngine()
+
+
+def handle(engine, request: Dict) -> Dict:
+    path = request.get("script", "")
+    if not os.path.exists(path):
+        return {"rc": 1, "stdout": "", "stderr": f"osascript: {path}: No such file or directory"}
+    try:
+        return engine.run(path, [str(a) for a in request.get("args", [])], request.get("timeout"))
+    except subprocess.TimeoutExpired:
+        return {"rc": -1, "stdout": "", "stderr": "", "timed_out": True}
+    except Exception as e:
+        return {"rc": 1, "stdout": "", "stderr": f"{type(e).__name__}: {e}"}
+
+
+def main():
+    engine = pick_engine()
+    out = sys.stdout
+    out.write(json.dumps({"ready": True, "engine": engine.name, "pid": os.getpid()}) + "\n")
+    out.flush()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            print(f"[WORKER] bad request line: {line[:200]}", file=sys.stderr)
+            continue
+        response = handle(engine, request)
+        response["id"] = request.get("id")
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
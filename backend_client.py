@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Backend Client - Pooled, keep-alive HTTP for calls to the Synthetic Friends backend
+
+`requests.post()` builds a throwaway Session per call, so every iMessage paid
+DNS + TCP + TLS setup to the backend (usually through ngrok) before the
+request even left the Mac. This client keeps warm connections in a shared
+urllib3 pool that every conversation worker draws from.
+
+Key principles:
+- One connection pool shared by all threads; each thread gets its own
+  lightweight Session mounted on it (Session itself isn't thread-safe)
+- Pool size is configurable; extra concurrent requests open a temporary
+  connection rather than blocking
+- Every request reports where its time went: connect, TLS, time-to-first-byte
+  and total (connect/TLS are 0 when a warm connection was reused)
+"""
+
+import threading
+import time
+from typing import Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Per-thread scratchpad the connection classes write into during a request
+_timing = threading.local()
+
+
+def _reset_timing():
+    _timing.tcp = 0.0
+    _timing.connect = 0.0
+    _timing.new_connection = False
+    _timing.headers_at = None
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        _timing.tcp = time.perf_counter() - start
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _timing.connect = time.perf_counter() - start
+        _timing.new_connection = True
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        _timing.tcp = time.perf_counter() - start
+        return sock
+
+    def connect(self):
+        # HTTPSConnection.connect() = TCP (_new_conn) + TLS handshake
+        start = time.perf_counter()
+        super().connect()
+        _timing.connect = time.perf_counter() - start
+        _timing.new_connection = True
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use the timed connection classes."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        # Returns once response headers are in (the body is read by the Session)
+        response = super().send(request, **kwargs)
+        _timing.headers_at = time.perf_counter()
+        return response
+
+
+class BackendClient:
+    """
+    Thread-safe pooled HTTP client.
+
+    Example:
+        >>> client = BackendClient(pool_size=8)
+        >>> response, timing = client.post(url, json=payload, headers=headers, timeout=30)
+        >>> timing
+        {'connect_ms': 0.0, 'tls_ms': 0.0, 'ttfb_ms': 212.4, 'total_ms': 213.1, 'reused_connection': True}
+    """
+
+    def __init__(self, pool_size: int = 10):
+        self.pool_size = max(1, int(pool_size))
+        self._adapter = _TimedAdapter(
+            pool_connections=4,          # distinct hosts kept (backend + maybe a fallback)
+            pool_maxsize=self.pool_size,  # warm connections kept per host
+            pool_block=False,
+        )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def post(self, url: str, **kwargs) -> Tuple[requests.Response, Dict]:
+        """
+        POST through the shared pool.
+
+        Returns:
+            (response, timing) - raises the same requests exceptions as requests.post
+        """
+        _reset_timing()
+        start = time.perf_counter()
+        response = self._session().post(url, **kwargs)
+        end = time.perf_counter()
+
+        headers_at = _timing.headers_at or end
+        tcp = _timing.tcp
+        connect = _timing.connect
+        is_https = url.lower().startswith("https://")
+        timing = {
+            "connect_ms": round(tcp * 1000, 2),
+            "tls_ms": round(max(0.0, connect - tcp) * 1000, 2) if is_https else 0.0,
+            "ttfb_ms": round((headers_at - start) * 1000, 2),
+            "total_ms": round((end - start) * 1000, 2),
+            "reused_connection": not _timing.new_connection,
+        }
+        with self._lock:
+            self.requests += 1
+            if _timing.new_connection:
+                self.new_connections += 1
+        return response, timing
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reuse_ratio": round(1 - self.new_connections / self.requests, 3) if self.requests else 0.0,
+            }
+
+    def close(self):
+        self._adapter.close()
@@ -1,10 +1,34 @@
 #!/usr/bin/env python3
-import os, time, json, sqlite3, subprocess, fcntl, random, sys
+import os, time, json, sqlite3, subprocess, fcntl, random, sys, atexit
 from pathlib import Path
 from datetime import datetime
-from typing import Set, Dict, List
+from typing import Set, Dict, List, Optional, Union
 import requests
 
+from dispatcher import ConversationDispatcher
+from chat_watcher import create_watcher
+from chat_reader import ChatDBReader
+from dedup_store import ProcessedStore
+from checkpoint import Checkpoint
+from backend_client import BackendClient
+from circuit_breaker import (AVAILABILITY_ERRORS, CLOSED, OPEN, BackendBacklog, CircuitBreaker, CircuitOpenError,
+                             GuardedPoster)
+from env_config import EnvConfig
+from async_log import AsyncLogWriter
+from automation import WorkerStartError, create_executor
+from automation_scheduler import AutomationScheduler, PRIORITIES, PROACTIVE, REACTION, REPLY
+from focus_cache import FocusCache
+from timeline import BubbleTimeline
+from bubble_plan import (FAILED as PLAN_FAILED, SENT as PLAN_SENT, SKIPPED as PLAN_SKIPPED,
+                         BubblePlan, build_plans, focus_after_plan, run_plan)
+from outbox import InDoubt, Outbox
+from reply_stream import ACCEPT as STREAM_ACCEPT, StreamedReply, is_streamed
+from poll_scheduler import AdaptivePollScheduler
+from metrics import MetricsRegistry
+from tracing import Tracer, to_chrome_trace, to_jsonl
+from send_jobs import SendJobQueue, add_send_routes
+from coalesce import BurstCoalescer, MessageBatch, POLICIES, apple_time, needs_catch_up, plan_batches
+
 # -----------------------------
 # Safe Print Function
 # -----------------------------
@@ -18,67 +42,161 @@ def safe_print(*args, **kwargs):
         # stdout is closed - that's okay, we log to files
         pass
 
+# -----------------------------
+# Load .env file
+# -----------------------------
+def _on_env_reload(old, new):
+    """Log hot config changes (e.g. API key rotation) once, when they happen."""
+    changed = sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+    details = {"changed_keys": changed}
+    if "SF_API_KEY" in changed:
+        details["old_key_preview"] = get_redacted_key(old.get("SF_API_KEY", ""))
+        details["new_key_preview"] = get_redacted_key(new.get("SF_API_KEY", ""))
+    if "LOG_LEVEL" in changed:
+        backend_log.set_level(new.get("LOG_LEVEL", "info"))
+    log_backend("🔁 .env changed - new values will be used for the next backend request", details)
+
+# Loaded once; re-read only when .env changes on disk or on SIGHUP.
+# ENV_FILE lets supervisor.py point every worker at one shared .env
+env_config = EnvConfig(os.getenv("ENV_FILE", ".env"), on_reload=_on_env_reload)
+
+# Per-worker files (state, processed IDs, outbox, lock, logs) live here when set;
+# unset keeps the single-instance layout (state in the working directory)
+STATE_DIR = os.getenv("BRIDGE_STATE_DIR", "").strip()
+if STATE_DIR:
+    os.makedirs(STATE_DIR, exist_ok=True)
+
+def state_path(name: str) -> str:
+    """Default location of a per-worker file."""
+    return os.path.join(STATE_DIR, name) if STATE_DIR else name
+
+WORKER_NAME = os.getenv("BRIDGE_WORKER", "").strip()  # label set by supervisor.py
+
 # -----------------------------
 # Logging Setup
 # -----------------------------
-LOG_DIR = Path(__file__).parent / "logs"
-LOG_DIR.mkdir(exist_ok=True)  # Ensure logs directory exists
+LOG_DIR = Path(os.getenv("LOG_DIR") or (Path(STATE_DIR) / "logs" if STATE_DIR else Path(__file__).parent / "logs"))
+LOG_DIR.mkdir(parents=True, exist_ok=True)  # Ensure logs directory exists
 BACKEND_LOG_FILE = LOG_DIR / "backend_communication.log"
+# error | warning | info | debug - full headers, payloads and response bodies only at debug
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").lower()
+LOG_MAX_BYTES = int(float(os.getenv("LOG_MAX_MB", "10")) * 1024 * 1024)
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", "0"))  # 0 = size-based only
 
-def log_backend(message: str, data: dict = None):
-    """Log backend communication to dedicated log file."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    log_entry = f"[{timestamp}] {message}"
-    
-    if data:
-        # Redact API key for security
-        safe_data = data.copy()
-        if 'headers' in safe_data and 'X-API-Key' in safe_data['headers']:
-            key = safe_data['headers']['X-API-Key']
-            safe_data['headers']['X-API-Key'] = f"{key[:10]}...{key[-10:]}" if len(key) > 20 else "***REDACTED***"
-        
-        log_entry += f"\n{json.dumps(safe_data, indent=2, default=str)}"
-    
-    log_entry += "\n" + ("-" * 80) + "\n"
-    
-    # Always write to file first (most important)
-    try:
-        with open(BACKEND_LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(log_entry)
-            f.flush()  # Ensure it's written immediately
-    except Exception:
-        pass  # Silently fail - don't crash on logging errors
-    
-    # Try to print to stdout, but don't crash if pipe is broken
-    try:
-        print(log_entry.strip(), flush=True)
-    except (BrokenPipeError, IOError):
-        # stdout is closed or broken - that's okay, we logged to file
-        pass
+# JSON-lines file + stdout echo, written by a background thread
+backend_log = AsyncLogWriter(
+    BACKEND_LOG_FILE,
+    level=LOG_LEVEL,
+    max_bytes=LOG_MAX_BYTES,
+    backups=LOG_BACKUPS,
+    rotate_seconds=LOG_ROTATE_HOURS * 3600 or None,
+)
+atexit.register(backend_log.close)
+
+def log_backend(message: str, data: dict = None, level: str = "info"):
+    """Queue a backend communication log record (never blocks on disk)."""
+    backend_log.log(message, data, level)
 
 # -----------------------------
-# Load .env file
+# Metrics (GET /metrics) - per-thread shards, no locks on the hot path
 # -----------------------------
-def load_env(path=".env"):
-    if os.path.exists(path):
-        for line in open(path):
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            k, _, v = line.partition("=")
-            os.environ[k.strip()] = v.strip()
+metrics = MetricsRegistry(prefix="bridge_")
+POLL_QUERY_SECONDS = metrics.histogram(
+    "poll_query_seconds", "chat.db poll query latency",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+BACKEND_SECONDS = metrics.histogram("backend_request_seconds", "Backend request latency (call_sf)")
+FIRST_BUBBLE_SECONDS = metrics.histogram("backend_first_bubble_seconds",
+                                         "Backend request to first parsed bubble (streamed replies)")
+TYPING_SECONDS = metrics.histogram("typing_indicator_seconds", "Typing indicator AppleScript latency per attempt")
+TAPBACK_SECONDS = metrics.histogram("tapback_seconds", "Tapback AppleScript latency per attempt")
+SEND_SECONDS = metrics.histogram("send_seconds", "Send AppleScript latency")
+TYPE_AND_SEND_SECONDS = metrics.histogram("type_and_send_seconds", "type_and_send AppleScript latency (whole plan)")
+INBOUND_TOTAL = metrics.counter("messages_inbound_total", "New inbound messages read from chat.db")
+PROCESSED_TOTAL = metrics.counter("messages_processed_total", "Inbound messages answered (reply stored in the outbox)")
+STALE_SKIPPED_TOTAL = metrics.counter("messages_stale_skipped_total", "Backlog messages skipped as stale")
+BACKEND_REQUESTS_TOTAL = metrics.counter("backend_requests_total", "Backend requests made (incl. hedged duplicates)")
+BACKEND_SHORT_CIRCUITED_TOTAL = metrics.counter("backend_short_circuited_total",
+                                                "Backend calls refused because the circuit breaker was open")
+BACKEND_ERRORS_TOTAL = metrics.counter("backend_errors_total", "Backend requests that failed (any error)")
+BACKEND_401_TOTAL = metrics.counter("backend_401_total", "Backend requests rejected with 401")
+SEND_FAILURES_TOTAL = metrics.counter("send_failures_total", "Bubble send attempts that failed")
+SEND_RETRIES_TOTAL = metrics.counter("send_retries_total", "Bubble sends retried by the outbox")
+TYPING_RETRIES_TOTAL = metrics.counter("script_retries_total", "AppleScript retries", script="typing")
+TAPBACK_RETRIES_TOTAL = metrics.counter("script_retries_total", "AppleScript retries", script="tapback")
 
-load_env()
+# Per-message latency spans (GET /traces, `python3 tracing.py summary`), keyed by ROWID
+tracer = Tracer(
+    capacity=int(os.getenv("TRACE_CAPACITY", "20000")),
+    enabled=os.getenv("TRACE_ENABLED", "true").lower() == "true",
+)
 
 SF_API_URL  = os.getenv("SF_API_URL", "").strip()
 SF_API_KEY  = os.getenv("SF_API_KEY", "").strip()
 POLL        = float(os.getenv("POLL_INTERVAL", "2"))
-STATE       = os.getenv("STATE_FILE", "./last_rowid.state")
+# Adaptive polling: fast right after activity, backing off exponentially when idle.
+# POLL_ADAPTIVE=false polls every POLL_INTERVAL as before
+POLL_ADAPTIVE = os.getenv("POLL_ADAPTIVE", "true").lower() == "true"
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "0.5"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "4"))
+POLL_ACTIVE_WINDOW = float(os.getenv("POLL_ACTIVE_WINDOW", "60"))  # seconds "active" after a message
+STATE       = os.getenv("STATE_FILE", state_path("last_rowid.state"))
+# fsync state commits (one per poll batch) so they survive power loss, not just crashes
+CHECKPOINT_FSYNC = os.getenv("CHECKPOINT_FSYNC", "true").lower() == "true"
 ENABLE_TYPING = os.getenv("ENABLE_TYPING_INDICATOR", "true").lower() == "true"
 ENABLE_REACTIONS = os.getenv("ENABLE_REACTIONS", "true").lower() == "true"
+# Send a reply's bubbles (typing indicator + send each) with one type_and_send.applescript
+# run instead of two scripts per bubble; replies estimated to take longer than
+# TYPE_AND_SEND_MAX_SECONDS are split over several runs so other chats get a turn
+TYPE_AND_SEND = os.getenv("TYPE_AND_SEND", "false").lower() == "true"
+TYPE_AND_SEND_MAX_SECONDS = float(os.getenv("TYPE_AND_SEND_MAX_SECONDS", "15"))
+# The typing indicator skips activate / open location / settle delays when the bridge
+# focused the same chat less than this many seconds ago (0 = always take the slow path)
+FOCUS_CACHE_SECONDS = float(os.getenv("FOCUS_CACHE_SECONDS", "10"))
+# How many conversations may be in flight at once (backend call + typing/send pipeline)
+MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT_CONVERSATIONS", "4"))
+# Proactive POST /send jobs: recipients sent to at once, and unfinished jobs before 429
+SEND_JOB_WORKERS = int(os.getenv("SEND_JOB_WORKERS", "2"))
+SEND_JOB_MAX_QUEUED = int(os.getenv("SEND_JOB_MAX_QUEUED", "100"))
+# Warm keep-alive connections kept to the backend (shared by all conversation workers)
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", str(max(4, MAX_CONCURRENT))))
+# Circuit breaker: after BREAKER_FAILURES failures in a row (or half the recent calls
+# failing or slower than BREAKER_SLOW_SECONDS) backend calls fail fast and inbound
+# messages are held locally; a probe goes out after BREAKER_OPEN_SECONDS (doubling)
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "10"))
+BREAKER_SLOW_SECONDS = float(os.getenv("BREAKER_SLOW_SECONDS", "10"))
+BACKEND_MAX_ATTEMPTS = int(os.getenv("BACKEND_MAX_ATTEMPTS", "5"))  # failed calls before a message is given up
+# Hedged requests: a duplicate (same Idempotency-Key) goes out when the first is slower
+# than the recent p95, first answer wins. Needs a backend that dedupes by message_id
+BACKEND_HEDGE = os.getenv("BACKEND_HEDGE", "false").lower() == "true"
+BACKEND_HEDGE_MIN_MS = float(os.getenv("BACKEND_HEDGE_MIN_MS", "500"))
+# Ask the backend to stream its reply (NDJSON or SSE, one bubble per event) so each
+# bubble is typed as soon as it's generated; a plain JSON answer still works
+BACKEND_STREAM = os.getenv("BACKEND_STREAM", "false").lower() == "true"
+# "watch" wakes as soon as chat.db / chat.db-wal changes (POLL becomes the max wait);
+# "poll" is the old fixed-interval loop
+WATCH_MODE = os.getenv("WATCH_MODE", "watch").lower()
+WATCH_BACKEND = os.getenv("WATCH_BACKEND", "auto").lower()  # auto | kqueue | inotify | stat
+# "worker" keeps one AppleScript runner process alive; "subprocess" spawns osascript per call
+AUTOMATION_BACKEND = os.getenv("AUTOMATION_BACKEND", "worker").lower()
+# Catch-up after downtime: drain the whole backlog at once and answer each sender
+# with one request (per_sender | latest | none = one request per message)
+CATCHUP_POLICY = os.getenv("CATCHUP_POLICY", "per_sender").lower()
+CATCHUP_AGE_SECONDS = float(os.getenv("CATCHUP_AGE_SECONDS", "120"))  # older than this = we fell behind
+CATCHUP_MAX_ROWS = int(os.getenv("CATCHUP_MAX_ROWS", "5000"))  # rows drained per catch-up pass
+STALE_MESSAGE_HOURS = float(os.getenv("STALE_MESSAGE_HOURS", "24"))
+STALE_POLICY = os.getenv("STALE_POLICY", "reply").lower()  # reply (flagged stale) | skip
+# Live bursts: a sender's messages arriving within this many ms of each other become
+# one backend request (0 = off, the default: every held message waits out the window,
+# so it's added to each reply's latency); BURST_MAX_WAIT_MS caps how long a burst is held
+BURST_WINDOW_MS = float(os.getenv("BURST_WINDOW_MS", "0"))
+BURST_MAX_WAIT_MS = float(os.getenv("BURST_MAX_WAIT_MS", str(BURST_WINDOW_MS * 4)))
 
 if not SF_API_URL or not SF_API_KEY:
     raise SystemExit("Set SF_API_URL and SF_API_KEY in your .env file.")
+if CATCHUP_POLICY not in POLICIES:
+    raise SystemExit(f"CATCHUP_POLICY must be one of: {', '.join(POLICIES)}")
 
 # Log startup configuration (with redacted API key)
 def get_redacted_key(key: str) -> str:
@@ -96,17 +214,23 @@ log_backend(
         "poll_interval": POLL,
         "typing_enabled": ENABLE_TYPING,
         "reactions_enabled": ENABLE_REACTIONS,
+        "max_concurrent_conversations": MAX_CONCURRENT,
+        "watch_mode": WATCH_MODE,
+        "catchup_policy": CATCHUP_POLICY,
+        "burst_window_ms": BURST_WINDOW_MS,
         "startup_time": datetime.now().isoformat()
     }
 )
 
 HOME     = str(Path.home())
-CHAT_DB  = f"{HOME}/Library/Messages/chat.db"
+CHAT_DB  = os.getenv("CHAT_DB", f"{HOME}/Library/Messages/chat.db")
+HTTP_PORT = int(os.getenv("HTTP_PORT", "3001"))
 BRIDGE_DIR = Path(__file__).parent
 ASCRIPT  = str(BRIDGE_DIR / "imessage_send.applescript")
 ASCRIPT_TYPING = str(BRIDGE_DIR / "show_typing_indicator.applescript")
 ASCRIPT_REACTION = str(BRIDGE_DIR / "send_tapback.applescript")
-LOCK_FILE = str(BRIDGE_DIR / "bridge.lock")
+ASCRIPT_PLAN = str(BRIDGE_DIR / "type_and_send.applescript")
+LOCK_FILE = os.getenv("LOCK_FILE", state_path("bridge.lock") if STATE_DIR else str(BRIDGE_DIR / "bridge.lock"))
 _lock_handle = None
 
 def acquire_lock():
@@ -119,59 +243,95 @@ def acquire_lock():
         _lock_handle.write(str(os.getpid()))
         _lock_handle.flush()
     except BlockingIOError:
-        log_backend("⚠️ Lock file exists - another instance running or stale lock", {})
-        raise SystemExit("Another bridge.py instance is already running. If not, remove bridge.lock.")
+        log_backend("⚠️ Lock file exists - another instance running or stale lock", {}, level="warning")
+        raise SystemExit(f"Another bridge.py instance is already running. If not, remove {LOCK_FILE}.")
     except Exception as e:
-        log_backend(f"❌ Failed to acquire lock: {e}", {})
+        log_backend(f"❌ Failed to acquire lock: {e}", {}, level="error")
         raise
 
 acquire_lock()
-log_backend("🔒 Lock acquired successfully", {"pid": os.getpid()})
+log_backend("🔒 Lock acquired successfully", {"pid": os.getpid(), "lock_file": LOCK_FILE, "chat_db": CHAT_DB, "worker": WORKER_NAME or None})
 
 # Processed message tracking (CRITICAL for preventing duplicates)
-PROCESSED_IDS_FILE = "bridge_processed_messages.txt"
-processed_message_ids: Set[int] = set()
+PROCESSED_IDS_FILE = state_path("bridge_processed_messages.txt")  # legacy format, migrated on startup
+PROCESSED_DB = os.getenv("PROCESSED_DB", state_path("bridge_processed_messages.db"))
+# IDs kept below the committed watermark before pruning
+PROCESSED_RETENTION = int(os.getenv("PROCESSED_RETENTION", "1000"))
+processed_message_ids: ProcessedStore = None
+checkpoint: Checkpoint = None  # batches processed IDs + watermark into one commit per poll
 
+# Outbound replies are stored here (one job per bubble) before anything is sent
+OUTBOX_DB = os.getenv("OUTBOX_DB", state_path("bridge_outbox.db"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "3"))
+OUTBOX_RETRY_SECONDS = float(os.getenv("OUTBOX_RETRY_SECONDS", "2"))  # doubles per retry
+OUTBOX_RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+outbox: Outbox = None
+dispatcher: ConversationDispatcher = None
+
+FETCH_LIMIT = 100  # rows per poll; a full batch triggers an immediate re-poll
+# Rows the bridge answers (and so the only ones the watermark moves over)
+POLL_FILTER = (
+    "message.is_from_me = 0 "
+    "AND message.text IS NOT NULL "
+    "AND message.service = 'iMessage'"
+)
 SQL = (
     "SELECT message.ROWID, message.text, "
-    "coalesce(handle.uncanonicalized_id, handle.id) AS sender "
+    "coalesce(handle.uncanonicalized_id, handle.id) AS sender, "
+    "message.date "
     "FROM message "
     "LEFT JOIN handle ON handle.ROWID = message.handle_id "
-    "WHERE message.is_from_me = 0 "
-    "AND message.text IS NOT NULL "
-    "AND message.service = 'iMessage' "
+    f"WHERE {POLL_FILTER} "
     "AND message.ROWID > ? "
-    "ORDER BY message.ROWID ASC LIMIT 100;"
+    f"ORDER BY message.ROWID ASC LIMIT {FETCH_LIMIT};"
 )
 
+if POLL_ADAPTIVE:
+    poll_scheduler = AdaptivePollScheduler(
+        min_interval=min(POLL_MIN_INTERVAL, POLL_MAX_INTERVAL),
+        max_interval=POLL_MAX_INTERVAL,
+        active_window=POLL_ACTIVE_WINDOW,
+    )
+else:
+    poll_scheduler = AdaptivePollScheduler(min_interval=POLL, max_interval=POLL)
+POLL_STATS_LOG_SECONDS = 900  # how often the poll metrics go to the backend log
+
+bursts = BurstCoalescer(window=BURST_WINDOW_MS / 1000, max_wait=BURST_MAX_WAIT_MS / 1000)
+
 # -----------------------------
 # Helpers
 # -----------------------------
-def read_last():
-    try:
-        return int(open(STATE).read().strip())
-    except Exception:
-        return 0
-
-def write_last(v):
-    with open(STATE, "w") as f:
-        f.write(str(v))
-
 def open_ro(path):
     return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
 
-def load_processed_ids() -> Set[int]:
-    """Load previously processed message IDs from disk to prevent duplicates."""
-    if not os.path.exists(PROCESSED_IDS_FILE):
-        return set()
+def open_processed_store() -> ProcessedStore:
+    """
+    Open the processed-ID store (CRITICAL for preventing duplicates).
     
-    with open(PROCESSED_IDS_FILE, 'r') as f:
-        return {int(line.strip()) for line in f if line.strip().isdigit()}
+    Migrates the old bridge_processed_messages.txt on first run.
+    """
+    store = ProcessedStore(PROCESSED_DB, retention=PROCESSED_RETENTION, durable=CHECKPOINT_FSYNC)
+    migrated = store.migrate_from_text(PROCESSED_IDS_FILE)
+    if migrated:
+        print(f"Migrated {migrated} processed message IDs from {PROCESSED_IDS_FILE}")
+        log_backend("📦 Migrated processed IDs to SQLite store", {"count": migrated, "store": PROCESSED_DB})
+    return store
 
-def save_processed_id(message_id: int):
-    """Save a processed message ID to disk."""
-    with open(PROCESSED_IDS_FILE, 'a') as f:
-        f.write(f"{message_id}\n")
+def open_outbox() -> Outbox:
+    """Open the reply outbox and settle anything a crash left half-sent."""
+    box = Outbox(OUTBOX_DB, max_attempts=OUTBOX_MAX_ATTEMPTS, backoff_base=OUTBOX_RETRY_SECONDS,
+                 durable=CHECKPOINT_FSYNC)
+    for job in box.recover():
+        print(f"[OUTBOX] ⚠️ Job {job['id']} (message {job['inbound_rowid']}) was mid-send when the bridge stopped - not resending")
+        log_backend(
+            "⚠️ Outbox job in doubt after restart - not resent",
+            {"job_id": job["id"], "message_id": job["inbound_rowid"], "target": job["target"], "kind": job.get("kind")},
+            level="warning"
+        )
+    pruned = box.prune(OUTBOX_RETENTION_DAYS * 86400)
+    if pruned:
+        print(f"[OUTBOX] Pruned {pruned} finished jobs older than {OUTBOX_RETENTION_DAYS:g} days")
+    return box
 
 def calculate_human_typing_delay(text: str) -> float:
     """
@@ -225,7 +385,84 @@ def calculate_delay_before(is_first_message: bool) -> float:
 # -----------------------------
 # Messaging / API calls
 # -----------------------------
-def send_imessage(target: str, text: str, effect: str = "none"):
+# Shared pooled HTTP client - skips DNS/TCP/TLS setup on warm connections
+backend_client = BackendClient(pool_size=BACKEND_POOL_SIZE)
+
+def post_backend(url: str, **kwargs):
+    """One HTTP attempt (hedging may make two per call)."""
+    BACKEND_REQUESTS_TOTAL.inc()
+    return backend_client.post(url, **kwargs)
+
+# Fail fast while the backend is down; batches that can't reach it wait in the backlog
+backend_breaker = CircuitBreaker(
+    consecutive_failures=BREAKER_FAILURES,
+    open_seconds=BREAKER_OPEN_SECONDS,
+    slow_call_seconds=BREAKER_SLOW_SECONDS,
+)
+backend = GuardedPoster(post_backend, backend_breaker, hedge=BACKEND_HEDGE,
+                        hedge_min_seconds=BACKEND_HEDGE_MIN_MS / 1000)
+backend_backlog = BackendBacklog(max_attempts=BACKEND_MAX_ATTEMPTS)
+
+def is_backend_unavailable(error: Exception) -> bool:
+    """Breaker open, timeout, connection error (or a stream cut off), 5xx or 429 - worth holding the message for."""
+    if isinstance(error, (CircuitOpenError, *AVAILABILITY_ERRORS)):
+        return True
+    response = getattr(error, "response", None)
+    return (isinstance(error, requests.exceptions.HTTPError) and response is not None
+            and (response.status_code >= 500 or response.status_code == 429))
+
+# Runs the .applescript files (send / typing / tapback)
+automation = create_executor(AUTOMATION_BACKEND)
+atexit.register(automation.close)
+
+# Every script takes its turn here: one at a time, replies before receipts before
+# tapbacks, each conversation in order (two GUI scripts at once fight over focus)
+AUTOMATION_WAIT_SECONDS = {
+    p: metrics.histogram("automation_wait_seconds", "Time a script waited for its turn at Messages.app", priority=p)
+    for p in PRIORITIES
+}
+gui_scheduler = AutomationScheduler(
+    starvation_after=float(os.getenv("AUTOMATION_STARVATION_SECONDS", "10")),
+    on_grant=lambda priority, waited: AUTOMATION_WAIT_SECONDS[priority].observe(waited),
+)
+
+# Which chat Messages.app is showing, so a typing indicator right after another one
+# for the same chat doesn't activate and re-open it
+focus = FocusCache(ttl=FOCUS_CACHE_SECONDS)
+
+def track_focus(script: str, target: str, ok: bool, args: List[str] = (), stdout: str = ""):
+    """What a finished script did to Messages.app's focused conversation."""
+    effect = focus_after_plan(args, stdout) if ok and script == ASCRIPT_PLAN else None
+    if not ok or script == ASCRIPT_REACTION or effect == "unknown":
+        focus.invalidate()  # failed, or may have opened another window
+    elif script == ASCRIPT_TYPING or effect == "focused":
+        focus.focused(target)  # opened (or was already in) this chat
+    else:
+        focus.touched(target)  # a send, or a plan that never typed (so never opened the chat)
+
+def run_script(script: str, args: List[str], histogram, priority: str = REPLY,
+               timeout: float = 10) -> subprocess.CompletedProcess:
+    """
+    automation.run_applescript (check=True) once the scheduler gives this
+    call its turn, with the script's own latency recorded.
+    args[0] is always the target, which keeps each conversation in order.
+    """
+    target = args[0] if args else ""
+
+    def timed():
+        # Decided inside the turn: no other script can move the focus until we're done
+        call_args = [*args, "fast"] if script == ASCRIPT_TYPING and focus.fast_path(target) else args
+        start = time.perf_counter()
+        result = None
+        try:
+            result = automation.run_applescript(script, call_args, timeout=timeout, check=True)
+            return result
+        finally:
+            histogram.since(start)
+            track_focus(script, target, result is not None, call_args, result.stdout if result is not None else "")
+    return gui_scheduler.run(timed, priority=priority, target=target)
+
+def send_imessage(target: str, text: str, effect: str = "none", priority: str = REPLY):
     """
     Send message using AppleScript.
     
@@ -235,27 +472,18 @@ def send_imessage(target: str, text: str, effect: str = "none"):
         effect: Message effect (slam, loud, gentle, etc.)
                 Note: Effects are not currently supported by macOS Messages AppleScript,
                 but the parameter is here for future compatibility.
+        priority: automation scheduler class (REPLY, or PROACTIVE for /send receipts)
     
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if successful, False if it definitely wasn't sent
+    
+    Raises:
+        InDoubt: the script timed out or died mid-send - the message may have
+            gone out, so it must not be retried
     """
     try:
-        if effect and effect != "none":
-            result = subprocess.run(
-                ["osascript", ASCRIPT, target, text, effect],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=10
-            )
-        else:
-            result = subprocess.run(
-                ["osascript", ASCRIPT, target, text],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=10
-            )
+        args = [target, text, effect] if effect and effect != "none" else [target, text]
+        result = run_script(ASCRIPT, args, SEND_SECONDS, priority)
         
         # Log success
         stdout = result.stdout.strip() if result.stdout else ""
@@ -268,10 +496,14 @@ def send_imessage(target: str, text: str, effect: str = "none"):
     except subprocess.TimeoutExpired:
         print(f"[SEND] ❌ Message send TIMED OUT to {target} after 10 seconds")
         print(f"[SEND] 💡 Tip: Check if Messages.app is responding")
-        return False
+        raise InDoubt("send script timed out after 10s")
         
     except subprocess.CalledProcessError as e:
         error_msg = e.stderr.strip() if e.stderr else str(e)
+        if e.returncode < 0:
+            # Killed (or the worker died) mid-request: it may already have sent
+            print(f"[SEND] ❌ Send script died mid-send to {target}: {error_msg}")
+            raise InDoubt(f"send script died: {error_msg}")
         print(f"[SEND] ❌ Message send FAILED to {target}")
         print(f"[SEND]    Exit code: {e.returncode}")
         if error_msg:
@@ -283,9 +515,14 @@ def send_imessage(target: str, text: str, effect: str = "none"):
         print(f"[SEND] ❌ CRITICAL: AppleScript file not found: {ASCRIPT}")
         return False
         
+    except WorkerStartError as e:
+        # The script never ran
+        print(f"[SEND] ❌ Automation worker unavailable: {e}")
+        return False
+        
     except Exception as e:
         print(f"[SEND] ❌ Unexpected error sending message: {type(e).__name__}: {e}")
-        return False
+        raise InDoubt(f"{type(e).__name__}: {e}") from e
 
 def show_typing_indicator(target: str, retry: int = 3):
     """
@@ -304,13 +541,7 @@ def show_typing_indicator(target: str, retry: int = 3):
     for attempt in range(retry):
         try:
             print(f"[TYPE] 📞 Calling AppleScript (attempt {attempt + 1}/{retry})...")
-            result = subprocess.run(
-                ["osascript", ASCRIPT_TYPING, target],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                check=True
-            )
+            result = run_script(ASCRIPT_TYPING, [target], TYPING_SECONDS)
             
             # Log the result
             stdout = result.stdout.strip() if result.stdout else ""
@@ -331,6 +562,7 @@ def show_typing_indicator(target: str, retry: int = 3):
             error_msg = "AppleScript timed out after 10 seconds"
             if attempt < retry - 1:
                 print(f"[TYPE] ⏱️ {error_msg}, retrying in 1s...")
+                TYPING_RETRIES_TOTAL.inc()
                 time.sleep(1.0)
             else:
                 print(f"[TYPE] ✗ Failed after {retry} attempts: {error_msg}")
@@ -347,6 +579,7 @@ def show_typing_indicator(target: str, retry: int = 3):
             
             if attempt < retry - 1:
                 print(f"[TYPE] 🔄 Retrying in 1s...")
+                TYPING_RETRIES_TOTAL.inc()
                 time.sleep(1.0)
             else:
                 print(f"[TYPE] ✗ Failed after {retry} attempts")
@@ -360,6 +593,7 @@ def show_typing_indicator(target: str, retry: int = 3):
             print(f"[TYPE] ⚠️ Unexpected error: {type(e).__name__}: {e}")
             if attempt < retry - 1:
                 print(f"[TYPE] 🔄 Retrying in 1s...")
+                TYPING_RETRIES_TOTAL.inc()
                 time.sleep(1.0)
             else:
                 print(f"[TYPE] ✗ Failed after {retry} attempts")
@@ -390,13 +624,7 @@ def send_tapback(target: str, reaction_type: str, retry: int = 3):
     for attempt in range(retry):
         try:
             print(f"[REACT] 📞 Calling AppleScript (attempt {attempt + 1}/{retry})...")
-            result = subprocess.run(
-                ["osascript", ASCRIPT_REACTION, target, reaction_type],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                check=True
-            )
+            result = run_script(ASCRIPT_REACTION, [target, reaction_type], TAPBACK_SECONDS, REACTION)
             
             # Log the result
             stdout = result.stdout.strip() if result.stdout else ""
@@ -417,6 +645,7 @@ def send_tapback(target: str, reaction_type: str, retry: int = 3):
             error_msg = "AppleScript timed out after 10 seconds"
             if attempt < retry - 1:
                 print(f"[REACT] ⏱️ {error_msg}, retrying in 1s...")
+                TAPBACK_RETRIES_TOTAL.inc()
                 time.sleep(1.0)
             else:
                 print(f"[REACT] ✗ {reaction_type} reaction timed out after {retry} attempts")
@@ -434,6 +663,7 @@ def send_tapback(target: str, reaction_type: str, retry: int = 3):
             
             if attempt < retry - 1:
                 print(f"[REACT] 🔄 Retrying in 1s...")
+                TAPBACK_RETRIES_TOTAL.inc()
                 time.sleep(1.0)
             else:
                 print(f"[REACT] ✗ Failed after {retry} attempts")
@@ -447,23 +677,36 @@ def send_tapback(target: str, reaction_type: str, retry: int = 3):
             print(f"[REACT] ⚠️ Unexpected error: {type(e).__name__}: {e}")
             if attempt < retry - 1:
                 print(f"[REACT] 🔄 Retrying in 1s...")
+                TAPBACK_RETRIES_TOTAL.inc()
                 time.sleep(1.0)
             else:
                 print(f"[REACT] ✗ Failed after {retry} attempts")
     
     return False
 
-def call_sf(sender: str, text: str, message_id: int) -> Dict:
-    """Call Synthetic Friends backend and return structured response."""
-    # Reload .env on each request to ensure we always have the latest API key
-    load_env()
-    current_api_key = os.getenv("SF_API_KEY", "").strip()
-    current_api_url = os.getenv("SF_API_URL", "").strip()
+def call_sf(sender: str, text: str, message_id: int, metadata: Dict = None) -> Union[Dict, StreamedReply]:
+    """
+    Call Synthetic Friends backend and return structured response.
+    
+    `metadata` is merged into the request metadata (coalesced catch-up batches
+    send their message_ids, per-message texts and stale flag there).
+    
+    With BACKEND_STREAM on and a backend that streams (NDJSON / SSE), returns a
+    StreamedReply as soon as the response headers are in; its bubbles are
+    read while the first ones are already being typed (see deliver_streamed).
+    """
+    # One consistent snapshot for this request - picks up a rotated key without
+    # re-reading .env per message
+    env = env_config.current()
+    current_api_key = env.get("SF_API_KEY", "").strip()
+    current_api_url = env.get("SF_API_URL", "").strip()
     
     # Use the freshly loaded values
     if not current_api_key or not current_api_url:
         raise ValueError("SF_API_KEY or SF_API_URL not found in .env file")
     
+    # Same key for retries and hedged duplicates, so the backend can dedupe by message_id
+    idempotency_key = f"{WORKER_NAME or 'mac_bridge'}:{message_id}"
     payload = {
         "from": sender,
         "text": text,
@@ -471,26 +714,21 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
         "metadata": {
             "source": "mac_bridge",
             "message_id": message_id,
+            "idempotency_key": idempotency_key,
             "received_at": datetime.utcnow().isoformat() + "Z",
         },
     }
+    if metadata:
+        payload["metadata"].update(metadata)
 
     headers = {
         "X-API-Key": current_api_key,
         "Content-Type": "application/json",
+        "Idempotency-Key": idempotency_key,
     }
+    if BACKEND_STREAM:
+        headers["Accept"] = STREAM_ACCEPT
     
-    # Log which API key we're using (redacted) for debugging
-    if current_api_key != SF_API_KEY:
-        log_backend(
-            "⚠️ API KEY CHANGED - Using newly loaded key from .env",
-            {
-                "old_key_preview": get_redacted_key(SF_API_KEY),
-                "new_key_preview": get_redacted_key(current_api_key),
-                "message_id": message_id
-            }
-        )
-
     # Log outgoing request
     log_backend(
         f"📤 OUTGOING REQUEST to backend",
@@ -506,27 +744,40 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
         }
     )
 
+    start = time.perf_counter()
     try:
-        start_time = time.time()
-        r = requests.post(current_api_url, headers=headers, json=payload, timeout=30)
-        elapsed_time = time.time() - start_time
+        r, timing = backend.post(current_api_url, headers=headers, json=payload, timeout=30, stream=BACKEND_STREAM)
+        elapsed_time = timing["total_ms"] / 1000
+        BACKEND_SECONDS.observe(elapsed_time)
+        
+        if BACKEND_STREAM and r.ok and is_streamed(r):
+            # Headers only so far; the events are logged as they're read
+            log_backend(
+                f"📥 INCOMING STREAMED RESPONSE from backend",
+                {
+                    "status_code": r.status_code,
+                    "elapsed_time_seconds": f"{elapsed_time:.3f}",
+                    "timing_ms": timing,
+                    "headers": dict(r.headers),
+                    "message_id": message_id
+                }
+            )
+            return StreamedReply(r, default_target=sender, started=start)
         
-        # Log response details
+        # Log response details (the body is only written at LOG_LEVEL=debug)
         try:
-            response_json = r.json()
-            response_preview = json.dumps(response_json, indent=2)
-            if len(response_preview) > 1000:
-                response_preview = response_preview[:1000] + "\n... (truncated)"
-        except:
-            response_preview = r.text[:500] if r.text else "(no response body)"
+            response_body = r.json()
+        except ValueError:
+            response_body = r.text[:500] if r.text else "(no response body)"
         
         log_backend(
             f"📥 INCOMING RESPONSE from backend",
             {
                 "status_code": r.status_code,
                 "elapsed_time_seconds": f"{elapsed_time:.3f}",
+                "timing_ms": timing,
                 "headers": dict(r.headers),
-                "response_body": response_json if r.status_code == 200 else response_preview,
+                "response_body": response_body,
                 "message_id": message_id
             }
         )
@@ -534,7 +785,15 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
         r.raise_for_status()
         return r.json()
         
+    except CircuitOpenError:
+        # No request was made - the caller holds the message until the breaker lets traffic through
+        BACKEND_SHORT_CIRCUITED_TOTAL.inc()
+        raise
+        
     except requests.exceptions.HTTPError as e:
+        BACKEND_ERRORS_TOTAL.inc()
+        if e.response is not None and e.response.status_code == 401:
+            BACKEND_401_TOTAL.inc()
         # Log the actual error response from backend
         try:
             error_body = e.response.text[:1000] if e.response.text else "(no error body)"
@@ -548,7 +807,8 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
                     "headers": error_headers,
                     "error_body": error_body,
                     "message_id": message_id
-                }
+                },
+                level="error"
             )
             
             print(f"[!!BACKEND ERROR!!] {e.response.status_code}: {error_body[:500]}")
@@ -562,7 +822,8 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
                         "message_id": message_id,
                         "sender": sender,
                         "note": "Bridge will continue running but message will not be processed"
-                    }
+                    },
+                    level="warning"
                 )
                 # Return empty response structure with marker so bridge knows it's a 401
                 return {
@@ -578,7 +839,8 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
                     "error": str(e),
                     "message_id": message_id,
                     "log_error": str(log_err)
-                }
+                },
+                level="error"
             )
             print(f"[!!BACKEND ERROR!!] {e}")
             # For 401, still return empty response
@@ -593,6 +855,8 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
             raise
         
     except requests.exceptions.Timeout as e:
+        BACKEND_ERRORS_TOTAL.inc()
+        BACKEND_SECONDS.since(start)
         log_backend(
             f"⏱️ BACKEND TIMEOUT",
             {
@@ -600,25 +864,30 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
                 "timeout_seconds": 30,
                 "error": str(e),
                 "message_id": message_id
-            }
+            },
+            level="error"
         )
         print(f"[!!CONNECTION ERROR!!] Backend request timed out after 30 seconds")
         raise
         
     except requests.exceptions.ConnectionError as e:
+        BACKEND_ERRORS_TOTAL.inc()
+        BACKEND_SECONDS.since(start)
         log_backend(
             f"🔌 BACKEND CONNECTION ERROR",
             {
                 "url": current_api_url,
                 "error": str(e),
                 "message_id": message_id
-            }
+            },
+            level="error"
         )
         print(f"[!!CONNECTION ERROR!!] Failed to connect to backend: {e}")
         print(f"[!!CONNECTION ERROR!!] Backend URL: {current_api_url}")
         raise
         
     except Exception as e:
+        BACKEND_ERRORS_TOTAL.inc()
         log_backend(
             f"💥 UNEXPECTED ERROR calling backend",
             {
@@ -626,15 +895,16 @@ def call_sf(sender: str, text: str, message_id: int) -> Dict:
                 "error_type": type(e).__name__,
                 "error": str(e),
                 "message_id": message_id
-            }
+            },
+            level="error"
         )
         print(f"[!!CONNECTION ERROR!!] Unexpected error: {type(e).__name__}: {e}")
         print(f"[!!CONNECTION ERROR!!] Backend URL: {current_api_url}")
         raise
 
-def handle_structured_response(response: Dict, target_phone: str):
+def plan_reply(response: Dict, target_phone: str):
     """
-    Process the structured response from backend with human-like timing.
+    Turn the structured response from backend into outbox jobs.
     
     Expected response format:
     {
@@ -652,20 +922,19 @@ def handle_structured_response(response: Dict, target_phone: str):
             "delay_before": 0.5
         }
     }
+    
+    Returns:
+        (target, jobs) - the tapback (if any) first, then one job per bubble with
+        its human-like timing already resolved, so a resumed reply replays the same plan
     """
     # Update target if backend specifies a different one
-    target = response.get('target', target_phone)
+    target = response.get('target') or target_phone
+    jobs = []
     
-    # Send reaction first if present
-    if response.get('reaction') and ENABLE_REACTIONS:
-        reaction = response['reaction']
-        delay = reaction.get('delay_before', 0.5)
-        if delay > 0:
-            time.sleep(delay)
-        print(f"[REACT] Sending {reaction['type']} to {target}")
-        success = send_tapback(target, reaction['type'])
-        if not success:
-            print(f"[REACT] ⚠️ Reaction may not have been delivered, continuing with messages...")
+    # Reaction goes first if present
+    reaction = plan_reaction(response.get('reaction'))
+    if reaction:
+        jobs.append(reaction)
     
     # Handle new structured format
     messages = response.get('messages', [])
@@ -678,108 +947,607 @@ def handle_structured_response(response: Dict, target_phone: str):
             'delay_before': 0.5
         }]
     
-    # Send each message with typing simulation
     for i, msg_data in enumerate(messages):
-        text = msg_data.get('text', '')
-        if not text:
+        bubble = plan_bubble(msg_data, i)
+        if bubble:
+            jobs.append(bubble)
+    
+    return target, jobs
+
+def plan_reaction(reaction: Optional[Dict]) -> Optional[Dict]:
+    """Outbox job for the backend's tapback (None if there is none or reactions are off)."""
+    if not reaction or not ENABLE_REACTIONS:
+        return None
+    return {
+        'kind': 'reaction',
+        'type': reaction['type'],
+        'delay_before': reaction.get('delay_before', 0.5),
+    }
+
+def plan_bubble(msg_data: Dict, i: int) -> Optional[Dict]:
+    """Outbox job for the reply's i-th (0-based) message, timing resolved; None if it has no text."""
+    text = msg_data.get('text', '')
+    if not text:
+        return None
+    
+    # Use backend's timing if provided, otherwise calculate realistic human timing
+    typing_delay = msg_data.get('typing_delay')
+    if typing_delay is None:
+        typing_delay = calculate_human_typing_delay(text)
+    
+    delay_before = msg_data.get('delay_before')
+    if delay_before is None:
+        delay_before = calculate_delay_before(is_first_message=(i == 0))
+    
+    return {
+        'kind': 'message',
+        'index': i + 1,
+        'text': text,
+        'effect': msg_data.get('effect', 'none'),
+        'typing_delay': typing_delay,
+        'delay_before': delay_before,
+    }
+
+def deliver_reply(rid: int):
+    """
+    Send whatever is still pending in the outbox for one inbound message.
+    
+    Runs in the sender's conversation worker, both right after the reply is
+    enqueued and when an unfinished reply is resumed at startup.
+    """
+    jobs = outbox.unsent(rid)
+    if not jobs:
+        return
+    target = jobs[0]['target']
+    
+    for job in jobs:
+        if job['kind'] != 'reaction':
             continue
-        
-        # Get optional effect parameter
-        effect = msg_data.get('effect', 'none')
-        
-        # Use backend's timing if provided, otherwise calculate realistic human timing
-        typing_delay = msg_data.get('typing_delay')
-        if typing_delay is None:
-            typing_delay = calculate_human_typing_delay(text)
-        
-        delay_before = msg_data.get('delay_before')
-        if delay_before is None:
-            delay_before = calculate_delay_before(is_first_message=(i == 0))
-        
-        # Wait before starting to type (thinking pause)
-        if delay_before > 0:
-            print(f"[PAUSE] Waiting {delay_before:.1f}s before typing...")
-            time.sleep(delay_before)
-        
-        # Show typing indicator for realistic duration
-        if ENABLE_TYPING:
-            effect_label = f" [{effect}]" if effect and effect != "none" else ""
-            print(f"[TYPE] Typing '{text[:50]}...' for {typing_delay:.1f}s ({len(text)} chars){effect_label}")
-            show_typing_indicator(target)
-            time.sleep(typing_delay)
-        
-        # Send the actual message
-        print(f"[OUT] To {target}: {text[:80]}{'...' if len(text) > 80 else ''}")
+        delay = job.get('delay_before', 0.5)
+        if delay > 0:
+            with tracer.span(rid, "tapback_delay"):
+                time.sleep(delay)
+        print(f"[REACT] Sending {job['type']} to {target}")
+        # send_tapback already retries internally
+        with tracer.span(rid, "tapback", reaction=job['type']):
+            success = outbox.deliver(job['id'], lambda: send_tapback(target, job['type']), max_attempts=1)
+        if not success:
+            print(f"[REACT] ⚠️ Reaction may not have been delivered, continuing with messages...")
+    
+    bubbles = [job for job in jobs if job['kind'] == 'message']
+    for bubble in bubbles:
+        effect = bubble['effect']
+        effect_label = f" [{effect}]" if effect and effect != "none" else ""
+        typing_label = f", typing {bubble['typing_delay']:.1f}s" if ENABLE_TYPING else ""
+        print(f"[PLAN] '{bubble['text'][:50]}' after {bubble['delay_before']:.1f}s pause{typing_label}{effect_label}")
+    
+    if TYPE_AND_SEND and bubbles:
+        deliver_planned(rid, target, bubbles)
+        # Whatever the plan couldn't send goes out one by one, in order, with retries
+        bubbles = [job for job in outbox.unsent(rid) if job['kind'] == 'message']
+        if not bubbles:
+            return
+    
+    def on_span(stage: str, start: float, end: float, index: int):
+        tracer.record(rid, stage, tracer.wall(start), tracer.wall(end), index)
+
+    bubble_timeline.run(target, bubbles, on_span=on_span if tracer.enabled else None)
+
+def deliver_planned(rid: int, target: str, bubbles: List[Dict]):
+    """
+    Send a reply's bubbles with type_and_send.applescript: the conversation is
+    opened and the buddy looked up once per plan instead of twice per bubble.
+    Stops at the first plan that didn't send everything.
+    """
+    for plan in build_plans(target, bubbles, typing=ENABLE_TYPING, max_seconds=TYPE_AND_SEND_MAX_SECONDS):
+        def send_plan(job_ids: List[int]) -> Dict[int, Optional[bool]]:
+            due = BubblePlan(target, [b for b in plan.bubbles if b['id'] in job_ids], typing=ENABLE_TYPING)
+            planned = due.estimated_seconds()
+            start = time.time()
+            results = run_plan(due, lambda args, timeout: run_script(ASCRIPT_PLAN, args, TYPE_AND_SEND_SECONDS,
+                                                                     timeout=timeout),
+                               timeout=planned + 10)
+            took = time.time() - start
+            tracer.record(rid, "type_and_send", start, start + took, bubbles=len(due))
+            print(f"[PLAN] {len(due)} bubble(s) to {target} in one script: planned {planned:.2f}s, took {took:.2f}s")
+
+            outcomes = {}
+            for bubble, (status, note) in zip(due.bubbles, results):
+                log_planned_bubble(target, bubble, status, note)
+                if status == PLAN_SENT:
+                    outcomes[bubble['id']] = True
+                elif status == PLAN_FAILED:
+                    outcomes[bubble['id']] = False
+                elif status == PLAN_SKIPPED:
+                    outcomes[bubble['id']] = None
+                # anything else may have been sent: left out, so the outbox never resends it
+            return outcomes
+
+        ids = [b['id'] for b in plan.bubbles]
+        if len(outbox.deliver_batch(ids, send_plan)) < len(ids):
+            break
+
+def log_planned_bubble(target: str, bubble: Dict, status: str, note: str):
+    """Per-bubble log for a type_and_send plan, like send_bubble's."""
+    index = bubble['index']
+    text = bubble['text']
+    if status == PLAN_SENT:
+        log_backend("✅ iMessage sent successfully", {"target": target, "message_index": index, "plan": True})
+        print(f"[OUT] ✅ Message #{index} delivered{f' ({note})' if note else ''}")
+    elif status == PLAN_SKIPPED:
+        print(f"[OUT] ⏭️ Message #{index} not attempted, sending it separately")
+    else:
+        SEND_FAILURES_TOTAL.inc()
+        log_backend(
+            "❌ iMessage send FAILED",
+            {"target": target, "message_index": index, "text_preview": text[:100], "status": status, "error": note},
+            level="error"
+        )
+        print(f"[ERROR] ⚠️ Message #{index} {status}: {note}")
+
+def send_outbox_bubble(target: str, index: int, bubble: Dict) -> bool:
+    """Timeline send callback: one outbox job, retried with backoff on failure (never when in doubt)."""
+    attempts = 0
+    in_doubt = False
+
+    def attempt() -> bool:
+        nonlocal attempts, in_doubt
+        attempts += 1
+        if attempts > 1:
+            SEND_RETRIES_TOTAL.inc()
+        try:
+            return send_bubble(target, bubble['index'], bubble)
+        except InDoubt:
+            in_doubt = True
+            raise
+
+    success = outbox.deliver(bubble['id'], attempt)
+    if not success:
+        if in_doubt:
+            print(f"[ERROR] Message #{bubble['index']} may have been sent; not retrying it")
+        else:
+            print(f"[ERROR] Gave up on message #{bubble['index']} after {OUTBOX_MAX_ATTEMPTS} attempts")
+        print(f"[ERROR] Continuing with remaining messages...")
+    return success
+
+def send_bubble(target: str, index: int, bubble: Dict) -> bool:
+    """Send one reply bubble (called by the timeline at its scheduled time)."""
+    text = bubble['text']
+    effect = bubble.get('effect', 'none')
+    
+    print(f"[OUT] To {target}: {text[:80]}{'...' if len(text) > 80 else ''}")
+    log_backend(
+        f"📤 Sending iMessage",
+        {
+            "target": target,
+            "message_index": index,
+            "text_preview": text[:100] + "..." if len(text) > 100 else text,
+            "effect": effect
+        }
+    )
+    
+    try:
+        success = send_imessage(target, text, effect)
+    except InDoubt as e:
+        SEND_FAILURES_TOTAL.inc()
+        log_backend(
+            f"❓ iMessage send IN DOUBT (not retried)",
+            {
+                "target": target,
+                "message_index": index,
+                "text_preview": text[:100],
+                "error": str(e)
+            },
+            level="error"
+        )
+        print(f"[ERROR] ⚠️ Message #{index} may or may not have been sent: {e}")
+        raise
+    
+    if not success:
+        SEND_FAILURES_TOTAL.inc()
+        log_backend(
+            f"❌ iMessage send FAILED",
+            {
+                "target": target,
+                "message_index": index,
+                "text_preview": text[:100]
+            },
+            level="error"
+        )
+        print(f"[ERROR] ⚠️ Message #{index} FAILED to send!")
+    else:
         log_backend(
-            f"📤 Sending iMessage",
+            f"✅ iMessage sent successfully",
             {
                 "target": target,
-                "message_index": i + 1,
-                "text_preview": text[:100] + "..." if len(text) > 100 else text,
-                "effect": effect
+                "message_index": index
             }
         )
+        print(f"[OUT] ✅ Message #{index} delivered")
+    return success
+
+def log_bubble_timing(report: Dict):
+    """Record how far a bubble landed from its planned time."""
+    print(f"[TIMING] Bubble #{report['message_index']}: planned +{report['intended_s']:.2f}s, "
+          f"landed +{report['actual_s']:.2f}s ({report['deviation_ms']:+.0f}ms)")
+    log_backend("🕒 Bubble timing", report)
+
+# Typing indicator runs in the background; sends happen in order at their planned times
+bubble_timeline = BubbleTimeline(
+    show_typing=show_typing_indicator if ENABLE_TYPING else None,
+    send=send_outbox_bubble,
+    on_bubble=log_bubble_timing,
+)
+
+def log_proactive_send(job, index: int, text: str, ok: bool):
+    """Per-message log for POST /send jobs."""
+    if ok:
+        log_backend("✅ Proactive message sent via iMessage", {"to": job.to, "job_id": job.id, "message": text[:100]})
+    else:
+        log_backend("❌ Failed to send proactive message", {"to": job.to, "job_id": job.id, "message": text[:100]},
+                    level="error")
+
+# POST /send queues here and returns at once; sends run on these worker threads
+send_jobs = SendJobQueue(
+    lambda to, text: send_imessage(to, text, priority=PROACTIVE),
+    max_workers=SEND_JOB_WORKERS,
+    max_queued=SEND_JOB_MAX_QUEUED,
+    on_message=log_proactive_send,
+)
+
+# -----------------------------
+# Main loop
+# -----------------------------
+def start_watcher():
+    """Create the chat.db change watcher, or return None to use fixed polling."""
+    if WATCH_MODE != "watch":
+        return None
+    try:
+        return create_watcher(CHAT_DB, WATCH_BACKEND)
+    except Exception as e:
+        print(f"[WATCH] ⚠️ Could not start chat.db watcher ({type(e).__name__}: {e}), using fixed polling")
+        return None
+
+def wait_for_changes(watcher, timeout: float):
+    """Sleep until chat.db changes or `timeout` seconds pass."""
+    if watcher is None:
+        time.sleep(timeout)
+        return
+    try:
+        watcher.wait(timeout)
+    except Exception as e:
+        print(f"[WATCH] ⚠️ Watcher failed ({type(e).__name__}: {e}), sleeping {timeout}s instead")
+        time.sleep(timeout)
+
+def hold_for_backend(batch: MessageBatch, attempted: bool, error: Exception = None):
+    """Park a batch the backend can't take right now; the main loop resubmits it when the breaker allows."""
+    reason = f"{type(error).__name__}: {error}" if error else "older messages from this sender are held"
+    if backend_backlog.park(batch, attempted=attempted):
+        print(f"[BACKEND] ⏸️ Holding {len(batch)} message(s) from {batch.sender} until the backend recovers ({reason})")
+        return
+    print(f"[!!ERROR!!] Giving up on ROWID {batch.rowid} after {BACKEND_MAX_ATTEMPTS} failed backend attempts")
+    log_backend("❌ Backend attempts exhausted, message not answered", {
+        "message_id": batch.rowid, "message_ids": batch.rowids, "sender": batch.sender, "error": reason,
+    }, level="error")
+    tracer.finished(batch.rowid, error="backend_attempts_exhausted")
+
+def process_batch(batch: MessageBatch):
+    """
+    Run one inbound message (or a coalesced catch-up batch) through the
+    backend and reply pipeline.
+
+    Called from a conversation worker (see dispatcher.py), so batches from the
+    same sender arrive here strictly in ROWID order. The batch's oldest ROWID
+    is its key for the watermark and the outbox.
+    """
+    rid, sender, text = batch.rowid, batch.sender, batch.text
+    tracer.started(rid, **({"message_ids": batch.rowids} if len(batch) > 1 else {}))
+    for message_id in batch.rowids[1:]:
+        tracer.discard(message_id)  # traced under the anchor from here on
+    if backend_backlog.holds(sender):
+        # Keep the conversation in order: queue behind the messages already waiting
+        hold_for_backend(batch, attempted=False)
+        return
+    try:
+        if len(batch) > 1:
+            source = f"from the backlog, one reply ({batch.policy})" if batch.catch_up else "in a burst, one reply"
+            print(f"[IN] {sender}: {len(batch)} messages {source}")
+            for _, line, _, _ in batch.messages:
+                print(f"[IN]   {line}")
+        else:
+            print(f"[IN] {sender}: {text}")
+        log_backend(f"📨 INCOMING iMessage", {
+            "sender": sender, "text": text, "message_id": rid,
+            "message_ids": batch.rowids, "catch_up": batch.catch_up, "stale": batch.stale,
+        })
         
-        success = send_imessage(target, text, effect)
+        # Call backend with new structured format
+        try:
+            with tracer.span(rid, "backend"):
+                response = call_sf(sender, text, rid, batch.metadata())
+        except Exception as e:
+            if not is_backend_unavailable(e):
+                raise
+            hold_for_backend(batch, attempted=not isinstance(e, CircuitOpenError), error=e)
+            return
         
-        if not success:
+        if isinstance(response, StreamedReply):
+            try:
+                deliver_streamed(batch, response)
+            except Exception as e:
+                # The stream broke before any of the reply was stored: same as a failed call
+                if not is_backend_unavailable(e):
+                    raise
+                hold_for_backend(batch, attempted=True, error=e)
+                return
+            tracer.finished(rid, messages=len(batch))
+            log_backend(f"✅ SUCCESS - Message ID {rid} fully processed and sent", {"message_id": rid, "message_ids": batch.rowids})
+            print(f"[SUCCESS] Processed message ID {rid} (streamed)" + (f" (+{len(batch) - 1} coalesced)" if len(batch) > 1 else ""))
+            return
+        
+        # Check if this was a 401 error (marked with _401_error flag)
+        is_401_error = response.get('_401_error', False)
+        
+        if is_401_error:
             log_backend(
-                f"❌ iMessage send FAILED",
+                f"⚠️ 401 UNAUTHORIZED - Message NOT marked as processed, will retry",
                 {
-                    "target": target,
-                    "message_index": i + 1,
-                    "text_preview": text[:100]
-                }
+                    "message_id": rid,
+                    "sender": sender,
+                    "note": "Message will be retried when backend auth is fixed"
+                },
+                level="warning"
             )
-            print(f"[ERROR] ⚠️ Message #{i+1} FAILED to send!")
-            print(f"[ERROR] Continuing with remaining messages...")
-        else:
-            log_backend(
-                f"✅ iMessage sent successfully",
-                {
-                    "target": target,
-                    "message_index": i + 1
+            print(f"[WARNING] 401 error - message {rid} will be retried. Bridge continues running.")
+            tracer.discard(rid)
+            # Don't mark as processed - will retry next loop
+            return
+        
+        # Log that we received and are processing the response
+        messages = response.get('messages', [])
+        log_backend(
+            f"✅ Backend response received, processing...",
+            {
+                "message_id": rid,
+                "response_summary": {
+                    "target": response.get('target'),
+                    "message_count": len(messages),
+                    "has_reaction": response.get('reaction') is not None
                 }
-            )
-            print(f"[OUT] ✅ Message #{i+1} delivered")
+            }
+        )
+        
+        # Store the whole reply in the outbox first (idempotent if this message is replayed)
+        target, jobs = plan_reply(response, sender)
+        if jobs:
+            outbox.enqueue(rid, sender, target, jobs)
+        
+        # The reply is durable now, so ack the messages instead of holding them through
+        # the typing simulation (written at the end of this poll batch)
+        acknowledge(batch)
+        
+        # Send it with human-like timing; failed bubbles are retried with backoff
+        deliver_reply(rid)
+        tracer.finished(rid, messages=len(batch))
+        
+        log_backend(f"✅ SUCCESS - Message ID {rid} fully processed and sent", {"message_id": rid, "message_ids": batch.rowids})
+        print(f"[SUCCESS] Processed message ID {rid}" + (f" (+{len(batch) - 1} coalesced)" if len(batch) > 1 else ""))
+
+    except Exception as e:
+        import traceback
+        error_trace = traceback.format_exc()
+        
+        log_backend(
+            f"❌ FAILED to process message",
+            {
+                "message_id": rid,
+                "message_ids": batch.rowids,
+                "sender": sender,
+                "error_type": type(e).__name__,
+                "error": str(e),
+                "traceback": error_trace
+            },
+            level="error"
+        )
+        
+        print(f"[!!ERROR!!] Failed to process ROWID {rid}: {e}")
+        traceback.print_exc()
+        tracer.finished(rid, error=type(e).__name__)
+        # Don't mark as processed if it failed - will retry next loop
+
+def acknowledge(batch: MessageBatch):
+    """The batch's reply is in the outbox: mark its messages processed and release the watermark."""
+    for message_id in batch.rowids:
+        checkpoint.mark_processed(message_id)
+    dispatcher.release(batch.rowid)
+    backend_backlog.forget(batch.rowid)
+    PROCESSED_TOTAL.inc(len(batch))
+
+def deliver_streamed(batch: MessageBatch, reply: StreamedReply):
+    """
+    Store and send a streamed reply piece by piece as the backend generates it.
+    
+    Each batch of pieces the stream hands over is appended to the outbox (seq
+    numbers continue where the last batch ended) and delivered at once, so the
+    first bubble is typed while later ones are still being generated. The
+    messages are acked once the stream has ended: a crash mid-stream replays
+    the message, and the replayed reply's seqs collide with the stored ones
+    (Idempotency-Key: the backend answers it with the same reply), so nothing
+    already sent goes out twice.
+    
+    Raises:
+        the stream's error if it broke before anything was stored; after that,
+        what arrived is sent and the reply is acked cut short (a second,
+        differently generated reply must not be spliced onto the first)
+    """
+    rid, sender = batch.rowid, batch.sender
+    stored = 0
+    bubbles_seen = 0
+    first_bubble_observed = False
+    error = None
+    try:
+        for pieces in reply.batches():
+            jobs = []
+            for kind, piece in pieces:
+                if kind == "reaction":
+                    job = plan_reaction(piece)
+                elif kind == "message":
+                    job = plan_bubble(piece, bubbles_seen)
+                    bubbles_seen += 1
+                else:
+                    print(f"[STREAM] ⚠️ Ignored: {piece['reason']}")
+                    log_backend("⚠️ Streamed reply event ignored", {"message_id": rid, **piece}, level="warning")
+                    continue
+                if job:
+                    jobs.append(job)
+            if not first_bubble_observed and reply.first_bubble_seconds is not None:
+                # Not tied to `stored`: the reaction may have been stored before the first bubble
+                first_bubble_observed = True
+                FIRST_BUBBLE_SECONDS.observe(reply.first_bubble_seconds)
+                print(f"[STREAM] First bubble from the backend after {reply.first_bubble_seconds:.2f}s")
+            if not jobs:
+                continue
+            outbox.enqueue(rid, sender, reply.target, jobs, first_seq=stored)
+            stored += len(jobs)
+            deliver_reply(rid)
+    except Exception as e:
+        if not stored:
+            raise
+        error = e
+    finally:
+        reply.close()
+    
+    response = reply.assembler.response()
+    log_backend(
+        f"✅ Streamed backend response finished" if error is None else f"❌ Streamed backend response cut short",
+        {
+            "message_id": rid,
+            "events": reply.events,
+            "first_bubble_seconds": reply.first_bubble_seconds,
+            "response_body": response,
+            "response_summary": {
+                "target": reply.target,
+                "message_count": len(response['messages']),
+                "has_reaction": response['reaction'] is not None
+            },
+            **({"error_type": type(error).__name__, "error": str(error)} if error else {}),
+        },
+        level="info" if error is None else "error"
+    )
+    if error is not None:
+        BACKEND_ERRORS_TOTAL.inc()
+        print(f"[!!BACKEND ERROR!!] Streamed reply stopped after {stored} job(s), sent what arrived: {type(error).__name__}: {error}")
+    acknowledge(batch)
+
+def register_gauges(reader: ChatDBReader):
+    """Scrape-time gauges over the objects main() creates."""
+    metrics.gauge("dispatch_queue_depth", "Messages submitted to conversation workers and not finished",
+                  dispatcher.pending_count)
+    metrics.gauge("active_conversations", "Conversations with queued or running work",
+                  dispatcher.active_conversations)
+    metrics.gauge("burst_held_messages", "Messages held in a burst window", lambda: bursts.stats()["held"])
+    metrics.gauge("outbox_pending_jobs", "Reply jobs waiting to be sent", lambda: outbox.stats()["pending"])
+    metrics.gauge("last_processed_rowid", "Committed ROWID watermark", lambda: checkpoint.committed_watermark)
+    metrics.gauge("chatdb_max_rowid", "Highest message ROWID in chat.db", reader.max_rowid)
+    metrics.gauge("rowid_lag", "Highest answerable message ROWID minus the committed watermark",
+                  lambda: max(0, (reader.max_rowid(POLL_FILTER) or 0) - checkpoint.committed_watermark))
+    metrics.gauge("poll_interval_seconds", "Current poll wait chosen by the scheduler", lambda: poll_scheduler.interval)
+    metrics.gauge("backend_circuit_open", "1 while the backend circuit breaker is open or probing",
+                  lambda: int(backend_breaker.state != CLOSED))
+    metrics.gauge("backend_held_messages", "Inbound messages waiting for the backend to recover",
+                  lambda: len(backend_backlog))
+    metrics.gauge("automation_queued", "Scripts waiting for their turn at Messages.app", gui_scheduler.queued)
+    metrics.gauge("send_jobs_unfinished", "POST /send jobs queued or running", lambda: send_jobs.stats()["unfinished"])
+    metrics.gauge("log_records_dropped", "Backend log records dropped because the queue was full",
+                  lambda: backend_log.dropped)
 
-# -----------------------------
-# Main loop
-# -----------------------------
 def main():
-    global processed_message_ids
+    global processed_message_ids, checkpoint, outbox, dispatcher
+    
+    processed_message_ids = open_processed_store()
+    checkpoint = Checkpoint(STATE, processed_message_ids, fsync=CHECKPOINT_FSYNC)
+    last = checkpoint.load()
     
     # Load processed message IDs on startup (CRITICAL for preventing duplicates)
-    processed_message_ids = load_processed_ids()
+    processed_message_ids.load_window(last)
     print(f"Loaded {len(processed_message_ids)} previously processed message IDs")
-    
-    last = read_last()
+    if WORKER_NAME:
+        print(f"Worker '{WORKER_NAME}': {CHAT_DB} (state in {STATE_DIR or '.'})")
     print(f"Starting bridge. Watching for new messages after ROWID {last}...")
     print(f"Typing indicator: {'enabled' if ENABLE_TYPING else 'disabled'}")
     print(f"Reactions: {'enabled' if ENABLE_REACTIONS else 'disabled'}")
+    print(f"Concurrent conversations: up to {MAX_CONCURRENT}")
+    if bursts.window:
+        print(f"Burst coalescing: messages within {BURST_WINDOW_MS:g}ms of each other get one reply")
+    automation_info = automation.stats()
+    if automation_info.get("engine"):
+        print(f"AppleScript automation: persistent worker ({automation_info['engine']})")
+    else:
+        print(f"AppleScript automation: {automation_info['backend']} (osascript per call)")
+
+    watcher = start_watcher()
+    if watcher:
+        print(f"Change detection: {watcher.name} watcher on chat.db (re-checks at least every {poll_scheduler.max_interval:g}s)")
+    elif POLL_ADAPTIVE:
+        print(f"Change detection: adaptive polling every {poll_scheduler.min_interval:g}s-{poll_scheduler.max_interval:g}s")
+    else:
+        print(f"Change detection: fixed polling every {POLL}s")
+
+    # One long-lived read-only connection instead of reconnecting every poll
+    reader = ChatDBReader(CHAT_DB, SQL)
+
+    # Each sender gets its own ordered queue; different senders run in parallel
+    dispatcher = ConversationDispatcher(process_batch, max_concurrent=MAX_CONCURRENT)
+
+    # Finish replies a previous run stored but didn't get to send
+    outbox = open_outbox()
+    for rowid, conversation in outbox.unfinished():
+        print(f"[OUTBOX] Resuming unsent reply to message {rowid} ({conversation})")
+        dispatcher.submit_task(conversation, deliver_reply, rowid)
+
+    register_gauges(reader)
 
+    next_stats_log = time.monotonic() + POLL_STATS_LOG_SECONDS
     while True:
         try:
-            with open_ro(CHAT_DB) as conn:
-                c = conn.cursor()
-                c.execute(SQL, (last,))
-                rows = c.fetchall()
+            rows = reader.fetch_after(last)
+            POLL_QUERY_SECONDS.observe(reader.last_query_time)
         except Exception as e:
             print(f"[DB ERROR] {e}")
-            time.sleep(POLL)
+            wait_for_changes(watcher, POLL)
             continue
 
+        # Behind (full page, or messages that waited through downtime): drain the
+        # whole backlog now instead of one page per poll
+        catch_up = needs_catch_up([(r[0], r[1], r[2], apple_time(r[3])) for r in rows],
+                                  FETCH_LIMIT, time.time(), CATCHUP_AGE_SECONDS)
+        drain_started = time.perf_counter()
+        pages = 1
+        more = len(rows) >= FETCH_LIMIT
+        if catch_up:
+            while more and len(rows) < CATCHUP_MAX_ROWS:
+                try:
+                    page = reader.fetch_after(rows[-1][0])
+                except Exception as e:
+                    print(f"[DB ERROR] {e}")
+                    break
+                POLL_QUERY_SECONDS.observe(reader.last_query_time)
+                rows.extend(page)
+                pages += 1
+                more = len(page) >= FETCH_LIMIT
+
+        read_at = time.time()
         if rows:
             print(f"Found {len(rows)} new message(s) in database.")
 
+        fresh = []
         for row in rows:
-            rid, text, sender = row
+            rid, text, sender, date = row
             
             # Update last ROWID even if we skip this message
             last = rid
             
             if not text or not sender:
-                write_last(last)
                 continue
             
             # CRITICAL: Skip if already processed (prevents duplicates!)
@@ -787,75 +1555,84 @@ def main():
                 print(f"[SKIP] Already processed message ID {rid}")
                 continue
 
-            try:
-                print(f"[IN] {sender}: {text}")
-                log_backend(f"📨 INCOMING iMessage", {"sender": sender, "text": text, "message_id": rid})
-                
-                # Call backend with new structured format
-                response = call_sf(sender, text, rid)
-                
-                # Check if this was a 401 error (marked with _401_error flag)
-                is_401_error = response.get('_401_error', False)
-                
-                if is_401_error:
-                    log_backend(
-                        f"⚠️ 401 UNAUTHORIZED - Message NOT marked as processed, will retry",
-                        {
-                            "message_id": rid,
-                            "sender": sender,
-                            "note": "Message will be retried when backend auth is fixed"
-                        }
-                    )
-                    print(f"[WARNING] 401 error - message {rid} will be retried. Bridge continues running.")
-                    # Don't mark as processed - will retry next loop
-                    write_last(last)  # Update ROWID to avoid blocking on this message
-                    continue
-                
-                # Log that we received and are processing the response
-                messages = response.get('messages', [])
-                log_backend(
-                    f"✅ Backend response received, processing...",
-                    {
-                        "message_id": rid,
-                        "response_summary": {
-                            "target": response.get('target'),
-                            "message_count": len(messages),
-                            "has_reaction": response.get('reaction') is not None
-                        }
-                    }
-                )
-                
-                # Handle structured response with human-like timing
-                handle_structured_response(response, sender)
-                
-                # Mark as processed AFTER successful send
-                processed_message_ids.add(rid)
-                save_processed_id(rid)
-                write_last(last)
-                
-                log_backend(f"✅ SUCCESS - Message ID {rid} fully processed and sent", {"message_id": rid})
-                print(f"[SUCCESS] Processed message ID {rid}")
+            fresh.append((rid, text, sender, apple_time(date)))
+            tracer.detected(rid, fresh[-1][3], now=read_at)
 
-            except Exception as e:
-                import traceback
-                error_trace = traceback.format_exc()
-                
-                log_backend(
-                    f"❌ FAILED to process message",
-                    {
-                        "message_id": rid,
-                        "sender": sender,
-                        "error_type": type(e).__name__,
-                        "error": str(e),
-                        "traceback": error_trace
-                    }
-                )
-                
-                print(f"[!!ERROR!!] Failed to process ROWID {rid}: {e}")
-                traceback.print_exc()
-                # Don't mark as processed if it failed - will retry next loop
+        INBOUND_TOTAL.inc(len(fresh))
+        batches, skipped = plan_batches(
+            fresh,
+            policy=CATCHUP_POLICY,
+            catch_up=catch_up,
+            stale_after=STALE_MESSAGE_HOURS * 3600 if catch_up else None,
+            skip_stale=STALE_POLICY == "skip",
+        )
+        for rid, text, sender, _ in skipped:
+            print(f"[STALE] Not replying to message ID {rid} from {sender} (older than {STALE_MESSAGE_HOURS:g}h)")
+            checkpoint.mark_processed(rid)
+            tracer.discard(rid)
+        STALE_SKIPPED_TOTAL.inc(len(skipped))
+        if catch_up and fresh:
+            summary = {
+                "rows": len(rows),
+                "pages": pages,
+                "messages": len(fresh),
+                "senders": len({r[2] for r in fresh}),
+                "backend_requests": len(batches),
+                "stale_skipped": len(skipped),
+                "stale_replied": sum(1 for b in batches if b.stale),
+                "policy": CATCHUP_POLICY,
+                "drain_ms": round((time.perf_counter() - drain_started) * 1000, 1),
+            }
+            print(f"[CATCH-UP] {summary['messages']} backlog message(s) from {summary['senders']} sender(s) "
+                  f"-> {summary['backend_requests']} request(s), {summary['stale_skipped']} stale skipped")
+            log_backend("🧹 Backlog catch-up", summary)
+
+        # Backend back (or ready for a probe): hand held messages back first, merged
+        # per sender, so they go out ahead of anything newer from the same person
+        if len(backend_backlog) and backend_breaker.allows_traffic():
+            probing = backend_breaker.state != CLOSED
+            for batch in backend_backlog.take(limit=1 if probing else None, busy=dispatcher.is_busy):
+                print(f"[BACKEND] ▶️ {'Probing with' if probing else 'Resuming'} {len(batch)} held message(s) from {batch.sender}")
+                dispatcher.submit(batch.sender, batch.rowid, batch)
 
-        time.sleep(POLL)
+        if catch_up:
+            # Anything held in a burst window is older than the backlog behind it
+            for batch in bursts.flush() + batches:
+                dispatcher.submit(batch.sender, batch.rowid, batch)
+        else:
+            # Live messages wait out the sender's burst window, then go as one request
+            for batch in batches:
+                bursts.add(batch)
+        for batch in bursts.ready():
+            dispatcher.submit(batch.sender, batch.rowid, batch)
+
+        # Only persist up to the oldest message still in flight, so a crash
+        # replays anything unfinished (processed IDs stop true duplicates).
+        # One atomic commit per poll batch covers the watermark and every ID
+        # that finished since the last one.
+        checkpoint.advance(min(dispatcher.safe_watermark(last), bursts.safe_watermark(last),
+                               backend_backlog.safe_watermark(last)))
+        try:
+            checkpoint.commit()
+        except Exception as e:
+            print(f"[STATE ERROR] Checkpoint commit failed, will retry next poll: {e}")
+
+        # Fast while conversations are active, backing off when idle; a full
+        # batch means more rows are waiting, so poll again straight away
+        wait = poll_scheduler.next_interval(len(rows), more, dispatcher.active_conversations())
+        hold = bursts.next_deadline()
+        if hold is not None:
+            # Wake up when the next burst window closes
+            wait = min(wait, hold)
+        if len(backend_backlog) and backend_breaker.state == OPEN:
+            # ...or when the breaker is ready to probe with the held messages
+            wait = min(wait, backend_breaker.retry_in() + 0.05)
+        if time.monotonic() >= next_stats_log:
+            log_backend("📊 Poll scheduler stats", poll_scheduler.stats())
+            log_backend("📊 Burst coalescing stats", bursts.stats())
+            next_stats_log = time.monotonic() + POLL_STATS_LOG_SECONDS
+        if wait > 0:
+            wait_for_changes(watcher, wait)
 
 # -----------------------------
 # HTTP Endpoint for proactive messages (receipts, etc.)
@@ -864,83 +1641,68 @@ def start_http_server():
     """
     Start a simple HTTP server to receive proactive messages from Railway.
     This allows Railway to send receipts immediately without waiting for next user message.
-    Runs on port 3001 in a background thread.
+    Runs on HTTP_PORT (default 3001) in a background thread.
     """
     try:
-        from fastapi import FastAPI, HTTPException
-        from pydantic import BaseModel
+        from fastapi import FastAPI
+        from fastapi.responses import PlainTextResponse
         import uvicorn
-        from typing import List
         
         app = FastAPI()
         
-        class SendMessageRequest(BaseModel):
-            to: str
-            messages: List[str]
+        add_send_routes(app, send_jobs, log=log_backend)
         
-        @app.post("/send")
-        async def send_messages(request: SendMessageRequest):
-            """
-            Receive messages from Railway and send via iMessage.
-            Used for proactive messages like receipts.
-            """
-            log_backend(
-                "📨 Received proactive message request from Railway",
-                {
-                    "to": request.to,
-                    "message_count": len(request.messages)
-                }
-            )
-            
-            sent_count = 0
-            for message in request.messages:
-                success = send_imessage(request.to, message)
-                if success:
-                    sent_count += 1
-                    log_backend(
-                        "✅ Proactive message sent via iMessage",
-                        {
-                            "to": request.to,
-                            "message": message[:100]
-                        }
-                    )
-                else:
-                    log_backend(
-                        "❌ Failed to send proactive message",
-                        {
-                            "to": request.to,
-                            "message": message[:100]
-                        }
-                    )
-            
-            return {
-                "status": "ok",
-                "sent": sent_count,
-                "total": len(request.messages)
-            }
+        @app.get("/metrics")
+        def metrics_endpoint():
+            """Prometheus text exposition (sync, so scrapes run off the event loop)."""
+            return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+        
+        @app.get("/traces")
+        def traces(since: float = None, rowid: int = None, format: str = "jsonl"):
+            """Recorded spans as JSON lines, or ?format=chrome for chrome://tracing / Perfetto."""
+            spans = tracer.spans(since=since, trace_id=rowid)
+            if format == "chrome":
+                return to_chrome_trace(spans)
+            return PlainTextResponse(to_jsonl(spans), media_type="application/x-ndjson")
         
         @app.get("/health")
         async def health():
             """Health check endpoint"""
-            return {"status": "ok", "service": "bridge_send_server"}
+            return {
+                "status": "ok",
+                "service": "bridge_send_server",
+                "worker": WORKER_NAME or None,
+                "chat_db": CHAT_DB,
+                "pid": os.getpid(),
+                "poll": poll_scheduler.stats(),
+                "burst": bursts.stats(),
+                "tracing": tracer.stats(),
+                "send_jobs": send_jobs.stats(),
+                "automation": gui_scheduler.stats(),
+                "focus": focus.stats(),
+                "backend": {**backend_breaker.stats(), **backend.stats(), **backend_backlog.stats(), "stream": BACKEND_STREAM},
+            }
         
         # Run server
-        log_backend("🚀 Starting HTTP server on port 3001", {})
-        print("[HTTP] Starting send server on http://0.0.0.0:3001")
-        uvicorn.run(app, host="0.0.0.0", port=3001, log_level="warning")
+        log_backend(f"🚀 Starting HTTP server on port {HTTP_PORT}", {})
+        print(f"[HTTP] Starting send server on http://0.0.0.0:{HTTP_PORT}")
+        uvicorn.run(app, host="0.0.0.0", port=HTTP_PORT, log_level="warning")
         
     except Exception as e:
-        log_backend(f"❌ HTTP server failed to start: {e}", {})
+        log_backend(f"❌ HTTP server failed to start: {e}", {}, level="error")
         print(f"[HTTP ERROR] Failed to start HTTP server: {e}")
 
 # -----------------------------
 if __name__ == "__main__":
     import threading
     
+    # `kill -HUP <pid>` re-reads .env without a restart
+    env_config.install_sighup_handler()
+    
     # Start HTTP server in background thread
     http_thread = threading.Thread(target=start_http_server, daemon=True)
     http_thread.start()
-    print("[STARTUP] HTTP send server started in background (port 3001)")
+    print(f"[STARTUP] HTTP send server started in background (port {HTTP_PORT})")
     
     # Small delay to let HTTP server start
     time.sleep(1)
@@ -962,7 +1724,8 @@ if __name__ == "__main__":
                 "error_type": type(e).__name__,
                 "error": str(e),
                 "traceback": error_trace
-            }
+            },
+            level="error"
         )
         # Exit with error code so LaunchAgent can restart
         exit(1)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Bubble Plan - A whole reply typed and sent by one AppleScript run
+
+Per bubble the bridge used to run show_typing_indicator.applescript (activate
+Messages, `open location`, `delay 0.6`, type and delete "abc") and then
+imessage_send.applescript (look the buddy up again, send): two scripts, two
+app activations and two buddy lookups, each taking its own turn at the
+automation scheduler. type_and_send.applescript opens the conversation and
+resolves the buddy once, then runs pause -> typing indicator -> send for
+every bubble of the plan it's given.
+
+    argv: target, open_delay_ms, then per bubble: pause_ms, typing_ms, text
+    stdout: one line per bubble, "<n>\\tsent|failed|skipped[\\t<note>]"
+
+Key principles:
+- Timing stays the backend's: pause = delay_before, typing = typing_delay
+  (0 when typing indicators are off), passed in as integer milliseconds
+  (AppleScript's string -> real coercion depends on the locale)
+- A plan never runs longer than `max_seconds` (estimated): longer replies are
+  split into several plans, so one script can't hold Messages.app for ages
+- The script stops at the first failed send and reports the rest as skipped,
+  so bubbles still go out in order when they're retried one by one
+- A bubble the script never reported on (timeout, crash) is "unknown": it
+  may have been sent, so it's never resent
+- The script only opens the conversation when some bubble types, and
+  reports "typing failed" when it couldn't: focus_after_plan() tells the
+  focus cache which of those happened
+- FakeMessagesExecutor simulates the scripts on a virtual clock, so plans and
+  timings can be tested without a Mac
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from automation import AutomationExecutor
+
+SCRIPT = str(Path(__file__).parent / "type_and_send.applescript")
+
+SENT, FAILED, SKIPPED, UNKNOWN = "sent", "failed", "skipped", "unknown"
+
+# Fixed costs inside the scripts (their `delay` statements), in seconds
+OPEN_SECONDS = 0.25        # frontmost + click after the open delay
+TYPE_KEYS_SECONDS = 0.34   # clear the draft, type "abc", delete it again
+
+
+class BubblePlan:
+    """
+    The bubbles of one type_and_send.applescript run, in order.
+
+    Example:
+        >>> plan = BubblePlan("+15551234567", [
+        ...     {"text": "hey!", "delay_before": 0.05, "typing_delay": 0.8},
+        ...     {"text": "what's up", "delay_before": 0.12, "typing_delay": 0.6},
+        ... ])
+        >>> plan.args()
+        ['+15551234567', '600', '50', '800', 'hey!', '120', '600', "what's up"]
+    """
+
+    def __init__(self, target: str, bubbles: List[Dict], typing: bool = True, open_delay: float = 0.6):
+        self.target = target
+        self.bubbles = [b for b in bubbles if b.get("text")]
+        self.typing = typing
+        self.open_delay = open_delay
+
+    def steps(self) -> List[Tuple[int, int, str]]:
+        """(pause_ms, typing_ms, text) per bubble."""
+        out = []
+        for bubble in self.bubbles:
+            pause = max(0.0, float(bubble.get("delay_before") or 0.0))
+            typing = max(0.0, float(bubble.get("typing_delay") or 0.0)) if self.typing else 0.0
+            out.append((round(pause * 1000), round(typing * 1000), bubble["text"]))
+        return out
+
+    def args(self) -> List[str]:
+        args = [self.target, str(round(self.open_delay * 1000))]
+        for pause_ms, typing_ms, text in self.steps():
+            args += [str(pause_ms), str(typing_ms), text]
+        return args
+
+    def schedule(self, send_seconds: float = 0.3) -> List[float]:
+        """Expected seconds from the script's start until each bubble is sent."""
+        steps = self.steps()
+        t = self.open_delay + OPEN_SECONDS if any(typing for _, typing, _ in steps) else 0.0
+        landed = []
+        for pause_ms, typing_ms, _ in steps:
+            t += pause_ms / 1000
+            if typing_ms:
+                t += TYPE_KEYS_SECONDS + typing_ms / 1000
+            t += send_seconds
+            landed.append(t)
+        return landed
+
+    def estimated_seconds(self, send_seconds: float = 0.3) -> float:
+        schedule = self.schedule(send_seconds)
+        return schedule[-1] if schedule else 0.0
+
+    def __len__(self) -> int:
+        return len(self.bubbles)
+
+
+def build_plans(target: str, bubbles: List[Dict], typing: bool = True, max_seconds: float = 15.0,
+                open_delay: float = 0.6, send_seconds: float = 0.3) -> List[BubblePlan]:
+    """
+    Split a reply into as few plans as possible, each estimated to finish
+    within max_seconds (a single bubble always gets a plan of its own).
+    """
+    plans: List[BubblePlan] = []
+    current: List[Dict] = []
+    for bubble in bubbles:
+        if not bubble.get("text"):
+            continue
+        candidate = BubblePlan(target, current + [bubble], typing, open_delay)
+        if current and candidate.estimated_seconds(send_seconds) > max_seconds:
+            plans.append(BubblePlan(target, current, typing, open_delay))
+            current = [bubble]
+        else:
+            current.append(bubble)
+    if current:
+        plans.append(BubblePlan(target, current, typing, open_delay))
+    return plans
+
+
+def parse_report(stdout: str, count: int) -> List[Tuple[str, str]]:
+    """(status, note) per bubble from the script's output; bubbles it didn't mention are UNKNOWN."""
+    results = [(UNKNOWN, "not reported by the script")] * count
+    for line in (stdout or "").splitlines():
+        fields = line.strip("\r\n").split("\t")
+        if len(fields) < 2 or not fields[0].strip().isdigit():
+            continue
+        n, status = int(fields[0]), fields[1].strip()
+        if 1 <= n <= count and status in (SENT, FAILED, SKIPPED):
+            results[n - 1] = (status, "\t".join(fields[2:]))
+    return results
+
+
+def focus_after_plan(args: Sequence[str], stdout: str) -> str:
+    """
+    What a successful plan run did to Messages.app's focused conversation.
+
+    Returns:
+        "focused" if it opened the target's chat and typed into it, "touched"
+        if nothing typed (the chat was never opened), "unknown" if typing
+        was attempted but failed (the chat may or may not be in front)
+    """
+    typing = [int(args[i]) for i in range(3, len(args), 3)]
+    if not any(typing):
+        return "touched"
+    notes = [note for _, note in parse_report(stdout, len(typing))]
+    if any(note.startswith("typing failed") for note in notes):
+        return "unknown"
+    return "focused"
+
+
+def run_plan(plan: BubblePlan, run: Callable[[List[str], float], subprocess.CompletedProcess],
+             timeout: float) -> List[Tuple[str, str]]:
+    """
+    Run one plan and say what happened to each bubble.
+
+    Args:
+        run: runs the script with (args, timeout), like automation.run_applescript with check=True
+
+    Returns:
+        (status, note) per bubble: SENT, FAILED (definitely not sent), SKIPPED
+        (not attempted) or UNKNOWN (may have been sent)
+    """
+    count = len(plan)
+    try:
+        result = run(plan.args(), timeout)
+    except subprocess.TimeoutExpired:
+        return [(UNKNOWN, f"script timed out after {timeout:.0f}s")] * count
+    except subprocess.CalledProcessError as e:
+        error = (e.stderr or "").strip() or str(e)
+        if e.returncode < 0:
+            return [(UNKNOWN, f"script died: {error}")] * count  # killed mid-run
+        # The script only raises before its first send (usage, buddy lookup)
+        return [(FAILED, error)] + [(SKIPPED, "")] * (count - 1)
+    except OSError as e:
+        return [(FAILED, f"{type(e).__name__}: {e}")] + [(SKIPPED, "")] * (count - 1)
+    except Exception as e:
+        return [(UNKNOWN, f"{type(e).__name__}: {e}")] * count
+    return parse_report(result.stdout, count)
+
+
+class FakeMessagesExecutor(AutomationExecutor):
+    """
+    Stand-in for Messages.app that runs the bridge's scripts on a virtual clock.
+
+    Each call costs `spawn_seconds`, then whatever the real script would
+    spend: its `delay`s, plus `lookup_seconds` per buddy lookup and
+    `send_seconds` per send. Typing indicators and sends are recorded as
+    events (time, kind, target, text); a typing event's target is the chat
+    that was really in front, so typing into the wrong chat shows up.
+    `activations` counts the scripts that activated Messages and opened a
+    chat, `fast_paths` the typing calls that skipped it.
+
+    Example:
+        >>> messages = FakeMessagesExecutor()
+        >>> messages.run_applescript(SCRIPT, plan.args(), timeout=15)
+        >>> [(round(t, 2), kind) for t, kind, _, _ in messages.events]
+    """
+
+    name = "fake"
+
+    def __init__(self, spawn_seconds: float = 0.15, lookup_seconds: float = 0.1, send_seconds: float = 0.3,
+                 fail_texts: Sequence[str] = (), clock: Optional[Callable[[], float]] = None,
+                 sleep: Optional[Callable[[float], None]] = None, gui_access: bool = True):
+        self.spawn_seconds = spawn_seconds
+        self.gui_access = gui_access  # False: System Events refuses, nothing can be opened or typed
+        self.lookup_seconds = lookup_seconds
+        self.send_seconds = send_seconds
+        self.fail_texts = set(fail_texts)
+        self.now = 0.0
+        self.clock = clock or (lambda: self.now)
+        self.sleep = sleep or self._advance
+        self.calls: List[Tuple[str, List[str]]] = []
+        self.events: List[Tuple[float, str, str, str]] = []
+        self.focused: Optional[str] = None  # chat Messages.app is showing
+        self.frontmost = False
+        self.activations = 0
+        self.fast_paths = 0
+
+    def _advance(self, seconds: float) -> None:
+        self.now += max(0.0, seconds)
+
+    def run_applescript(self, script, args=(), timeout=10, check=True):
+        args = [str(a) for a in args]
+        name = Path(script).name
+        self.calls.append((name, args))
+        argv = ["osascript", script, *args]
+        self._deadline = self.clock() + timeout
+        self._argv = argv
+        self._wait(self.spawn_seconds)
+
+        rc, stdout, stderr = 0, "", ""
+        if name == Path(SCRIPT).name:
+            rc, stdout, stderr = self._type_and_send(args)
+        elif name == "show_typing_indicator.applescript":
+            fast = len(args) > 1 and args[1] == "fast" and self.frontmost
+            if fast:
+                self.fast_paths += 1
+            else:
+                self._open(args[0], 0.6)
+            self.events.append((self.clock(), "typing", self.focused, ""))
+            self._wait(TYPE_KEYS_SECONDS + 1.0)  # fixed 1.0s "typing"
+            stdout = "ok (fast)" if fast else "ok"
+        elif name == "send_tapback.applescript":
+            self._wait(1.5 + self.lookup_seconds + 1.2 + 0.5 + 0.5 + 0.5 + 0.3)
+            self.frontmost = True
+            self.events.append((self.clock(), "tapback", self.focused, args[1]))
+            stdout = f"reaction_sent:{args[1]}"
+        elif name == "imessage_send.applescript":
+            self._wait(self.lookup_seconds + self.send_seconds)
+            if args[1] in self.fail_texts:
+                rc, stderr = 1, "Failed to send message: fake failure"
+            else:
+                self.events.append((self.clock(), "sent", args[0], args[1]))
+                stdout = "sent"
+        else:
+            stdout = "ok"
+
+        result = subprocess.CompletedProcess(argv, rc, stdout + "\n" if stdout else "", stderr)
+        if check and rc != 0:
+            raise subprocess.CalledProcessError(rc, argv, result.stdout, stderr)
+        return result
+
+    def _open(self, target: str, open_delay: float) -> None:
+        """activate + open location + settle delays: `target` is now in front."""
+        self._wait(open_delay + OPEN_SECONDS)
+        self.activations += 1
+        self.focused = target
+        self.frontmost = True
+
+    def _wait(self, seconds: float) -> None:
+        if self.clock() + seconds > self._deadline:
+            self.sleep(max(0.0, self._deadline - self.clock()))
+            raise subprocess.TimeoutExpired(self._argv, self._deadline)
+        self.sleep(seconds)
+
+    def _type_and_send(self, args: List[str]) -> Tuple[int, str, str]:
+        if len(args) < 5 or (len(args) - 2) % 3:
+            return 1, "", "Usage: osascript type_and_send.applescript ..."
+        target, open_delay = args[0], int(args[1]) / 1000
+        bubbles = [(int(args[i]) / 1000, int(args[i + 1]) / 1000, args[i + 2]) for i in range(2, len(args), 3)]
+        self._wait(self.lookup_seconds)
+        can_type = self.gui_access and any(typing for _, typing, _ in bubbles)
+        if can_type:
+            self._open(target, open_delay)
+
+        report, stopped = [], False
+        for n, (pause, typing, text) in enumerate(bubbles, 1):
+            if stopped:
+                report.append(f"{n}\tskipped")
+                continue
+            self._wait(pause)
+            note = ""
+            if typing and not can_type:
+                note = "\ttyping failed: conversation not opened: fake: no GUI access"
+            elif typing:
+                self.events.append((self.clock(), "typing", self.focused, text))
+                self._wait(TYPE_KEYS_SECONDS + typing)
+            self._wait(self.send_seconds)
+            if text in self.fail_texts:
+                report.append(f"{n}\tfailed\tfake failure")
+                stopped = True
+            else:
+                self.events.append((self.clock(), "sent", target, text))
+                report.append(f"{n}\tsent{note}")
+        return 0, "\n".join(report), ""
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, "requests": len(self.calls), "activations": self.activations,
+                "fast_paths": self.fast_paths}
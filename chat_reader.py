@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Chat DB Reader - One long-lived read-only connection to chat.db
+
+The main loop used to run `sqlite3.connect("file:...?mode=ro")` on every
+poll: URI parsing, opening the file, loading the whole chat.db schema and
+preparing the query again each time. This reader keeps a single connection
+open and lets sqlite3's statement cache reuse the prepared SQL.
+
+Key principles:
+- Autocommit, so every poll is a fresh read transaction that sees the latest
+  WAL commits and never pins an old snapshot (which would block checkpoints)
+- Reconnect when chat.db is replaced (inode/device change) or its schema
+  version moves (e.g. a macOS update migrating the database)
+- Cheap counters (queries, rows, query time, reconnects) for monitoring
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class ChatDBReader:
+    """
+    Persistent read-only reader for one query shape.
+
+    Example:
+        >>> reader = ChatDBReader(CHAT_DB, SQL)
+        >>> rows = reader.fetch_after(last_rowid)
+        >>> reader.stats()["avg_query_ms"]
+    """
+
+    def __init__(self, db_path: str, sql: str):
+        self.db_path = db_path
+        self.sql = sql
+        self._conn: Optional[sqlite3.Connection] = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self._schema_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self.queries = 0
+        self.rows_returned = 0
+        self.query_time = 0.0
+        self.last_query_time = 0.0
+        self.reconnects = 0
+
+    def _file_identity(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.db_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def _connect(self):
+        self.close()
+        identity = self._file_identity()
+        if identity is None:
+            raise sqlite3.OperationalError(f"unable to open database file: {self.db_path}")
+
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            isolation_level=None,     # autocommit: each SELECT is its own read transaction
+            check_same_thread=False,  # the HTTP thread may ask for stats / max ROWID
+        )
+        schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+
+        if self._schema_version is not None and schema_version != self._schema_version:
+            print(f"[DB] chat.db schema changed (version {self._schema_version} -> {schema_version})")
+        if self._identity is not None:
+            self.reconnects += 1
+
+        self._conn = conn
+        self._identity = identity
+        self._schema_version = schema_version
+
+    def _needs_reconnect(self) -> bool:
+        if self._conn is None or self._file_identity() != self._identity:
+            return True
+        # Header read on the open connection - far cheaper than reconnecting
+        try:
+            return self._conn.execute("PRAGMA schema_version").fetchone()[0] != self._schema_version
+        except sqlite3.DatabaseError:
+            return True
+
+    def _run(self, sql: str, params: tuple) -> List[tuple]:
+        if self._needs_reconnect():
+            self._connect()
+        try:
+            return self._conn.execute(sql, params).fetchall()
+        except sqlite3.DatabaseError:
+            # File swapped or schema changed in a way the cached statement can't
+            # survive - start over once, then let the caller see the error
+            self._connect()
+            return self._conn.execute(sql, params).fetchall()
+
+    def fetch_after(self, rowid: int) -> List[tuple]:
+        """Run the reader's query with `rowid` as its only parameter."""
+        with self._lock:
+            start = time.perf_counter()
+            rows = self._run(self.sql, (rowid,))
+            elapsed = time.perf_counter() - start
+
+            self.queries += 1
+            self.rows_returned += len(rows)
+            self.query_time += elapsed
+            self.last_query_time = elapsed
+            return rows
+
+    def max_rowid(self, where: Optional[str] = None) -> Optional[int]:
+        """
+        Highest message ROWID in chat.db (how far the bridge could be behind).
+
+        Args:
+            where: SQL condition on `message` (e.g. the poll query's filter) so
+                rows the poll never returns don't count
+
+        Returns:
+            The ROWID, or None if no row matches
+        """
+        sql = "SELECT max(ROWID) FROM message"
+        if where:
+            sql += f" WHERE {where}"
+        with self._lock:
+            return self._run(sql, ())[0][0]
+
+    def stats(self) -> Dict:
+        """Snapshot of the reader's counters."""
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "rows_returned": self.rows_returned,
+                "query_time_seconds": round(self.query_time, 6),
+                "avg_query_ms": round(self.query_time / self.queries * 1000, 3) if self.queries else 0.0,
+                "last_query_ms": round(self.last_query_time * 1000, 3),
+                "reconnects": self.reconnects,
+                "schema_version": self._schema_version,
+            }
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
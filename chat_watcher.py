@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Chat DB Watcher - Wake the bridge as soon as chat.db changes
+
+Messages.app writes new rows to `chat.db-wal` (and checkpoints into
+`chat.db`). Instead of sleeping a fixed POLL_INTERVAL between queries, the
+main loop can block on one of these watchers and re-query the moment either
+file changes. POLL_INTERVAL stays as the upper bound, so a missed event only
+costs what polling always cost.
+
+Backends (pluggable, picked by `create_watcher`):
+- kqueue  - macOS/BSD vnode events (what the bridge uses in production)
+- inotify - Linux, via libc (lets us test against a synthetic SQLite file)
+- stat    - portable fallback that polls mtime/size/inode at a short interval
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+def _watched_paths(db_path: str) -> List[str]:
+    """The files whose changes can mean a new message landed."""
+    return [db_path, db_path + "-wal"]
+
+
+class StatWatcher:
+    """Portable fallback: compare os.stat() signatures every `interval` seconds."""
+
+    name = "stat"
+
+    def __init__(self, db_path: str, interval: float = 0.05):
+        self.paths = _watched_paths(db_path)
+        self.interval = interval
+        self._last = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Optional[Tuple[int, int, int]]]:
+        snapshot = {}
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                snapshot[path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+            except FileNotFoundError:
+                snapshot[path] = None
+        return snapshot
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to `timeout` seconds. Returns True if a watched file changed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._snapshot()
+            if current != self._last:
+                self._last = current
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify on the database directory (so a late-created -wal is seen too)."""
+
+    name = "inotify"
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    _MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, db_path: str):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._names = {os.path.basename(p).encode() for p in _watched_paths(db_path)}
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.path.dirname(os.path.abspath(db_path)).encode()
+        if libc.inotify_add_watch(self._fd, directory, self._MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory!r}")
+
+    def _drain(self) -> bool:
+        """Read all queued events; True if any touched a watched file."""
+        hit = False
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return hit
+            offset = 0
+            while offset < len(buf):
+                _wd, _mask, _cookie, length = self._EVENT.unpack_from(buf, offset)
+                offset += self._EVENT.size
+                name = buf[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name in self._names:
+                    hit = True
+
+    def wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if ready and self._drain():
+                return True
+
+    def close(self):
+        os.close(self._fd)
+
+
+class KqueueWatcher:
+    """macOS/BSD kqueue vnode events on chat.db, chat.db-wal and their directory."""
+
+    name = "kqueue"
+
+    O_EVTONLY = 0x8000  # macOS: open for event notification only
+
+    def __init__(self, db_path: str):
+        if not hasattr(select, "kqueue"):
+            raise OSError("kqueue is not available on this platform")
+        self.paths = _watched_paths(db_path)
+        self._directory = os.path.dirname(os.path.abspath(db_path))
+        self._kq = select.kqueue()
+        self._fds: Dict[str, int] = {}
+        self._register()
+
+    def _register(self):
+        """(Re)open every watched path that exists and add it to the kqueue."""
+        flags = getattr(os, "O_EVTONLY", self.O_EVTONLY if sys.platform == "darwin" else os.O_RDONLY)
+        fflags = (select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND |
+                  select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME)
+        changes = []
+        for path in self.paths + [self._directory]:
+            if path in self._fds:
+                continue
+            try:
+                fd = os.open(path, flags)
+            except FileNotFoundError:
+                continue  # e.g. no -wal yet; the directory event will tell us when it appears
+            self._fds[path] = fd
+            changes.append(select.kevent(
+                fd,
+                filter=select.KQ_FILTER_VNODE,
+                flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                fflags=fflags,
+            ))
+        if changes:
+            self._kq.control(changes, 0, 0)
+
+    def _forget(self, fd: int):
+        for path, known in list(self._fds.items()):
+            if known == fd:
+                del self._fds[path]
+                os.close(fd)
+
+    def wait(self, timeout: float) -> bool:
+        events = self._kq.control(None, 8, max(0.0, timeout))
+        for event in events:
+            if event.fflags & (select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME):
+                # File was replaced (e.g. -wal reset) - watch the new one
+                self._forget(event.ident)
+        self._register()
+        return bool(events)
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        self._kq.close()
+
+
+BACKENDS = {
+    "kqueue": KqueueWatcher,
+    "inotify": InotifyWatcher,
+    "stat": StatWatcher,
+}
+
+
+def create_watcher(db_path: str, backend: str = "auto"):
+    """
+    Build a watcher for `db_path`.
+
+    Args:
+        db_path: Path to chat.db
+        backend: "auto", "kqueue", "inotify" or "stat"
+
+    Returns:
+        A watcher with `wait(timeout) -> bool` and `close()`.
+        "auto" tries the native backend for this platform, then falls back to stat.
+    """
+    if backend != "auto":
+        return BACKENDS[backend](db_path)
+
+    native = ["kqueue"] if hasattr(select, "kqueue") else ["inotify"]
+    for name in native:
+        try:
+            return BACKENDS[name](db_path)
+        except OSError as e:
+            print(f"[WATCH] ⚠️ {name} watcher unavailable ({e}), falling back to stat polling")
+    return StatWatcher(db_path)
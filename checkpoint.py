@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Checkpoint - Batched, atomic commits of bridge progress
+
+The bridge tracks two things across restarts:
+- the ROWID watermark in `last_rowid.state`
+- the set of processed message IDs (see dedup_store.py)
+
+Both used to be written once per message with a truncate-and-rewrite, so a
+crash mid-write could leave an empty state file that `read_last()` turned
+into 0 and replayed all history. Now the poll loop collects everything that
+finished during a batch and commits it once:
+
+1. processed IDs in a single SQLite transaction
+2. the watermark via temp file + rename (optionally fsync'd)
+
+IDs go first, so a crash between the two steps only means a few rows are
+re-read and skipped as duplicates. The rename means the state file is always
+either the old value or the new one, never half-written. If it is unreadable
+anyway (disk trouble, hand edit), recovery falls back to the highest
+processed ID instead of ROWID 0.
+"""
+
+import os
+import threading
+from typing import List, Optional
+
+from dedup_store import ProcessedStore
+
+
+def atomic_write(path: str, data: str, fsync: bool = True) -> None:
+    """Replace `path` with `data` so readers only ever see old or new contents."""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(data)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if fsync:
+        # Make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def read_watermark(path: str) -> Optional[int]:
+    """
+    Read a watermark file.
+
+    Returns:
+        The stored ROWID, 0 if the file doesn't exist yet, or None if it
+        exists but can't be parsed.
+    """
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError):
+        return None
+
+
+class Checkpoint:
+    """
+    Collects progress from conversation workers and commits it once per poll.
+
+    Example:
+        >>> checkpoint = Checkpoint(STATE, store, fsync=True)
+        >>> last = checkpoint.load()
+        >>> checkpoint.mark_processed(rid)          # from any worker thread
+        >>> checkpoint.advance(dispatcher.safe_watermark(last))
+        >>> checkpoint.commit()                      # end of each poll
+    """
+
+    def __init__(self, state_path: str, store: ProcessedStore, fsync: bool = True):
+        self.state_path = state_path
+        self.store = store
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._pending_ids: List[int] = []
+        self._watermark = 0
+        self._committed_watermark = 0
+
+        self.commits = 0
+        self.ids_written = 0
+
+    def load(self) -> int:
+        """Read the committed watermark, recovering deterministically if the file is damaged."""
+        # Leftovers from a crash between write and rename are never authoritative
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        prefix = os.path.basename(self.state_path) + ".tmp."
+        for name in os.listdir(directory):
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+        watermark = read_watermark(self.state_path)
+        if watermark is None:
+            watermark = self.store.max_id()
+            print(f"[STATE] ⚠️ {self.state_path} is unreadable - recovering from last processed ID {watermark}")
+            atomic_write(self.state_path, str(watermark), fsync=self.fsync)
+
+        self._watermark = self._committed_watermark = watermark
+        return watermark
+
+    def mark_processed(self, rid: int) -> None:
+        """Record a finished message. Visible to dedup immediately, durable at the next commit."""
+        self.store.remember(rid)
+        with self._lock:
+            self._pending_ids.append(rid)
+
+    def advance(self, watermark: int) -> None:
+        """Move the watermark that the next commit will write."""
+        with self._lock:
+            self._watermark = watermark
+
+    def commit(self) -> bool:
+        """
+        Write everything collected since the last commit.
+
+        Returns:
+            True if anything was written
+        """
+        with self._lock:
+            ids, self._pending_ids = self._pending_ids, []
+            watermark = self._watermark
+
+        if ids:
+            try:
+                self.store.add_many(ids)
+            except Exception:
+                # Keep them for the next attempt rather than losing dedup info
+                with self._lock:
+                    self._pending_ids[:0] = ids
+                raise
+            self.ids_written += len(ids)
+
+        if watermark == self._committed_watermark:
+            if ids:
+                self.commits += 1
+            return bool(ids)
+
+        atomic_write(self.state_path, str(watermark), fsync=self.fsync)
+        self._committed_watermark = watermark
+        self.store.prune(watermark)
+        self.commits += 1
+        return True
+
+    @property
+    def committed_watermark(self) -> int:
+        return self._committed_watermark
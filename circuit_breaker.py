@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker - Fail fast while the backend is down, hedge slow requests
+
+When the backend was slow or down every batch waited out the full 30s
+request timeout, every later message queued behind it, and a failed message
+was just dropped. Now:
+
+- CircuitBreaker watches outcomes and latency. Too many failures (or slow
+  calls) and it opens: calls fail immediately with CircuitOpenError. After a
+  cool-off it lets a probe through (half-open); success closes it, failure
+  re-opens it for twice as long.
+- BackendBacklog parks batches that hit an open breaker or a transient error
+  and hands them back, merged per sender, once the breaker lets traffic
+  through again. Parked messages hold back the ROWID watermark like
+  in-flight ones.
+- hedged_call fires a second identical request when the first is slower than
+  the recent p95; the first response wins. Both carry the same
+  Idempotency-Key, so the backend can answer the duplicate from its dedupe
+  cache instead of generating a second reply.
+
+Key principles:
+- Only availability counts against the backend: timeouts, connection errors,
+  5xx and 429 are failures; 4xx (incl. 401) are the request's problem, and
+  any other exception (bad URL, unencodable payload, a bug) is neither
+- Opens quickly (a run of consecutive failures) or on a failure rate over a
+  rolling window of recent calls
+- Half-open allows a bounded number of probes; everyone else keeps failing fast
+- Parked work keeps per-sender order: a sender with parked messages parks
+  new ones too
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import requests
+
+from coalesce import MessageBatch
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Raised by a call the backend couldn't answer; anything else (bad URL, a
+# payload that won't encode, a bug) is the caller's problem, not an outage
+AVAILABILITY_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                       requests.exceptions.ChunkedEncodingError)
+
+
+class CircuitOpenError(RuntimeError):
+    """The breaker is open: the backend isn't being called right now."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"backend circuit open, next probe in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Closed -> open -> half-open state machine over recent call outcomes.
+
+    Example:
+        >>> breaker = CircuitBreaker(consecutive_failures=3, open_seconds=10)
+        >>> breaker.before_call()            # raises CircuitOpenError while open
+        >>> breaker.record_success(0.42)     # or record_failure() / release()
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 consecutive_failures: int = 3, slow_call_seconds: Optional[float] = 10.0,
+                 open_seconds: float = 10.0, max_open_seconds: float = 120.0,
+                 half_open_probes: int = 1, latency_samples: int = 200,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            window: recent calls the failure rate is computed over
+            min_calls: calls needed in the window before the rate can open it
+            failure_rate: fraction of bad calls (failed or slow) that opens it
+            consecutive_failures: failures in a row that open it straight away
+            slow_call_seconds: a successful call slower than this counts as bad (None = never)
+            open_seconds: first cool-off before a probe; doubles per failed probe
+            half_open_probes: calls let through at once while half-open
+        """
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.consecutive_failures = consecutive_failures
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = bad
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self._state = CLOSED
+        self._streak = 0
+        self._opened_at = 0.0
+        self._cooloff = open_seconds
+        self._probes = 0
+
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def _refresh(self) -> None:
+        if self._state == OPEN and self.clock() - self._opened_at >= self._cooloff:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe may go out (0 unless open)."""
+        with self._lock:
+            self._refresh()
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self._cooloff - self.clock())
+
+    def allows_traffic(self) -> bool:
+        """True if a call right now would be let through."""
+        with self._lock:
+            self._refresh()
+            return self._state == CLOSED or (self._state == HALF_OPEN and self._probes < self.half_open_probes)
+
+    def before_call(self) -> None:
+        """Reserve a call. Raises CircuitOpenError while open (or half-open with probes out)."""
+        with self._lock:
+            self._refresh()
+            if self._state == OPEN or (self._state == HALF_OPEN and self._probes >= self.half_open_probes):
+                self.rejected += 1
+                raise CircuitOpenError(max(0.0, self._opened_at + self._cooloff - self.clock())
+                                       if self._state == OPEN else 0.0)
+            if self._state == HALF_OPEN:
+                self._probes += 1
+            self.calls += 1
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            slow = self.slow_call_seconds is not None and latency > self.slow_call_seconds
+            self.slow_calls += slow
+            if self._state == HALF_OPEN:
+                if slow:
+                    self._trip()
+                else:
+                    self._close()
+                return
+            self._streak = 0
+            self._outcomes.append(slow)
+            self._check()
+
+    def record_failure(self, latency: Optional[float] = None) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            self._streak += 1
+            self._outcomes.append(True)
+            self._check()
+
+    def release(self) -> None:
+        """A reserved call ended without telling anything about the backend (a local error)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1  # let the next call probe instead
+
+    def _check(self) -> None:
+        if self._state != CLOSED:
+            return
+        if self._streak >= self.consecutive_failures:
+            self._trip()
+        elif len(self._outcomes) >= self.min_calls and \
+                sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+            self._trip()
+
+    def _trip(self) -> None:
+        if self._state == HALF_OPEN:
+            self._cooloff = min(self._cooloff * 2, self.max_open_seconds)
+        else:
+            self._cooloff = self.open_seconds
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self._streak = 0
+        self.opened += 1
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._outcomes.clear()
+        self._streak = 0
+        self._cooloff = self.open_seconds
+
+    def latency_percentile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        """Recent successful-call latency percentile (None until there are enough samples)."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "state": self._state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "slow_calls": self.slow_calls,
+                "rejected": self.rejected,
+                "opened": self.opened,
+                "recent_failure_rate": round(sum(self._outcomes) / len(self._outcomes), 3) if self._outcomes else 0.0,
+                "retry_in_s": round(max(0.0, self._opened_at + self._cooloff - self.clock()), 1)
+                if self._state == OPEN else 0.0,
+            }
+
+
+def hedged_call(fn: Callable[[int], object], hedge_after: float, executor: ThreadPoolExecutor,
+                discard: Optional[Callable[[object], None]] = None):
+    """
+    Run fn(0); if it hasn't finished after `hedge_after` seconds, also run fn(1)
+    and return whichever succeeds first.
+
+    Args:
+        discard: called with the loser's result if it succeeds too (e.g. to
+            close a streamed response nobody will read)
+
+    Returns:
+        (result, attempt that won, hedged?) - raises if every attempt failed
+    """
+    first = executor.submit(fn, 0)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result(), 0, False
+
+    second = executor.submit(fn, 1)
+    attempts = {first: 0, second: 1}
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if discard is not None:
+                    for loser in attempts:
+                        if loser is not future:
+                            loser.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+                return future.result(), attempts[future], True
+            error = error or future.exception()
+    raise error
+
+
+def _close_response(result: Tuple[object, Dict]) -> None:
+    """A hedged duplicate's (response, timing) that lost: give its connection back."""
+    close = getattr(result[0], "close", None)
+    if close is not None:
+        close()
+
+
+class GuardedPoster:
+    """
+    A backend POST behind a breaker, optionally hedged.
+
+    Example:
+        >>> poster = GuardedPoster(backend_client.post, breaker, hedge=True)
+        >>> response, timing = poster.post(url, headers=headers, json=payload, timeout=30)
+        >>> timing["hedged"], timing["winner"]
+    """
+
+    def __init__(self, post: Callable[..., Tuple[object, Dict]], breaker: CircuitBreaker,
+                 hedge: bool = False, hedge_min_seconds: float = 0.5, hedge_percentile: float = 95,
+                 hedge_workers: int = 8):
+        self._post = post
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_percentile = hedge_percentile
+        self._pool = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="hedge") if hedge else None
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def hedge_after(self) -> Optional[float]:
+        """Delay before the duplicate request goes out (None = don't hedge yet)."""
+        if not self.hedge:
+            return None
+        p = self.breaker.latency_percentile(self.hedge_percentile)
+        return None if p is None else max(p, self.hedge_min_seconds)
+
+    def post(self, url: str, **kwargs) -> Tuple[object, Dict]:
+        """Like BackendClient.post; raises CircuitOpenError without calling while open."""
+        self.breaker.before_call()
+        start = time.perf_counter()
+        try:
+            delay = self.hedge_after()
+            if delay is None:
+                (response, timing), winner, hedged = self._post(url, **kwargs), 0, False
+            else:
+                (response, timing), winner, hedged = hedged_call(
+                    lambda attempt: self._post(url, **kwargs), delay, self._pool, discard=_close_response)
+        except AVAILABILITY_ERRORS:
+            self.breaker.record_failure(time.perf_counter() - start)
+            raise
+        except Exception:
+            self.breaker.release()
+            raise
+        elapsed = time.perf_counter() - start
+        status = getattr(response, "status_code", 200)
+        if status >= 500 or status == 429:
+            self.breaker.record_failure(elapsed)
+        else:
+            self.breaker.record_success(elapsed)
+        if hedged:
+            with self._lock:
+                self.hedged += 1
+                self.hedge_wins += winner == 1
+        return response, dict(timing, hedged=hedged, winner=winner)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            out = {"hedge": self.hedge, "hedged": self.hedged, "hedge_wins": self.hedge_wins}
+        delay = self.hedge_after()
+        out["hedge_after_ms"] = round(delay * 1000, 1) if delay is not None else None
+        return out
+
+
+class BackendBacklog:
+    """
+    Batches waiting for the backend to come back.
+
+    Example:
+        >>> backlog = BackendBacklog(max_attempts=5)
+        >>> backlog.park(batch)                      # from the worker, on CircuitOpenError
+        >>> if breaker.allows_traffic(): resubmit(backlog.take())
+        >>> watermark = backlog.safe_watermark(watermark)
+    """
+
+    def __init__(self, max_attempts: int = 5):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._parked: Dict[str, List[MessageBatch]] = {}  # sender -> batches in ROWID order
+        self._attempts: Dict[int, int] = {}              # anchor ROWID -> failed backend attempts
+        self.parked_total = 0
+        self.dropped = 0
+
+    def park(self, batch: MessageBatch, attempted: bool = True) -> bool:
+        """
+        Hold a batch for later. `attempted` is False when the backend was never
+        called (breaker open), so it doesn't count towards max_attempts.
+
+        Returns:
+            False if the batch has failed max_attempts times and should be given up on
+        """
+        with self._lock:
+            attempts = self._attempts.get(batch.rowid, 0) + (1 if attempted else 0)
+            if attempts >= self.max_attempts:
+                self._attempts.pop(batch.rowid, None)
+                self.dropped += 1
+                return False
+            self._attempts[batch.rowid] = attempts
+            self._parked.setdefault(batch.sender, []).append(batch)
+            self.parked_total += 1
+            return True
+
+    def holds(self, sender: str) -> bool:
+        """True if the sender has parked work (new batches must queue behind it)."""
+        with self._lock:
+            return sender in self._parked
+
+    def take(self, limit: Optional[int] = None,
+             busy: Optional[Callable[[str], bool]] = None) -> List[MessageBatch]:
+        """
+        Hand parked work back, one merged batch per sender, oldest first.
+
+        Args:
+            limit: senders to release (1 while the breaker is only probing)
+            busy: senders for which this is True stay parked (they still have
+                newer work queued, which must park behind this first)
+        """
+        with self._lock:
+            senders = sorted((s for s in self._parked if not (busy and busy(s))),
+                             key=lambda s: self._parked[s][0].rowid)
+            if limit is not None:
+                senders = senders[:limit]
+            batches = []
+            for sender in senders:
+                parked = self._parked.pop(sender)
+                if len(parked) == 1:
+                    batches.append(parked[0])
+                    continue
+                messages = [m for b in parked for m in b.messages]
+                merged = MessageBatch(sender, messages, policy="per_sender", catch_up=True,
+                                      stale=any(b.stale for b in parked))
+                self._attempts[merged.rowid] = max(self._attempts.pop(b.rowid, 0) for b in parked)
+                batches.append(merged)
+            return batches
+
+    def forget(self, rowid: int) -> None:
+        """The batch anchored here was answered; drop its attempt count."""
+        with self._lock:
+            self._attempts.pop(rowid, None)
+
+    def safe_watermark(self, cursor: int) -> int:
+        with self._lock:
+            anchors = [batches[0].rowid for batches in self._parked.values()]
+        return min(min(anchors) - 1, cursor) if anchors else cursor
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(m) for batches in self._parked.values() for m in batches)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "parked_messages": sum(len(m) for batches in self._parked.values() for m in batches),
+                "parked_senders": len(self._parked),
+                "parked_total": self.parked_total,
+                "dropped": self.dropped,
+            }
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Coalesce - Group a chat.db backlog into one backend request per conversation
+
+After an outage the main loop used to page through the backlog one LIMIT-ed
+query per poll and call the backend once per row, so someone who sent 8
+messages while the bridge was down got 8 separate replies, each typed out in
+full. In catch-up mode the loop drains every page at once and the backlog is
+grouped per sender into MessageBatches, each answered by a single backend call.
+
+Policies (CATCHUP_POLICY):
+    per_sender  one request per sender carrying all their backlog messages (default)
+    latest      one request per sender with only the newest message; the
+                earlier ones are listed in metadata as superseded
+    none        one request per message (the old behaviour)
+
+Live bursts ("hey", "quick q", "what time do you close?") get the same
+treatment through BurstCoalescer: a sender's messages are held until they
+have been quiet for BURST_WINDOW_MS, then go out as one batch.
+
+Key principles:
+- Order within a conversation is kept; batches are ordered by their oldest ROWID
+- A batch is anchored on its OLDEST ROWID: the watermark never moves past any
+  of its messages, and a replay of the same backlog maps to the same outbox key
+- Messages older than `stale_after` are flagged stale; with skip_stale they
+  are marked handled without a reply and returned so the skip can be logged
+- Held messages count as in flight: the watermark stays below them, so a
+  crash mid-window replays them
+- Counters for how many backend calls coalescing saved
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+APPLE_EPOCH = 978307200  # 2001-01-01 in unix seconds
+
+POLICIES = ("per_sender", "latest", "none")
+
+# (rowid, text, sender, sent_at) with sent_at in unix seconds (None if unknown)
+Row = Tuple[int, str, str, Optional[float]]
+
+
+def apple_time(value) -> Optional[float]:
+    """
+    Convert chat.db's message.date to unix seconds.
+
+    Modern macOS stores nanoseconds since 2001-01-01, older versions seconds.
+    """
+    if not value:
+        return None
+    return APPLE_EPOCH + (value / 1e9 if value > 1e12 else value)
+
+
+class MessageBatch:
+    """
+    Inbound messages from one sender answered by a single backend request.
+
+    Example:
+        >>> batch = MessageBatch("+1555", [(41, "hey", t0), (42, "you there?", t1)])
+        >>> batch.rowid, batch.text
+        (41, 'hey\\nyou there?')
+    """
+
+    def __init__(self, sender: str, messages: Sequence[Row], policy: str = "per_sender",
+                 catch_up: bool = False, stale: bool = False):
+        if not messages:
+            raise ValueError("MessageBatch needs at least one message")
+        self.sender = sender
+        self.messages = list(messages)
+        self.policy = policy
+        self.catch_up = catch_up
+        self.stale = stale
+
+    @property
+    def rowid(self) -> int:
+        """Anchor ROWID: the oldest message (dispatcher watermark + outbox key)."""
+        return self.messages[0][0]
+
+    @property
+    def rowids(self) -> List[int]:
+        return [m[0] for m in self.messages]
+
+    @property
+    def text(self) -> str:
+        """What the backend is asked to answer."""
+        if self.policy == "latest":
+            return self.messages[-1][1]
+        return "\n".join(m[1] for m in self.messages)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def metadata(self) -> Dict:
+        """
+        Extra request metadata. Empty for a plain live message, so the payload
+        is unchanged from the one-request-per-message days.
+        """
+        if len(self.messages) == 1 and not self.catch_up:
+            return {}
+        meta = {
+            "message_ids": self.rowids,
+            "coalesced": len(self.messages),
+            "catch_up": self.catch_up,
+            "stale": self.stale,
+            "messages": [{"id": rid, "text": text, "sent_at": _iso(sent_at)}
+                         for rid, text, _, sent_at in self.messages],
+        }
+        if self.policy == "latest" and len(self.messages) > 1:
+            meta["superseded_ids"] = self.rowids[:-1]
+        return meta
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+def needs_catch_up(rows: Sequence[Row], limit: int, now: float, max_age: float) -> bool:
+    """
+    True when a poll shows the bridge is behind: the page was full, or its
+    oldest message has been waiting longer than `max_age` seconds.
+    """
+    if len(rows) >= limit:
+        return True
+    oldest = next((r[3] for r in rows if r[3] is not None), None)
+    return oldest is not None and now - oldest > max_age
+
+
+def plan_batches(rows: Sequence[Row], policy: str = "per_sender", catch_up: bool = True,
+                 now: Optional[float] = None, stale_after: Optional[float] = None,
+                 skip_stale: bool = False) -> Tuple[List[MessageBatch], List[Row]]:
+    """
+    Group rows into batches.
+
+    Args:
+        rows: (rowid, text, sender, sent_at) in ROWID order, already filtered
+            for empty/processed messages
+        policy: per_sender | latest | none
+        catch_up: False for live traffic (always one batch per message)
+        now: current unix time (for staleness)
+        stale_after: age in seconds after which a message is stale (None = never)
+        skip_stale: drop stale messages instead of answering them
+
+    Returns:
+        (batches ordered by anchor ROWID, stale rows that were skipped)
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"unknown coalescing policy {policy!r} (expected one of {', '.join(POLICIES)})")
+    now = time.time() if now is None else now
+
+    def is_stale(row: Row) -> bool:
+        return stale_after is not None and row[3] is not None and now - row[3] > stale_after
+
+    skipped = []
+    kept = []
+    for row in rows:
+        if skip_stale and is_stale(row):
+            skipped.append(row)
+        else:
+            kept.append(row)
+
+    if not catch_up or policy == "none":
+        batches = [MessageBatch(r[2], [r], policy="none", catch_up=catch_up, stale=is_stale(r))
+                   for r in kept]
+        return batches, skipped
+
+    groups: Dict[str, List[Row]] = {}
+    for row in kept:
+        groups.setdefault(row[2], []).append(row)
+    batches = [MessageBatch(sender, group, policy=policy, catch_up=True, stale=is_stale(group[-1]))
+               for sender, group in groups.items()]
+    batches.sort(key=lambda b: b.rowid)
+    return batches, skipped
+
+
+class BurstCoalescer:
+    """
+    Per-sender debounce window for live messages.
+
+    A sender's messages are held while they keep arriving less than `window`
+    seconds apart (never longer than `max_wait` in total), then released as
+    one MessageBatch. With window 0 (off) every batch is released by the next
+    ready() exactly as it was added. Only the poll loop adds and releases;
+    stats() may be read from any thread.
+
+    Example:
+        >>> bursts = BurstCoalescer(window=1.5)
+        >>> for batch in live_batches: bursts.add(batch)
+        >>> for batch in bursts.ready(): dispatcher.submit(batch.sender, batch.rowid, batch)
+        >>> hold = bursts.next_deadline()   # wake up when the next window closes
+        >>> if hold is not None: wait = min(wait, hold)
+    """
+
+    def __init__(self, window: float, max_wait: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = max(0.0, window)
+        self.max_wait = max(self.window, max_wait if max_wait is not None else self.window * 4)
+        self.clock = clock
+        self._lock = threading.Lock()
+        # sender -> [messages, first_arrival, last_arrival]
+        self._held: Dict[str, list] = {}
+        # window 0 (off): batches go out exactly as they came in, never merged
+        self._passthrough: List[MessageBatch] = []
+
+        self.messages = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    def add(self, batch: MessageBatch) -> None:
+        """Hold a live batch (normally a single message) for its sender."""
+        now = self.clock()
+        with self._lock:
+            self.messages += len(batch)
+            if not self.window:
+                self._passthrough.append(batch)
+                return
+            held = self._held.get(batch.sender)
+            if held is None:
+                self._held[batch.sender] = [list(batch.messages), now, now]
+            else:
+                held[0].extend(batch.messages)
+                held[2] = now
+
+    def _deadline(self, held: list) -> float:
+        return min(held[2] + self.window, held[1] + self.max_wait)
+
+    def _release(self, senders: List[str]) -> List[MessageBatch]:
+        batches, self._passthrough = self._passthrough, []
+        for sender in senders:
+            messages = self._held.pop(sender)[0]
+            batches.append(MessageBatch(sender, messages, policy="per_sender"))
+        for batch in batches:
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+        batches.sort(key=lambda b: b.rowid)
+        return batches
+
+    def ready(self) -> List[MessageBatch]:
+        """Release every sender whose window has closed, oldest first."""
+        now = self.clock()
+        with self._lock:
+            return self._release([s for s, held in self._held.items() if self._deadline(held) <= now])
+
+    def flush(self) -> List[MessageBatch]:
+        """Release everything still held (e.g. before a catch-up pass)."""
+        with self._lock:
+            return self._release(list(self._held))
+
+    def next_deadline(self) -> Optional[float]:
+        """Seconds until the next window closes (None if nothing is held)."""
+        with self._lock:
+            if self._passthrough:
+                return 0.0
+            if not self._held:
+                return None
+            return max(0.0, min(self._deadline(h) for h in self._held.values()) - self.clock())
+
+    def safe_watermark(self, cursor: int) -> int:
+        """`cursor`, or just below the oldest held message so a crash replays it."""
+        with self._lock:
+            rowids = [m[0][0][0] for m in self._held.values()] + [b.rowid for b in self._passthrough]
+        return min(min(rowids) - 1, cursor) if rowids else cursor
+
+    def stats(self) -> Dict:
+        with self._lock:
+            held = sum(len(h[0]) for h in self._held.values())
+            released = self.messages - held - sum(len(b) for b in self._passthrough)
+            return {
+                "window_ms": round(self.window * 1000),
+                "messages": self.messages,
+                "batches": self.batches,
+                "backend_calls_saved": released - self.batches,
+                "largest_batch": self.largest_batch,
+                "avg_batch_size": round(released / self.batches, 2) if self.batches else 0.0,
+                "held": held,
+            }
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Dedup Store - Compact, prunable record of processed message ROWIDs
+
+Replaces the append-only `bridge_processed_messages.txt`, which was read into
+a Python set at startup and grew forever. IDs now live in a small SQLite
+table keyed by ROWID (a single integer B-tree, no separate index).
+
+Key principles:
+- Only the recent window is held in memory: IDs above
+  (last_rowid.state watermark - retention). Startup cost is O(window), not
+  O(history)
+- Anything older is still answerable by an indexed lookup, just not cached
+- Entries far enough below the committed watermark can never be queried
+  again (the poll only asks for ROWID > watermark), so they get pruned
+- One-time migration from the old text file
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Iterable, Set
+
+DEFAULT_RETENTION = 1000  # IDs kept below the watermark as a safety margin
+
+
+class ProcessedStore:
+    """
+    Set-like store of processed message ROWIDs.
+
+    Example:
+        >>> store = ProcessedStore("bridge_processed_messages.db")
+        >>> store.migrate_from_text("bridge_processed_messages.txt")
+        >>> store.load_window(read_last())
+        >>> if rid not in store: ...; store.add(rid)
+        >>> store.prune(watermark)
+    """
+
+    def __init__(self, path: str, retention: int = DEFAULT_RETENTION, durable: bool = False):
+        self.path = path
+        self.retention = max(0, int(retention))
+        self._lock = threading.Lock()
+        self._recent: Set[int] = set()
+        self._floor = 0  # IDs <= floor are not cached and need a lookup
+        self._pruned_below = 0
+
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # Must be set before the first table exists; lets prune() give space back
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL survives a process crash; FULL also survives power loss
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS processed (rowid INTEGER PRIMARY KEY)")
+
+    def migrate_from_text(self, txt_path: str) -> int:
+        """
+        Import IDs from the legacy text file, then rename it to `<name>.migrated`.
+
+        Returns:
+            Number of IDs imported (0 if there was nothing to migrate)
+        """
+        if not os.path.exists(txt_path):
+            return 0
+
+        def ids():
+            with open(txt_path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.isdigit():
+                        yield (int(line),)
+
+        with self._lock:
+            before = self._count()
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR IGNORE INTO processed (rowid) VALUES (?)", ids())
+            self._conn.execute("COMMIT")
+            imported = self._count() - before
+
+        os.replace(txt_path, txt_path + ".migrated")
+        return imported
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT count(*) FROM processed").fetchone()[0]
+
+    def load_window(self, watermark: int) -> int:
+        """
+        Cache the IDs that can still show up in a poll.
+
+        Args:
+            watermark: Committed last_rowid.state value
+
+        Returns:
+            Number of IDs loaded into memory
+        """
+        floor = max(0, watermark - self.retention)
+        with self._lock:
+            rows = self._conn.execute("SELECT rowid FROM processed WHERE rowid > ?", (floor,))
+            self._recent = {rid for (rid,) in rows}
+            self._floor = floor
+            return len(self._recent)
+
+    def __contains__(self, rid: int) -> bool:
+        with self._lock:
+            if rid in self._recent:
+                return True
+            if rid > self._floor:
+                return False
+            # Below the cached window - rare (state file rolled back); ask SQLite
+            return self._conn.execute("SELECT 1 FROM processed WHERE rowid = ?", (rid,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        """Number of IDs cached in memory (the live dedup window)."""
+        with self._lock:
+            return len(self._recent)
+
+    def max_id(self) -> int:
+        """Highest ID on disk (0 if empty)."""
+        with self._lock:
+            return self._conn.execute("SELECT coalesce(max(rowid), 0) FROM processed").fetchone()[0]
+
+    def remember(self, rid: int) -> None:
+        """
+        Add to the in-memory window only; the caller persists it later (see
+        checkpoint.py). Called from send workers while the poll thread may be
+        pruning, hence the lock.
+        """
+        with self._lock:
+            self._recent.add(rid)
+
+    def add(self, rid: int) -> None:
+        """Record one processed ID (durable once this returns)."""
+        self.add_many((rid,))
+
+    def add_many(self, rids: Iterable[int]) -> None:
+        """Record several processed IDs in a single transaction."""
+        rids = list(rids)
+        if not rids:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR IGNORE INTO processed (rowid) VALUES (?)", ((r,) for r in rids))
+            self._conn.execute("COMMIT")
+            self._recent.update(rids)
+
+    def prune(self, watermark: int) -> int:
+        """
+        Drop IDs more than `retention` below the committed watermark.
+
+        Returns:
+            Number of IDs deleted from disk
+        """
+        cutoff = watermark - self.retention
+        if cutoff <= self._pruned_below:
+            return 0
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM processed WHERE rowid < ?", (cutoff,)).rowcount
+            if deleted:
+                # executescript() steps the pragma to completion; execute() frees one page
+                self._conn.executescript("PRAGMA incremental_vacuum;")
+            # In place: a new set would drop IDs remembered into the old one
+            self._recent.difference_update([rid for rid in self._recent if rid < cutoff])
+            self._floor = max(self._floor, cutoff - 1)
+            self._pruned_below = cutoff
+            return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
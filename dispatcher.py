@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Conversation Dispatcher - Per-sender worker queues for the bridge
+
+Rows returned by the chat.db poll are partitioned by sender. Every
+conversation gets its own FIFO queue, so replies to one person stay strictly
+in order while backend calls and typing/send pipelines for different people
+run concurrently.
+
+Key principles:
+- Strict ordering WITHIN a conversation
+- Concurrency ACROSS conversations, capped globally (Messages.app can only
+  take so many sends at once)
+- Round-robin between busy conversations so one chatty sender can't hog a slot
+- The committed ROWID watermark never moves past an unfinished message
+"""
+
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
+
+
+class ConversationDispatcher:
+    """
+    Run `handler(*args)` for each submitted message, one conversation at a time
+    per key, with at most `max_concurrent` conversations in flight.
+
+    Example:
+        >>> dispatcher = ConversationDispatcher(process_message, max_concurrent=4)
+        >>> dispatcher.submit(sender, rowid, rowid, text, sender)
+        >>> write_last(dispatcher.safe_watermark(last_seen_rowid))
+    """
+
+    def __init__(self, handler: Callable[..., None], max_concurrent: int = 4):
+        self._handler = handler
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent,
+            thread_name_prefix="conversation",
+        )
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # key -> queued (rowid, fn, args); a key is present while it has a drain scheduled.
+        # rowid is None for tasks that don't hold back the watermark (see submit_task)
+        self._queues: Dict[str, Deque[Tuple[Optional[int], Callable[..., None], tuple]]] = {}
+        # ROWIDs submitted but not finished yet
+        self._pending: Set[int] = set()
+
+    def submit(self, key: str, rowid: int, *args) -> None:
+        """Queue a message for its conversation. Never blocks on the handler."""
+        self._enqueue(key, rowid, self._handler, args)
+
+    def submit_task(self, key: str, fn: Callable[..., None], *args) -> None:
+        """
+        Queue other work (e.g. resuming an outbox) in a conversation's order.
+
+        Unlike submit(), the task has no ROWID, so it never holds back the watermark.
+        """
+        self._enqueue(key, None, fn, args)
+
+    def _enqueue(self, key: str, rowid: Optional[int], fn: Callable[..., None], args: tuple) -> None:
+        with self._lock:
+            if rowid is not None:
+                self._pending.add(rowid)
+            queue = self._queues.get(key)
+            if queue is not None:
+                # A drain is already scheduled for this conversation - it will pick this up
+                queue.append((rowid, fn, args))
+                return
+            self._queues[key] = deque([(rowid, fn, args)])
+        self._executor.submit(self._drain, key)
+
+    def _drain(self, key: str) -> None:
+        """Handle ONE queued message for `key`, then yield the worker slot."""
+        with self._lock:
+            rowid, fn, args = self._queues[key].popleft()
+
+        try:
+            fn(*args)
+        except Exception as e:
+            # Handlers log their own failures; this only keeps the worker alive
+            label = f"ROWID {rowid}" if rowid is not None else f"task for {key}"
+            print(f"[DISPATCH] ❌ Unhandled error for {label}: {type(e).__name__}: {e}")
+            traceback.print_exc()
+
+        with self._lock:
+            self._pending.discard(rowid)
+            if self._queues[key]:
+                # Go to the back of the line so other conversations get a turn
+                reschedule = True
+            else:
+                del self._queues[key]
+                reschedule = False
+            self._idle.notify_all()
+
+        if reschedule:
+            self._executor.submit(self._drain, key)
+
+    def release(self, rowid: int) -> None:
+        """
+        Let the watermark move past a message whose handler is still running.
+
+        For handlers that have durably handed the rest of their work off (the
+        outbox) and don't need a replay if the bridge dies from here on.
+        """
+        with self._lock:
+            self._pending.discard(rowid)
+            self._idle.notify_all()
+
+    def is_pending(self, rowid: int) -> bool:
+        """True if the message was submitted and hasn't finished yet."""
+        with self._lock:
+            return rowid in self._pending
+
+    def pending_count(self) -> int:
+        """Number of submitted messages that haven't finished yet."""
+        with self._lock:
+            return len(self._pending)
+
+    def is_busy(self, key: str) -> bool:
+        """True if the conversation has queued or running work."""
+        with self._lock:
+            return key in self._queues
+
+    def active_conversations(self) -> int:
+        """Number of conversations with queued or running work."""
+        with self._lock:
+            return len(self._queues)
+
+    def safe_watermark(self, cursor: int) -> int:
+        """
+        Highest ROWID that is safe to persist as "handled".
+
+        Args:
+            cursor: Highest ROWID the poll loop has seen
+
+        Returns:
+            `cursor` when nothing is in flight, otherwise the ROWID just below
+            the oldest unfinished message (so a crash replays it on restart).
+        """
+        with self._lock:
+            if not self._pending:
+                return cursor
+            return min(min(self._pending) - 1, cursor)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted message has finished. Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work and (optionally) wait for in-flight messages."""
+        if wait:
+            self.wait_idle()
+        self._executor.shutdown(wait=wait)
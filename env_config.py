@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Env Config - Load .env once, reload only when it actually changes
+
+`call_sf` used to re-open and re-parse `.env` (and rewrite os.environ) for
+every single message, just so a rotated SF_API_KEY would be picked up. This
+keeps the hot-rotation behavior without the per-message file I/O.
+
+Key principles:
+- Values are published as an immutable snapshot; a reload swaps the whole
+  snapshot in one reference assignment, so a worker that grabbed it at the
+  start of a request never sees half-old, half-new values
+- The file is only stat()ed, at most once per `check_interval`, and only
+  re-parsed when its mtime, size or inode changed
+- SIGHUP forces a reload on the next access (`kill -HUP <pid>`)
+"""
+
+import os
+import signal
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+
+def parse_env_file(path: str) -> Dict[str, str]:
+    """Parse KEY=VALUE lines (same rules the bridge always used)."""
+    values = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            k, _, v = line.partition("=")
+            values[k.strip()] = v.strip()
+    return values
+
+
+class EnvConfig:
+    """
+    Cached view of the environment with .env values layered on top.
+
+    Example:
+        >>> config = EnvConfig(".env")
+        >>> env = config.current()        # take ONE snapshot per request
+        >>> api_key = env.get("SF_API_KEY", "")
+    """
+
+    def __init__(self, path: str = ".env", check_interval: float = 1.0,
+                 on_reload: Optional[Callable[[Mapping[str, str], Mapping[str, str]], None]] = None):
+        self.path = path
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._reload_requested = False
+        self._next_check = 0.0
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._loaded = False
+        self._snapshot: Mapping[str, str] = MappingProxyType(dict(os.environ))
+        self.refresh(force=True)
+
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Re-read .env if it changed (or if forced).
+
+        Returns:
+            True if a new snapshot was published
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            signature = self._file_signature()
+            if not force and signature == self._signature:
+                return False
+
+            values = parse_env_file(self.path) if signature is not None else {}
+            # Same effect the old load_env() had, for code that still reads os.environ
+            os.environ.update(values)
+            old = self._snapshot
+            self._snapshot = MappingProxyType({**os.environ, **values})
+            self._signature = signature
+            self._reload_requested = False
+            is_reload = self._loaded
+            self._loaded = True
+            if is_reload:
+                self.reloads += 1
+
+        if is_reload and self.on_reload:
+            self.on_reload(old, self._snapshot)
+        return True
+
+    def current(self) -> Mapping[str, str]:
+        """The latest snapshot. Cheap enough to call per message."""
+        if self._reload_requested:
+            self.refresh(force=True)
+        elif time.monotonic() >= self._next_check:
+            self.refresh()
+        return self._snapshot
+
+    def get(self, key: str, default: str = "") -> str:
+        return self.current().get(key, default)
+
+    def request_reload(self) -> None:
+        """Force a re-read on the next access. Safe to call from a signal handler."""
+        self._reload_requested = True
+
+    def install_sighup_handler(self) -> None:
+        """Reload on SIGHUP. Must be called from the main thread."""
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.request_reload())
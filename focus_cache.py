@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Focus Cache - Remember which conversation Messages.app is showing
+
+show_typing_indicator.applescript always ran `activate`, `open location` and
+a fixed `delay 0.6` (plus frontmost/click settle delays), even for the second
+bubble of a reply when that chat had been opened a second earlier. The
+bridge now remembers which conversation a script last focused, and when, and
+passes "fast" to the typing script while that's still true; the script then
+only checks Messages is still frontmost and types.
+
+Key principles:
+- Only a script that opened the chat itself (the typing indicator) makes a
+  conversation "focused"; it stays valid for `ttl` seconds
+- A script for any other target, anything that may open or switch windows
+  (tapbacks), and any failure invalidates it - when in doubt, take the slow
+  path (typing "abc" into the wrong chat's draft would show the indicator
+  to the wrong person)
+- The fast path is a hint: the script falls back to the full activation if
+  Messages isn't frontmost any more (someone used the Mac)
+- Callers hold the automation scheduler's turn while deciding and running,
+  so the answer can't go stale in between
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class FocusCache:
+    """
+    Which conversation the bridge last brought to the front, and when.
+
+    Example:
+        >>> focus = FocusCache(ttl=10)
+        >>> args = [target, "fast"] if focus.fast_path(target) else [target]
+        >>> run_applescript(ASCRIPT_TYPING, args)
+        >>> focus.focused(target)
+    """
+
+    def __init__(self, ttl: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: seconds a focused conversation is trusted (0 disables the fast path)
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._target: Optional[str] = None
+        self._since = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def fast_path(self, target: str) -> bool:
+        """True if `target` is still the focused conversation (counts a hit or miss)."""
+        with self._lock:
+            fresh = (self.ttl > 0 and self._target == target
+                     and self.clock() - self._since <= self.ttl)
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return fresh
+
+    def focused(self, target: str) -> None:
+        """A script just opened and focused this conversation."""
+        with self._lock:
+            self._target = target
+            self._since = self.clock()
+
+    def touched(self, target: str) -> None:
+        """A script ran for `target` without changing the window (e.g. a send)."""
+        with self._lock:
+            if self._target is not None and self._target != target:
+                self._drop()
+
+    def invalidate(self) -> None:
+        """Focus unknown (a script failed or may have switched windows)."""
+        with self._lock:
+            if self._target is not None:
+                self._drop()
+
+    def _drop(self) -> None:
+        self._target = None
+        self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "ttl_s": self.ttl,
+                "focused": self._target is not None and self.clock() - self._since <= self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
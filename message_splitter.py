@@ -15,7 +15,15 @@ Key principles:
 """
 
 import re
-from typing import List
+from typing import Iterable, Iterator, List
+
+
+# A sentence ends at a run of . ! ? followed by whitespace
+# ([.!?][.!?]* is [.!?]+, spelled the way sre scans fastest)
+_SENTENCE_END = re.compile(r'([.!?][.!?]*\s+)')
+# ...unless the run is just the "." of one of these (it always follows the letters)
+_ABBREVIATIONS = ("Mr", "Mrs", "Dr", "Ms", "vs")
+_PLACEHOLDER = "<DOT>"  # the old tokenizer's abbreviation marker; a literal one still reads as "."
 
 
 def split_into_natural_messages(text: str, max_chars: int = 160) -> List[str]:
@@ -46,67 +54,240 @@ def split_into_natural_messages(text: str, max_chars: int = 160) -> List[str]:
     if len(text) <= max_chars:
         return [text]
     
-    # Split into sentences
-    sentences = _split_into_sentences(text)
-    
-    # Group sentences into natural message bubbles
-    messages = []
-    current_bubble = ""
+    bubbles = _BubbleGrouper(max_chars)
+    bubbles.add(_split_into_sentences(text))
+    bubbles.close()
+    return bubbles.messages
+
+
+def split_many(texts: Iterable[str], max_chars: int = 160) -> List[List[str]]:
+    """
+    Split a batch of replies: the same result as calling
+    split_into_natural_messages on each, with short replies (one bubble)
+    handled inline.
     
-    for sentence in sentences:
-        # Clean up the sentence
-        sentence = sentence.strip()
-        if not sentence:
-            continue
-        
-        # Check if adding this sentence would exceed max_chars
-        would_be_length = len(current_bubble) + len(sentence) + (1 if current_bubble else 0)
-        
-        # Decision logic:
-        # 1. If current bubble is empty, start with this sentence
-        # 2. If adding wouldn't exceed max by much, add it
-        # 3. If sentence ends with question mark, always break after it
-        # 4. If current bubble + sentence is reasonable, group them
-        
-        if not current_bubble:
-            # Start new bubble
-            current_bubble = sentence
-            # If it's a question or short exclamation, send it alone
-            if _is_standalone_sentence(sentence):
-                messages.append(current_bubble)
-                current_bubble = ""
-        elif would_be_length <= max_chars:
-            # Add to current bubble
-            current_bubble += " " + sentence
-            # If this is a question, break after it
-            if sentence.endswith("?"):
-                messages.append(current_bubble)
-                current_bubble = ""
-        elif len(sentence) > max_chars * 1.5:
-            # Sentence itself is too long - break it carefully
-            # First, finish current bubble if any
-            if current_bubble:
-                messages.append(current_bubble)
-                current_bubble = ""
-            # Then split the long sentence (at natural points if possible)
-            long_parts = _split_long_sentence(sentence, max_chars)
-            messages.extend(long_parts)
+    Example:
+        >>> split_many(["Hey! How are you?", ""])
+        [['Hey! How are you?'], []]
+    """
+    out = []
+    append = out.append
+    for text in texts:
+        stripped = text.strip() if text else ""
+        if not stripped:
+            append([])
+        elif len(stripped) <= max_chars:
+            append([stripped])  # most replies: one bubble, no sentence split needed
         else:
-            # Current bubble + sentence would be too long
-            # Finish current bubble and start new one
-            if current_bubble:
-                messages.append(current_bubble)
-            current_bubble = sentence
-            # If it's a standalone sentence, send it
-            if _is_standalone_sentence(sentence):
-                messages.append(current_bubble)
-                current_bubble = ""
-    
-    # Don't forget the last bubble
-    if current_bubble:
-        messages.append(current_bubble)
-    
-    return messages
+            append(split_into_natural_messages(stripped, max_chars))
+    return out
+
+
+class StreamingSplitter:
+    """
+    Split a reply while it's still streaming in: feed() it text chunks as
+    they arrive and send each bubble it returns straight away.
+
+    The bubbles are exactly what split_into_natural_messages gives for the
+    whole text, however it's chunked. That means:
+    - Nothing comes out until the reply is longer than max_chars (a short
+      reply is one bubble, as-is)
+    - A sentence is only final once its ending (. ! ? run, whitespace) and
+      the first character after it have arrived - "Dr. " or "..." may still
+      turn out not to end it
+    - A bubble goes out once a later sentence closes it (a question, or one
+      that doesn't fit); the last one comes from finish()
+
+    Example:
+        >>> splitter = StreamingSplitter()
+        >>> for chunk in token_stream:
+        ...     for bubble in splitter.feed(chunk):
+        ...         send(bubble)
+        >>> for bubble in splitter.finish():
+        ...     send(bubble)
+    """
+
+    def __init__(self, max_chars: int = 160):
+        self.max_chars = max_chars
+        self._text = ""          # not yet split into sentences (everything, until _long)
+        self._scan = 0           # where in _text the next sentence ending can start
+        self._started = False    # leading whitespace is behind us
+        self._long = False       # longer than max_chars: bubbles can go out
+        self._finished = False
+        self._bubbles = _BubbleGrouper(max_chars)
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Add the next chunk of text.
+
+        Returns:
+            Bubbles that are final now (often none)
+        """
+        if self._finished:
+            raise ValueError("StreamingSplitter.feed() after finish()")
+        if not chunk:
+            return []
+        if not self._started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return []
+            self._started = True
+        self._text += chunk
+        if not self._long:
+            if len(self._text.rstrip()) <= self.max_chars:
+                return []
+            self._long = True
+        return self._group(self._take_sentences(final=False))
+
+    def finish(self) -> List[str]:
+        """
+        The stream is over.
+
+        Returns:
+            The remaining bubbles
+        """
+        if self._finished:
+            return []
+        self._finished = True
+        text = self._text.rstrip()
+        if not self._long:
+            return [text] if text else []
+        self._text = text
+        bubbles = self._group(self._take_sentences(final=True))
+        self._bubbles.close()
+        return bubbles + self._drain()
+
+    def _take_sentences(self, final: bool) -> List[str]:
+        """
+        Cut the sentences that are final off the front of the buffer, with
+        the same rules as _split_into_sentences (search, not split, so a
+        long buffer isn't rescanned for every chunk).
+        """
+        text = self._text
+        search = _SENTENCE_END.search
+        sentences = []
+        start, pos = 0, self._scan
+        while True:
+            m = search(text, pos)
+            if m is None:
+                # a later ending can only begin in a . ! ? run at the very end
+                end = len(text)
+                while end > pos and text[end - 1] in ".!?":
+                    end -= 1
+                pos = end
+                break
+            if m.end() == len(text) and not final:
+                pos = m.start()  # the next sentence hasn't started; more whitespace or . ! ? may follow
+                break
+            ending = m.group()
+            if ending[0] == "." and ending[1] not in ".!?" and text.endswith(_ABBREVIATIONS, start, m.start()):
+                pos = m.end()  # "Dr. Patel": not the end of a sentence
+                continue
+            sentences.append(text[start:m.start()] + ending.rstrip())
+            start = pos = m.end()
+        if final and start < len(text):
+            sentences.append(text[start:])
+            start = pos = len(text)
+
+        if start:
+            self._text = text[start:]
+        self._scan = pos - start
+        if sentences and _PLACEHOLDER in text[:start]:
+            sentences = [s.replace(_PLACEHOLDER, ".") for s in sentences]
+        return sentences
+
+    def _group(self, sentences: List[str]) -> List[str]:
+        if sentences:
+            self._bubbles.add(sentences)
+        return self._drain()
+
+    def _drain(self) -> List[str]:
+        bubbles, self._bubbles.messages = self._bubbles.messages, []
+        return bubbles
+
+
+def split_stream(chunks: Iterable[str], max_chars: int = 160) -> Iterator[str]:
+    """
+    Yield the bubbles of a streamed reply as soon as each one is final.
+
+    Example:
+        >>> for bubble in split_stream(backend_chunks()):
+        ...     send(bubble)
+    """
+    splitter = StreamingSplitter(max_chars)
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.finish()
+
+
+class _BubbleGrouper:
+    """
+    Groups sentences into natural message bubbles, in order. Finished
+    bubbles collect in `messages`; the one being built is held back until a
+    later sentence (or close()) finishes it. It's a list of sentences plus
+    its joined length, joined once when it's done.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.messages: List[str] = []
+        self._bubble: List[str] = []
+        self._bubble_len = 0
+
+    def add(self, sentences: Iterable[str]) -> None:
+        max_chars = self.max_chars
+        long_sentence = max_chars * 1.5
+        messages = self.messages
+        bubble, bubble_len = self._bubble, self._bubble_len
+
+        for sentence in sentences:
+            # Decision logic:
+            # 1. If current bubble is empty, start with this sentence
+            # 2. If adding wouldn't exceed max by much, add it
+            # 3. If sentence ends with question mark, always break after it
+            # 4. If current bubble + sentence is reasonable, group them
+
+            # _is_standalone_sentence, inlined (sentences are never empty)
+            last = sentence[-1]
+            standalone = last == "?" or (last == "!" and len(sentence) < 30)
+
+            if not bubble:
+                # Start new bubble; a question or short exclamation goes alone
+                if standalone:
+                    messages.append(sentence)
+                else:
+                    bubble, bubble_len = [sentence], len(sentence)
+            elif bubble_len + len(sentence) + 1 <= max_chars:
+                # Add to current bubble
+                bubble.append(sentence)
+                bubble_len += len(sentence) + 1
+                # If this is a question, break after it
+                if last == "?":
+                    messages.append(" ".join(bubble))
+                    bubble, bubble_len = [], 0
+            elif len(sentence) > long_sentence:
+                # Sentence itself is too long - finish the current bubble, then
+                # split the sentence (at natural points if possible)
+                messages.append(" ".join(bubble))
+                bubble, bubble_len = [], 0
+                messages.extend(_split_long_sentence(sentence, max_chars))
+            else:
+                # Current bubble + sentence would be too long
+                # Finish current bubble and start new one
+                messages.append(" ".join(bubble))
+                if standalone:
+                    messages.append(sentence)
+                    bubble, bubble_len = [], 0
+                else:
+                    bubble, bubble_len = [sentence], len(sentence)
+
+        self._bubble, self._bubble_len = bubble, bubble_len
+
+    def close(self) -> None:
+        # Don't forget the last bubble
+        if self._bubble:
+            self.messages.append(" ".join(self._bubble))
+            self._bubble, self._bubble_len = [], 0
 
 
 def _split_into_sentences(text: str) -> List[str]:
@@ -114,36 +295,36 @@ def _split_into_sentences(text: str) -> List[str]:
     Split text into sentences, handling common edge cases.
     
     Handles:
-    - Regular sentences ending with . ! ?
+    - Regular sentences ending with . ! ? (the punctuation stays, the
+      whitespace after it doesn't)
     - Abbreviations (Dr., Mr., etc.)
     - URLs
     - Numbers (3.14, etc.)
-    """
-    # Simple but effective sentence splitting
-    # This regex splits on . ! ? followed by space and capital letter
-    # while trying to avoid common abbreviations
     
-    # Replace common abbreviations temporarily
-    text = text.replace("Mr.", "Mr<DOT>")
-    text = text.replace("Mrs.", "Mrs<DOT>")
-    text = text.replace("Dr.", "Dr<DOT>")
-    text = text.replace("Ms.", "Ms<DOT>")
-    text = text.replace("vs.", "vs<DOT>")
-    
-    # Split on sentence endings
-    pattern = r'([.!?]+[\s]+)'
-    parts = re.split(pattern, text)
-    
-    # Recombine sentences with their punctuation
+    One split with a precompiled pattern instead of masking abbreviations
+    with str.replace first. Expects stripped text: the pattern eats all the
+    whitespace after an ending, so every sentence comes back stripped and
+    non-empty without stripping each one.
+    """
+    parts = _SENTENCE_END.split(text)  # [sentence, ending, sentence, ending, ..., rest]
     sentences = []
-    for i in range(0, len(parts), 2):
-        sentence = parts[i]
-        if i + 1 < len(parts):
-            sentence += parts[i + 1].rstrip()
-        sentence = sentence.replace("<DOT>", ".")
-        if sentence.strip():
-            sentences.append(sentence.strip())
+    append = sentences.append
+    carried = ""
+    for i in range(1, len(parts), 2):
+        body, ending = parts[i - 1], parts[i]
+        if ending[0] == "." and body[-1:] in "rs" and ending[1] not in ".!?" and body.endswith(_ABBREVIATIONS):
+            carried += body + ending  # "Dr. Patel": not the end of a sentence
+            continue
+        if carried:
+            append(carried + body + ending.rstrip())
+            carried = ""
+        else:
+            append(body + ending.rstrip())
+    if carried or parts[-1]:
+        append(carried + parts[-1])
     
+    if _PLACEHOLDER in text:
+        sentences = [s.replace(_PLACEHOLDER, ".") for s in sentences]
     return sentences
 
 
@@ -153,25 +334,10 @@ def _is_standalone_sentence(sentence: str) -> bool:
     
     Returns True for:
     - Questions
-    - Short exclamations
-    - Greetings
+    - Short exclamations (under 30 chars ending with !), which also covers
+      short phrases like "ok!", "got it!", "sounds good!"
     """
-    sentence = sentence.strip()
-    
-    # Questions always standalone
-    if sentence.endswith("?"):
-        return True
-    
-    # Short exclamations (under 30 chars ending with !)
-    if sentence.endswith("!") and len(sentence) < 30:
-        return True
-    
-    # Common short phrases that should be alone
-    short_phrases = ["ok!", "great!", "awesome!", "perfect!", "got it!", "sounds good!"]
-    if sentence.lower() in short_phrases:
-        return True
-    
-    return False
+    return sentence.endswith("?") or (len(sentence) < 30 and sentence.endswith("!"))
 
 
 def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
@@ -187,38 +353,39 @@ def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
     if len(sentence) <= max_chars:
         return [sentence]
     
-    # Try to split at commas first
+    # Try to split at commas first (each chunk keeps its comma while grouping)
     if "," in sentence:
         parts = []
-        current = ""
-        for chunk in sentence.split(","):
-            if not current:
-                current = chunk + ","
-            elif len(current) + len(chunk) + 1 < max_chars:
-                current += chunk + ","
+        chunks = sentence.split(",")
+        group = [chunks[0]]
+        group_len = len(chunks[0]) + 1
+        for chunk in chunks[1:]:
+            if group_len + len(chunk) + 1 < max_chars:
+                group.append(chunk)
+                group_len += len(chunk) + 1
             else:
-                parts.append(current.strip().rstrip(","))
-                current = chunk + ","
-        if current:
-            parts.append(current.strip().rstrip(","))
+                parts.append((",".join(group) + ",").strip().rstrip(","))
+                group, group_len = [chunk], len(chunk) + 1
+        parts.append((",".join(group) + ",").strip().rstrip(","))
         return parts
     
     # Fall back to word-based splitting
-    words = sentence.split()
     parts = []
-    current = ""
-    
-    for word in words:
-        if not current:
-            current = word
-        elif len(current) + len(word) + 1 <= max_chars:
-            current += " " + word
+    group: List[str] = []
+    group_len = 0
+    
+    for word in sentence.split():
+        if not group:
+            group, group_len = [word], len(word)
+        elif group_len + len(word) + 1 <= max_chars:
+            group.append(word)
+            group_len += len(word) + 1
         else:
-            parts.append(current)
-            current = word
+            parts.append(" ".join(group))
+            group, group_len = [word], len(word)
     
-    if current:
-        parts.append(current)
+    if group:
+        parts.append(" ".join(group))
     
     return parts
 
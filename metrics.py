@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Metrics - Low-overhead counters/histograms with Prometheus text exposition
+
+The only operational signal used to be grepping backend_communication.log.
+This module keeps in-process counters, gauges and latency histograms and
+renders them in the Prometheus text format for GET /metrics.
+
+Key principles:
+- Lock-free hot path: every thread writes only its own shard (a plain list
+  held in a threading.local), so inc()/observe() never contend and never
+  lose updates; a scrape sums the shards
+- No allocations per call: shards are created once per thread, buckets are
+  found with bisect over a tuple, and callers time with one perf_counter()
+- Gauges are callbacks evaluated at scrape time (queue depth, ROWID lag),
+  so nothing has to be kept up to date on the hot path
+- Metrics are registered once at startup; label children are pre-bound
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds. Wide enough for a 1ms SQLite poll and a 30s backend timeout
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+
+    def escape(v) -> str:
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Sharded:
+    """Per-thread list of `width` slots, summed on read."""
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        self._shards: List[list] = []
+        self._lock = threading.Lock()  # only taken when a thread writes for the first time
+
+    def _shard(self) -> list:
+        shard = [0] * self._width
+        with self._lock:
+            self._shards.append(shard)
+        self._local.shard = shard
+        return shard
+
+    def _totals(self) -> list:
+        with self._lock:
+            shards = list(self._shards)
+        totals = [0] * self._width
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    """Monotonic counter."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[Tuple[str, str]] = ()):
+        super().__init__(1)
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def inc(self, amount: float = 1) -> None:
+        try:
+            self._local.shard[0] += amount
+        except AttributeError:
+            self._shard()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._totals()[0]
+
+    def samples(self) -> List[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        return [(self.name, self.labels, self.value)]
+
+
+class Histogram(_Sharded):
+    """
+    Fixed-bucket histogram. Shard layout: one slot per bucket, one for +Inf,
+    then the running sum.
+    """
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 labels: Sequence[Tuple[str, str]] = ()):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(len(self.bounds) + 2)
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._sum_slot = len(self.bounds) + 1
+
+    def observe(self, value: float) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[self._sum_slot] += value
+
+    def since(self, start: float) -> None:
+        """observe(perf_counter() - start) - the usual way to time a call."""
+        self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict:
+        totals = self._totals()
+        counts = totals[:-1]
+        return {"count": sum(counts), "sum": totals[-1], "buckets": counts}
+
+    def samples(self) -> List[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        snap = self.snapshot()
+        out = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), snap["buckets"]):
+            cumulative += count
+            out.append((f"{self.name}_bucket", self.labels + (("le", _format_value(bound)),), cumulative))
+        out.append((f"{self.name}_sum", self.labels, snap["sum"]))
+        out.append((f"{self.name}_count", self.labels, snap["count"]))
+        return out
+
+
+class Gauge:
+    """Value read from a callback at scrape time (None = skip this scrape)."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Optional[float]],
+                 labels: Sequence[Tuple[str, str]] = ()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+
+    def samples(self) -> List[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return [] if value is None else [(self.name, self.labels, value)]
+
+
+class MetricsRegistry:
+    """
+    Holds every metric and renders them.
+
+    Example:
+        >>> metrics = MetricsRegistry(prefix="bridge_")
+        >>> sends = metrics.histogram("send_seconds", "AppleScript send latency")
+        >>> start = time.perf_counter(); send(); sends.since(start)
+        >>> metrics.render()            # text for GET /metrics
+    """
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._families: Dict[str, Tuple[str, str, list]] = {}  # name -> (type, help, metrics)
+        self._lock = threading.Lock()
+
+    def _register(self, kind: str, metric):
+        with self._lock:
+            family = self._families.setdefault(metric.name, (kind, metric.help, []))
+            if family[0] != kind:
+                raise ValueError(f"{metric.name} already registered as a {family[0]}")
+            family[2].append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, **labels: str) -> Counter:
+        return self._register("counter", Counter(self.prefix + name, help, tuple(labels.items())))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                  **labels: str) -> Histogram:
+        return self._register("histogram", Histogram(self.prefix + name, help, buckets, tuple(labels.items())))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], Optional[float]], **labels: str) -> Gauge:
+        return self._register("gauge", Gauge(self.prefix + name, help, fn, tuple(labels.items())))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            families = list(self._families.items())
+        lines = []
+        for name, (kind, help, metrics) in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in metrics:
+                for sample_name, labels, value in metric.samples():
+                    lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
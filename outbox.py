@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Outbox - Durable queue of outbound reply bubbles
+
+A backend reply used to live only in memory while it was being typed out.
+If the bridge died halfway, the inbound message was replayed to the backend
+on restart and the person saw the bubbles that had already gone out a second
+time; a failed send was just logged and skipped.
+
+Now every reply is written to a local SQLite outbox as one job per bubble
+(plus one for the tapback) before anything is sent. Once it's there the
+inbound message can be acked, and delivery works through the jobs.
+
+Job states:
+    pending  -> waiting to be sent (or waiting out a retry backoff)
+    sending  -> handed to Messages.app; still "sending" after a crash means
+                we can't know if it went out
+    sent     -> delivered
+    failed   -> gave up (out of attempts, or in doubt after a crash)
+
+Key principles:
+- Enqueue is idempotent: UNIQUE(inbound_rowid, seq), so replaying the same
+  inbound message never duplicates jobs
+- A job is marked `sending` (committed) BEFORE the send and `sent` after it;
+  an in-doubt job is never resent, because a duplicate iMessage is worse
+  than a missing one
+- Failed sends retry with exponential backoff, in order, up to max_attempts
+- Clock and sleep are injectable for tests
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+
+IN_DOUBT_ERROR = "interrupted mid-send by a restart; not resent to avoid a duplicate"
+
+
+class InDoubt(Exception):
+    """Raised by a send that may have gone out anyway (timed out, runner died mid-send)."""
+
+
+class Outbox:
+    """
+    SQLite-backed outbox of reply jobs.
+
+    Example:
+        >>> outbox = Outbox("bridge_outbox.db")
+        >>> outbox.recover()                    # once at startup
+        >>> outbox.enqueue(rid, sender, target, [{"kind": "message", "text": "hi", ...}])
+        >>> for job in outbox.unsent(rid):
+        ...     outbox.deliver(job["id"], lambda: send_imessage(target, job["text"]))
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, backoff_base: float = 2.0,
+                 backoff_max: float = 60.0, durable: bool = False,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.path = path
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL survives a process crash; FULL also survives power loss
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id              INTEGER PRIMARY KEY,
+                inbound_rowid   INTEGER NOT NULL,
+                seq             INTEGER NOT NULL,
+                conversation    TEXT NOT NULL,
+                target          TEXT NOT NULL,
+                payload         TEXT NOT NULL,
+                state           TEXT NOT NULL DEFAULT 'pending',
+                attempts        INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error      TEXT,
+                created_at      REAL NOT NULL,
+                updated_at      REAL NOT NULL,
+                UNIQUE (inbound_rowid, seq)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_state ON outbox (state, inbound_rowid)")
+
+    # ---------- writing ----------
+
+    def enqueue(self, inbound_rowid: int, conversation: str, target: str, jobs: List[Dict],
+                first_seq: int = 0) -> int:
+        """
+        Store a reply's jobs in one transaction. Replays of the same inbound
+        message are ignored.
+
+        Args:
+            inbound_rowid: chat.db ROWID of the message being answered
+            conversation: dispatcher key (the sender) the reply belongs to
+            target: who the reply goes to
+            jobs: payload dicts in send order (must be JSON-serializable)
+            first_seq: seq of the first job, for a reply stored piece by piece as it streams in
+
+        Returns:
+            Number of jobs actually inserted
+        """
+        now = self.clock()
+        rows = [(inbound_rowid, seq, conversation, target, json.dumps(job), now, now)
+                for seq, job in enumerate(jobs, first_seq)]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO outbox "
+                    "(inbound_rowid, seq, conversation, target, payload, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def _set(self, job_id: int, state: str, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        sql = f"UPDATE outbox SET state = ?, updated_at = ?{', ' + columns if columns else ''} WHERE id = ?"
+        with self._lock:
+            self._conn.execute(sql, (state, self.clock(), *fields.values(), job_id))
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before retry number `attempts` (1-based): base, 2*base, 4*base..."""
+        return min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+
+    def deliver(self, job_id: int, send: Callable[[], bool],
+                max_attempts: Optional[int] = None) -> bool:
+        """
+        Send one job, retrying with backoff until it succeeds or runs out of attempts.
+
+        Args:
+            send: does the actual send; returns True on success. False and
+                exceptions are failures and get retried, except InDoubt: the
+                job is failed at once and never resent
+            max_attempts: override for this job (e.g. a tapback that retries internally)
+
+        Returns:
+            True if the job ended up `sent`
+        """
+        limit = max_attempts or self.max_attempts
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT state, attempts, next_attempt_at FROM outbox WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["state"] != PENDING:
+                return row is not None and row["state"] == SENT
+
+            wait = row["next_attempt_at"] - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+
+            attempts = row["attempts"] + 1
+            self._set(job_id, SENDING, attempts=attempts)
+            error = None
+            try:
+                ok = bool(send())
+            except InDoubt as e:
+                self._set(job_id, FAILED, last_error=f"in doubt ({e}); not resent to avoid a duplicate")
+                return False
+            except Exception as e:
+                ok, error = False, f"{type(e).__name__}: {e}"
+
+            if ok:
+                self._set(job_id, SENT, last_error=None)
+                return True
+            error = error or "send reported failure"
+            if attempts >= limit:
+                self._set(job_id, FAILED, last_error=error)
+                return False
+            self._set(job_id, PENDING, last_error=error,
+                      next_attempt_at=self.clock() + self.backoff(attempts))
+
+    def deliver_batch(self, job_ids: List[int], send: Callable[[List[int]], Dict[int, Optional[bool]]]) -> List[int]:
+        """
+        Hand several jobs to one send call (e.g. one script for a whole reply), once.
+
+        Pending jobs take part up to the first one still waiting out a backoff;
+        they're all marked `sending` before send() runs. send(ids) returns {job_id: True (sent),
+        False (failed) or None (never attempted)}. A job missing from the
+        result may have gone out, so like a crash mid-send it's failed and
+        never resent. Failures and unattempted jobs stay pending for deliver().
+
+        Returns:
+            The ids that ended up `sent`
+        """
+        now = self.clock()
+        with self._lock:
+            marks = ",".join("?" * len(job_ids))
+            rows = self._conn.execute(
+                f"SELECT id, state, attempts, next_attempt_at FROM outbox WHERE id IN ({marks})",
+                list(job_ids)).fetchall() if job_ids else []
+        by_id = {r["id"]: r for r in rows}
+        due: Dict[int, int] = {}
+        for job_id in job_ids:
+            row = by_id.get(job_id)
+            if row is None or row["state"] != PENDING:
+                continue
+            if row["next_attempt_at"] > now:
+                break  # waiting out a backoff: it and everything after it go later, in order
+            due[job_id] = row["attempts"]
+        ids = list(due)
+        if not ids:
+            return []
+        for job_id in ids:
+            self._set(job_id, SENDING, attempts=due[job_id] + 1)
+
+        try:
+            results = send(ids) or {}
+            error = "not reported by the batch send"
+        except Exception as e:
+            results, error = {}, f"{type(e).__name__}: {e}"
+
+        sent = []
+        for job_id in ids:
+            attempts = due[job_id] + 1
+            outcome = results.get(job_id, "missing")
+            if outcome is True:
+                self._set(job_id, SENT, last_error=None)
+                sent.append(job_id)
+            elif outcome is None:
+                self._set(job_id, PENDING, attempts=attempts - 1)
+            elif outcome is False and attempts < self.max_attempts:
+                self._set(job_id, PENDING, last_error="batch send reported failure",
+                          next_attempt_at=self.clock() + self.backoff(attempts))
+            elif outcome is False:
+                self._set(job_id, FAILED, last_error="batch send reported failure")
+            else:
+                self._set(job_id, FAILED, last_error=f"in doubt ({error}); not resent to avoid a duplicate")
+        return sent
+
+    # ---------- reading ----------
+
+    @staticmethod
+    def _job(row) -> Dict:
+        job = json.loads(row["payload"])
+        job.update({
+            "id": row["id"],
+            "inbound_rowid": row["inbound_rowid"],
+            "seq": row["seq"],
+            "conversation": row["conversation"],
+            "target": row["target"],
+            "state": row["state"],
+            "attempts": row["attempts"],
+            "last_error": row["last_error"],
+        })
+        return job
+
+    def jobs(self, inbound_rowid: int) -> List[Dict]:
+        """Every job for one inbound message, in send order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM outbox WHERE inbound_rowid = ? ORDER BY seq", (inbound_rowid,)).fetchall()
+        return [self._job(r) for r in rows]
+
+    def unsent(self, inbound_rowid: int) -> List[Dict]:
+        """Jobs still to deliver for one inbound message, in send order."""
+        return [j for j in self.jobs(inbound_rowid) if j["state"] == PENDING]
+
+    def unfinished(self) -> List[Tuple[int, str]]:
+        """(inbound_rowid, conversation) for every reply with pending jobs, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT inbound_rowid, conversation FROM outbox "
+                "WHERE state = ? ORDER BY inbound_rowid", (PENDING,)).fetchall()
+        return [(r["inbound_rowid"], r["conversation"]) for r in rows]
+
+    # ---------- maintenance ----------
+
+    def recover(self) -> List[Dict]:
+        """
+        Startup: jobs left `sending` by a crash may or may not have gone out.
+        Mark them failed (never resent) and return them for logging.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM outbox WHERE state = ?", (SENDING,)).fetchall()
+            self._conn.execute(
+                "UPDATE outbox SET state = ?, last_error = ?, updated_at = ? WHERE state = ?",
+                (FAILED, IN_DOUBT_ERROR, self.clock(), SENDING))
+        return [self._job(r) for r in rows]
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Delete finished (sent/failed) jobs older than the cutoff. Returns rows removed."""
+        cutoff = self.clock() - older_than_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM outbox WHERE state IN (?, ?) AND updated_at < ?", (SENT, FAILED, cutoff))
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, count(*) AS n FROM outbox GROUP BY state").fetchall()
+        counts = {PENDING: 0, SENDING: 0, SENT: 0, FAILED: 0}
+        counts.update({r["state"]: r["n"] for r in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Reply Stream - Backend replies that arrive a bubble at a time
+
+call_sf used to wait for the complete JSON body (`r.json()`) before the first
+typing indicator could start, so a long AI reply meant seconds of silence
+while the backend generated bubbles the bridge could already have been
+typing. With BACKEND_STREAM on, the bridge asks for a streamed reply (Accept
+header); a backend that supports it answers with newline-delimited JSON
+(application/x-ndjson) or server-sent events (text/event-stream), one JSON
+object per line / `data:` event:
+
+    {"target": "+15551234567"}
+    {"reaction": {"type": "like", "delay_before": 0.5}}
+    {"message": {"text": "hey!", "typing_delay": 1.2}}
+    {"message": {"text": "what's up?"}}
+    {"done": true}
+
+Any key of the full response works in any event ("messages": [...] adds
+several bubbles at once, so the whole JSON body is a valid one-event stream).
+SSE's `data: [DONE]` also ends it, and {"error": "..."} aborts it. A backend
+that ignores the Accept header and answers application/json works as before.
+
+Key principles:
+- Each bubble is handed over as soon as its event is parsed; events that
+  arrive while earlier bubbles are still being typed are handed over together,
+  so they're planned as one stretch of the reply
+- The first bubble (or reaction) fixes the reply's target, so "target" has to
+  come before it. A different target after that is ignored and reported:
+  a reply never switches chats halfway
+- A reaction can arrive at any point; it goes out before the next bubble.
+  Only the first one counts
+- A stream that breaks raises (the transport's exception, or
+  ReplyStreamError for a bad event), but only after everything parsed before
+  the break has been handed over
+"""
+
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+STREAM_TYPES = (NDJSON, "application/jsonl", "application/json-seq", SSE)
+
+# Sent by call_sf when streaming is on; plain JSON stays acceptable
+ACCEPT = f"{NDJSON}, {SSE};q=0.9, application/json;q=0.5"
+
+_END = object()
+
+
+class ReplyStreamError(ValueError):
+    """The stream carried something that isn't a reply event (or an error event)."""
+
+
+def content_type(response) -> str:
+    return (response.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+
+
+def is_streamed(response) -> bool:
+    """True if the backend answered with one of the streamed formats."""
+    return content_type(response) in STREAM_TYPES
+
+
+def split_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Lines of a UTF-8 byte stream as chunks arrive. Only "\n" ends a line
+    (Response.iter_lines uses str.splitlines, which also breaks on U+2028
+    and friends inside JSON strings).
+    """
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        if b"\n" not in chunk:
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", "replace")
+    if buffer:
+        yield buffer.decode("utf-8", "replace")
+
+
+def parse_events(lines: Iterable[str], sse: bool = False) -> Iterator[Dict]:
+    """
+    JSON events from a stream's lines: one per non-empty line (NDJSON), or
+    one per blank-line-terminated SSE event made of its `data:` lines.
+
+    Raises:
+        ReplyStreamError: for data that isn't a JSON object
+    """
+    data: List[str] = []
+    for line in lines:
+        line = line.rstrip("\r")
+        if not sse:
+            if line.strip():
+                yield _decode(line)
+            continue
+        if line:
+            if line.startswith("data:"):
+                value = line[5:]
+                data.append(value[1:] if value.startswith(" ") else value)
+            continue  # comments (":") and event/id/retry fields don't matter here
+        if data:
+            payload, data = "\n".join(data), []
+            if payload.strip() == "[DONE]":
+                return
+            yield _decode(payload)
+    if data and "\n".join(data).strip() != "[DONE]":
+        yield _decode("\n".join(data))  # last event without its blank line
+
+
+def _decode(payload: str) -> Dict:
+    try:
+        event = json.loads(payload)
+    except ValueError as e:
+        raise ReplyStreamError(f"bad event {payload[:80]!r}: {e}") from None
+    if not isinstance(event, dict):
+        raise ReplyStreamError(f"event is not a JSON object: {payload[:80]!r}")
+    return event
+
+
+class ReplyAssembler:
+    """
+    Folds stream events into the pieces of a reply, in the order they may go out.
+
+    Example:
+        >>> reply = ReplyAssembler(default_target="+15551234567")
+        >>> reply.add({"message": {"text": "hey!"}})
+        [('message', {'text': 'hey!'})]
+        >>> reply.add({"target": "+15557654321"})
+        [('ignored', {'reason': 'target +15557654321 arrived after the first bubble, kept +15551234567'})]
+    """
+
+    def __init__(self, default_target: str):
+        self.default_target = default_target
+        self.announced_target: Optional[str] = None
+        self.locked = False  # something went out: the target can't change any more
+        self.reaction: Optional[Dict] = None
+        self.messages: List[Dict] = []
+        self.done = False
+
+    @property
+    def target(self) -> str:
+        return self.announced_target or self.default_target
+
+    def add(self, event: Dict) -> List[Tuple[str, Dict]]:
+        """
+        Returns:
+            (kind, piece) for what this event adds: "reaction", "message", or
+            "ignored" (with a reason) for what can't be honoured any more
+
+        Raises:
+            ReplyStreamError: for an error event
+        """
+        if event.get("error"):
+            raise ReplyStreamError(f"backend aborted the stream: {event['error']}")
+        pieces: List[Tuple[str, Dict]] = []
+
+        target = event.get("target")
+        if target and target != self.target:
+            if self.locked:
+                pieces.append(("ignored", {
+                    "reason": f"target {target} arrived after the first bubble, kept {self.target}"}))
+            else:
+                self.announced_target = target
+
+        reaction = event.get("reaction")
+        if reaction:
+            if self.reaction is None:
+                self.reaction = reaction
+                self.locked = True
+                pieces.append(("reaction", reaction))
+            else:
+                pieces.append(("ignored", {"reason": f"second reaction {reaction.get('type')!r}"}))
+
+        messages = list(event.get("messages") or [])
+        if event.get("message"):
+            messages.insert(0, event["message"])
+        if not messages and event.get("reply_text") and not self.messages:
+            # Old single-text format
+            messages = [{"text": event["reply_text"], "typing_delay": 2.0, "delay_before": 0.5}]
+        for message in messages:
+            self.locked = True
+            self.messages.append(message)
+            pieces.append(("message", message))
+
+        if event.get("done"):
+            self.done = True
+        return pieces
+
+    def response(self) -> Dict:
+        """What came in so far, shaped like a full (non-streamed) response."""
+        return {"target": self.announced_target, "messages": list(self.messages), "reaction": self.reaction}
+
+
+class StreamedReply:
+    """
+    A streamed backend response, read on a background thread.
+
+    Example:
+        >>> reply = StreamedReply(response, default_target=sender)
+        >>> for pieces in reply.batches():
+        ...     store_and_send(reply.target, pieces)   # [("message", {...}), ...]
+        >>> reply.assembler.response()
+    """
+
+    def __init__(self, response, default_target: str, started: Optional[float] = None):
+        """
+        Args:
+            response: a requests.Response made with stream=True
+            started: perf_counter() when the request went out (for first_bubble_seconds)
+        """
+        self.response = response
+        self.sse = content_type(response) == SSE
+        self.assembler = ReplyAssembler(default_target)
+        self.started = started if started is not None else time.perf_counter()
+        self.first_bubble_seconds: Optional[float] = None
+        self.events = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._read, name="reply-stream", daemon=True)
+        self._thread.start()
+
+    @property
+    def target(self) -> str:
+        return self.assembler.target
+
+    def _read(self) -> None:
+        try:
+            lines = split_lines(self.response.iter_content(chunk_size=None))
+            for event in parse_events(lines, sse=self.sse):
+                self.events += 1
+                pieces = self.assembler.add(event)
+                if pieces:
+                    if self.first_bubble_seconds is None and any(kind == "message" for kind, _ in pieces):
+                        self.first_bubble_seconds = time.perf_counter() - self.started
+                    self._queue.put(pieces)
+                if self.assembler.done:
+                    break
+            self._queue.put(_END)
+        except BaseException as e:
+            self._queue.put(e)
+        finally:
+            self.response.close()
+
+    def batches(self) -> Iterator[List[Tuple[str, Dict]]]:
+        """
+        Everything parsed since the last batch, waiting only when nothing is.
+        Ends with the stream; re-raises its error after the pieces before it.
+        """
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            pieces: List[Tuple[str, Dict]] = []
+            for item in items:
+                if item is _END or isinstance(item, BaseException):
+                    if pieces:
+                        yield pieces
+                    if item is _END:
+                        return
+                    raise item
+                pieces.extend(item)
+            yield pieces
+
+    def close(self) -> None:
+        """Stop reading (the reader thread ends on the closed connection)."""
+        self.response.close()
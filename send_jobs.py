@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Send Jobs - Non-blocking proactive sends for POST /send
+
+`/send` used to be an `async def` that called send_imessage (a blocking
+AppleScript run, up to 10s) once per message. That froze uvicorn's event loop,
+so /health and /metrics stalled while a receipt went out. Now the endpoint
+only validates and queues a job, answers 202 with its ID straight away, and
+the sends run on worker threads; GET /jobs/{id} reports progress.
+
+Key principles:
+- The request handler never touches AppleScript: submit() takes a lock, queues
+  and returns
+- Bounded: at most `max_workers` recipients are sent to at once and at most
+  `max_queued` jobs may be unfinished; past that submit() raises QueueFull and
+  the endpoint answers 429 with a Retry-After estimate
+- Jobs to the same recipient run in order (a ConversationDispatcher keyed by
+  recipient, like inbound replies), messages within a job in order
+- Finished jobs are kept for status lookups, oldest dropped first
+"""
+
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from dispatcher import ConversationDispatcher
+
+
+class QueueFull(Exception):
+    """Too many unfinished send jobs - the caller should retry later."""
+
+
+class SendJob:
+    """One POST /send request: a recipient and the messages to send, in order."""
+
+    def __init__(self, job_id: str, to: str, messages: List[str], created_at: float):
+        self.id = job_id
+        self.to = to
+        self.messages = list(messages)
+        self.created_at = created_at
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.status = "queued"  # queued | running | sent | partial | failed
+        self.results: List[Dict] = []
+        self.done = threading.Event()
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for r in self.results if r["ok"])
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "to": self.to,
+            "total": len(self.messages),
+            "sent": self.sent,
+            "results": list(self.results),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class SendJobQueue:
+    """
+    Runs proactive send jobs off the event loop.
+
+    Example:
+        >>> jobs = SendJobQueue(send_imessage, max_workers=2, max_queued=100)
+        >>> job = jobs.submit("+15551234567", ["Your receipt", "Thanks!"])
+        >>> jobs.get(job.id).to_dict()["status"]
+        'queued'
+    """
+
+    def __init__(self, send: Callable[[str, str], bool], max_workers: int = 2, max_queued: int = 100,
+                 keep_finished: int = 1000,
+                 on_message: Optional[Callable[[SendJob, int, str, bool], None]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            send: sends one message (to, text) and returns success (blocking is fine)
+            max_workers: recipients sent to concurrently
+            max_queued: unfinished jobs allowed before submit() raises QueueFull
+            keep_finished: finished jobs kept for GET /jobs/{id}
+            on_message: called after every message with (job, 1-based index, text, ok)
+        """
+        self.send = send
+        self.max_workers = max(1, int(max_workers))
+        self.max_queued = max(1, int(max_queued))
+        self.keep_finished = max(1, int(keep_finished))
+        self.on_message = on_message
+        self.clock = clock
+        self._dispatcher = ConversationDispatcher(self._run, max_concurrent=self.max_workers)
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, SendJob]" = OrderedDict()
+        self._unfinished = 0
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.job_seconds = 0.0
+
+    def submit(self, to: str, messages: List[str]) -> SendJob:
+        """Queue a job and return it without waiting. Raises QueueFull when at capacity."""
+        with self._lock:
+            if self._unfinished >= self.max_queued:
+                self.rejected += 1
+                raise QueueFull(f"{self._unfinished} send jobs already queued (limit {self.max_queued})")
+            job = SendJob(uuid.uuid4().hex, to, messages, self.clock())
+            self._jobs[job.id] = job
+            self._unfinished += 1
+            self.submitted += 1
+        self._dispatcher.submit_task(to, self._run, job.id)
+        return job
+
+    def _run(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.started_at = self.clock()
+        job.status = "running"
+        try:
+            for index, text in enumerate(job.messages, 1):
+                start = time.perf_counter()
+                try:
+                    ok = bool(self.send(job.to, text))
+                except Exception as e:
+                    print(f"[SEND JOB] ❌ {job.id} message #{index}: {type(e).__name__}: {e}")
+                    ok = False
+                job.results.append({"index": index, "ok": ok,
+                                    "ms": round((time.perf_counter() - start) * 1000, 1)})
+                if self.on_message:
+                    self.on_message(job, index, text, ok)
+        finally:
+            sent = job.sent
+            job.status = "sent" if sent == len(job.messages) else ("partial" if sent else "failed")
+            job.finished_at = self.clock()
+            with self._lock:
+                self._unfinished -= 1
+                self.completed += 1
+                self.job_seconds += job.finished_at - job.started_at
+                self._trim()
+            job.done.set()
+
+    def _trim(self) -> None:
+        finished = len(self._jobs) - self._unfinished
+        for job_id in list(self._jobs):
+            if finished <= self.keep_finished:
+                break
+            if self._jobs[job_id].finished_at is not None:
+                del self._jobs[job_id]
+                finished -= 1
+
+    def get(self, job_id: str) -> Optional[SendJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def retry_after(self) -> int:
+        """Seconds a rejected caller should wait: the backlog at the average job time."""
+        with self._lock:
+            avg = self.job_seconds / self.completed if self.completed else 1.0
+            return max(1, math.ceil(avg * self._unfinished / self.max_workers))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "unfinished": self._unfinished,
+                "max_queued": self.max_queued,
+                "workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_job_ms": round(self.job_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._dispatcher.shutdown(wait=wait)
+
+
+def add_send_routes(app, jobs: SendJobQueue, log: Optional[Callable[..., None]] = None) -> None:
+    """
+    Register POST /send and GET /jobs/{job_id} on a FastAPI app.
+
+    Both handlers are async and only touch the queue's lock, so they never
+    hold up the event loop.
+    """
+    from fastapi import HTTPException
+    from pydantic import BaseModel
+
+    class SendMessageRequest(BaseModel):
+        to: str
+        messages: List[str]
+
+    @app.post("/send", status_code=202)
+    async def send_messages(request: SendMessageRequest):
+        """Queue proactive messages (receipts etc.) and return the job ID immediately."""
+        try:
+            job = jobs.submit(request.to, request.messages)
+        except QueueFull as e:
+            if log:
+                log("⏳ Proactive send rejected, queue full", {"to": request.to, **jobs.stats()},
+                    level="warning")
+            raise HTTPException(status_code=429, detail=str(e),
+                                headers={"Retry-After": str(jobs.retry_after())})
+        if log:
+            log("📨 Received proactive message request from Railway",
+                {"to": request.to, "message_count": len(request.messages), "job_id": job.id})
+        return {"status": "queued", "job_id": job.id, "total": len(job.messages),
+                "status_url": f"/jobs/{job.id}"}
+
+    @app.get("/jobs/{job_id}")
+    async def job_status(job_id: str):
+        job = jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"unknown job {job_id}")
+        return job.to_dict()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Supervisor - Run several bridge workers, one per chat.db, from one config
+
+bridge.py is single-instance by design: one chat.db, one state file, one
+flock'd bridge.lock, one HTTP port. Scaling used to mean another Mac with a
+hand-copied setup. The supervisor starts N bridge.py processes from a
+workers file, each bound to its own database, state directory (state,
+processed IDs, outbox, lock, logs) and HTTP port, restarts them when they
+die, and serves one health view over all of them.
+
+workers.json:
+    {
+      "env_file": ".env",
+      "health_port": 3000,
+      "workers": [
+        {"name": "main", "chat_db": "~/Library/Messages/chat.db",
+         "state_dir": "state/main", "http_port": 3001},
+        {"name": "support", "chat_db": "/Volumes/support/chat.db",
+         "state_dir": "state/support", "http_port": 3002,
+         "env": {"MAX_CONCURRENT_CONVERSATIONS": "2"}}
+      ]
+    }
+
+Key principles:
+- The shared .env is loaded and validated once here; workers get its path
+  (ENV_FILE) so a rotated key still reaches all of them without a restart
+- Every per-worker resource must be unique, checked before anything starts,
+  and the shared .env may not set per-worker keys (it would override them all)
+- A dead worker is restarted with exponential backoff (like the LaunchAgent's
+  ThrottleInterval) without touching the others
+- SIGHUP is forwarded to every worker; SIGTERM/SIGINT stop them all
+- GET /health aggregates every worker's /health plus its process state;
+  GET /metrics merges every worker's /metrics with a worker="name" label
+- Workers send through the Messages.app of the session they run in
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from env_config import parse_env_file
+
+BRIDGE_SCRIPT = str(Path(__file__).resolve().parent / "bridge.py")
+
+# Set per worker by the supervisor; a shared .env must not override them
+PER_WORKER_KEYS = (
+    "CHAT_DB", "BRIDGE_STATE_DIR", "BRIDGE_WORKER", "HTTP_PORT", "LOCK_FILE",
+    "STATE_FILE", "PROCESSED_DB", "OUTBOX_DB", "LOG_DIR",
+)
+
+# Counters summed across workers in the aggregated /health
+TOTALS = {
+    "poll": ("polls", "rows", "empty_polls", "polls_per_hour"),
+    "burst": ("messages", "batches", "backend_calls_saved", "held"),
+}
+
+
+def relabel_metrics(text: str, worker: str, families: Dict[str, List[str]]) -> None:
+    """
+    Add worker="<name>" to every sample in a Prometheus text payload, merging
+    into `families` (name -> lines) so each family stays contiguous.
+    """
+    label = f'worker="{worker}"'
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            current = line.split(" ", 3)[2]
+            family = families.setdefault(current, [])
+            if line not in family:
+                family.append(line)
+            continue
+        if not line or line.startswith("#") or current is None:
+            continue
+        brace, space = line.find("{"), line.find(" ")
+        if brace != -1 and brace < space:
+            line = f"{line[:brace + 1]}{label},{line[brace + 1:]}"
+        else:
+            line = f"{line[:space]}{{{label}}}{line[space:]}"
+        families[current].append(line)
+
+
+class ConfigError(ValueError):
+    """The workers file (or the shared .env) can't be used as-is."""
+
+
+class WorkerSpec:
+    """One bridge worker's identity and per-worker settings."""
+
+    def __init__(self, name: str, chat_db: str, state_dir: str, http_port: int,
+                 env: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.chat_db = chat_db
+        self.state_dir = state_dir
+        self.http_port = http_port
+        self.env = dict(env or {})
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "chat_db": self.chat_db, "state_dir": self.state_dir,
+                "http_port": self.http_port}
+
+
+def load_config(path: str) -> Tuple[str, Dict[str, str], int, List[WorkerSpec]]:
+    """
+    Read and validate a workers file.
+
+    Returns:
+        (absolute env_file path, shared .env values, health_port, worker specs)
+    """
+    with open(path) as f:
+        raw = json.load(f)
+    base = Path(path).resolve().parent
+
+    def resolve(value: str) -> str:
+        p = Path(os.path.expanduser(str(value)))
+        return str(p if p.is_absolute() else base / p)
+
+    env_file = resolve(raw.get("env_file", ".env"))
+    shared_env = parse_env_file(env_file) if os.path.exists(env_file) else {}
+    clashes = sorted(k for k in shared_env if k in PER_WORKER_KEYS)
+    if clashes:
+        raise ConfigError(f"{env_file} sets per-worker keys {', '.join(clashes)} - "
+                          f"move them to the worker entries in {path}")
+    for key in ("SF_API_URL", "SF_API_KEY"):
+        if not (shared_env.get(key) or os.environ.get(key)):
+            raise ConfigError(f"{key} missing from {env_file}")
+
+    entries = raw.get("workers") or []
+    if not entries:
+        raise ConfigError(f"{path} defines no workers")
+    specs = []
+    for i, entry in enumerate(entries):
+        name = str(entry.get("name") or f"worker{i + 1}")
+        try:
+            spec = WorkerSpec(
+                name=name,
+                chat_db=resolve(entry["chat_db"]),
+                state_dir=resolve(entry.get("state_dir") or f"state/{name}"),
+                http_port=int(entry.get("http_port") or 3001 + i),
+                env={k: str(v) for k, v in (entry.get("env") or {}).items()},
+            )
+        except KeyError as e:
+            raise ConfigError(f"worker {name!r} is missing {e.args[0]!r}") from None
+        bad = sorted(k for k in spec.env if k in PER_WORKER_KEYS)
+        if bad:
+            raise ConfigError(f"worker {name!r}: set {', '.join(bad)} with the worker's own fields, not env")
+        specs.append(spec)
+
+    for field in ("name", "chat_db", "state_dir", "http_port"):
+        values = [getattr(s, field) for s in specs]
+        dupes = sorted({str(v) for v in values if values.count(v) > 1})
+        if dupes:
+            raise ConfigError(f"workers must not share a {field}: {', '.join(dupes)}")
+
+    health_port = int(raw.get("health_port", 3000))
+    if health_port in [s.http_port for s in specs]:
+        raise ConfigError(f"health_port {health_port} is also a worker's http_port")
+    return env_file, shared_env, health_port, specs
+
+
+def worker_env(spec: WorkerSpec, env_file: str, shared_env: Dict[str, str],
+               base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment for one worker: inherited env < shared .env < worker overrides < identity."""
+    env = dict(os.environ if base is None else base)
+    env.update(shared_env)
+    env.update(spec.env)
+    env.update({
+        "ENV_FILE": env_file,
+        "BRIDGE_WORKER": spec.name,
+        "CHAT_DB": spec.chat_db,
+        "BRIDGE_STATE_DIR": spec.state_dir,
+        "HTTP_PORT": str(spec.http_port),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+class Worker:
+    """Process state for one spec."""
+
+    def __init__(self, spec: WorkerSpec):
+        self.spec = spec
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.last_exit: Optional[int] = None
+        self.next_start = 0.0
+        self.backoff = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+
+class Supervisor:
+    """
+    Start, watch and restart bridge workers.
+
+    Example:
+        >>> env_file, shared, port, specs = load_config("workers.json")
+        >>> sup = Supervisor(specs, env_file, shared)
+        >>> sup.serve_health(port)
+        >>> sup.run()                   # until SIGTERM / Ctrl+C
+    """
+
+    def __init__(self, specs: List[WorkerSpec], env_file: str, shared_env: Dict[str, str],
+                 command: Optional[List[str]] = None, restart_base: float = 1.0,
+                 restart_max: float = 60.0, stable_after: float = 60.0):
+        self.workers = [Worker(spec) for spec in specs]
+        self.env_file = env_file
+        self.shared_env = shared_env
+        self.command = command or [sys.executable, BRIDGE_SCRIPT]
+        self.restart_base = restart_base
+        self.restart_max = restart_max
+        self.stable_after = stable_after
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # ---------- process control ----------
+
+    def _spawn(self, worker: Worker) -> None:
+        spec = worker.spec
+        log_dir = Path(spec.state_dir) / "logs"
+        log_dir.mkdir(parents=True, exist_ok=True)
+        with open(log_dir / "bridge.stdout.log", "ab") as out:
+            worker.process = subprocess.Popen(
+                self.command,
+                cwd=spec.state_dir,
+                env=worker_env(spec, self.env_file, self.shared_env),
+                stdout=out,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,  # Ctrl+C in the terminal goes to the supervisor only
+            )
+        worker.started_at = time.monotonic()
+        print(f"[SUPERVISOR] ▶️ {spec.name}: pid {worker.process.pid}, {spec.chat_db}, port {spec.http_port}")
+
+    def start(self) -> None:
+        with self._lock:
+            for worker in self.workers:
+                self._spawn(worker)
+
+    def check(self) -> None:
+        """Reap dead workers and restart any whose backoff has passed."""
+        now = time.monotonic()
+        with self._lock:
+            if self._stopping.is_set():
+                return
+            for worker in self.workers:
+                if worker.process is not None and worker.process.poll() is not None:
+                    worker.last_exit = worker.process.returncode
+                    ran = now - worker.started_at
+                    worker.process = None
+                    # A worker that stayed up a while gets a fresh backoff
+                    worker.backoff = (self.restart_base if ran >= self.stable_after or not worker.backoff
+                                      else min(self.restart_max, worker.backoff * 2))
+                    worker.next_start = now + worker.backoff
+                    print(f"[SUPERVISOR] ⚠️ {worker.spec.name} exited with {worker.last_exit} "
+                          f"after {ran:.1f}s - restarting in {worker.backoff:g}s")
+                if worker.process is None and worker.last_exit is not None and now >= worker.next_start:
+                    worker.restarts += 1
+                    self._spawn(worker)
+
+    def reload(self) -> None:
+        """Forward SIGHUP: every worker re-reads the shared .env."""
+        with self._lock:
+            for worker in self.workers:
+                if worker.alive:
+                    worker.process.send_signal(signal.SIGHUP)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """SIGTERM every worker, SIGKILL whatever is still up after `timeout`."""
+        self._stopping.set()
+        with self._lock:
+            running = [w for w in self.workers if w.alive]
+            for worker in running:
+                worker.process.terminate()
+            deadline = time.monotonic() + timeout
+            for worker in running:
+                try:
+                    worker.process.wait(max(0.0, deadline - time.monotonic()))
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+                    worker.process.wait()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def run(self, interval: float = 1.0) -> None:
+        """Start the workers and supervise until SIGTERM/SIGINT."""
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.reload())
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._stopping.set())
+        self.start()
+        try:
+            while not self._stopping.wait(interval):
+                self.check()
+        except KeyboardInterrupt:
+            pass
+        print("[SUPERVISOR] Stopping workers...")
+        self.stop()
+
+    # ---------- health ----------
+
+    def status(self) -> List[Dict]:
+        """Process state of every worker (no network calls)."""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                **w.spec.to_dict(),
+                "pid": w.process.pid if w.alive else None,
+                "alive": w.alive,
+                "uptime_s": round(now - w.started_at, 1) if w.alive else 0.0,
+                "restarts": w.restarts,
+                "last_exit": w.last_exit,
+            } for w in self.workers]
+
+    def health(self, timeout: float = 1.0) -> Dict:
+        """Every worker's own /health, plus totals across all of them."""
+        workers = self.status()
+        totals = {section: {key: 0 for key in keys} for section, keys in TOTALS.items()}
+        up = 0
+        for worker in workers:
+            worker["health"] = None
+            if not worker["alive"]:
+                continue
+            try:
+                url = f"http://127.0.0.1:{worker['http_port']}/health"
+                with urllib.request.urlopen(url, timeout=timeout) as r:
+                    worker["health"] = json.loads(r.read())
+            except Exception as e:
+                worker["health_error"] = f"{type(e).__name__}: {e}"
+                continue
+            up += 1
+            for section, keys in TOTALS.items():
+                stats = worker["health"].get(section) or {}
+                for key in keys:
+                    value = stats.get(key)
+                    if isinstance(value, (int, float)):
+                        totals[section][key] += value
+        return {
+            "status": "ok" if up == len(workers) else "degraded",
+            "service": "bridge_supervisor",
+            "workers_up": up,
+            "workers_total": len(workers),
+            "totals": totals,
+            "workers": workers,
+        }
+
+    def metrics(self, timeout: float = 1.0) -> str:
+        """Every live worker's /metrics, labelled by worker, plus the supervisor's own gauges."""
+        families: Dict[str, List[str]] = {
+            "bridge_supervisor_worker_up": ["# HELP bridge_supervisor_worker_up Worker process is running",
+                                            "# TYPE bridge_supervisor_worker_up gauge"],
+            "bridge_supervisor_worker_restarts": ["# HELP bridge_supervisor_worker_restarts Times the worker was restarted",
+                                                  "# TYPE bridge_supervisor_worker_restarts gauge"],
+        }
+        for worker in self.status():
+            families["bridge_supervisor_worker_up"].append(
+                f'bridge_supervisor_worker_up{{worker="{worker["name"]}"}} {int(worker["alive"])}')
+            families["bridge_supervisor_worker_restarts"].append(
+                f'bridge_supervisor_worker_restarts{{worker="{worker["name"]}"}} {worker["restarts"]}')
+            if not worker["alive"]:
+                continue
+            try:
+                url = f"http://127.0.0.1:{worker['http_port']}/metrics"
+                with urllib.request.urlopen(url, timeout=timeout) as r:
+                    relabel_metrics(r.read().decode(), worker["name"], families)
+            except Exception:
+                continue  # shows up as a gap in that worker's series
+        return "\n".join(line for lines in families.values() for line in lines) + "\n"
+
+    def serve_health(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve GET /health, /metrics (aggregated) and /workers (process state) in a background thread."""
+        supervisor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    data = supervisor.metrics().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                if self.path == "/health":
+                    body = supervisor.health()
+                elif self.path == "/workers":
+                    body = supervisor.status()
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="supervisor-http").start()
+        print(f"[SUPERVISOR] Health on http://{host}:{self._server.server_address[1]}/health")
+        return self._server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run several bridge workers from one workers file")
+    parser.add_argument("config", nargs="?", default="workers.json")
+    parser.add_argument("--check", action="store_true", help="validate the config and exit")
+    opts = parser.parse_args()
+
+    try:
+        env_file, shared_env, health_port, specs = load_config(opts.config)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"[SUPERVISOR] ❌ {e}")
+    for spec in specs:
+        print(f"[SUPERVISOR] {spec.name}: {spec.chat_db} -> {spec.state_dir} (port {spec.http_port})")
+    if opts.check:
+        raise SystemExit(0)
+
+    supervisor = Supervisor(specs, env_file, shared_env)
+    supervisor.serve_health(health_port)
+    supervisor.run()
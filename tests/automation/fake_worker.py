@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Fake automation worker - speaks the WorkerExecutor protocol without AppleScript
+
+Behavior is picked by the script's file name:
+    echo.applescript  -> stdout is the args joined by spaces
+    pid.applescript   -> stdout is this worker's pid
+    fail.applescript  -> rc 1 with an error on stderr
+    slow.applescript  -> reports a worker-side timeout
+    hang.applescript  -> never answers
+    die.applescript   -> worker exits mid-request
+"""
+import json
+import os
+import sys
+import time
+
+if os.environ.get("FAKE_WORKER_SILENT"):
+    time.sleep(60)
+
+print(json.dumps({"ready": True, "engine": "fake", "pid": os.getpid()}), flush=True)
+
+for line in sys.stdin:
+    request = json.loads(line)
+    name = os.path.basename(request["script"]).split(".")[0]
+    response = {"id": request["id"], "rc": 0, "stdout": "", "stderr": ""}
+    if name == "echo":
+        response["stdout"] = " ".join(request["args"]) + "\n"
+    elif name == "pid":
+        response["stdout"] = f"{os.getpid()}\n"
+    elif name == "fail":
+        response.update(rc=1, stderr="execution error: boom (-1728)\n")
+    elif name == "slow":
+        response.update(rc=-1, timed_out=True)
+    elif name == "hang":
+        time.sleep(60)
+    elif name == "die":
+        os._exit(3)
+    print(json.dumps(response), flush=True)
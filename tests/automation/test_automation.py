@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Automation Executor Tests - worker protocol, timeouts, restarts, fallback
+"""
+import os
+import stat
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from automation import (SubprocessExecutor, WorkerExecutor, WorkerStartError,
+                        create_executor)
+
+FAKE_WORKER = [sys.executable, str(Path(__file__).parent / "fake_worker.py")]
+
+
+@pytest.fixture
+def executor():
+    executor = WorkerExecutor(command=FAKE_WORKER, start_timeout=5)
+    yield executor
+    executor.close()
+
+
+def test_requests_share_one_worker_process(executor):
+    first = executor.run_applescript("/x/pid.applescript").stdout
+    for _ in range(20):
+        assert executor.run_applescript("/x/pid.applescript").stdout == first
+    result = executor.run_applescript("/x/echo.applescript", ["+15550001111", "hello there"])
+    assert result.returncode == 0
+    assert result.stdout.strip() == "+15550001111 hello there"
+    assert executor.stats()["requests"] == 22 and executor.stats()["restarts"] == 0
+
+
+def test_script_errors_raise_called_process_error_like_subprocess(executor):
+    with pytest.raises(subprocess.CalledProcessError) as exc:
+        executor.run_applescript("/x/fail.applescript", ["+1555"])
+    assert exc.value.returncode == 1
+    assert "boom" in exc.value.stderr
+
+    result = executor.run_applescript("/x/fail.applescript", check=False)
+    assert result.returncode == 1
+
+
+def test_hung_worker_is_killed_and_replaced(executor):
+    old_pid = executor.run_applescript("/x/pid.applescript").stdout
+    with pytest.raises(subprocess.TimeoutExpired):
+        executor.run_applescript("/x/hang.applescript", timeout=0.3)
+
+    new_pid = executor.run_applescript("/x/pid.applescript").stdout
+    assert new_pid != old_pid
+    assert executor.stats()["timeouts"] == 1 and executor.stats()["restarts"] == 1
+
+
+def test_worker_side_timeout_keeps_the_worker(executor):
+    old_pid = executor.run_applescript("/x/pid.applescript").stdout
+    with pytest.raises(subprocess.TimeoutExpired):
+        executor.run_applescript("/x/slow.applescript", timeout=5)
+    assert executor.run_applescript("/x/pid.applescript").stdout == old_pid
+
+
+def test_worker_crash_fails_the_request_without_retrying(executor):
+    with pytest.raises(subprocess.CalledProcessError) as exc:
+        executor.run_applescript("/x/die.applescript")
+    assert exc.value.returncode == -1
+    assert executor.stats()["crashes"] == 1
+    # Next call transparently gets a new worker
+    assert executor.run_applescript("/x/echo.applescript", ["ok"]).stdout.strip() == "ok"
+    assert executor.stats()["restarts"] == 1
+
+
+def test_worker_that_never_gets_ready_is_a_start_error(monkeypatch):
+    monkeypatch.setenv("FAKE_WORKER_SILENT", "1")
+    executor = WorkerExecutor(command=FAKE_WORKER, start_timeout=0.3)
+    with pytest.raises(WorkerStartError):
+        executor.run_applescript("/x/echo.applescript")
+
+
+def test_create_executor_falls_back_to_subprocess(monkeypatch):
+    monkeypatch.setattr("automation.WORKER_SCRIPT", "/nonexistent/automation_worker.py")
+    assert isinstance(create_executor("worker"), SubprocessExecutor)
+    assert isinstance(create_executor("subprocess"), SubprocessExecutor)
+
+
+def test_real_worker_runs_scripts_through_osascript(tmp_path, monkeypatch):
+    """automation_worker.py without PyObjC/osacompile, against a stand-in osascript."""
+    fake_bin = tmp_path / "bin"
+    fake_bin.mkdir()
+    osascript = fake_bin / "osascript"
+    osascript.write_text(
+        "#!/bin/sh\n"
+        "case \"$1\" in *bad*) echo 'execution error: nope (-1)' >&2; exit 1;; esac\n"
+        "shift; echo \"ran $*\"\n")
+    osascript.chmod(osascript.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{fake_bin}{os.pathsep}{os.environ['PATH']}")
+
+    good = tmp_path / "imessage_send.applescript"
+    good.write_text("on run argv\nend run\n")
+    bad = tmp_path / "bad.applescript"
+    bad.write_text("on run argv\nend run\n")
+
+    executor = WorkerExecutor(start_timeout=10)
+    try:
+        result = executor.run_applescript(str(good), ["+1555", "hi there"])
+        assert result.stdout.strip() == "ran +1555 hi there"
+        assert executor.engine == "osascript"
+        with pytest.raises(subprocess.CalledProcessError) as exc:
+            executor.run_applescript(str(bad))
+        assert "nope" in exc.value.stderr
+        with pytest.raises(subprocess.CalledProcessError) as exc:
+            executor.run_applescript(str(tmp_path / "missing.applescript"))
+        assert "No such file" in exc.value.stderr
+    finally:
+        executor.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Automation Scheduler Tests - mutual exclusion, priority classes, per-target
+order, round-robin fairness, aging
+"""
+import threading
+import time
+
+import pytest
+
+from automation_scheduler import PROACTIVE, REACTION, REPLY, AutomationScheduler
+
+
+class Harness:
+    """Holds the single slot with a blocker while calls queue up in a known order."""
+
+    def __init__(self, **kwargs):
+        self.scheduler = AutomationScheduler(**kwargs)
+        self.order = []
+        self.gate = threading.Event()
+        self.threads = []
+        self._spawn(lambda: self.gate.wait(5), REPLY, "blocker")
+        self._wait_for(lambda s: s["running"] == 1)
+
+    def _spawn(self, fn, priority, target):
+        thread = threading.Thread(target=self.scheduler.run, args=(fn,),
+                                  kwargs={"priority": priority, "target": target})
+        thread.start()
+        self.threads.append(thread)
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition(self.scheduler.stats()):
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+
+    def queue(self, name, priority, target):
+        queued = self.scheduler.queued()
+        self._spawn(lambda: self.order.append(name), priority, target)
+        self._wait_for(lambda s: s["queued"] == queued + 1)
+
+    def release(self):
+        self.gate.set()
+        for thread in self.threads:
+            thread.join(5)
+        return self.order
+
+
+def test_only_one_script_runs_at_a_time():
+    scheduler = AutomationScheduler()
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def script():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.002)
+        with lock:
+            active[0] -= 1
+
+    threads = [threading.Thread(target=lambda i=i: [scheduler.run(script, priority=REPLY, target=f"+{i % 4}")
+                                                    for _ in range(10)]) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 1
+    assert scheduler.stats()["runs"][REPLY] == 80
+
+
+def test_replies_go_before_receipts_before_tapbacks():
+    h = Harness()
+    h.queue("tapback", REACTION, "+1")
+    h.queue("receipt", PROACTIVE, "+2")
+    h.queue("reply", REPLY, "+3")
+    assert h.release() == ["reply", "receipt", "tapback"]
+
+
+def test_one_conversation_keeps_its_order_and_inherits_its_best_class():
+    h = Harness()
+    h.queue("receipt", PROACTIVE, "+2")
+    h.queue("tapback +1", REACTION, "+1")
+    h.queue("reply +1", REPLY, "+1")
+    # +1's reply can't overtake its own tapback, but lifts it above +2's receipt
+    assert h.release() == ["tapback +1", "reply +1", "receipt"]
+
+
+def test_busy_conversations_take_turns():
+    h = Harness()
+    for i in range(3):
+        h.queue(f"a{i}", REPLY, "+a")
+    for i in range(3):
+        h.queue(f"b{i}", REPLY, "+b")
+    assert h.release() == ["a0", "b0", "a1", "b1", "a2", "b2"]
+
+
+def test_a_starving_tapback_jumps_the_queue():
+    clock = [0.0]
+    h = Harness(starvation_after=10.0, clock=lambda: clock[0])
+    h.queue("tapback", REACTION, "+1")
+    clock[0] = 11.0
+    h.queue("reply", REPLY, "+2")
+    assert h.release() == ["tapback", "reply"]
+    assert h.scheduler.stats()["aged"] == 1
+
+
+def test_errors_propagate_and_free_the_slot():
+    waits = []
+    scheduler = AutomationScheduler(on_grant=lambda priority, waited: waits.append(priority))
+
+    def boom():
+        raise RuntimeError("Messages.app went away")
+
+    with pytest.raises(RuntimeError):
+        scheduler.run(boom, priority=REACTION, target="+1")
+    assert scheduler.run(lambda x: x * 2, 21, priority=REPLY, target="+1") == 42
+    assert waits == [REACTION, REPLY]
+    with pytest.raises(ValueError):
+        scheduler.run(lambda: None, priority="urgent")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Focus Cache Tests - activations skipped for a multi-bubble reply, invalidation
+by other targets / tapbacks / failures, TTL
+"""
+import pytest
+
+from bubble_plan import BubblePlan, FakeMessagesExecutor, focus_after_plan
+from focus_cache import FocusCache
+
+TYPING = "show_typing_indicator.applescript"
+SEND = "imessage_send.applescript"
+TAPBACK = "send_tapback.applescript"
+PLAN = "type_and_send.applescript"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Bridge:
+    """The bridge's run_script focus handling, against the fake Messages.app."""
+
+    def __init__(self, focus, gui_access=True):
+        self.messages = FakeMessagesExecutor(spawn_seconds=0.15, gui_access=gui_access)
+        self.focus = focus
+
+    def run(self, script, args):
+        target = args[0]
+        if script == TYPING and self.focus and self.focus.fast_path(target):
+            args = [*args, "fast"]
+        result = self.messages.run_applescript(script, args)
+        if self.focus:
+            effect = focus_after_plan(args, result.stdout) if script == PLAN else None
+            if script == TAPBACK or effect == "unknown":
+                self.focus.invalidate()
+            elif script == TYPING or effect == "focused":
+                self.focus.focused(target)
+            else:
+                self.focus.touched(target)
+        return result
+
+    def reply(self, target, bubbles):
+        for n in range(1, bubbles + 1):
+            self.run(TYPING, [target])
+            self.run(SEND, [target, f"bubble {n}"])
+
+
+def test_four_bubble_reply_opens_the_chat_once():
+    slow = Bridge(focus=None)
+    slow.reply("+1", 4)
+    fast = Bridge(FocusCache(ttl=10, clock=FakeClock()))
+    fast.reply("+1", 4)
+
+    assert (slow.messages.activations, slow.messages.fast_paths) == (4, 0)
+    assert (fast.messages.activations, fast.messages.fast_paths) == (1, 3)
+    assert [args[-1] for name, args in fast.messages.calls if name == TYPING] == ["+1", "fast", "fast", "fast"]
+    saved = slow.messages.now - fast.messages.now
+    assert saved == pytest.approx(3 * (0.6 + 0.25))  # open delay + frontmost/click settle, per bubble
+    assert {chat for _, kind, chat, _ in fast.messages.events if kind == "typing"} == {"+1"}
+
+
+def test_other_targets_tapbacks_and_failures_invalidate():
+    focus = FocusCache(ttl=10, clock=FakeClock())
+    bridge = Bridge(focus)
+    bridge.run(TYPING, ["+1"])
+    bridge.run(TYPING, ["+2"])          # another chat took the front
+    bridge.run(TYPING, ["+1"])
+    assert bridge.messages.activations == 3
+
+    bridge.run(SEND, ["+2", "receipt"])  # a send to someone else: don't trust it any more
+    bridge.run(TYPING, ["+1"])
+    bridge.run(TAPBACK, ["+1", "like"])
+    bridge.run(TYPING, ["+1"])
+    assert bridge.messages.activations == 5 and bridge.messages.fast_paths == 0
+    assert {chat for _, kind, chat, _ in bridge.messages.events if kind == "typing"} == {"+1", "+2"}
+    assert focus.stats()["invalidations"] == 2  # the send to +2 and the tapback
+
+    bridge.run(TYPING, ["+1"])
+    assert bridge.messages.fast_paths == 1
+    focus.invalidate()  # what run_script does when a script fails
+    assert not focus.fast_path("+1")
+
+
+def test_focus_expires_and_the_script_double_checks_frontmost():
+    clock = FakeClock()
+    focus = FocusCache(ttl=5, clock=clock)
+    focus.focused("+1")
+    clock.now = 4.0
+    assert focus.fast_path("+1")
+    clock.now = 5.5
+    assert not focus.fast_path("+1")
+    assert not FocusCache(ttl=0, clock=clock).fast_path("+1")
+
+    bridge = Bridge(FocusCache(ttl=10, clock=FakeClock()))
+    bridge.run(TYPING, ["+1"])
+    bridge.messages.frontmost = False   # someone switched to another app
+    bridge.run(TYPING, ["+1"])          # asked for the fast path, script re-opened the chat
+    assert (bridge.messages.activations, bridge.messages.fast_paths) == (2, 0)
+
+
+def test_a_plan_only_focuses_the_chat_if_it_opened_it():
+    bubbles = [{"text": "one", "typing_delay": 0.5}, {"text": "two", "typing_delay": 0.5}]
+
+    bridge = Bridge(FocusCache(ttl=10, clock=FakeClock()))
+    bridge.run(PLAN, BubblePlan("+1", bubbles).args())
+    bridge.run(TYPING, ["+1"])
+    assert bridge.messages.fast_paths == 1  # the plan typed, so +1 is in front
+
+    # Every typing_ms is 0: the script sends without ever opening the chat
+    bridge = Bridge(FocusCache(ttl=10, clock=FakeClock()))
+    bridge.run(TYPING, ["+2"])
+    silent = BubblePlan("+1", bubbles, typing=False).args()
+    assert focus_after_plan(silent, "1\tsent\n2\tsent") == "touched"
+    bridge.run(PLAN, silent)
+    bridge.run(TYPING, ["+1"])
+    assert bridge.messages.fast_paths == 0 and bridge.messages.activations == 2
+    assert [chat for _, kind, chat, _ in bridge.messages.events if kind == "typing"] == ["+2", "+1"]
+
+    # No GUI access: the open fails, the bubbles go out untyped and say so
+    bridge = Bridge(FocusCache(ttl=10, clock=FakeClock()), gui_access=False)
+    result = bridge.run(PLAN, BubblePlan("+1", bubbles).args())
+    assert "typing failed" in result.stdout
+    assert not bridge.focus.fast_path("+1")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Backend Client Tests - connection reuse, timing breakdown, thread safety
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend_client import BackendClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        with Handler.lock:
+            Handler.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status = 500 if self.path == "/fail" else 200
+        body = b'{"messages": []}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.connections = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_sequential_requests_reuse_one_connection(server):
+    client = BackendClient(pool_size=2)
+    timings = [client.post(server + "/webhook", json={"n": n}, timeout=5)[1] for n in range(5)]
+
+    assert len(Handler.connections) == 1
+    assert timings[0]["reused_connection"] is False
+    assert all(t["reused_connection"] for t in timings[1:])
+    assert all(t["connect_ms"] == 0 for t in timings[1:])
+    assert client.stats()["new_connections"] == 1
+    client.close()
+
+
+def test_timing_breakdown_is_consistent(server):
+    client = BackendClient()
+    response, timing = client.post(server + "/webhook", json={}, timeout=5)
+
+    assert response.json() == {"messages": []}
+    assert set(timing) == {"connect_ms", "tls_ms", "ttfb_ms", "total_ms", "reused_connection"}
+    assert timing["tls_ms"] == 0.0  # plain http
+    assert 0 <= timing["connect_ms"] <= timing["ttfb_ms"] <= timing["total_ms"]
+    client.close()
+
+
+def test_http_errors_surface_like_requests_post(server):
+    client = BackendClient()
+    response, _ = client.post(server + "/fail", json={}, timeout=5)
+    with pytest.raises(requests.exceptions.HTTPError):
+        response.raise_for_status()
+    client.close()
+
+
+def test_concurrent_workers_share_warm_connections(server):
+    client = BackendClient(pool_size=4)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for _ in range(3):
+            list(pool.map(lambda n: client.post(server + "/webhook", json={"n": n}, timeout=5), range(4)))
+
+    # 12 requests from 4 threads, but never more connections than the pool holds
+    assert len(Handler.connections) <= 4
+    assert client.stats()["requests"] == 12
+    client.close()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker Tests - open/half-open/close transitions, fail-fast against a
+fault-injecting stand-in backend, hedged requests with one Idempotency-Key,
+held batches keeping per-sender order and the watermark
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend_client import BackendClient
+from circuit_breaker import (CLOSED, HALF_OPEN, OPEN, BackendBacklog, CircuitBreaker, CircuitOpenError,
+                             GuardedPoster, hedged_call)
+from coalesce import MessageBatch
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FaultHandler(BaseHTTPRequestHandler):
+    """Backend stand-in: each request takes the next fault from `plan`, else `mode`."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.seen.append({"key": self.headers.get("Idempotency-Key"), "body": json.loads(body)})
+            fault = server.plan.pop(0) if server.plan else server.mode
+        if fault == "drop":
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        if fault.startswith("slow:"):
+            time.sleep(float(fault.split(":")[1]))
+        status = 500 if fault == "error" else 200
+        data = json.dumps({"messages": [{"text": "hi"}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def backend():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FaultHandler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.seen, httpd.plan, httpd.mode = [], [], "ok"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}/webhook"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_consecutive_failures_open_then_a_probe_closes_it():
+    clock = FakeClock()
+    breaker = CircuitBreaker(consecutive_failures=3, open_seconds=10, clock=clock)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as exc:
+        breaker.before_call()
+    assert exc.value.retry_in == pytest.approx(10)
+
+    clock.now += 10
+    assert breaker.state == HALF_OPEN and breaker.allows_traffic()
+    breaker.before_call()                 # the one probe
+    assert not breaker.allows_traffic()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()             # everyone else still fails fast
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.retry_in() == pytest.approx(20)  # cool-off doubled
+
+    clock.now += 20
+    breaker.before_call()
+    breaker.record_success(0.2)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["opened"] == 2
+
+
+def test_failure_rate_including_slow_calls_opens_it():
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, consecutive_failures=99,
+                             slow_call_seconds=5.0, clock=FakeClock())
+    for latency in (0.3, 7.0, 0.4, 8.0):
+        breaker.before_call()
+        breaker.record_success(latency)
+    assert breaker.state == OPEN
+    assert breaker.stats()["slow_calls"] == 2
+
+
+def test_dead_backend_fails_fast_instead_of_waiting_for_timeouts(backend):
+    server, url = backend
+    clock = FakeClock()
+    poster = GuardedPoster(BackendClient().post, CircuitBreaker(consecutive_failures=3, clock=clock))
+
+    server.mode = "error"
+    assert [poster.post(url, json={}, timeout=5)[0].status_code for _ in range(3)] == [500, 500, 500]
+    server.mode = "drop"
+    start = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        poster.post(url, json={}, timeout=5)
+    assert time.perf_counter() - start < 0.05
+    assert len(server.seen) == 3  # the refused call never reached the backend
+
+    clock.now += 10
+    with pytest.raises(requests.exceptions.ConnectionError):
+        poster.post(url, json={}, timeout=5)  # the probe hits a dropped connection
+    assert poster.breaker.state == OPEN
+
+    server.mode = "ok"
+    clock.now += 20
+    response, timing = poster.post(url, json={}, timeout=5)
+    assert response.status_code == 200 and timing["hedged"] is False
+    assert poster.breaker.state == CLOSED
+
+
+def test_timeouts_count_as_failures(backend):
+    server, url = backend
+    poster = GuardedPoster(BackendClient().post, CircuitBreaker(consecutive_failures=2, clock=FakeClock()))
+    server.mode = "slow:1.0"
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.Timeout):
+            poster.post(url, json={}, timeout=0.1)
+    assert poster.breaker.state == OPEN
+
+
+def test_local_errors_do_not_count_against_the_backend():
+    clock = FakeClock()
+    poster = GuardedPoster(BackendClient().post, CircuitBreaker(consecutive_failures=2, open_seconds=10, clock=clock))
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.InvalidSchema):
+            poster.post("localhost:3000/webhook", json={}, timeout=1)  # bad SF_API_URL
+    for _ in range(3):
+        with pytest.raises(TypeError):
+            poster.post("http://127.0.0.1:9/webhook", json={"when": object()}, timeout=1)  # won't encode
+    assert poster.breaker.state == CLOSED and poster.breaker.failures == 0
+
+    # A probe that fails locally frees its slot instead of wedging the breaker half-open
+    def refused(url, **kwargs):
+        raise requests.exceptions.ConnectionError("refused")
+    poster._post = refused
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            poster.post("http://backend/webhook")
+    assert poster.breaker.state == OPEN
+    clock.now += 10
+    poster._post = lambda url, **kwargs: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        poster.post("http://backend/webhook")
+    assert poster.breaker.state == HALF_OPEN and poster.breaker.allows_traffic()
+
+
+def test_slow_request_is_hedged_with_the_same_idempotency_key(backend):
+    server, url = backend
+    poster = GuardedPoster(BackendClient(pool_size=4).post, CircuitBreaker(clock=FakeClock()),
+                           hedge=True, hedge_min_seconds=0.2)
+    assert poster.hedge_after() is None  # no hedging until p95 is known
+    for _ in range(20):
+        poster.post(url, json={}, timeout=5)
+    assert 0.2 <= poster.hedge_after() < 0.8  # p95 of the warm-up, floored
+
+    server.seen.clear()
+    server.plan = ["slow:1.5"]  # the first copy stalls, the duplicate doesn't
+    start = time.perf_counter()
+    response, timing = poster.post(url, json={"message_id": 7}, headers={"Idempotency-Key": "main:7"}, timeout=5)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert timing["hedged"] is True and timing["winner"] == 1
+    assert elapsed < 1.0
+    assert [r["key"] for r in server.seen] == ["main:7", "main:7"]
+    assert poster.stats()["hedge_wins"] == 1
+
+
+def test_hedged_call_returns_the_survivor_and_raises_when_all_fail():
+    pool = ThreadPoolExecutor(max_workers=2)
+
+    def first_fails_slowly(attempt):
+        if attempt == 0:
+            time.sleep(0.1)
+            raise ConnectionError("reset")
+        time.sleep(0.2)
+        return "second"
+
+    assert hedged_call(first_fails_slowly, 0.01, pool) == ("second", 1, True)
+    with pytest.raises(ConnectionError):
+        hedged_call(lambda attempt: (_ for _ in ()).throw(ConnectionError("down")), 0.5, pool)
+
+
+def batch(sender, *rowids):
+    return MessageBatch(sender, [(r, f"m{r}", sender, None) for r in rowids])
+
+
+def test_held_batches_merge_per_sender_and_hold_the_watermark():
+    backlog = BackendBacklog(max_attempts=3)
+    assert backlog.park(batch("+1", 10))
+    assert backlog.park(batch("+2", 11))
+    assert backlog.park(batch("+1", 12, 13), attempted=False)  # queued behind +1's first message
+    assert backlog.holds("+1") and len(backlog) == 4
+    assert backlog.safe_watermark(20) == 9
+
+    assert [b.rowids for b in backlog.take(limit=1)] == [[10, 12, 13]]  # probing: oldest sender only
+    merged = backlog.take(busy=lambda sender: sender == "+2")
+    assert merged == [] and backlog.holds("+2")  # +2 still has newer work queued
+    assert [b.rowids for b in backlog.take()] == [[11]]
+    assert backlog.safe_watermark(20) == 20
+
+
+def test_gives_up_after_max_attempts():
+    backlog = BackendBacklog(max_attempts=2)
+    assert backlog.park(batch("+1", 5))
+    retried = backlog.take()[0]
+    assert backlog.park(retried, attempted=False)   # breaker open: not an attempt
+    assert not backlog.park(backlog.take()[0])      # second real failure
+    assert backlog.stats()["dropped"] == 1 and len(backlog) == 0
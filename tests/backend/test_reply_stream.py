@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Reply Stream Tests - NDJSON/SSE parsing, late target/reaction handling, and
+StreamedReply against a stand-in backend that streams bubbles as it
+"generates" them (chunked, with pauses), breaks mid-stream, or answers
+plain JSON
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend_client import BackendClient
+from circuit_breaker import hedged_call
+from reply_stream import (ACCEPT, ReplyAssembler, ReplyStreamError, StreamedReply, is_streamed, parse_events,
+                          split_lines)
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """
+    Backend stand-in: plays `server.script`, a list of (pause seconds, event
+    dict or "BREAK"), as NDJSON (/ndjson), SSE (/sse) or one JSON body (/json).
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.accept = self.headers.get("Accept")
+        script = self.server.script
+        if self.path == "/json":
+            for pause, _ in script:
+                time.sleep(pause)
+            body = json.dumps({"messages": [e["message"] for _, e in script if "message" in e]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        sse = self.path == "/sse"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for pause, event in script:
+            time.sleep(pause)
+            if event == "BREAK":
+                self.wfile.flush()
+                self.close_connection = True
+                self.connection.shutdown(2)  # no terminating chunk: the stream is cut off
+                return
+            data = json.dumps(event)
+            raw = (f"event: reply\ndata: {data}\n\n" if sse else data + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(raw), raw))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def backend():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StreamHandler)
+    httpd.daemon_threads = True
+    httpd.script, httpd.accept = [], None
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def bubble(text):
+    return {"message": {"text": text}}
+
+
+def test_parses_ndjson_and_sse():
+    lines = ['{"target": "+1"}', "", '{"message": {"text": "a\\nb"}}\r']
+    assert list(parse_events(lines)) == [{"target": "+1"}, {"message": {"text": "a\nb"}}]
+
+    sse = [": keep-alive", "", "event: reply", 'data: {"message":', 'data: {"text": "hi"}}', "",
+           "id: 2", 'data: {"done": true}', "", "data: [DONE]", "", 'data: {"never": 1}', ""]
+    assert list(parse_events(sse, sse=True)) == [{"message": {"text": "hi"}}, {"done": True}]
+
+    with pytest.raises(ReplyStreamError):
+        list(parse_events(["[1, 2]"]))
+    with pytest.raises(ReplyStreamError):
+        list(parse_events(["data: {oops", ""], sse=True))
+
+
+def test_split_lines_only_breaks_on_newline():
+    chunks = [b'{"text": "a\xe2\x80\xa8', b'b\xc2\x85c"}\n{"do', b'ne": true}\r\n', b"\n", b"tail"]
+    assert list(split_lines(chunks)) == ['{"text": "a\u2028b\x85c"}', '{"done": true}\r', "", "tail"]
+
+
+def test_target_is_fixed_by_the_first_bubble():
+    reply = ReplyAssembler(default_target="+1000")
+    assert reply.add({"target": "+2000"}) == []
+    assert reply.add(bubble("hi")) == [("message", {"text": "hi"})]
+    assert reply.target == "+2000"
+
+    late = reply.add({"target": "+3000", "message": {"text": "still here"}})
+    assert late[0][0] == "ignored" and "+3000" in late[0][1]["reason"]
+    assert late[1] == ("message", {"text": "still here"})
+    assert reply.target == "+2000"
+    assert reply.add({"target": "+2000"}) == []  # repeating the same target is fine
+
+    default = ReplyAssembler(default_target="+1000")
+    default.add(bubble("hi"))
+    assert default.add({"target": "+2000"})[0][0] == "ignored"
+    assert default.target == "+1000"
+
+
+def test_late_reaction_goes_out_next_and_only_the_first_counts():
+    reply = ReplyAssembler(default_target="+1000")
+    reply.add(bubble("one"))
+    assert reply.add({"reaction": {"type": "love"}, "messages": [{"text": "two"}, {"text": "three"}]}) == [
+        ("reaction", {"type": "love"}), ("message", {"text": "two"}), ("message", {"text": "three"})]
+    assert reply.add({"reaction": {"type": "like"}})[0][0] == "ignored"
+    assert reply.add({"done": True}) == [] and reply.done
+    assert reply.response() == {"target": None, "reaction": {"type": "love"},
+                                "messages": [{"text": "one"}, {"text": "two"}, {"text": "three"}]}
+    with pytest.raises(ReplyStreamError):
+        reply.add({"error": "model overloaded"})
+
+
+@pytest.mark.parametrize("path", ["/ndjson", "/sse"])
+def test_first_bubble_arrives_while_the_rest_is_generated(backend, path):
+    server, url = backend
+    server.script = [(0.0, {"target": "+2000"}), (0.05, bubble("one")), (0.3, bubble("two")),
+                     (0.3, {"reaction": {"type": "like"}}), (0.0, bubble("three")), (0.0, {"done": True})]
+    client = BackendClient()
+    start = time.perf_counter()
+    response, _ = client.post(url + path, json={}, headers={"Accept": ACCEPT}, stream=True, timeout=5)
+    assert server.accept == ACCEPT
+    assert is_streamed(response)
+
+    reply = StreamedReply(response, default_target="+1000", started=start)
+    arrivals = []
+    for pieces in reply.batches():
+        arrivals.append((time.perf_counter() - start, pieces))
+
+    assert [p for _, pieces in arrivals for p in pieces] == [
+        ("message", {"text": "one"}), ("message", {"text": "two"}),
+        ("reaction", {"type": "like"}), ("message", {"text": "three"})]
+    assert arrivals[0][0] < 0.3  # long before the whole reply was generated (0.65s)
+    assert arrivals[-1][0] >= 0.6
+    assert reply.first_bubble_seconds < 0.3
+    assert reply.target == "+2000"
+    assert reply.events == 6
+    client.close()
+
+
+def test_pieces_that_arrive_during_delivery_come_as_one_batch(backend):
+    server, url = backend
+    server.script = [(0.0, bubble("one"))] + [(0.02, bubble(f"n{i}")) for i in range(4)]
+    client = BackendClient()
+    response, _ = client.post(url + "/ndjson", json={}, stream=True, timeout=5)
+    batches = []
+    for pieces in StreamedReply(response, default_target="+1000").batches():
+        batches.append([p["text"] for _, p in pieces])
+        time.sleep(0.3)  # "typing" the first bubble while the backend finishes
+    assert batches == [["one"], ["n0", "n1", "n2", "n3"]]
+    client.close()
+
+
+def test_broken_stream_hands_over_what_arrived_then_raises(backend):
+    server, url = backend
+    server.script = [(0.0, bubble("one")), (0.1, "BREAK")]
+    client = BackendClient()
+    response, _ = client.post(url + "/ndjson", json={}, stream=True, timeout=5)
+    got = []
+    with pytest.raises(requests.exceptions.RequestException):
+        for pieces in StreamedReply(response, default_target="+1000").batches():
+            got.extend(pieces)
+    assert got == [("message", {"text": "one"})]
+    client.close()
+
+
+def test_error_event_aborts_the_stream(backend):
+    server, url = backend
+    server.script = [(0.0, bubble("one")), (0.0, {"error": "model overloaded"}), (0.0, bubble("never"))]
+    client = BackendClient()
+    response, _ = client.post(url + "/sse", json={}, stream=True, timeout=5)
+    got = []
+    with pytest.raises(ReplyStreamError, match="overloaded"):
+        for pieces in StreamedReply(response, default_target="+1000").batches():
+            got.extend(pieces)
+    assert got == [("message", {"text": "one"})]
+    client.close()
+
+
+def test_plain_json_answer_is_not_streamed(backend):
+    server, url = backend
+    server.script = [(0.0, bubble("one"))]
+    client = BackendClient()
+    response, _ = client.post(url + "/json", json={}, headers={"Accept": ACCEPT}, stream=True, timeout=5)
+    assert not is_streamed(response)
+    assert response.json() == {"messages": [{"text": "one"}]}
+    client.close()
+
+
+def test_hedge_loser_is_discarded():
+    pool = ThreadPoolExecutor(max_workers=2)
+    closed = []
+
+    def slow_first(attempt):
+        time.sleep(0.2 if attempt == 0 else 0.01)
+        return f"response {attempt}"
+
+    assert hedged_call(slow_first, 0.05, pool, discard=closed.append) == ("response 1", 1, True)
+    time.sleep(0.3)
+    assert closed == ["response 0"]
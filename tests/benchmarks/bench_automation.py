@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Automation Benchmark - per-call overhead of osascript-per-call vs the worker
+
+On Linux there is no AppleScript, so both sides run a stand-in: a tiny
+`osascript` shell script for SubprocessExecutor, and the test suite's fake
+worker for WorkerExecutor. That isolates what the worker removes (process
+spawn, plus on macOS the per-call compile of the .applescript source, which
+this benchmark cannot show and which costs more than the spawn).
+
+Usage:
+    python3 tests/benchmarks/bench_automation.py [calls]
+"""
+
+import os
+import stat
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from automation import SubprocessExecutor, WorkerExecutor  # noqa: E402
+
+FAKE_WORKER = [sys.executable, str(Path(__file__).resolve().parents[1] / "automation" / "fake_worker.py")]
+
+
+def measure(label: str, executor, calls: int) -> float:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        executor.run_applescript("/x/echo.applescript", ["+15550001111", "hello"], timeout=10)
+        samples.append(time.perf_counter() - start)
+    median = statistics.median(samples)
+    print(f"{label:<28} median {median * 1000:7.2f}ms   p95 {sorted(samples)[int(calls * 0.95)] * 1000:7.2f}ms")
+    return median
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    with tempfile.TemporaryDirectory() as tmp:
+        osascript = os.path.join(tmp, "osascript")
+        with open(osascript, "w") as f:
+            f.write("#!/bin/sh\nshift\necho \"$*\"\n")
+        os.chmod(osascript, os.stat(osascript).st_mode | stat.S_IEXEC)
+
+        print("=" * 72)
+        print(f"{calls} calls each (3 per reply: typing, send, tapback)")
+        print("=" * 72)
+        spawn = measure("osascript per call", SubprocessExecutor(osascript), calls)
+        worker = WorkerExecutor(command=FAKE_WORKER)
+        pipe = measure("persistent worker", worker, calls)
+        print(f"{'':28} {spawn / pipe:.0f}x less overhead per call, ~{(spawn - pipe) * 3000:.0f}ms saved per reply")
+        print(f"Worker stats: {worker.stats()}")
+        worker.close()
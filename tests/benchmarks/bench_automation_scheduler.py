@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Automation Scheduler Benchmark - GUI collisions vs one scheduled queue
+
+A fake Messages.app where two scripts overlapping fight over focus: both
+fail, and the caller does what bridge.py does - sleep 1s and retry (up to 3
+attempts). The workload is what a busy minute looks like: several
+conversations getting multi-bubble replies (typing + send per bubble),
+receipts from POST /send and a few tapbacks, all at once.
+
+    uncoordinated  every thread calls the script directly (the old bridge)
+    scheduled      every call goes through AutomationScheduler
+
+Usage:
+    python3 tests/benchmarks/bench_automation_scheduler.py [script_ms]
+"""
+
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from automation_scheduler import PROACTIVE, REACTION, REPLY, AutomationScheduler  # noqa: E402
+
+RETRY_SLEEP = 1.0
+RETRIES = 3
+
+
+class FakeMessagesApp:
+    def __init__(self, script_seconds: float):
+        self.script_seconds = script_seconds
+        self.lock = threading.Lock()
+        self.active = {}  # call id -> collided?
+        self.ids = 0
+        self.collisions = 0
+
+    def script(self) -> bool:
+        with self.lock:
+            self.ids += 1
+            me = self.ids
+            collided = bool(self.active)
+            for other in self.active:
+                self.active[other] = True
+            self.active[me] = collided
+        time.sleep(self.script_seconds)
+        with self.lock:
+            failed = self.active.pop(me)
+            self.collisions += failed
+        return not failed
+
+
+def run(mode: str, script_seconds: float):
+    app = FakeMessagesApp(script_seconds)
+    scheduler = AutomationScheduler()
+    retries = [0]
+    lock = threading.Lock()
+
+    def call(priority, target):
+        for attempt in range(RETRIES):
+            ok = (scheduler.run(app.script, priority=priority, target=target) if mode == "scheduled"
+                  else app.script())
+            if ok:
+                return True
+            if attempt < RETRIES - 1:
+                with lock:
+                    retries[0] += 1
+                time.sleep(RETRY_SLEEP)
+        return False
+
+    reply_latency, receipt_latency = [], []
+    failures = [0]
+
+    def reply(target, bubbles):
+        start = time.perf_counter()
+        for _ in range(bubbles):
+            failures[0] += not call(REPLY, target)   # typing indicator
+            failures[0] += not call(REPLY, target)   # send
+        reply_latency.append(time.perf_counter() - start)
+
+    def receipt(target):
+        start = time.perf_counter()
+        failures[0] += not call(PROACTIVE, target)
+        receipt_latency.append(time.perf_counter() - start)
+
+    def tapback(target):
+        failures[0] += not call(REACTION, target)
+
+    work = ([threading.Thread(target=reply, args=(f"+{i}", 3)) for i in range(4)]
+            + [threading.Thread(target=receipt, args=(f"+r{i}",)) for i in range(4)]
+            + [threading.Thread(target=tapback, args=(f"+{i}",)) for i in range(2)])
+    start = time.perf_counter()
+    for t in work:
+        t.start()
+    for t in work:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed": elapsed,
+        "scripts_ok": 4 * 3 * 2 + 4 + 2 - failures[0],
+        "failures": failures[0],
+        "retries": retries[0],
+        "collisions": app.collisions,
+        "reply_p50": statistics.median(reply_latency),
+        "receipt_p50": statistics.median(receipt_latency),
+    }
+
+
+if __name__ == "__main__":
+    script_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"4 replies x 3 bubbles (typing + send), 4 receipts, 2 tapbacks; {script_ms:.0f}ms per script, "
+          f"{RETRY_SLEEP:.0f}s retry sleep")
+    for mode in ("uncoordinated", "scheduled"):
+        r = run(mode, script_ms / 1000)
+        print(f"  {mode:<14} {r['elapsed']:5.2f}s total, {r['scripts_ok']:2d}/30 scripts ok, "
+              f"{r['failures']:2d} gave up, {r['retries']:2d} retries, {r['collisions']:2d} collisions, "
+              f"reply p50 {r['reply_p50']:.2f}s, receipt p50 {r['receipt_p50']:.2f}s")
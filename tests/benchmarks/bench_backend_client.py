@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Backend Client Benchmark - cold requests.post() vs the pooled BackendClient
+
+Runs against a local stand-in backend (keep-alive HTTP/1.1). Locally the
+connect cost is only a loopback handshake, so the gap here is the floor; over
+ngrok every cold request also pays DNS + a remote TCP + TLS handshake.
+
+Usage:
+    python3 tests/benchmarks/bench_backend_client.py [requests] [threads]
+"""
+
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from backend_client import BackendClient  # noqa: E402
+
+PAYLOAD = {"from": "+15550000000", "text": "hey", "channel": "imessage", "metadata": {"message_id": 1}}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this a kept-alive
+    # socket hits the Nagle/delayed-ACK stall (~40ms) that real servers avoid
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"messages": [{"text": "hi"}]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label: str, post, total: int, threads: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        post()
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {total / elapsed:8.0f} req/s   mean {statistics.mean(latencies) * 1000:6.2f}ms   "
+          f"median {statistics.median(latencies) * 1000:6.2f}ms")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    client = BackendClient(pool_size=threads)
+
+    print("=" * 72)
+    print(f"{total} requests, {threads} concurrent workers")
+    print("=" * 72)
+    run("cold requests.post()", lambda: requests.post(url, json=PAYLOAD, timeout=30).json(), total, threads)
+    run("pooled BackendClient", lambda: client.post(url, json=PAYLOAD, timeout=30)[0].json(), total, threads)
+    print(f"Pool stats: {client.stats()}")
+
+    _, cold = BackendClient().post(url, json=PAYLOAD, timeout=30)
+    _, warm = client.post(url, json=PAYLOAD, timeout=30)
+    print(f"cold timing: {cold}")
+    print(f"warm timing: {warm}")
+    server.shutdown()
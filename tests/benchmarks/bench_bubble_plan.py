@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Bubble Plan Benchmark - per-bubble scripts vs one type_and_send run per reply
+
+Runs on FakeMessagesExecutor's virtual clock (spawn, buddy lookup and send
+costs are parameters), so it works anywhere. "per-bubble" is the old path:
+show_typing_indicator + imessage_send for every bubble, back to back.
+"plan" is one type_and_send.applescript run with the same human timing.
+
+Usage:
+    python3 tests/benchmarks/bench_bubble_plan.py [spawn_ms] [bubbles]
+"""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from bubble_plan import SCRIPT, FakeMessagesExecutor, build_plans  # noqa: E402
+
+
+def reply(count: int, rng: random.Random):
+    return [{"text": f"bubble {i + 1}", "delay_before": rng.uniform(0.03, 0.18),
+             "typing_delay": rng.uniform(0.36, 1.5)} for i in range(count)]
+
+
+def per_bubble(messages: FakeMessagesExecutor, bubbles):
+    for bubble in bubbles:
+        messages.sleep(bubble["delay_before"])
+        messages.run_applescript("show_typing_indicator.applescript", ["+1"])
+        messages.sleep(bubble["typing_delay"])
+        messages.run_applescript("imessage_send.applescript", ["+1", bubble["text"]])
+
+
+def planned(messages: FakeMessagesExecutor, bubbles):
+    for plan in build_plans("+1", bubbles, max_seconds=15):
+        messages.run_applescript(SCRIPT, plan.args(), timeout=plan.estimated_seconds() + 10)
+
+
+if __name__ == "__main__":
+    spawn_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 150
+    most = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"{spawn_ms:.0f}ms per script spawn, 100ms buddy lookup, 300ms send")
+    print(f"{'bubbles':>7}  {'per-bubble s':>12} {'scripts':>7}  {'plan s':>7} {'scripts':>7}  {'saved':>6}")
+    for count in range(1, most + 1):
+        bubbles = reply(count, random.Random(count))
+        results = []
+        for run in (per_bubble, planned):
+            messages = FakeMessagesExecutor(spawn_seconds=spawn_ms / 1000)
+            run(messages, bubbles)
+            results.append((messages.now, len(messages.calls)))
+        (old, old_calls), (new, new_calls) = results
+        print(f"{count:>7}  {old:>12.2f} {old_calls:>7}  {new:>7.2f} {new_calls:>7}  {(1 - new / old) * 100:>5.0f}%")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Catch-up Benchmark - recovering from an outage: per-message vs coalesced backlog
+
+Generates a chat.db look-alike holding the messages that piled up during an
+outage (default 1 hour, 40 senders), then replays the recovery through the
+real ChatDBReader, coalesce.plan_batches and ConversationDispatcher. Backend
+latency and the typing/send pipeline are sleeps, compressed by TIME_SCALE so
+a multi-minute recovery runs in seconds; reported times are scaled back up.
+
+    legacy      one LIMIT-ed page per POLL sleep, one request per message
+    paged       all pages drained at once, one request per message
+    per_sender  all pages drained at once, one request per sender
+    latest      same, answering only each sender's newest message
+
+Usage:
+    python3 tests/benchmarks/bench_catchup.py [outage_minutes] [senders]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from chat_reader import ChatDBReader  # noqa: E402
+from coalesce import APPLE_EPOCH, apple_time, plan_batches  # noqa: E402
+from dispatcher import ConversationDispatcher  # noqa: E402
+
+LIMIT = 100
+SQL = (
+    "SELECT message.ROWID, message.text, "
+    "coalesce(handle.uncanonicalized_id, handle.id) AS sender, "
+    "message.date "
+    "FROM message "
+    "LEFT JOIN handle ON handle.ROWID = message.handle_id "
+    "WHERE message.is_from_me = 0 "
+    "AND message.text IS NOT NULL "
+    "AND message.service = 'iMessage' "
+    "AND message.ROWID > ? "
+    f"ORDER BY message.ROWID ASC LIMIT {LIMIT};"
+)
+
+TIME_SCALE = 0.01       # 1 real second = 10ms here
+POLL = 2.0              # seconds between polls (legacy paging)
+BACKEND_LATENCY = 2.0   # seconds per backend request
+REPLY_TIME = 7.5        # reading pause + typing + send for a 2-bubble reply
+MAX_CONCURRENT = 4
+
+
+def build_backlog(path: str, minutes: float, senders: int, seed: int = 42) -> int:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE handle (ROWID INTEGER PRIMARY KEY, id TEXT, uncanonicalized_id TEXT)")
+    conn.execute("CREATE TABLE message (ROWID INTEGER PRIMARY KEY, text TEXT, handle_id INTEGER, "
+                 "service TEXT, date INTEGER, is_from_me INTEGER DEFAULT 0)")
+    conn.executemany("INSERT INTO handle (ROWID, id) VALUES (?, ?)",
+                     [(n + 1, f"+1555{n:07d}") for n in range(senders)])
+    now = time.time()
+    start = now - minutes * 60
+    rows = []
+    for handle in range(1, senders + 1):
+        # Most people send a handful, a few send a lot
+        for _ in range(max(1, int(rng.paretovariate(1.5) * 3))):
+            sent = rng.uniform(start, now)
+            rows.append((sent, f"message from {handle} at {sent:.0f}", handle))
+    rows.sort()
+    conn.executemany(
+        "INSERT INTO message (text, handle_id, service, date) VALUES (?, ?, 'iMessage', ?)",
+        [(text, handle, int((sent - APPLE_EPOCH) * 1e9)) for sent, text, handle in rows])
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def recover(db_path: str, policy: str, drain: bool) -> dict:
+    reader = ChatDBReader(db_path, SQL)
+    done = []
+    lock = threading.Lock()
+    requests = [0]
+
+    def handle(batch):
+        with lock:
+            requests[0] += 1
+        time.sleep((BACKEND_LATENCY + REPLY_TIME) * TIME_SCALE)
+        with lock:
+            done.append(time.perf_counter())
+
+    dispatcher = ConversationDispatcher(handle, max_concurrent=MAX_CONCURRENT)
+    started = time.perf_counter()
+    last, pages, drain_seconds = 0, 0, 0.0
+    while True:
+        t = time.perf_counter()
+        rows = reader.fetch_after(last)
+        pages += 1
+        more = len(rows) >= LIMIT
+        while drain and more:
+            page = reader.fetch_after(rows[-1][0])
+            pages += 1
+            rows.extend(page)
+            more = len(page) >= LIMIT
+        drain_seconds += time.perf_counter() - t
+        if not rows:
+            break
+        last = rows[-1][0]
+        fresh = [(r[0], r[1], r[2], apple_time(r[3])) for r in rows]
+        batches, _ = plan_batches(fresh, policy=policy, catch_up=True)
+        for batch in batches:
+            dispatcher.submit(batch.sender, batch.rowid, batch)
+        if not more or drain:
+            break
+        time.sleep(POLL * TIME_SCALE)
+    dispatcher.wait_idle()
+    dispatcher.shutdown()
+    reader.close()
+    return {
+        "requests": requests[0],
+        "pages": pages,
+        "drain_ms": drain_seconds * 1000,
+        "recovery_s": (max(done) - started) / TIME_SCALE if done else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    senders = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chat.db")
+        messages = build_backlog(path, minutes, senders)
+        print("=" * 88)
+        print(f"{minutes:g}-minute outage: {messages} messages from {senders} senders "
+              f"(backend {BACKEND_LATENCY:g}s + reply {REPLY_TIME:g}s, {MAX_CONCURRENT} concurrent)")
+        print("=" * 88)
+        baseline = None
+        for label, policy, drain in [
+            ("legacy (page per poll)", "none", False),
+            ("paged, per message", "none", True),
+            ("per_sender (default)", "per_sender", True),
+            ("latest", "latest", True),
+        ]:
+            result = recover(path, policy, drain)
+            baseline = baseline or result["recovery_s"]
+            print(f"{label:<24} {result['requests']:5d} backend requests  {result['pages']:3d} pages "
+                  f"(drain {result['drain_ms']:6.1f}ms)  recovered in {result['recovery_s']:7.1f}s "
+                  f"({baseline / result['recovery_s']:4.1f}x)")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Chat DB Reader Benchmark - reconnect-per-poll vs one persistent connection
+
+Generates a large chat.db look-alike (`message` + `handle` plus a pile of
+extra tables/indexes so schema loading costs what it does on a real Mac),
+then times the bridge's poll query both ways with the watermark at the tip,
+which is what almost every production poll looks like.
+
+Usage:
+    python3 tests/benchmarks/bench_chat_reader.py [messages] [polls]
+"""
+
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from chat_reader import ChatDBReader  # noqa: E402
+
+SQL = (
+    "SELECT message.ROWID, message.text, "
+    "coalesce(handle.uncanonicalized_id, handle.id) AS sender "
+    "FROM message "
+    "LEFT JOIN handle ON handle.ROWID = message.handle_id "
+    "WHERE message.is_from_me = 0 "
+    "AND message.text IS NOT NULL "
+    "AND message.service = 'iMessage' "
+    "AND message.ROWID > ? "
+    "ORDER BY message.ROWID ASC LIMIT 100;"
+)
+
+
+def build_db(path: str, messages: int, handles: int = 2000):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE handle (ROWID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                 "id TEXT NOT NULL, country TEXT, service TEXT, uncanonicalized_id TEXT)")
+    conn.execute("CREATE TABLE message (ROWID INTEGER PRIMARY KEY AUTOINCREMENT, guid TEXT UNIQUE, "
+                 "text TEXT, handle_id INTEGER DEFAULT 0, service TEXT, date INTEGER, "
+                 "is_from_me INTEGER DEFAULT 0, is_read INTEGER DEFAULT 0, cache_roomnames TEXT)")
+    conn.execute("CREATE INDEX message_idx_handle ON message(handle_id, date)")
+    conn.execute("CREATE INDEX message_idx_date ON message(date)")
+    # chat.db carries dozens of tables, indexes and triggers; opening it parses them all
+    for i in range(40):
+        conn.execute(f"CREATE TABLE aux_{i} (ROWID INTEGER PRIMARY KEY, a TEXT, b INTEGER, c BLOB)")
+        conn.execute(f"CREATE INDEX aux_{i}_idx ON aux_{i}(b, a)")
+        conn.execute(f"CREATE TRIGGER aux_{i}_trg AFTER DELETE ON aux_{i} "
+                     f"BEGIN DELETE FROM aux_{(i + 1) % 40} WHERE b = old.ROWID; END")
+
+    conn.executemany("INSERT INTO handle (id, service) VALUES (?, 'iMessage')",
+                     ((f"+1555{n:07d}",) for n in range(handles)))
+    rng = random.Random(7)
+    batch = []
+    for n in range(messages):
+        batch.append((f"guid-{n}", f"message number {n} with some text", rng.randint(1, handles),
+                      "iMessage", n * 1_000_000_000, rng.random() < 0.4))
+        if len(batch) == 50_000:
+            conn.executemany("INSERT INTO message (guid, text, handle_id, service, date, is_from_me) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO message (guid, text, handle_id, service, date, is_from_me) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def time_polls(poll, polls: int) -> list:
+    timings = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        poll()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list):
+    print(f"{label:<26} mean {statistics.mean(timings) * 1e6:9.1f}µs   "
+          f"median {statistics.median(timings) * 1e6:9.1f}µs")
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    polls = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "chat.db")
+        print(f"Generating {messages:,} messages...")
+        start = time.perf_counter()
+        build_db(db_path, messages)
+        print(f"  done in {time.perf_counter() - start:.1f}s")
+        tip = messages - 50  # a handful of rows past the watermark
+
+        def reconnect_each_poll():
+            with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+                conn.cursor().execute(SQL, (tip,)).fetchall()
+
+        reader = ChatDBReader(db_path, SQL)
+
+        print("=" * 72)
+        print(f"{polls} polls, watermark at ROWID {tip:,}")
+        print("=" * 72)
+        old = time_polls(reconnect_each_poll, polls)
+        new = time_polls(lambda: reader.fetch_after(tip), polls)
+        report("open_ro() per poll", old)
+        report("ChatDBReader", new)
+        print(f"Per-poll cost: {statistics.mean(new) / statistics.mean(old):.1%} of the old loop")
+        print(f"Reader stats: {reader.stats()}")
+        reader.close()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Chat DB Watcher Benchmark - insert-to-dispatch latency, poll vs watch
+
+Runs the bridge's query loop against a synthetic WAL-mode chat.db while a
+writer thread inserts messages at random times. Each inserted row carries its
+insert timestamp, so the loop can measure how long it took to notice it.
+
+Usage:
+    python3 tests/benchmarks/bench_chat_watcher.py [messages] [poll_interval]
+"""
+
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from chat_watcher import create_watcher  # noqa: E402
+
+SQL = "SELECT ROWID, text FROM message WHERE ROWID > ? ORDER BY ROWID ASC LIMIT 100"
+
+
+def run(db_path: str, messages: int, poll: float, backend: str = None) -> list:
+    writer = sqlite3.connect(db_path, check_same_thread=False)
+    watcher = create_watcher(db_path, backend) if backend else None
+    latencies = []
+    done = threading.Event()
+
+    def insert_messages():
+        for _ in range(messages):
+            time.sleep(random.uniform(0.05, poll))
+            writer.execute("INSERT INTO message (text) VALUES (?)", (repr(time.time()),))
+            writer.commit()
+        done.set()
+
+    last = writer.execute("SELECT coalesce(max(ROWID), 0) FROM message").fetchone()[0]
+    threading.Thread(target=insert_messages, daemon=True).start()
+
+    while len(latencies) < messages:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        rows = conn.execute(SQL, (last,)).fetchall()
+        conn.close()
+        now = time.time()
+        for rid, inserted_at in rows:
+            last = rid
+            latencies.append(now - float(inserted_at))
+        if watcher:
+            watcher.wait(poll)
+        else:
+            time.sleep(poll)
+
+    if watcher:
+        watcher.close()
+    writer.close()
+    return latencies
+
+
+def report(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"{label:<22} mean {statistics.mean(latencies) * 1000:7.1f}ms   "
+          f"p95 {p95 * 1000:7.1f}ms   max {latencies[-1] * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    poll = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "chat.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE message (ROWID INTEGER PRIMARY KEY, text TEXT)")
+        conn.commit()
+        conn.close()
+
+        print("=" * 72)
+        print(f"{messages} inserts per mode, POLL_INTERVAL={poll}s")
+        print("=" * 72)
+        report("poll", run(db_path, messages, poll))
+        report("watch (auto)", run(db_path, messages, poll, "auto"))
+        report("watch (stat)", run(db_path, messages, poll, "stat"))
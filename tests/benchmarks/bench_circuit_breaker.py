@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker Benchmark - draining messages with the backend down, and tail
+latency with hedging
+
+"down": the backend accepts connections and never answers. "unguarded" waits
+out the timeout for every message (the old call_sf); "breaker" waits for the
+first few, then refuses the rest immediately (they'd be held for retry).
+
+"stalls": 1 request in `stall_every` hangs for a second. Compares p50/p99
+with and without a hedged duplicate.
+
+Usage:
+    python3 tests/benchmarks/bench_circuit_breaker.py [messages] [timeout_seconds] [stall_every]
+"""
+
+import itertools
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from backend_client import BackendClient  # noqa: E402
+from circuit_breaker import CircuitBreaker, CircuitOpenError, GuardedPoster  # noqa: E402
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        n = next(self.server.counter)
+        if self.server.mode == "down":
+            time.sleep(3600)
+        if self.server.stall_every and n % self.server.stall_every == 0:
+            time.sleep(1.0)
+        data = json.dumps({"messages": [{"text": "ok"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(mode: str, stall_every: int = 0):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    httpd.mode, httpd.stall_every, httpd.counter = mode, stall_every, itertools.count(1)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}/webhook"
+
+
+def drain(post, url, messages: int, timeout: float):
+    refused = 0
+    start = time.perf_counter()
+    for i in range(messages):
+        try:
+            post(url, json={"message_id": i}, timeout=timeout)
+        except CircuitOpenError:
+            refused += 1
+        except Exception:
+            pass
+    return time.perf_counter() - start, refused
+
+
+def latencies(post, url, count: int):
+    out = []
+    for i in range(count):
+        start = time.perf_counter()
+        post(url, json={"message_id": i}, headers={"Idempotency-Key": f"bench:{i}"}, timeout=5)
+        out.append(time.perf_counter() - start)
+    return sorted(out)
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    timeout = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    stall_every = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+
+    httpd, url = serve("down")
+    print(f"Backend down: {messages} messages, {timeout * 1000:.0f}ms timeout")
+    elapsed, _ = drain(BackendClient().post, url, messages, timeout)
+    print(f"  unguarded {elapsed:7.2f}s  (every message waits for its timeout)")
+    elapsed, refused = drain(GuardedPoster(BackendClient().post, CircuitBreaker()).post, url, messages, timeout)
+    print(f"  breaker   {elapsed:7.2f}s  ({refused} refused without a request)")
+    httpd.shutdown()
+
+    count = stall_every * 8
+    print(f"Stalls: {count} requests, 1 in {stall_every} takes +1s")
+    for label, hedge in (("plain", False), ("hedged", True)):
+        httpd, url = serve("stalls", stall_every)
+        poster = GuardedPoster(BackendClient(pool_size=8).post, CircuitBreaker(consecutive_failures=99),
+                               hedge=hedge, hedge_min_seconds=0.05)
+        times = latencies(poster.post, url, count)
+        p = lambda q: times[min(len(times) - 1, int(len(times) * q))] * 1000  # noqa: E731
+        print(f"  {label:<7} p50 {p(0.50):7.1f}ms  p99 {p(0.99):7.1f}ms  max {times[-1] * 1000:7.1f}ms  "
+              f"hedged {poster.stats()['hedged']}")
+        httpd.shutdown()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Dedup Store Benchmark - legacy text file vs ProcessedStore with 10M IDs
+
+Measures, for a year-plus of history:
+- startup load (whole text file into a set vs windowed load)
+- memory held by the in-memory dedup set
+- one-time migration cost
+- per-message save cost
+
+Usage:
+    python3 tests/benchmarks/bench_dedup_store.py [ids]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from dedup_store import ProcessedStore  # noqa: E402
+
+
+def legacy_load(path: str) -> set:
+    with open(path, "r") as f:
+        return {int(line.strip()) for line in f if line.strip().isdigit()}
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    appends = 2000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        txt = os.path.join(tmp, "bridge_processed_messages.txt")
+        db = os.path.join(tmp, "bridge_processed_messages.db")
+
+        print(f"Writing {total:,} legacy IDs...")
+        with open(txt, "w") as f:
+            for start in range(1, total + 1, 100_000):
+                f.write("".join(f"{n}\n" for n in range(start, min(start + 100_000, total + 1))))
+        print(f"  text file: {os.path.getsize(txt) / 1e6:.1f} MB")
+
+        print("=" * 72)
+        ids, legacy_time, legacy_peak = measure(lambda: legacy_load(txt))
+        print(f"legacy startup load        {legacy_time:7.2f}s   peak memory {legacy_peak / 1e6:8.1f} MB   "
+              f"({len(ids):,} IDs in set)")
+        del ids
+
+        store = ProcessedStore(db, retention=1000)
+        start = time.perf_counter()
+        migrated = store.migrate_from_text(txt)
+        print(f"one-time migration         {time.perf_counter() - start:7.2f}s   ({migrated:,} IDs)")
+
+        watermark = total
+        pruned_start = time.perf_counter()
+        pruned = store.prune(watermark)
+        print(f"first prune                {time.perf_counter() - pruned_start:7.2f}s   ({pruned:,} IDs dropped)")
+        store.close()
+        print(f"  store file: {os.path.getsize(db) / 1e6:.2f} MB")
+
+        store = ProcessedStore(db, retention=1000)
+        loaded, new_time, new_peak = measure(lambda: store.load_window(watermark))
+        print(f"store startup load         {new_time:7.4f}s   peak memory {new_peak / 1e6:8.3f} MB   "
+              f"({loaded:,} IDs in window)")
+
+        print("-" * 72)
+        legacy_txt = os.path.join(tmp, "append.txt")
+        start = time.perf_counter()
+        for n in range(appends):
+            with open(legacy_txt, "a") as f:
+                f.write(f"{total + n}\n")
+        legacy_append = (time.perf_counter() - start) / appends
+        start = time.perf_counter()
+        for n in range(appends):
+            store.add(total + n + 1)
+        store_add = (time.perf_counter() - start) / appends
+        print(f"per-message save: legacy append {legacy_append * 1e6:.1f}µs, store add {store_add * 1e6:.1f}µs")
+        store.close()
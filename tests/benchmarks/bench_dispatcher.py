@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Dispatcher Benchmark - end-to-end reply latency with N concurrent senders
+
+Spins up a fake backend (local HTTP server with configurable latency) and a
+fake `osascript` executable, then pushes one message per sender through the
+same call -> typing -> send pipeline the bridge uses. Compares the old
+strictly-sequential loop (max_concurrent=1) against per-conversation dispatch.
+
+Usage:
+    python3 tests/benchmarks/bench_dispatcher.py [senders] [max_concurrent]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from dispatcher import ConversationDispatcher  # noqa: E402
+
+BACKEND_LATENCY = 0.25   # seconds the fake backend "thinks"
+OSASCRIPT_LATENCY = 0.1  # seconds per fake osascript call
+TYPING_DELAY = 0.2       # simulated typing time per bubble
+
+FAKE_OSASCRIPT = f"""#!/bin/sh
+sleep {OSASCRIPT_LATENCY}
+echo ok
+"""
+
+
+class FakeBackend(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(BACKEND_LATENCY)
+        body = b'{"messages": [{"text": "hi"}]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(senders: int, max_concurrent: int, url: str, osascript: str) -> list:
+    latencies = []
+    lock = threading.Lock()
+
+    def pipeline(sender: str, submitted_at: float):
+        requests.post(url, json={"from": sender, "text": "hey"}, timeout=30).json()
+        subprocess.run([osascript, "typing", sender], capture_output=True, check=True)
+        time.sleep(TYPING_DELAY)
+        subprocess.run([osascript, "send", sender, "hi"], capture_output=True, check=True)
+        with lock:
+            latencies.append(time.perf_counter() - submitted_at)
+
+    dispatcher = ConversationDispatcher(pipeline, max_concurrent=max_concurrent)
+    now = time.perf_counter()
+    for i in range(senders):
+        sender = f"+1555000{i:04d}"
+        dispatcher.submit(sender, i + 1, sender, now)
+    dispatcher.wait_idle()
+    dispatcher.shutdown()
+    return latencies
+
+
+def report(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"{label:<28} mean {statistics.mean(latencies):6.2f}s   "
+          f"p95 {p95:6.2f}s   last sender {latencies[-1]:6.2f}s")
+
+
+if __name__ == "__main__":
+    senders = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    cap = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBackend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        osascript = os.path.join(tmp, "osascript")
+        with open(osascript, "w") as f:
+            f.write(FAKE_OSASCRIPT)
+        os.chmod(osascript, 0o755)
+
+        print("=" * 72)
+        print(f"{senders} senders, one message each "
+              f"(backend {BACKEND_LATENCY}s, osascript {OSASCRIPT_LATENCY}s, typing {TYPING_DELAY}s)")
+        print("=" * 72)
+        report("sequential (cap=1)", run(senders, 1, url, osascript))
+        report(f"dispatcher (cap={cap})", run(senders, cap, url, osascript))
+
+    server.shutdown()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Message Splitter Benchmark - split_many vs the original implementation over a
+corpus of generated replies
+
+The corpus mixes short answers (returned as-is), multi-sentence replies with
+questions, abbreviations, prices and URLs, and run-on sentences that take the
+comma / word fallback. Both implementations' output is compared while timing.
+
+Usage:
+    python3 tests/benchmarks/bench_message_splitter.py [replies] [seed]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tests" / "splitting"))
+import legacy_splitter  # noqa: E402
+from message_splitter import split_many  # noqa: E402
+
+OPENERS = ["Great!", "Hey!", "Perfect!", "Got it!", "Sure thing.", "Ok!", "Thanks so much for reaching out."]
+SENTENCES = [
+    "I can help you with that.",
+    "Our most popular item is the vanilla latte which comes in three sizes.",
+    "Your latte is $5.50.",
+    "Dr. Patel will see you at 3.30 tomorrow, and Mrs. Lee confirmed the room.",
+    "It's basically oat vs. almond milk, both are great.",
+    "You can see the full menu at https://example.com/menu.html any time.",
+    "By the way, we have a special today on pastries!",
+    "I'll send you a payment link now.",
+    "Mr. Alvarez mentioned you wanted the corner table.",
+]
+QUESTIONS = ["Would you like to hear about our specials?", "Does that work for you?", "Want me to add one?"]
+RUN_ON = ("so we could do the blueberry one, or the lemon one, or honestly the chocolate chip, "
+          "which everyone seems to love lately, and then we can figure out drinks after that, "
+          "maybe something iced since it's warm out")
+
+
+def corpus(count: int, seed: int):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.25:
+            texts.append(rng.choice(OPENERS + QUESTIONS))
+        elif kind < 0.9:
+            parts = [rng.choice(OPENERS)] + rng.sample(SENTENCES, rng.randint(1, 5))
+            if rng.random() < 0.6:
+                parts.append(rng.choice(QUESTIONS))
+            texts.append(" ".join(parts))
+        else:
+            texts.append(rng.choice(SENTENCES) + " " + RUN_ON + ("." if rng.random() < 0.5 else RUN_ON.replace(",", "")))
+    return texts
+
+
+def best_of(fn, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    texts = corpus(count, seed)
+    chars = sum(len(t) for t in texts)
+    print(f"{count} replies, {chars / 1e6:.1f}M chars")
+
+    legacy_s, legacy = best_of(lambda: [legacy_splitter.split_into_natural_messages(t) for t in texts])
+    fast_s, fast = best_of(lambda: split_many(texts))
+    assert fast == legacy, "split_many output differs from the original implementation"
+
+    bubbles = sum(len(b) for b in fast)
+    for label, seconds in (("original", legacy_s), ("split_many", fast_s)):
+        print(f"  {label:<11} {seconds:6.2f}s  {count / seconds:>9,.0f} replies/s  "
+              f"{seconds / count * 1e6:6.1f}us/reply")
+    print(f"  {bubbles} bubbles, identical output, {legacy_s / fast_s:.2f}x faster")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Metrics Benchmark - cost of one counter inc / histogram observe on the hot path
+
+Compares the sharded (per-thread, lock-free) metrics against the obvious
+lock-protected counter, single-threaded and with 8 threads hammering the
+same metric.
+
+Usage:
+    python3 tests/benchmarks/bench_metrics.py [ops_per_thread]
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from metrics import MetricsRegistry  # noqa: E402
+
+
+class LockedCounter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+def run(fn, threads: int, ops: int) -> float:
+    """ns per operation across all threads."""
+    def work():
+        for _ in range(ops):
+            fn()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return (time.perf_counter() - start) / (threads * ops) * 1e9
+
+
+if __name__ == "__main__":
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    registry = MetricsRegistry()
+    counter = registry.counter("c_total", "c")
+    hist = registry.histogram("h_seconds", "h")
+    locked = LockedCounter()
+
+    def observe():
+        hist.observe(0.0123)
+
+    def timed():
+        start = time.perf_counter()
+        hist.since(start)
+
+    print("=" * 64)
+    print(f"{'operation':<34}{'1 thread':>14}{'8 threads':>14}")
+    print("=" * 64)
+    for label, fn in [
+        ("locked counter inc", locked.inc),
+        ("sharded counter inc", counter.inc),
+        ("histogram observe", observe),
+        ("perf_counter + histogram since", timed),
+    ]:
+        print(f"{label:<34}{run(fn, 1, ops):11.0f} ns{run(fn, 8, ops // 4):11.0f} ns")
+    assert counter.value == ops + 8 * (ops // 4)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Poll Scheduler Benchmark - replay message arrival traces against poll policies
+
+Each policy is simulated on a virtual clock over the whole trace: at every
+poll, messages that arrived since the last one are "found" (at most LIMIT per
+query), and the detection latency of each is recorded. Polls per day stand in
+for CPU/disk cost.
+
+Traces:
+    (default)            synthetic 3-day trace: daytime conversation bursts,
+                         quiet nights, one 250-message catch-up burst
+    --trace FILE         one arrival time (unix seconds) per line
+    --chatdb PATH        arrival times of inbound messages in a chat.db copy
+
+Usage:
+    python3 tests/benchmarks/bench_poll_scheduler.py [--trace FILE | --chatdb PATH]
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from poll_scheduler import AdaptivePollScheduler  # noqa: E402
+
+LIMIT = 100
+QUERY_COST = 0.002  # seconds a poll itself takes
+APPLE_EPOCH = 978307200  # 2001-01-01 in unix seconds
+
+
+def synthetic_trace(days: int = 3, seed: int = 42):
+    rng = random.Random(seed)
+    arrivals = []
+    for day in range(days):
+        base = day * 86400
+        for _ in range(rng.randint(25, 45)):
+            t = base + rng.uniform(8 * 3600, 23 * 3600)
+            for _ in range(rng.randint(2, 20)):
+                arrivals.append(t)
+                t += rng.expovariate(1 / 25)
+    # Bridge-offline catch-up: a burst bigger than one LIMIT-ed query
+    burst = 1.5 * 86400
+    arrivals.extend(burst + i * 0.01 for i in range(250))
+    return sorted(arrivals)
+
+
+def chatdb_trace(path: str):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    rows = conn.execute("SELECT date FROM message WHERE is_from_me = 0 AND date > 0 ORDER BY date").fetchall()
+    # Modern chat.db stores nanoseconds since 2001-01-01, older versions seconds
+    return [APPLE_EPOCH + (d / 1e9 if d > 1e12 else d) for (d,) in rows]
+
+
+def simulate(arrivals, make_scheduler, use_limit_repoll=True):
+    clock = [arrivals[0] - 3600]
+    scheduler = make_scheduler(lambda: clock[0])
+    end = arrivals[-1] + 3600
+    i, latencies = 0, []
+    while clock[0] < end:
+        now = clock[0]
+        j = i
+        while j < len(arrivals) and arrivals[j] <= now and j - i < LIMIT:
+            j += 1
+        latencies.extend(now - a for a in arrivals[i:j])
+        found, i = j - i, j
+        wait = scheduler.next_interval(found, use_limit_repoll and found >= LIMIT, 0)
+        clock[0] += wait + QUERY_COST
+    days = (end - arrivals[0] + 3600) / 86400
+    return latencies, scheduler.polls / days, scheduler.stats()
+
+
+def report(label, latencies, polls_per_day):
+    latencies = sorted(latencies)
+    print(f"{label:<28} latency mean {statistics.mean(latencies) * 1000:7.0f}ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.0f}ms  "
+          f"max {latencies[-1]:6.1f}s   {polls_per_day:9,.0f} polls/day")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trace")
+    parser.add_argument("--chatdb")
+    opts = parser.parse_args()
+
+    if opts.chatdb:
+        arrivals, source = chatdb_trace(opts.chatdb), opts.chatdb
+    elif opts.trace:
+        arrivals = sorted(float(line) for line in open(opts.trace) if line.strip())
+        source = opts.trace
+    else:
+        arrivals, source = synthetic_trace(), "synthetic 3-day trace"
+
+    print("=" * 96)
+    print(f"{len(arrivals):,} inbound messages from {source}")
+    print("=" * 96)
+    for label, factory, repoll in [
+        ("fixed 2s (old)", lambda c: AdaptivePollScheduler(2.0, 2.0, clock=c), False),
+        ("fixed 0.25s", lambda c: AdaptivePollScheduler(0.25, 0.25, clock=c), False),
+        ("adaptive 0.5s-4s (default)", lambda c: AdaptivePollScheduler(0.5, 4.0, 60, clock=c), True),
+        ("adaptive 1s-4s, 120s window", lambda c: AdaptivePollScheduler(1.0, 4.0, 120, clock=c), True),
+        ("adaptive 0.25s-10s", lambda c: AdaptivePollScheduler(0.25, 10.0, 60, clock=c), True),
+    ]:
+        latencies, per_day, stats = simulate(arrivals, factory, repoll)
+        report(label, latencies, per_day)
+        if repoll:
+            print(f"{'':28} decisions {stats['decisions']}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Reply Stream Benchmark - time to first bubble, buffered JSON vs streamed NDJSON
+
+A stand-in backend "thinks" for `think` seconds, then generates a bubble
+every `per_bubble` seconds. "buffered" is the old call_sf: the first bubble
+can't be typed until r.json() has the whole reply. "streamed" hands each
+bubble over as its NDJSON line arrives (StreamedReply).
+
+"done" is when the last bubble would have been sent if each takes `deliver`
+seconds to type and send once it's available, one at a time (the bridge's
+timeline): streaming overlaps generation with typing.
+
+Usage:
+    python3 tests/benchmarks/bench_reply_stream.py [bubbles] [per_bubble_seconds] [rounds]
+"""
+
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from backend_client import BackendClient  # noqa: E402
+from reply_stream import ACCEPT, StreamedReply, is_streamed  # noqa: E402
+
+THINK = 0.3
+DELIVER = 0.4
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        bubbles, per_bubble = self.server.bubbles, self.server.per_bubble
+        texts = [f"Bubble number {i + 1} of a long reply, generated one at a time." for i in range(bubbles)]
+        time.sleep(THINK)
+        if "x-ndjson" not in (self.headers.get("Accept") or ""):
+            time.sleep(per_bubble * bubbles)
+            data = json.dumps({"target": "+15551234567", "messages": [{"text": t} for t in texts]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [{"target": "+15551234567"}] + [{"message": {"text": t}} for t in texts] + [{"done": True}]
+        for i, event in enumerate(events):
+            if 0 < i <= bubbles:
+                time.sleep(per_bubble)
+            raw = (json.dumps(event) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(raw), raw))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(bubbles: int, per_bubble: float):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    httpd.bubbles, httpd.per_bubble = bubbles, per_bubble
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}/webhook"
+
+
+def finish_time(available):
+    """When the last bubble is sent if each takes DELIVER once available, one at a time."""
+    done = 0.0
+    for t in available:
+        done = max(done, t) + DELIVER
+    return done
+
+
+def buffered(client, url):
+    start = time.perf_counter()
+    response, _ = client.post(url, json={}, timeout=30)
+    messages = response.json()["messages"]
+    now = time.perf_counter() - start
+    return now, finish_time([now] * len(messages))
+
+
+def streamed(client, url):
+    start = time.perf_counter()
+    response, _ = client.post(url, json={}, headers={"Accept": ACCEPT}, stream=True, timeout=30)
+    assert is_streamed(response)
+    available = []
+    for pieces in StreamedReply(response, default_target="+1", started=start).batches():
+        now = time.perf_counter() - start
+        available += [now for kind, _ in pieces if kind == "message"]
+    return available[0], finish_time(available)
+
+
+if __name__ == "__main__":
+    bubbles = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    per_bubble = float(sys.argv[2]) if len(sys.argv) > 2 else 0.25
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    httpd, url = serve(bubbles, per_bubble)
+    client = BackendClient()
+    print(f"{bubbles} bubbles, {THINK:.2f}s think + {per_bubble:.2f}s per bubble, "
+          f"{DELIVER:.2f}s to deliver each, {rounds} rounds")
+    results = {}
+    for label, run in (("buffered", buffered), ("streamed", streamed)):
+        samples = [run(client, url) for _ in range(rounds)]
+        first = statistics.median(s[0] for s in samples)
+        done = statistics.median(s[1] for s in samples)
+        results[label] = first
+        print(f"  {label:<9} first bubble {first * 1000:7.0f}ms   last sent {done:6.2f}s")
+    print(f"  time to first bubble {results['buffered'] / results['streamed']:.1f}x shorter streamed")
+    client.close()
+    httpd.shutdown()
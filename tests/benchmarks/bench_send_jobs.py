@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Send Jobs Benchmark - /health latency while POST /send traffic is in flight
+
+"blocking" is the old endpoint: an async handler calling the blocking send
+per message on the event loop. "jobs" is send_jobs.add_send_routes. The fake
+sender sleeps like an AppleScript send.
+
+Usage:
+    python3 tests/benchmarks/bench_send_jobs.py [send_seconds] [requests]
+"""
+
+import json
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from send_jobs import SendJobQueue, add_send_routes  # noqa: E402
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+
+def build(mode: str, send_seconds: float):
+    def send(to, text):
+        time.sleep(send_seconds)
+        return True
+
+    app = FastAPI()
+    if mode == "jobs":
+        add_send_routes(app, SendJobQueue(send, max_workers=2, max_queued=1000))
+    else:
+        class SendMessageRequest(BaseModel):
+            to: str
+            messages: List[str]
+
+        @app.post("/send")
+        async def send_messages(request: SendMessageRequest):
+            return {"sent": sum(send(request.to, m) for m in request.messages)}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+    return app
+
+
+def serve(app):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def timed(url, body=None) -> float:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        urllib.request.urlopen(req, timeout=120).read()
+    except urllib.error.HTTPError:
+        pass
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    send_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{requests} POST /send x 2 messages, {send_seconds * 1000:.0f}ms per send")
+    for mode in ("blocking", "jobs"):
+        server, base = serve(build(mode, send_seconds))
+        with ThreadPoolExecutor(max_workers=requests + 5) as pool:
+            posts = [pool.submit(timed, f"{base}/send", {"to": f"+{i}", "messages": ["receipt", "thanks"]})
+                     for i in range(requests)]
+            time.sleep(0.05)
+            health = sorted(pool.map(lambda _: timed(f"{base}/health"), range(5)))
+            post_times = sorted(f.result() for f in posts)
+        server.should_exit = True
+        print(f"  {mode:<9} /send p50 {post_times[len(post_times) // 2] * 1000:7.1f}ms  "
+              f"/health p50 {health[2] * 1000:7.1f}ms  max {health[-1] * 1000:7.1f}ms")
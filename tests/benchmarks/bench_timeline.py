@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Timeline Benchmark - how far reply gaps drift from the intended human timing
+
+Simulated (virtual clock) so it runs anywhere in milliseconds. Script
+latencies are drawn from a jittered distribution similar to osascript on a
+busy Mac: typing ~600ms, send ~350ms.
+
+    serial:   the old loop (sleep, typing script, sleep, send script)
+    timeline: BubbleTimeline with the same scripts
+
+Usage:
+    python3 tests/benchmarks/bench_timeline.py [replies]
+"""
+
+import random
+import statistics
+import sys
+from concurrent.futures import Future
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from timeline import BubbleTimeline  # noqa: E402
+
+
+class Sim:
+    def __init__(self, seed=7):
+        self.now = 0.0
+        self.rng = random.Random(seed)
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def run_async(self, fn, *args):
+        started = self.now
+        future = Future()
+        future.set_result(fn(*args))
+        self.now = started
+        return future
+
+    def typing(self, target):
+        self.now += max(0.1, self.rng.gauss(0.6, 0.15))
+        return True
+
+    def send(self, target, index, bubble):
+        self.now += max(0.1, self.rng.gauss(0.35, 0.1))
+        return True
+
+
+def plan(rng):
+    return [{"text": "x", "delay_before": rng.uniform(0.3, 1.5), "typing_delay": rng.uniform(1.0, 4.0)}
+            for _ in range(rng.randint(1, 4))]
+
+
+def serial(sim, bubbles):
+    """The old handle_structured_response loop; returns gap errors in ms."""
+    errors, last = [], sim.now
+    for bubble in bubbles:
+        sim.sleep(bubble["delay_before"])
+        sim.typing("+1")
+        sim.sleep(bubble["typing_delay"])
+        sim.send("+1", 0, bubble)
+        errors.append((sim.now - last - bubble["delay_before"] - bubble["typing_delay"]) * 1000)
+        last = sim.now
+    return errors
+
+
+def summarize(label, errors):
+    errors = sorted(abs(e) for e in errors)
+    print(f"{label:<10} gap error  mean {statistics.mean(errors):6.0f}ms   "
+          f"p50 {errors[len(errors) // 2]:6.0f}ms   p95 {errors[int(len(errors) * 0.95)]:6.0f}ms")
+
+
+if __name__ == "__main__":
+    replies = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    plans = [plan(random.Random(i)) for i in range(replies)]
+
+    sim = Sim()
+    old = [e for bubbles in plans for e in serial(sim, bubbles)]
+
+    sim = Sim()
+    timeline = BubbleTimeline(show_typing=sim.typing, send=sim.send, clock=sim.clock,
+                              sleep=sim.sleep, run_async=sim.run_async)
+    new = [(r["actual_gap_s"] - r["intended_gap_s"]) * 1000 for bubbles in plans for r in timeline.run("+1", bubbles)]
+
+    print("=" * 72)
+    print(f"{replies} simulated replies, {len(old)} bubbles")
+    print("=" * 72)
+    summarize("serial", old)
+    summarize("timeline", new)
+    print(f"Learned latency: typing {timeline.typing_latency * 1000:.0f}ms, send {timeline.send_latency * 1000:.0f}ms")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tracing Benchmark - cost of recording spans and of summarizing a full buffer
+
+A traced reply records ~10 spans (poll_wait, queue, backend, and per bubble
+delay_before / typing / typing_delay / send, then total), so the per-message
+overhead is what matters next to a ~1s backend call.
+
+Usage:
+    python3 tests/benchmarks/bench_tracing.py [messages]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from tracing import Tracer, summarize, to_chrome_trace, to_jsonl  # noqa: E402
+
+
+def trace_reply(tracer: Tracer, rowid: int, t: float):
+    tracer.detected(rowid, t - 1.0, now=t)
+    tracer.started(rowid, now=t + 0.1)
+    with tracer.span(rowid, "backend"):
+        pass
+    for index in (1, 2):
+        tracer.record(rowid, "delay_before", t, t + 0.5, index)
+        tracer.record(rowid, "typing", t + 0.5, t + 0.9, index)
+        tracer.record(rowid, "typing_delay", t + 0.9, t + 2.0, index)
+        tracer.record(rowid, "send", t + 2.0, t + 2.3, index)
+    tracer.finished(rowid, now=t + 5.0, messages=1)
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tracer = Tracer(capacity=messages * 12)
+
+    start = time.perf_counter()
+    for rowid in range(messages):
+        trace_reply(tracer, rowid, 1000.0 + rowid)
+    per_message = (time.perf_counter() - start) / messages
+    spans_per_message = tracer.recorded / messages
+    print(f"record:    {per_message * 1e6:7.1f} us per traced reply ({spans_per_message:.0f} spans, "
+          f"{per_message / spans_per_message * 1e9:.0f} ns/span)")
+
+    start = time.perf_counter()
+    spans = tracer.spans()
+    snapshot = time.perf_counter() - start
+    start = time.perf_counter()
+    rows = summarize(spans)
+    summary = time.perf_counter() - start
+    start = time.perf_counter()
+    to_jsonl(spans)
+    jsonl = time.perf_counter() - start
+    start = time.perf_counter()
+    to_chrome_trace(spans)
+    chrome = time.perf_counter() - start
+    print(f"{len(spans)} spans: snapshot {snapshot * 1000:.0f}ms, summary {summary * 1000:.0f}ms, "
+          f"jsonl {jsonl * 1000:.0f}ms, chrome {chrome * 1000:.0f}ms")
+    print(f"stages summarized: {', '.join(r['stage'] for r in rows)}")
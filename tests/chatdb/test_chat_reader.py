@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Chat DB Reader Tests - persistent connection, WAL visibility and reconnects
+"""
+import os
+import sqlite3
+
+from chat_reader import ChatDBReader
+
+SQL = "SELECT ROWID, text FROM message WHERE ROWID > ? ORDER BY ROWID ASC LIMIT 100"
+
+
+def make_db(path, texts):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE message (ROWID INTEGER PRIMARY KEY, text TEXT)")
+    conn.executemany("INSERT INTO message (text) VALUES (?)", [(t,) for t in texts])
+    conn.commit()
+    return conn
+
+
+def test_sees_new_wal_commits_on_the_same_connection(tmp_path):
+    path = str(tmp_path / "chat.db")
+    writer = make_db(path, ["a", "b"])
+    reader = ChatDBReader(path, SQL)
+
+    assert reader.fetch_after(0) == [(1, "a"), (2, "b")]
+    writer.execute("INSERT INTO message (text) VALUES ('c')")
+    writer.commit()
+    assert reader.fetch_after(2) == [(3, "c")]
+
+    stats = reader.stats()
+    assert stats["queries"] == 2
+    assert stats["rows_returned"] == 3
+    assert stats["reconnects"] == 0
+    reader.close()
+    writer.close()
+
+
+def test_reconnects_when_the_file_is_replaced(tmp_path):
+    path = str(tmp_path / "chat.db")
+    make_db(path, ["old"]).close()
+    reader = ChatDBReader(path, SQL)
+    assert reader.fetch_after(0) == [(1, "old")]
+
+    replacement = str(tmp_path / "restored.db")
+    conn = make_db(replacement, ["new1", "new2"])
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.replace(replacement, path)
+
+    assert reader.fetch_after(0) == [(1, "new1"), (2, "new2")]
+    assert reader.stats()["reconnects"] == 1
+    reader.close()
+
+
+def test_reconnects_after_schema_change(tmp_path):
+    path = str(tmp_path / "chat.db")
+    writer = make_db(path, ["a"])
+    reader = ChatDBReader(path, SQL)
+    reader.fetch_after(0)
+    version = reader.stats()["schema_version"]
+
+    writer.execute("ALTER TABLE message ADD COLUMN service TEXT")
+    writer.execute("INSERT INTO message (text, service) VALUES ('b', 'iMessage')")
+    writer.commit()
+
+    assert reader.fetch_after(1) == [(2, "b")]
+    writer.execute("DROP TABLE message")
+    writer.execute("CREATE TABLE message (ROWID INTEGER PRIMARY KEY, text TEXT)")
+    writer.execute("INSERT INTO message (text) VALUES ('fresh')")
+    writer.commit()
+
+    assert reader.fetch_after(0) == [(1, "fresh")]
+    assert reader.stats()["schema_version"] != version
+    reader.close()
+    writer.close()
+
+
+def test_max_rowid_can_count_only_rows_the_poll_returns(tmp_path):
+    path = str(tmp_path / "chat.db")
+    writer = make_db(path, ["a", "b", None, None])  # e.g. attachments / tapbacks with no text
+    reader = ChatDBReader(path, SQL)
+
+    assert reader.max_rowid() == 4
+    assert reader.max_rowid("message.text IS NOT NULL") == 2
+    assert reader.max_rowid("message.text = 'never'") is None
+    reader.close()
+    writer.close()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Chat DB Watcher Tests - change detection against a synthetic WAL-mode chat.db
+"""
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+from chat_watcher import create_watcher
+
+BACKENDS = ["stat"] + (["inotify"] if sys.platform.startswith("linux") else []) + \
+    (["kqueue"] if sys.platform == "darwin" else [])
+
+
+@pytest.fixture
+def chat_db(tmp_path):
+    path = str(tmp_path / "chat.db")
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE message (ROWID INTEGER PRIMARY KEY, text TEXT)")
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_wakes_on_insert(chat_db, backend):
+    path, conn = chat_db
+    watcher = create_watcher(path, backend)
+
+    def insert():
+        time.sleep(0.1)
+        conn.execute("INSERT INTO message (text) VALUES ('hey')")
+        conn.commit()
+
+    writer = threading.Thread(target=insert)
+    start = time.monotonic()
+    writer.start()
+    changed = watcher.wait(2.0)
+    elapsed = time.monotonic() - start
+    writer.join()
+    watcher.close()
+
+    assert changed
+    assert elapsed < 1.0
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_times_out_when_idle(chat_db, backend):
+    path, _ = chat_db
+    watcher = create_watcher(path, backend)
+    start = time.monotonic()
+    assert watcher.wait(0.2) is False
+    assert time.monotonic() - start >= 0.19
+    watcher.close()
+
+
+def test_auto_picks_a_working_backend(chat_db):
+    path, _ = chat_db
+    watcher = create_watcher(path, "auto")
+    assert watcher.name in ("kqueue", "inotify", "stat")
+    watcher.close()
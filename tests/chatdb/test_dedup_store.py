@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Dedup Store Tests - windowed load, pruning and legacy migration
+"""
+import os
+import sys
+import threading
+
+from dedup_store import ProcessedStore
+
+
+def test_add_and_lookup_survive_reopen(tmp_path):
+    path = str(tmp_path / "processed.db")
+    store = ProcessedStore(path)
+    store.add(5)
+    store.add_many([6, 7])
+    assert 5 in store and 7 in store and 8 not in store
+    store.close()
+
+    reopened = ProcessedStore(path)
+    reopened.load_window(0)
+    assert 6 in reopened and 8 not in reopened
+    reopened.close()
+
+
+def test_startup_only_caches_the_window_above_the_watermark(tmp_path):
+    path = str(tmp_path / "processed.db")
+    store = ProcessedStore(path, retention=10)
+    store.add_many(range(1, 1001))
+    store.close()
+
+    store = ProcessedStore(path, retention=10)
+    assert store.load_window(900) == 110  # 891..1000
+    # Older IDs are not cached but still answered from disk
+    assert 50 in store
+    assert 2000 not in store
+    store.close()
+
+
+def test_prune_drops_ids_below_the_retention_margin(tmp_path):
+    store = ProcessedStore(str(tmp_path / "processed.db"), retention=5)
+    store.add_many(range(1, 101))
+    deleted = store.prune(100)
+
+    assert deleted == 94           # 1..94 gone, 95..100 kept
+    assert 94 not in store
+    assert 95 in store
+    assert store.prune(100) == 0   # nothing new to drop
+    store.close()
+
+
+def test_remember_from_workers_while_pruning_loses_nothing(tmp_path):
+    store = ProcessedStore(str(tmp_path / "processed.db"), retention=100)
+    store.add_many(range(1, 20001))
+    remembered = list(range(100001, 140001))
+
+    def worker(ids):
+        for rid in ids:
+            store.remember(rid)
+
+    workers = [threading.Thread(target=worker, args=(remembered[i::4],)) for i in range(4)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads often enough to hit a prune mid-rebuild
+    try:
+        for w in workers:
+            w.start()
+        for watermark in range(200, 20001, 50):  # the poll thread committing as it goes
+            store.prune(watermark)
+        for w in workers:
+            w.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert all(rid in store for rid in remembered)
+    assert len(store) == 101 + len(remembered)  # 19900..20000 plus every remembered ID
+    store.close()
+
+
+def test_migrates_legacy_text_file_once(tmp_path):
+    txt = tmp_path / "bridge_processed_messages.txt"
+    txt.write_text("1\n2\n\ngarbage\n3\n3\n")
+    store = ProcessedStore(str(tmp_path / "processed.db"))
+
+    assert store.migrate_from_text(str(txt)) == 3
+    assert not txt.exists()
+    assert os.path.exists(str(txt) + ".migrated")
+    assert store.migrate_from_text(str(txt)) == 0
+
+    store.load_window(0)
+    assert {1, 2, 3} <= {r for r in range(5) if r in store}
+    store.close()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Poll Scheduler Tests - fast when active, exponential idle back-off, backlog re-poll
+"""
+import pytest
+
+from poll_scheduler import AdaptivePollScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(**kwargs):
+    clock = FakeClock()
+    params = dict(min_interval=0.25, max_interval=8.0, active_window=30.0, backoff=2.0)
+    params.update(kwargs)
+    return AdaptivePollScheduler(clock=clock, **params), clock
+
+
+def run_idle(scheduler, clock, polls):
+    waits = []
+    for _ in range(polls):
+        wait = scheduler.next_interval(0)
+        waits.append(wait)
+        clock.now += wait
+    return waits
+
+
+def test_idle_backs_off_exponentially_to_the_ceiling():
+    scheduler, clock = make()
+    assert run_idle(scheduler, clock, 7) == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+
+def test_inbound_message_snaps_back_to_the_fast_interval_for_the_window():
+    scheduler, clock = make()
+    run_idle(scheduler, clock, 6)
+    assert scheduler.next_interval(3) == 0.25
+
+    waits = run_idle(scheduler, clock, 200)
+    fast = [w for w in waits if w == 0.25]
+    # Stays fast for the whole active window, then backs off again
+    assert len(fast) == pytest.approx(30 / 0.25, abs=1)
+    assert waits[-1] == 8.0
+
+
+def test_replies_in_progress_keep_polling_fast():
+    scheduler, clock = make(active_window=0)
+    assert scheduler.next_interval(0, active_conversations=2) == 0.25
+    assert scheduler.next_interval(0, active_conversations=0) == 0.5
+
+
+def test_full_batch_repolls_immediately_without_losing_the_schedule():
+    scheduler, clock = make(active_window=0)
+    run_idle(scheduler, clock, 3)  # interval is now 2.0
+    assert scheduler.next_interval(100, hit_limit=True) == 0.0
+    assert scheduler.decisions["backlog"] == 1
+    assert scheduler.next_interval(0) == 4.0
+
+
+def test_equal_bounds_is_a_fixed_interval():
+    scheduler, clock = make(min_interval=2.0, max_interval=2.0)
+    assert set(run_idle(scheduler, clock, 20)) == {2.0}
+    stats = scheduler.stats()
+    assert stats["avg_interval_s"] == 2.0
+    assert stats["expected_poll_latency_ms"] == 1000.0
+    assert stats["polls_per_hour"] == pytest.approx(1800, rel=0.01)
+
+
+def test_stats_report_decisions_and_tradeoff():
+    scheduler, clock = make()
+    scheduler.next_interval(5)
+    clock.now += 0.25
+    run_idle(scheduler, clock, 3)
+    stats = scheduler.stats()
+    assert stats["polls"] == 4 and stats["rows"] == 5 and stats["empty_polls"] == 3
+    assert stats["decisions"] == {"backlog": 0, "activity": 4, "conversation": 0, "idle": 0}
+    assert stats["current_interval_s"] == 0.25
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Env Config Tests - load once, reload on change / SIGHUP, atomic snapshots
+"""
+import os
+import signal
+import time
+
+import pytest
+
+import env_config
+from env_config import EnvConfig
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    path = tmp_path / ".env"
+    path.write_text("SF_API_URL=https://example.test/hook\nSF_API_KEY=key-one\n# comment\n")
+    monkeypatch.delenv("SF_API_KEY", raising=False)
+    monkeypatch.delenv("SF_API_URL", raising=False)
+    return path
+
+
+def count_parses(monkeypatch):
+    calls = []
+    original = env_config.parse_env_file
+
+    def counting(path):
+        calls.append(path)
+        return original(path)
+
+    monkeypatch.setattr(env_config, "parse_env_file", counting)
+    return calls
+
+
+def test_parses_once_while_the_file_is_unchanged(env_file, monkeypatch):
+    calls = count_parses(monkeypatch)
+    config = EnvConfig(str(env_file), check_interval=0)
+    for _ in range(100):
+        assert config.get("SF_API_KEY") == "key-one"
+    assert len(calls) == 1
+    assert os.environ["SF_API_URL"] == "https://example.test/hook"
+
+
+def test_rotated_key_is_picked_up_and_reported(env_file):
+    changes = []
+    config = EnvConfig(str(env_file), check_interval=0, on_reload=lambda old, new: changes.append(
+        (old.get("SF_API_KEY"), new.get("SF_API_KEY"))))
+    before = config.current()
+
+    env_file.write_text("SF_API_URL=https://example.test/hook\nSF_API_KEY=key-two-longer\n")
+    after = config.current()
+
+    assert before["SF_API_KEY"] == "key-one"  # snapshot held by an in-flight worker is untouched
+    assert after["SF_API_KEY"] == "key-two-longer"
+    assert changes == [("key-one", "key-two-longer")]
+    assert config.reloads == 1
+
+
+def test_replaced_file_is_detected_by_inode(env_file, tmp_path):
+    config = EnvConfig(str(env_file), check_interval=0)
+    replacement = tmp_path / "new.env"
+    replacement.write_text("SF_API_URL=https://example.test/hook\nSF_API_KEY=key-six\n")
+    os.replace(replacement, env_file)
+    assert config.get("SF_API_KEY") == "key-six"
+
+
+def test_check_interval_throttles_stat_calls(env_file):
+    config = EnvConfig(str(env_file), check_interval=60)
+    env_file.write_text("SF_API_KEY=key-later\n")
+    assert config.get("SF_API_KEY") == "key-one"  # not checked yet
+    assert config.refresh()
+    assert config.get("SF_API_KEY") == "key-later"
+
+
+def test_sighup_forces_a_reload(env_file):
+    config = EnvConfig(str(env_file), check_interval=60)
+    previous = signal.getsignal(signal.SIGHUP)
+    try:
+        config.install_sighup_handler()
+        env_file.write_text("SF_API_KEY=key-from-hup\n")
+        os.kill(os.getpid(), signal.SIGHUP)
+        time.sleep(0.01)
+        assert config.get("SF_API_KEY") == "key-from-hup"
+        assert config.reloads == 1
+    finally:
+        signal.signal(signal.SIGHUP, previous)
@@ -0,0 +1,16 @@
+"""
+Shared pytest setup.
+
+Makes the bridge modules in the repo root importable and keeps pytest away
+from the interactive scripts (echo mode, GUI click tests) that drive a real
+Messages.app when imported.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+collect_ignore = [
+    "sending/test_echo_mode.py",
+    "coordinates/test_click_hold_python.py",
+]
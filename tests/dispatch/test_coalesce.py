@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Coalesce Tests - per-sender grouping, policies, stale handling, catch-up
+detection, burst debounce window
+"""
+import sqlite3
+
+import pytest
+
+from chat_reader import ChatDBReader
+from coalesce import APPLE_EPOCH, BurstCoalescer, MessageBatch, apple_time, needs_catch_up, plan_batches
+
+NOW = 1_800_000_000.0
+
+
+def backlog():
+    # (rowid, text, sender, sent_at): two people interleaved while the bridge was down
+    return [
+        (10, "hey", "+1", NOW - 3000),
+        (11, "yo", "+2", NOW - 2900),
+        (12, "you there?", "+1", NOW - 2000),
+        (13, "hello??", "+1", NOW - 100),
+        (14, "nvm", "+2", NOW - 50),
+    ]
+
+
+def test_per_sender_policy_sends_one_ordered_request_per_conversation():
+    batches, skipped = plan_batches(backlog(), "per_sender", now=NOW)
+    assert skipped == []
+    assert [(b.sender, b.rowids) for b in batches] == [("+1", [10, 12, 13]), ("+2", [11, 14])]
+    first = batches[0]
+    assert first.rowid == 10
+    assert first.text == "hey\nyou there?\nhello??"
+    meta = first.metadata()
+    assert meta["message_ids"] == [10, 12, 13]
+    assert meta["coalesced"] == 3 and meta["catch_up"] is True
+    assert [m["text"] for m in meta["messages"]] == ["hey", "you there?", "hello??"]
+
+
+def test_latest_policy_answers_the_newest_message_and_lists_the_rest():
+    batches, _ = plan_batches(backlog(), "latest", now=NOW)
+    first = batches[0]
+    assert first.text == "hello??"
+    assert first.rowid == 10  # still anchored on the oldest so the watermark holds
+    assert first.metadata()["superseded_ids"] == [10, 12]
+
+
+def test_none_policy_and_live_traffic_keep_one_request_per_message():
+    for batches, _ in (plan_batches(backlog(), "none", now=NOW),
+                       plan_batches(backlog(), "per_sender", catch_up=False, now=NOW)):
+        assert [b.rowids for b in batches] == [[10], [11], [12], [13], [14]]
+    live = plan_batches(backlog()[:1], "per_sender", catch_up=False, now=NOW)[0][0]
+    assert live.metadata() == {}  # payload unchanged for ordinary messages
+
+
+def test_stale_messages_are_flagged_or_skipped():
+    batches, skipped = plan_batches(backlog(), "per_sender", now=NOW, stale_after=1000)
+    assert skipped == []
+    assert [b.stale for b in batches] == [False, False]  # each sender's newest is recent
+
+    batches, skipped = plan_batches(backlog(), "per_sender", now=NOW, stale_after=1000, skip_stale=True)
+    assert [r[0] for r in skipped] == [10, 11, 12]
+    assert [b.rowids for b in batches] == [[13], [14]]
+
+    batches, _ = plan_batches(backlog()[:2], "per_sender", now=NOW, stale_after=1000)
+    assert all(b.stale for b in batches)
+
+
+def test_needs_catch_up_on_full_page_or_old_messages():
+    recent = [(1, "a", "+1", NOW - 5)]
+    assert not needs_catch_up(recent, limit=100, now=NOW, max_age=120)
+    assert needs_catch_up(recent * 100, limit=100, now=NOW, max_age=120)
+    assert needs_catch_up([(1, "a", "+1", NOW - 600)], limit=100, now=NOW, max_age=120)
+    assert not needs_catch_up([(1, "a", "+1", None)], limit=100, now=NOW, max_age=120)
+
+
+def test_apple_time_handles_nanoseconds_and_seconds():
+    assert apple_time(0) is None
+    assert apple_time(700_000_000) == APPLE_EPOCH + 700_000_000
+    assert apple_time(700_000_000 * 10**9) == pytest.approx(APPLE_EPOCH + 700_000_000)
+
+
+def test_rejects_unknown_policy_and_empty_batch():
+    with pytest.raises(ValueError):
+        plan_batches(backlog(), "everything")
+    with pytest.raises(ValueError):
+        MessageBatch("+1", [])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 500.0
+
+    def __call__(self):
+        return self.now
+
+
+class ChatDB:
+    """Synthetic chat.db with just the columns the poll query reads."""
+
+    SQL = ("SELECT message.ROWID, message.text, handle.id, message.date FROM message "
+           "LEFT JOIN handle ON handle.ROWID = message.handle_id "
+           "WHERE message.ROWID > ? ORDER BY message.ROWID LIMIT 100")
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE handle (ROWID INTEGER PRIMARY KEY, id TEXT)")
+        self.conn.execute("CREATE TABLE message (ROWID INTEGER PRIMARY KEY, text TEXT, "
+                          "handle_id INTEGER, date INTEGER)")
+        self.conn.commit()
+
+    def receive(self, sender, text):
+        row = self.conn.execute("SELECT ROWID FROM handle WHERE id = ?", (sender,)).fetchone()
+        handle = row[0] if row else self.conn.execute("INSERT INTO handle (id) VALUES (?)", (sender,)).lastrowid
+        self.conn.execute("INSERT INTO message (text, handle_id, date) VALUES (?, ?, 0)", (text, handle))
+        self.conn.commit()
+
+
+class PollLoop:
+    """The bridge's live path: poll, hold in the burst window, submit when it closes."""
+
+    def __init__(self, path, clock, window, max_wait=None):
+        self.reader = ChatDBReader(path, ChatDB.SQL)
+        self.bursts = BurstCoalescer(window, max_wait, clock=clock)
+        self.last = 0
+        self.submitted = []
+
+    def poll(self):
+        rows = self.reader.fetch_after(self.last)
+        if rows:
+            self.last = rows[-1][0]
+        batches, _ = plan_batches([(r[0], r[1], r[2], apple_time(r[3])) for r in rows], catch_up=False)
+        for batch in batches:
+            self.bursts.add(batch)
+        self.submitted.extend(self.bursts.ready())
+        return min(self.bursts.safe_watermark(self.last), self.last)
+
+
+def test_burst_within_the_window_becomes_one_backend_request(tmp_path):
+    clock = FakeClock()
+    db = ChatDB(str(tmp_path / "chat.db"))
+    loop = PollLoop(str(tmp_path / "chat.db"), clock, window=1.5)
+
+    db.receive("+1", "hey")
+    db.receive("+2", "hello")
+    loop.poll()
+    clock.now += 1.0
+    db.receive("+1", "quick q")
+    loop.poll()
+    clock.now += 1.0
+    db.receive("+1", "what time do you close?")
+    assert loop.poll() == 0  # watermark held below the oldest held message
+    assert [b.rowids for b in loop.submitted] == [[2]]  # +2 went quiet after 1.5s
+
+    clock.now += 1.5
+    assert loop.poll() == 4
+    batch = loop.submitted[-1]
+    assert batch.sender == "+1" and batch.rowids == [1, 3, 4]
+    assert batch.text == "hey\nquick q\nwhat time do you close?"
+    assert batch.metadata()["message_ids"] == [1, 3, 4]
+    assert loop.bursts.stats() == {
+        "window_ms": 1500, "messages": 4, "batches": 2, "backend_calls_saved": 2,
+        "largest_batch": 3, "avg_batch_size": 2.0, "held": 0,
+    }
+
+
+def test_gap_longer_than_the_window_splits_the_burst(tmp_path):
+    clock = FakeClock()
+    db = ChatDB(str(tmp_path / "chat.db"))
+    loop = PollLoop(str(tmp_path / "chat.db"), clock, window=1.0)
+
+    db.receive("+1", "one")
+    loop.poll()
+    clock.now += 1.2
+    loop.poll()
+    db.receive("+1", "two")
+    loop.poll()
+    clock.now += 1.0
+    loop.poll()
+    assert [b.rowids for b in loop.submitted] == [[1], [2]]
+    assert loop.bursts.stats()["backend_calls_saved"] == 0
+
+
+def test_max_wait_releases_a_sender_who_never_pauses(tmp_path):
+    clock = FakeClock()
+    db = ChatDB(str(tmp_path / "chat.db"))
+    loop = PollLoop(str(tmp_path / "chat.db"), clock, window=1.0, max_wait=3.0)
+
+    deadlines = []
+    for i in range(4):
+        db.receive("+1", f"m{i}")
+        loop.poll()
+        deadlines.append(loop.bursts.next_deadline())
+        clock.now += 0.8
+    # Each message re-arms the 1s window until the 3s cap takes over
+    assert deadlines == pytest.approx([1.0, 1.0, 1.0, 0.6])
+    assert loop.submitted == []
+
+    db.receive("+1", "m4")
+    loop.poll()
+    assert [b.rowids for b in loop.submitted] == [[1, 2, 3, 4, 5]]
+    assert loop.bursts.stats()["held"] == 0
+
+
+def test_zero_window_leaves_live_traffic_unchanged(tmp_path):
+    clock = FakeClock()
+    db = ChatDB(str(tmp_path / "chat.db"))
+    loop = PollLoop(str(tmp_path / "chat.db"), clock, window=0)
+
+    for text in ("hey", "quick q", "what time do you close?"):
+        db.receive("+1", text)
+    db.receive("+2", "hello")
+    assert loop.poll() == 4  # nothing held back
+    assert [(b.sender, b.rowids) for b in loop.submitted] == [("+1", [1]), ("+1", [2]), ("+1", [3]), ("+2", [4])]
+    assert loop.bursts.next_deadline() is None
+    stats = loop.bursts.stats()
+    assert stats["batches"] == 4 and stats["backend_calls_saved"] == 0 and stats["held"] == 0
+
+
+def test_zero_window_releases_immediately_and_flush_empties_everything():
+    clock = FakeClock()
+    bursts = BurstCoalescer(0, clock=clock)
+    bursts.add(MessageBatch("+1", [(1, "a", "+1", None)]))
+    assert [b.rowids for b in bursts.ready()] == [[1]]
+
+    bursts = BurstCoalescer(5, clock=clock)
+    bursts.add(MessageBatch("+2", [(7, "b", "+2", None)]))
+    bursts.add(MessageBatch("+1", [(6, "a", "+1", None)]))
+    assert bursts.ready() == []
+    assert [b.rowid for b in bursts.flush()] == [6, 7]
+    assert bursts.next_deadline() is None
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Dispatcher Tests - ordering, concurrency cap and watermark safety
+"""
+import threading
+import time
+
+from dispatcher import ConversationDispatcher
+
+
+def test_order_is_strict_within_a_conversation():
+    seen = []
+
+    def handler(sender, n):
+        time.sleep(0.001 * (5 - n % 5))  # later messages finish faster if run in parallel
+        seen.append((sender, n))
+
+    d = ConversationDispatcher(handler, max_concurrent=4)
+    for n in range(20):
+        d.submit("+1", n + 1, "+1", n)
+    assert d.wait_idle(timeout=5)
+    d.shutdown()
+
+    assert [n for _, n in seen] == list(range(20))
+
+
+def test_conversations_run_concurrently_up_to_the_cap():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def handler(sender):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    d = ConversationDispatcher(handler, max_concurrent=3)
+    start = time.time()
+    for i in range(6):
+        d.submit(f"+{i}", i + 1, f"+{i}")
+    assert d.wait_idle(timeout=5)
+    elapsed = time.time() - start
+    d.shutdown()
+
+    assert peak == 3
+    assert elapsed < 0.25  # two waves of 50ms, not six
+
+
+def test_watermark_stops_below_oldest_unfinished_message():
+    release = threading.Event()
+
+    def handler(sender):
+        if sender == "+slow":
+            release.wait(5)
+
+    d = ConversationDispatcher(handler, max_concurrent=2)
+    d.submit("+slow", 10, "+slow")
+    d.submit("+fast", 11, "+fast")
+    d.submit("+fast", 12, "+fast")
+
+    deadline = time.time() + 5
+    while d.pending_count() > 1 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert d.is_pending(10)
+    assert not d.is_pending(12)
+    assert d.safe_watermark(12) == 9
+
+    release.set()
+    assert d.wait_idle(timeout=5)
+    assert d.safe_watermark(12) == 12
+    d.shutdown()
+
+
+def test_handler_errors_do_not_stall_the_conversation():
+    seen = []
+
+    def handler(n):
+        if n == 0:
+            raise RuntimeError("boom")
+        seen.append(n)
+
+    d = ConversationDispatcher(handler, max_concurrent=1)
+    for n in range(3):
+        d.submit("+1", n + 1, n)
+    assert d.wait_idle(timeout=5)
+    d.shutdown()
+
+    assert seen == [1, 2]
+
+
+def test_release_lets_the_watermark_pass_a_running_handler():
+    release = threading.Event()
+    d = ConversationDispatcher(lambda rid: (d.release(rid), release.wait(5)), max_concurrent=1)
+    d.submit("+1", 10, 10)
+
+    deadline = time.time() + 5
+    while d.safe_watermark(10) != 10 and time.time() < deadline:
+        time.sleep(0.01)
+    assert d.safe_watermark(10) == 10  # handed off while the handler still runs
+    release.set()
+    d.shutdown()
+
+
+def test_tasks_run_in_conversation_order_without_holding_the_watermark():
+    order = []
+    d = ConversationDispatcher(lambda n: order.append(("msg", n)), max_concurrent=2)
+    gate = threading.Event()
+    d.submit_task("+1", lambda: (gate.wait(5), order.append(("task", 0))))
+    d.submit("+1", 5, 5)
+    assert d.safe_watermark(7) == 4  # only the message counts
+    gate.set()
+    assert d.wait_idle(timeout=5)
+    d.shutdown()
+    assert order == [("task", 0), ("msg", 5)]
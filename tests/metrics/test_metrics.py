@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Metrics Tests - sharded counters under contention, histogram buckets,
+Prometheus text exposition
+"""
+import threading
+
+from metrics import MetricsRegistry
+
+
+def test_counter_loses_no_updates_across_threads():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "hits")
+
+    def work():
+        for _ in range(20000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.value == 160000
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    registry = MetricsRegistry(prefix="bridge_")
+    hist = registry.histogram("send_seconds", "send latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value)
+
+    text = registry.render()
+    assert "# TYPE bridge_send_seconds histogram" in text
+    assert 'bridge_send_seconds_bucket{le="0.1"} 2' in text  # le is inclusive
+    assert 'bridge_send_seconds_bucket{le="1"} 3' in text
+    assert 'bridge_send_seconds_bucket{le="+Inf"} 4' in text
+    assert "bridge_send_seconds_sum 3.65" in text
+    assert "bridge_send_seconds_count 4" in text
+
+
+def test_labeled_children_share_one_family_header():
+    registry = MetricsRegistry(prefix="bridge_")
+    typing = registry.counter("script_retries_total", "AppleScript retries", script="typing")
+    tapback = registry.counter("script_retries_total", "AppleScript retries", script="tapback")
+    typing.inc(2)
+    tapback.inc()
+
+    lines = registry.render().splitlines()
+    assert lines.count("# TYPE bridge_script_retries_total counter") == 1
+    assert 'bridge_script_retries_total{script="typing"} 2' in lines
+    assert 'bridge_script_retries_total{script="tapback"} 1' in lines
+
+
+def test_gauges_are_read_at_scrape_time_and_failures_are_skipped():
+    registry = MetricsRegistry()
+    depth = [3]
+    registry.gauge("queue_depth", "depth", lambda: depth[0])
+    registry.gauge("not_ready", "no value yet", lambda: None)
+    registry.gauge("broken", "raises", lambda: 1 / 0)
+
+    assert "queue_depth 3" in registry.render()
+    depth[0] = 7
+    text = registry.render()
+    assert "queue_depth 7" in text
+    assert "\nnot_ready " not in text and "\nbroken " not in text
+    assert "# TYPE broken gauge" in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("c_total", "c", target='a"b\\c').inc()
+    assert 'c_total{target="a\\"b\\\\c"} 1' in registry.render()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tracing Tests - per-message span lifecycle, ring buffer bounds, percentile
+summary, JSON-lines / Chrome trace export and the CLI
+"""
+import json
+
+import pytest
+
+from tracing import Tracer, main, percentile, summarize, to_chrome_trace, to_jsonl
+
+
+def trace_message(tracer, rowid, sent_at, backend_ms, sends_ms):
+    tracer.detected(rowid, sent_at, now=sent_at + 1.0)
+    tracer.started(rowid, now=sent_at + 1.5)
+    t = sent_at + 1.5
+    tracer.record(rowid, "backend", t, t + backend_ms / 1000)
+    t += backend_ms / 1000
+    for index, ms in enumerate(sends_ms, 1):
+        tracer.record(rowid, "send", t, t + ms / 1000, index)
+        t += ms / 1000
+    tracer.finished(rowid, now=t)
+
+
+def test_message_lifecycle_starts_at_the_chat_db_date():
+    tracer = Tracer()
+    trace_message(tracer, 42, 1000.0, backend_ms=800, sends_ms=[300, 200])
+    spans = {(s["stage"], s.get("index")): s["ms"] for s in tracer.spans(trace_id=42)}
+    assert spans == pytest.approx({
+        ("poll_wait", None): 1000, ("queue", None): 500, ("backend", None): 800,
+        ("send", 1): 300, ("send", 2): 200, ("total", None): 2800,
+    })
+    assert tracer.stats()["in_progress"] == 0
+
+
+def test_ring_buffer_keeps_the_newest_spans_and_bounds_open_traces():
+    tracer = Tracer(capacity=3)
+    for rowid in range(5):
+        tracer.record(rowid, "backend", rowid, rowid + 0.1)
+        tracer.detected(rowid, None, now=rowid)
+    assert [s["trace_id"] for s in tracer.spans()] == [2, 3, 4]
+    assert tracer.stats() == {"enabled": True, "capacity": 3, "buffered": 3, "recorded": 5, "in_progress": 3}
+    assert [s["trace_id"] for s in tracer.spans(since=3.05)] == [3, 4]
+
+
+def test_discarded_and_disabled_traces_record_nothing():
+    tracer = Tracer()
+    tracer.detected(1, 10.0, now=11.0)
+    tracer.discard(1)
+    tracer.finished(1, now=12.0)
+    assert [s["stage"] for s in tracer.spans()] == ["poll_wait"]
+
+    off = Tracer(enabled=False)
+    trace_message(off, 1, 10.0, backend_ms=5, sends_ms=[5])
+    assert off.spans() == []
+
+
+def test_summary_sums_bubbles_per_message_and_reports_percentiles():
+    tracer = Tracer()
+    for rowid in range(1, 101):
+        trace_message(tracer, rowid, 1000.0 + rowid, backend_ms=rowid * 10, sends_ms=[100, 100])
+    rows = {r["stage"]: r for r in summarize(tracer.spans())}
+    assert list(rows) == ["poll_wait", "queue", "backend", "send", "total"]
+    assert rows["backend"]["count"] == 100
+    assert (rows["backend"]["p50_ms"], rows["backend"]["p95_ms"], rows["backend"]["p99_ms"]) == (500, 950, 990)
+    assert rows["send"]["p99_ms"] == 200  # two 100ms bubbles per message
+    assert percentile([], 50) == 0.0
+
+
+def test_chrome_trace_has_one_row_per_message():
+    tracer = Tracer()
+    trace_message(tracer, 7, 1000.0, backend_ms=250, sends_ms=[100])
+    events = to_chrome_trace(tracer.spans())["traceEvents"]
+    backend = next(e for e in events if e["name"] == "backend")
+    assert backend["ph"] == "X" and backend["tid"] == 7
+    assert backend["ts"] == 1001.5e6 and backend["dur"] == 250000
+    assert any(e["name"] == "send #1" for e in events)
+
+
+def test_cli_summarizes_and_exports_a_jsonl_file(tmp_path, capsys):
+    tracer = Tracer()
+    trace_message(tracer, 9, 1000.0, backend_ms=250, sends_ms=[100])
+    path = tmp_path / "traces.jsonl"
+    path.write_text(to_jsonl(tracer.spans()))
+
+    assert main(["summary", "--file", str(path)]) == 0
+    out = capsys.readouterr().out
+    assert "backend" in out and "250.0" in out
+
+    assert main(["show", "9", "--file", str(path)]) == 0
+    assert "send #1" in capsys.readouterr().out
+
+    chrome = tmp_path / "trace.json"
+    assert main(["export", "--format", "chrome", "--file", str(path), "-o", str(chrome)]) == 0
+    assert len(json.loads(chrome.read_text())["traceEvents"]) == 5
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Bubble Plan Tests - argv encoding, splitting long replies, parsing the
+script's report, and timing on the fake Messages executor
+"""
+import pytest
+
+from bubble_plan import (FAILED, SCRIPT, SENT, SKIPPED, UNKNOWN, BubblePlan, FakeMessagesExecutor, build_plans,
+                         parse_report, run_plan)
+
+
+def bubbles(*timings):
+    return [{"text": f"bubble {i + 1}", "delay_before": pause, "typing_delay": typing}
+            for i, (pause, typing) in enumerate(timings)]
+
+
+def test_args_are_integer_milliseconds_per_bubble():
+    plan = BubblePlan("+1", bubbles((0.05, 0.8), (0.12, 0.6)) + [{"text": "", "delay_before": 1}])
+    assert plan.args() == ["+1", "600", "50", "800", "bubble 1", "120", "600", "bubble 2"]
+    no_typing = BubblePlan("+1", bubbles((0.05, 0.8)), typing=False)
+    assert no_typing.args() == ["+1", "600", "50", "0", "bubble 1"]
+    assert no_typing.schedule(send_seconds=0.3) == [pytest.approx(0.35)]  # no conversation to open
+
+
+def test_long_replies_are_split_to_fit_the_budget():
+    reply = bubbles(*[(0.1, 1.5)] * 8)
+    plans = build_plans("+1", reply, max_seconds=6.0)  # open 0.85s + 2.24s per bubble
+    assert [len(p) for p in plans] == [2, 2, 2, 2]
+    assert all(p.estimated_seconds() <= 6.0 for p in plans)
+    assert [b["text"] for p in plans for b in p.bubbles] == [b["text"] for b in reply]
+    assert [len(p) for p in build_plans("+1", bubbles((0.1, 20.0)), max_seconds=5.0)] == [1]
+
+
+def test_report_parsing():
+    assert parse_report("1\tsent\n2\tsent\ttyping failed: no access\n3\tfailed\tbuddy offline\n", 4) == [
+        (SENT, ""), (SENT, "typing failed: no access"), (FAILED, "buddy offline"),
+        (UNKNOWN, "not reported by the script")]
+    assert parse_report("ok\n", 1)[0][0] == UNKNOWN
+
+
+def test_one_script_per_plan_with_the_planned_timing():
+    messages = FakeMessagesExecutor(spawn_seconds=0.15, lookup_seconds=0.1, send_seconds=0.3)
+    plan = BubblePlan("+1", bubbles((0.05, 0.8), (0.12, 0.6), (0.1, 0.5)))
+    results = run_plan(plan, lambda args, timeout: messages.run_applescript(SCRIPT, args, timeout), timeout=15)
+
+    assert results == [(SENT, "")] * 3
+    assert [name for name, _ in messages.calls] == ["type_and_send.applescript"]
+    sent_at = [t for t, kind, _, _ in messages.events if kind == "sent"]
+    offset = 0.15 + 0.1  # spawn + buddy lookup happen before the plan's clock starts
+    assert sent_at == pytest.approx([offset + t for t in plan.schedule(send_seconds=0.3)])
+
+
+def test_per_bubble_scripts_cost_two_spawns_and_an_open_each():
+    messages = FakeMessagesExecutor()
+    for bubble in bubbles((0.05, 0.8), (0.12, 0.6), (0.1, 0.5)):
+        messages.run_applescript("show_typing_indicator.applescript", ["+1"])
+        messages.run_applescript("imessage_send.applescript", ["+1", bubble["text"]])
+    assert len(messages.calls) == 6
+    planned = FakeMessagesExecutor()
+    plan = BubblePlan("+1", bubbles((0.05, 0.8), (0.12, 0.6), (0.1, 0.5)))
+    planned.run_applescript(SCRIPT, plan.args())
+    assert planned.now < messages.now
+
+
+def test_a_failed_send_stops_the_plan_and_nothing_is_claimed_after_a_timeout():
+    messages = FakeMessagesExecutor(fail_texts={"bubble 2"})
+    plan = BubblePlan("+1", bubbles((0.0, 0.5), (0.0, 0.5), (0.0, 0.5)))
+    run = lambda args, timeout: messages.run_applescript(SCRIPT, args, timeout)  # noqa: E731
+    assert [s for s, _ in run_plan(plan, run, timeout=15)] == [SENT, FAILED, SKIPPED]
+
+    messages = FakeMessagesExecutor()
+    assert [s for s, _ in run_plan(plan, run, timeout=3.0)] == [UNKNOWN] * 3
+    assert len([e for e in messages.events if e[1] == "sent"]) == 1  # one really went out
+
+    broken = BubblePlan("+1", [])
+    broken.bubbles = [{"text": "x"}]
+    assert run_plan(broken, lambda args, timeout: messages.run_applescript(SCRIPT, args[:3], timeout),
+                    timeout=15)[0][0] == FAILED
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Outbox Tests - idempotent enqueue, retry/backoff, crash recovery without duplicates
+"""
+import pytest
+
+from outbox import FAILED, PENDING, SENT, InDoubt, Outbox
+
+
+class Crash(BaseException):
+    """Simulated process death (not caught by `except Exception`)."""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 3))
+        self.now += seconds
+
+
+def reply(n):
+    return [{"kind": "message", "index": i + 1, "text": f"bubble {i + 1}"} for i in range(n)]
+
+
+def open_box(path, clock=None, **kwargs):
+    clock = clock or FakeClock()
+    return Outbox(str(path), clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_enqueue_is_idempotent_per_inbound_message(tmp_path):
+    box = open_box(tmp_path / "outbox.db")
+    assert box.enqueue(10, "+1", "+1", reply(3)) == 3
+    # Backend replay after a crash before the ack: same message, no new jobs
+    assert box.enqueue(10, "+1", "+1", reply(3)) == 0
+    assert box.enqueue(11, "+1", "+1", reply(1)) == 1
+    assert [j["text"] for j in box.unsent(10)] == ["bubble 1", "bubble 2", "bubble 3"]
+    assert box.unfinished() == [(10, "+1"), (11, "+1")]
+
+
+def test_streamed_reply_is_stored_piece_by_piece(tmp_path):
+    box = open_box(tmp_path / "outbox.db")
+    first, rest = reply(3)[:1], reply(3)[1:]
+    assert box.enqueue(10, "+1", "+1", first) == 1
+    (job,) = box.unsent(10)
+    assert box.deliver(job["id"], lambda: True)
+    assert box.enqueue(10, "+1", "+1", rest, first_seq=1) == 2
+    assert [j["text"] for j in box.unsent(10)] == ["bubble 2", "bubble 3"]
+    # A replay of the whole stream after a crash only adds what was never stored
+    assert box.enqueue(10, "+1", "+1", reply(4)[:1]) == 0
+    assert box.enqueue(10, "+1", "+1", reply(4)[1:], first_seq=1) == 1
+    assert [j["seq"] for j in box.jobs(10)] == [0, 1, 2, 3]
+    assert box.jobs(10)[0]["state"] == SENT
+
+
+def test_failed_send_retries_with_exponential_backoff(tmp_path):
+    clock = FakeClock()
+    box = open_box(tmp_path / "outbox.db", clock, max_attempts=4, backoff_base=2.0)
+    box.enqueue(1, "+1", "+1", reply(1))
+    (job,) = box.unsent(1)
+
+    results = iter([False, False, True])
+    assert box.deliver(job["id"], lambda: next(results)) is True
+    assert clock.sleeps == [2.0, 4.0]
+    (job,) = box.jobs(1)
+    assert job["state"] == SENT and job["attempts"] == 3
+
+
+def test_gives_up_after_max_attempts_and_records_the_error(tmp_path):
+    box = open_box(tmp_path / "outbox.db", max_attempts=2)
+    box.enqueue(1, "+1", "+1", reply(1))
+    (job,) = box.unsent(1)
+
+    def boom():
+        raise RuntimeError("Messages.app not responding")
+
+    assert box.deliver(job["id"], boom) is False
+    (job,) = box.jobs(1)
+    assert job["state"] == FAILED and job["attempts"] == 2
+    assert "not responding" in job["last_error"]
+    assert box.unfinished() == []
+
+
+def test_send_that_times_out_after_delivering_is_not_retried(tmp_path):
+    clock = FakeClock()
+    box = open_box(tmp_path / "outbox.db", clock, max_attempts=3)
+    box.enqueue(1, "+1", "+1", reply(2))
+    first, second = box.unsent(1)
+    delivered = []
+
+    def send_then_time_out():
+        delivered.append("bubble 1")  # Messages.app sent it...
+        raise InDoubt("send script timed out after 10s")  # ...but the script never answered
+
+    assert box.deliver(first["id"], send_then_time_out) is False
+    assert delivered == ["bubble 1"] and clock.sleeps == []
+    job = box.jobs(1)[0]
+    assert job["state"] == FAILED and job["attempts"] == 1
+    assert "not resent to avoid a duplicate" in job["last_error"]
+    assert box.deliver(first["id"], send_then_time_out) is False  # still never resent
+    assert delivered == ["bubble 1"]
+
+    # A clean failure (script exited non-zero) is still retried
+    results = iter([False, True])
+    assert box.deliver(second["id"], lambda: next(results)) is True
+    assert box.jobs(1)[1]["attempts"] == 2
+
+
+def test_delivering_a_finished_job_again_is_a_no_op(tmp_path):
+    box = open_box(tmp_path / "outbox.db")
+    box.enqueue(1, "+1", "+1", reply(1))
+    (job,) = box.unsent(1)
+    sent = []
+    assert box.deliver(job["id"], lambda: sent.append(1) or True)
+    assert box.deliver(job["id"], lambda: sent.append(1) or True)
+    assert sent == [1]
+
+
+def test_batch_delivery_settles_each_job_by_its_outcome(tmp_path):
+    clock = FakeClock()
+    box = open_box(tmp_path / "outbox.db", clock, max_attempts=3, backoff_base=2.0)
+    box.enqueue(1, "+1", "+1", reply(4))
+    ids = [j["id"] for j in box.unsent(1)]
+
+    # sent, failed, not attempted, and one the script never reported on
+    sent = box.deliver_batch(ids, lambda due: {due[0]: True, due[1]: False, due[2]: None})
+    assert sent == [ids[0]]
+    jobs = box.jobs(1)
+    assert [(j["state"], j["attempts"]) for j in jobs] == [(SENT, 1), (PENDING, 1), (PENDING, 0), (FAILED, 1)]
+    assert "in doubt" in jobs[3]["last_error"]
+
+    # bubble 2 is backing off, so nothing after it may jump the queue
+    assert box.deliver_batch(ids, lambda due: pytest.fail("should not be called")) == []
+    clock.now += 2.0
+    assert box.deliver_batch(ids, lambda due: {i: True for i in due}) == ids[1:3]
+
+
+@pytest.mark.parametrize("crash_at", range(4))
+@pytest.mark.parametrize("crash_after_send", [False, True])
+def test_crash_mid_reply_never_duplicates_a_bubble(tmp_path, crash_at, crash_after_send):
+    path = tmp_path / "outbox.db"
+    delivered = []
+
+    def run(box, crash_on=None):
+        for job in box.unsent(1):
+            def send(job=job):
+                if job["index"] == crash_on and not crash_after_send:
+                    raise Crash()
+                delivered.append(job["index"])
+                if job["index"] == crash_on:
+                    raise Crash()  # died after Messages.app took it, before we recorded it
+                return True
+            box.deliver(job["id"], send)
+
+    box = open_box(path)
+    box.enqueue(1, "+1", "+1", reply(4))
+    with pytest.raises(Crash):
+        run(box, crash_on=crash_at + 1)
+    box.close()
+
+    # Restart: the same inbound message may be replayed to the backend too
+    box = open_box(path)
+    in_doubt = box.recover()
+    assert [j["index"] for j in in_doubt] == [crash_at + 1]
+    assert box.enqueue(1, "+1", "+1", reply(4)) == 0
+    assert box.unfinished() == ([(1, "+1")] if crash_at < 3 else [])
+    run(box)
+
+    assert len(delivered) == len(set(delivered)), f"duplicate bubble: {delivered}"
+    expected = [i for i in range(1, 5) if i != crash_at + 1 or crash_after_send]
+    assert delivered == expected
+    states = {j["index"]: j["state"] for j in box.jobs(1)}
+    assert states[crash_at + 1] == FAILED
+    assert all(states[i] == SENT for i in range(1, 5) if i != crash_at + 1)
+
+
+def test_prune_only_removes_old_finished_jobs(tmp_path):
+    clock = FakeClock()
+    box = open_box(tmp_path / "outbox.db", clock)
+    box.enqueue(1, "+1", "+1", reply(2))
+    box.enqueue(2, "+1", "+1", reply(1))
+    first = box.unsent(1)[0]
+    box.deliver(first["id"], lambda: True)
+
+    clock.now += 8 * 86400
+    assert box.prune(7 * 86400) == 1
+    assert [j["state"] for j in box.jobs(1)] == [PENDING]
+    assert box.stats() == {PENDING: 2, "sending": 0, SENT: 0, FAILED: 0}
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Send Job Tests - non-blocking POST /send, per-recipient ordering, 429
+backpressure, and a load test against a real uvicorn server with a fake sender
+"""
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from send_jobs import QueueFull, SendJobQueue, add_send_routes
+
+
+class FakeSender:
+    """Stands in for send_imessage: blocks like the AppleScript does."""
+
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def __call__(self, to, text):
+        time.sleep(self.delay)
+        with self.lock:
+            self.sent.append((to, text))
+        return text not in self.fail
+
+
+def test_jobs_for_one_recipient_run_in_order_and_report_status():
+    sender = FakeSender(delay=0.01, fail={"b2"})
+    jobs = SendJobQueue(sender, max_workers=4)
+    first = jobs.submit("+1", ["a1", "a2"])
+    second = jobs.submit("+1", ["b1", "b2"])
+    third = jobs.submit("+2", ["c1"])
+
+    for job in (first, second, third):
+        assert job.done.wait(2)
+    assert [text for to, text in sender.sent if to == "+1"] == ["a1", "a2", "b1", "b2"]
+    assert (first.status, second.status, third.status) == ("sent", "partial", "sent")
+    status = jobs.get(second.id).to_dict()
+    assert status["sent"] == 1 and [r["ok"] for r in status["results"]] == [True, False]
+    assert jobs.stats()["completed"] == 3
+
+
+def test_submit_raises_queue_full_past_the_limit_and_recovers():
+    gate = threading.Event()
+    jobs = SendJobQueue(lambda to, text: gate.wait(2), max_workers=1, max_queued=2)
+    held = [jobs.submit("+1", ["x"]), jobs.submit("+2", ["y"])]
+    with pytest.raises(QueueFull):
+        jobs.submit("+3", ["z"])
+    assert jobs.stats()["rejected"] == 1 and jobs.retry_after() >= 1
+
+    gate.set()
+    for job in held:
+        assert job.done.wait(2)
+    assert jobs.submit("+3", ["z"]).done.wait(2)
+
+
+def test_finished_jobs_are_trimmed_oldest_first():
+    jobs = SendJobQueue(lambda to, text: True, keep_finished=2)
+    submitted = [jobs.submit("+1", [str(i)]) for i in range(4)]
+    for job in submitted:
+        assert job.done.wait(2)
+    assert [jobs.get(j.id) is not None for j in submitted] == [False, False, True, True]
+
+
+# -----------------------------
+# Load test: real HTTP server
+# -----------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    fastapi = pytest.importorskip("fastapi")
+    uvicorn = pytest.importorskip("uvicorn")
+
+    sender = FakeSender(delay=0.1)
+    jobs = SendJobQueue(sender, max_workers=2, max_queued=20)
+    app = fastapi.FastAPI()
+    add_send_routes(app, jobs)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    port = free_port()
+    srv = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=srv.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not srv.started and time.monotonic() < deadline:
+        time.sleep(0.02)
+    yield f"http://127.0.0.1:{port}", jobs, sender
+    srv.should_exit = True
+    thread.join(5)
+    jobs.shutdown()
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as r:
+            return r.status, dict(r.headers), json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.loads(e.read())
+
+
+def test_concurrent_sends_never_stall_health_and_overflow_gets_429(server):
+    base, jobs, sender = server
+
+    def timed(url, body=None):
+        start = time.perf_counter()
+        result = request(url, body)
+        return result, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        posts = list(pool.map(lambda i: timed(f"{base}/send", {"to": f"+{i % 5}",
+                                                               "messages": [f"receipt {i}", "thanks!"]}),
+                              range(40)))
+        # 20 jobs x 2 messages x 0.1s over 2 workers is ~2s of blocking sends still running
+        health = list(pool.map(lambda _: timed(f"{base}/health"), range(10)))
+    assert jobs.stats()["unfinished"] > 0
+    assert all(r[0] == 200 for r, _ in health)
+
+    accepted = [r for (r, _) in posts if r[0] == 202]
+    rejected = [r for (r, _) in posts if r[0] == 429]
+    assert len(accepted) == 20 and len(rejected) == 20
+    assert all(r[1].get("retry-after") or r[1].get("Retry-After") for r in rejected)
+    assert max(elapsed for _, elapsed in posts) < 1.0  # submit never waits for a send
+    assert max(elapsed for _, elapsed in health) < 1.0
+
+    deadline = time.monotonic() + 10
+    for status, _, body in accepted:
+        while True:
+            code, _, job = request(f"{base}{body['status_url']}")
+            if job["status"] not in ("queued", "running") or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        assert code == 200 and job["status"] == "sent" and job["sent"] == 2
+    assert len(sender.sent) == 40
+    assert request(f"{base}/jobs/nope")[0] == 404
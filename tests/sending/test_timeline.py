@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Bubble Timeline Tests - absolute deadlines, latency absorption, serial sends
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from timeline import BubbleTimeline
+
+
+class FakeClock:
+    """Virtual time: sleep() and the fake scripts advance it instantly."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def run_async(self, fn, *args):
+        # Runs "in parallel": whatever time fn spends doesn't hold up the caller
+        started = self.now
+        future = Future()
+        future.set_result(fn(*args))
+        self.now = started
+        return future
+
+
+class FakeScripts:
+    def __init__(self, clock, typing_latency, send_latency):
+        self.clock = clock
+        self.typing_latency = typing_latency
+        self.send_latency = send_latency
+        self.events = []
+
+    def show_typing(self, target):
+        self.events.append(("typing", target, self.clock.now))
+        self.clock.now += self.typing_latency
+        return True
+
+    def send(self, target, index, bubble):
+        self.events.append(("send", index, self.clock.now))
+        self.clock.now += self.send_latency
+        return True
+
+
+def make_timeline(typing_latency=0.4, send_latency=0.3, typing=True):
+    clock = FakeClock()
+    scripts = FakeScripts(clock, typing_latency, send_latency)
+    timeline = BubbleTimeline(
+        show_typing=scripts.show_typing if typing else None,
+        send=scripts.send,
+        clock=clock,
+        sleep=clock.sleep,
+        run_async=clock.run_async,
+    )
+    return timeline, scripts
+
+
+def bubbles(n, delay_before=1.0, typing_delay=2.0):
+    return [{"text": f"bubble {i}", "delay_before": delay_before, "typing_delay": typing_delay}
+            for i in range(n)]
+
+
+def test_gaps_match_intended_timing_once_latency_is_learned():
+    timeline, _ = make_timeline(typing_latency=0.4, send_latency=0.3)
+    timeline.run("+1555", bubbles(3))  # warm up the latency estimates
+
+    reports = timeline.run("+1555", bubbles(4))
+    for report in reports:
+        assert report["deviation_ms"] == pytest.approx(0, abs=1)
+        assert report["actual_gap_s"] == pytest.approx(report["intended_gap_s"], abs=0.001)
+    # The old serial loop would have added both script latencies to every gap
+    assert reports[-1]["actual_s"] == pytest.approx(4 * 3.0, abs=0.001)
+
+
+def test_first_reply_is_only_late_by_the_unknown_send_latency():
+    timeline, _ = make_timeline(typing_latency=0.4, send_latency=0.3)
+    first, second = timeline.run("+1555", bubbles(2))
+    # Typing latency is absorbed by typing_delay even before it's measured
+    assert first["deviation_ms"] == pytest.approx(300, abs=1)
+    assert second["actual_gap_s"] == pytest.approx(3.0, abs=0.001)
+
+
+def test_send_waits_for_a_slow_typing_indicator_and_keeps_the_next_gap():
+    timeline, scripts = make_timeline(typing_latency=3.0, send_latency=0.0)
+    first, second = timeline.run("+1555", bubbles(2, delay_before=1.0, typing_delay=1.0))
+
+    typing_done = scripts.events[0][2] + 3.0
+    first_send = next(e for e in scripts.events if e[0] == "send")
+    assert first_send[2] >= typing_done
+    assert first["deviation_ms"] == pytest.approx(2000, abs=1)  # typing +1s..+4s vs planned +2s
+    # Re-planned from when bubble 1 actually landed, not squeezed to catch up
+    assert second["actual_gap_s"] >= second["intended_gap_s"] - 0.001
+
+
+def test_sends_are_in_order_and_empty_bubbles_are_skipped():
+    timeline, scripts = make_timeline()
+    plan = bubbles(3)
+    plan.insert(1, {"text": "", "delay_before": 5, "typing_delay": 5})
+    reports = timeline.run("+1555", plan)
+
+    assert [r["message_index"] for r in reports] == [1, 3, 4]
+    sends = [e for e in scripts.events if e[0] == "send"]
+    assert [e[1] for e in sends] == [1, 3, 4]
+    assert [e[2] for e in sends] == sorted(e[2] for e in sends)
+
+
+def test_typing_disabled_ignores_typing_delay():
+    timeline, scripts = make_timeline(send_latency=0.0, typing=False)
+    reports = timeline.run("+1555", bubbles(2, delay_before=0.5, typing_delay=9.0))
+    assert all(e[0] == "send" for e in scripts.events)
+    assert reports[-1]["actual_s"] == pytest.approx(1.0, abs=0.001)
+
+
+def test_typing_runs_concurrently_with_the_wait_on_real_threads():
+    calls = []
+    lock = threading.Lock()
+
+    def show_typing(target):
+        with lock:
+            calls.append(("typing", threading.current_thread().name))
+        time.sleep(0.1)
+        return True
+
+    def send(target, index, bubble):
+        with lock:
+            calls.append(("send", threading.current_thread().name))
+        time.sleep(0.02)
+        return True
+
+    timeline = BubbleTimeline(show_typing=show_typing, send=send)
+    start = time.monotonic()
+    reports = timeline.run("+1555", bubbles(2, delay_before=0.05, typing_delay=0.15))
+    elapsed = time.monotonic() - start
+
+    assert [c[0] for c in calls] == ["typing", "send", "typing", "send"]
+    assert calls[0][1] != threading.current_thread().name  # typing ran off-thread
+    # Serial would be 2 * (0.05 + 0.1 + 0.15 + 0.02) = 0.64s
+    assert elapsed < 0.55
+    assert all(r["ok"] for r in reports)
+
+
+def test_on_span_reports_each_phase_of_a_bubble():
+    timeline, _ = make_timeline(typing_latency=0.4, send_latency=0.3)
+    spans = []
+    timeline.run("+1555", bubbles(1, delay_before=1.0, typing_delay=2.0),
+                 on_span=lambda *span: spans.append(span))
+    assert spans == pytest.approx([
+        ("delay_before", 100.0, 101.0, 1),
+        ("typing", 101.0, 101.4, 1),
+        ("typing_delay", 101.4, 103.0, 1),
+        ("send", 103.0, 103.3, 1),
+    ])
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Legacy Splitter - message_splitter as it was before split_many, kept verbatim
+as the reference the fast implementation must match output-for-output
+"""
+
+import re
+from typing import List
+
+
+def split_into_natural_messages(text: str, max_chars: int = 160) -> List[str]:
+    """
+    Split a long text into natural message bubbles.
+    
+    Args:
+        text: The full text to split
+        max_chars: Guideline for max characters per bubble (not a hard limit)
+    
+    Returns:
+        List of message strings that feel natural
+    
+    Examples:
+        >>> split_into_natural_messages("Great! I can help you with that. Our most popular item is the vanilla latte which comes in three sizes. Would you like to hear about our specials?")
+        [
+            "Great! I can help you with that.",
+            "Our most popular item is the vanilla latte which comes in three sizes.",
+            "Would you like to hear about our specials?"
+        ]
+    """
+    if not text or not text.strip():
+        return []
+    
+    text = text.strip()
+    
+    # If text is short enough, return as-is
+    if len(text) <= max_chars:
+        return [text]
+    
+    # Split into sentences
+    sentences = _split_into_sentences(text)
+    
+    # Group sentences into natural message bubbles
+    messages = []
+    current_bubble = ""
+    
+    for sentence in sentences:
+        # Clean up the sentence
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        
+        # Check if adding this sentence would exceed max_chars
+        would_be_length = len(current_bubble) + len(sentence) + (1 if current_bubble else 0)
+        
+        # Decision logic:
+        # 1. If current bubble is empty, start with this sentence
+        # 2. If adding wouldn't exceed max by much, add it
+        # 3. If sentence ends with question mark, always break after it
+        # 4. If current bubble + sentence is reasonable, group them
+        
+        if not current_bubble:
+            # Start new bubble
+            current_bubble = sentence
+            # If it's a question or short exclamation, send it alone
+            if _is_standalone_sentence(sentence):
+                messages.append(current_bubble)
+                current_bubble = ""
+        elif would_be_length <= max_chars:
+            # Add to current bubble
+            current_bubble += " " + sentence
+            # If this is a question, break after it
+            if sentence.endswith("?"):
+                messages.append(current_bubble)
+                current_bubble = ""
+        elif len(sentence) > max_chars * 1.5:
+            # Sentence itself is too long - break it carefully
+            # First, finish current bubble if any
+            if current_bubble:
+                messages.append(current_bubble)
+                current_bubble = ""
+            # Then split the long sentence (at natural points if possible)
+            long_parts = _split_long_sentence(sentence, max_chars)
+            messages.extend(long_parts)
+        else:
+            # Current bubble + sentence would be too long
+            # Finish current bubble and start new one
+            if current_bubble:
+                messages.append(current_bubble)
+            current_bubble = sentence
+            # If it's a standalone sentence, send it
+            if _is_standalone_sentence(sentence):
+                messages.append(current_bubble)
+                current_bubble = ""
+    
+    # Don't forget the last bubble
+    if current_bubble:
+        messages.append(current_bubble)
+    
+    return messages
+
+
+def _split_into_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences, handling common edge cases.
+    
+    Handles:
+    - Regular sentences ending with . ! ?
+    - Abbreviations (Dr., Mr., etc.)
+    - URLs
+    - Numbers (3.14, etc.)
+    """
+    # Simple but effective sentence splitting
+    # This regex splits on . ! ? followed by space and capital letter
+    # while trying to avoid common abbreviations
+    
+    # Replace common abbreviations temporarily
+    text = text.replace("Mr.", "Mr<DOT>")
+    text = text.replace("Mrs.", "Mrs<DOT>")
+    text = text.replace("Dr.", "Dr<DOT>")
+    text = text.replace("Ms.", "Ms<DOT>")
+    text = text.replace("vs.", "vs<DOT>")
+    
+    # Split on sentence endings
+    pattern = r'([.!?]+[\s]+)'
+    parts = re.split(pattern, text)
+    
+    # Recombine sentences with their punctuation
+    sentences = []
+    for i in range(0, len(parts), 2):
+        sentence = parts[i]
+        if i + 1 < len(parts):
+            sentence += parts[i + 1].rstrip()
+        sentence = sentence.replace("<DOT>", ".")
+        if sentence.strip():
+            sentences.append(sentence.strip())
+    
+    return sentences
+
+
+def _is_standalone_sentence(sentence: str) -> bool:
+    """
+    Check if a sentence should be sent alone (not grouped).
+    
+    Returns True for:
+    - Questions
+    - Short exclamations
+    - Greetings
+    """
+    sentence = sentence.strip()
+    
+    # Questions always standalone
+    if sentence.endswith("?"):
+        return True
+    
+    # Short exclamations (under 30 chars ending with !)
+    if sentence.endswith("!") and len(sentence) < 30:
+        return True
+    
+    # Common short phrases that should be alone
+    short_phrases = ["ok!", "great!", "awesome!", "perfect!", "got it!", "sounds good!"]
+    if sentence.lower() in short_phrases:
+        return True
+    
+    return False
+
+
+def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """
+    Split a sentence that's too long, trying to break at natural points.
+    
+    Prefers to break at:
+    - Commas
+    - Conjunctions (and, but, or)
+    - After parentheses
+    """
+    # If it fits, return as-is
+    if len(sentence) <= max_chars:
+        return [sentence]
+    
+    # Try to split at commas first
+    if "," in sentence:
+        parts = []
+        current = ""
+        for chunk in sentence.split(","):
+            if not current:
+                current = chunk + ","
+            elif len(current) + len(chunk) + 1 < max_chars:
+                current += chunk + ","
+            else:
+                parts.append(current.strip().rstrip(","))
+                current = chunk + ","
+        if current:
+            parts.append(current.strip().rstrip(","))
+        return parts
+    
+    # Fall back to word-based splitting
+    words = sentence.split()
+    parts = []
+    current = ""
+    
+    for word in words:
+        if not current:
+            current = word
+        elif len(current) + len(word) + 1 <= max_chars:
+            current += " " + word
+        else:
+            parts.append(current)
+            current = word
+    
+    if current:
+        parts.append(current)
+    
+    return parts
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Message Splitter Tests - split_many / the fast tokenizer against the original
+implementation (legacy_splitter.py) on seeded random replies, plus the edge
+cases that matter: abbreviations, punctuation runs, odd whitespace
+"""
+import random
+
+import pytest
+
+import legacy_splitter
+from message_splitter import split_into_natural_messages, split_many
+
+# Fragments picked to hit every branch: abbreviations (and near misses),
+# runs of . ! ?, the old <DOT> marker, commas for the long-sentence split,
+# unicode whitespace, words longer than a bubble
+FRAGMENTS = [
+    "hey", "latte", "three sizes", "Mr.", "Mrs.", "Dr.", "Ms.", "vs.", "Mr", "vs", "Dr.!", "HMr.",
+    "<DOT>", "<DO", "T>", ".", "!", "?", "...", "?!", "!.", ",", ",,", "$5.50", "3.14",
+    "https://example.com/a.b", " ", " ", " ", "  ", "\n", "\t", " ", " ", "\x1c",
+    "😀", "x" * 45, "Would you like that?", "Great!", "ok!", "SOUNDS GOOD!", "Mrs. Smith is here.",
+]
+
+
+def random_reply(rng: random.Random) -> str:
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 90)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_the_original_on_random_replies(seed):
+    rng = random.Random(seed)
+    for _ in range(4000):
+        text = random_reply(rng)
+        max_chars = rng.choice([1, 10, 30, 80, 160, 320])
+        expected = legacy_splitter.split_into_natural_messages(text, max_chars)
+        assert split_into_natural_messages(text, max_chars) == expected, (text, max_chars)
+        assert split_many([text], max_chars) == [expected], (text, max_chars)
+
+
+def test_batch_matches_one_call_per_reply():
+    rng = random.Random(99)
+    texts = [random_reply(rng) for _ in range(500)] + ["", "   ", None]
+    assert split_many(texts, 60) == [legacy_splitter.split_into_natural_messages(t, 60) for t in texts]
+
+
+@pytest.mark.parametrize("text", [
+    "Dr. Patel will see you now and Mrs. Lee too. She says hi vs. last week when she was busy. Ok?",
+    "Mr.. Hello there friend. " * 6,
+    "Wait what?!? Really... I had no idea!! Tell me more about the thing, the other thing, and so on. " * 3,
+    "Meet at 3.14 p.m. sharp. Dr. Who is coming. Literally <DOT> here. " * 3,
+    "word " * 80,
+    "a, " * 120,
+])
+def test_edge_cases(text):
+    for max_chars in (20, 60, 160):
+        assert split_into_natural_messages(text, max_chars) == \
+            legacy_splitter.split_into_natural_messages(text, max_chars)
+
+
+def test_abbreviations_do_not_end_a_sentence():
+    text = ("Dr. Patel can see you at three. Mr. Alvarez asked about oat vs. almond milk too. "
+            "Would you like the corner table?")
+    assert split_into_natural_messages(text, max_chars=40) == [
+        "Dr. Patel can see you at three.",
+        "Mr. Alvarez asked about oat vs. almond milk too.",
+        "Would you like the corner table?",
+    ]
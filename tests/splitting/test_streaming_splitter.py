@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Streaming Splitter Tests - StreamingSplitter / split_stream must give the
+same bubbles as split_into_natural_messages on the whole text, wherever the
+chunk boundaries fall, and must hand each bubble out as soon as it's final
+"""
+import random
+
+import pytest
+
+from message_splitter import StreamingSplitter, split_into_natural_messages, split_stream
+from test_message_splitter import random_reply
+
+
+def random_chunks(rng: random.Random, text: str):
+    """Cut text at random points: single characters, token-sized pieces, the odd empty chunk."""
+    chunks, i = [], 0
+    while i < len(text):
+        n = rng.choice([0, 1, 1, 2, 3, 4, 7, 20])
+        chunks.append(text[i:i + n])
+        i += n
+    return chunks
+
+
+def stream(chunks, max_chars):
+    """(bubbles, number of chunks fed when each bubble came out)"""
+    splitter = StreamingSplitter(max_chars)
+    bubbles, fed = [], []
+    for i, chunk in enumerate(chunks, 1):
+        for bubble in splitter.feed(chunk):
+            bubbles.append(bubble)
+            fed.append(i)
+    bubbles += splitter.finish()
+    return bubbles, fed
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_the_batch_splitter_for_any_chunking(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        text = random_reply(rng)
+        max_chars = rng.choice([1, 10, 30, 80, 160, 320])
+        expected = split_into_natural_messages(text, max_chars)
+        chunks = random_chunks(rng, text)
+        assert stream(chunks, max_chars)[0] == expected, (chunks, max_chars)
+        assert list(split_stream(iter(chunks), max_chars)) == expected, (chunks, max_chars)
+
+
+def test_one_character_at_a_time():
+    rng = random.Random(42)
+    for _ in range(500):
+        text = random_reply(rng)
+        assert stream(list(text), 30)[0] == split_into_natural_messages(text, 30), text
+
+
+def test_bubbles_go_out_before_the_stream_ends():
+    text = ("Great! I can help you with that. Our most popular item is the vanilla latte "
+            "which comes in three sizes. Would you like to hear about our specials? "
+            "We also have a seasonal pumpkin bread that people love.")
+    chunks = [text[i:i + 4] for i in range(0, len(text), 4)]
+    bubbles, fed = stream(chunks, 80)
+
+    assert bubbles == split_into_natural_messages(text, 80)
+    assert len(bubbles) == 5
+    # nothing until the text passes max_chars; then each sentence is final at the
+    # first character of the next one, and a bubble goes out when a sentence closes it
+    past_max = 80 // 4 + 1
+    would, we_also = text.index("Would") // 4 + 1, text.index("We also") // 4 + 1
+    assert fed == [past_max, would, we_also, we_also]  # the last bubble waits for finish()
+
+
+def test_short_reply_is_held_until_finish():
+    splitter = StreamingSplitter(160)
+    assert splitter.feed("  Hey! ") == []
+    assert splitter.feed("How are you?  \n") == []
+    assert splitter.finish() == ["Hey! How are you?"]
+    assert splitter.finish() == []
+    with pytest.raises(ValueError):
+        splitter.feed("more")
+
+
+def test_sentence_end_split_across_chunks():
+    # the ending, the abbreviation and the placeholder all straddle chunk boundaries
+    text = "Ask Dr" + ". Patel about it." + "." + ". " + "Sure <D" + "OT> thing! " * 6 + "Done?"
+    chunks = ["Ask Dr", ".", " Patel about it.", ".", ".", " ", "Sure <D", "OT> thing! " * 6, "Done?"]
+    assert "".join(chunks) == text
+    assert stream(chunks, 20)[0] == split_into_natural_messages(text, 20)
+
+
+def test_empty_streams():
+    assert list(split_stream([])) == []
+    assert list(split_stream(["", "  ", "\n"])) == []
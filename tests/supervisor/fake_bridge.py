@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Fake bridge worker for supervisor tests: reads its CHAT_DB like the bridge,
+holds its LOCK_FILE, and serves /health on HTTP_PORT.
+
+FAKE_CRASH_ONCE=1 exits with status 3 on the first start (a marker file in
+the state dir remembers it).
+"""
+import fcntl
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from chat_reader import ChatDBReader  # noqa: E402
+
+state_dir = os.environ["BRIDGE_STATE_DIR"]
+marker = os.path.join(state_dir, "crashed_once")
+if os.environ.get("FAKE_CRASH_ONCE") and not os.path.exists(marker):
+    open(marker, "w").close()
+    sys.exit(3)
+
+lock = open(os.path.join(state_dir, "bridge.lock"), "w")
+fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+rows = ChatDBReader(os.environ["CHAT_DB"], "SELECT ROWID, text FROM message WHERE ROWID > ?").fetch_after(0)
+with open(os.path.join(state_dir, "last_rowid.state"), "w") as f:
+    f.write(str(rows[-1][0] if rows else 0))
+
+
+class Health(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({
+            "status": "ok",
+            "worker": os.environ["BRIDGE_WORKER"],
+            "chat_db": os.environ["CHAT_DB"],
+            "api_url": os.environ.get("SF_API_URL"),
+            "env_file": os.environ.get("ENV_FILE"),
+            "poll": {"polls": 1, "rows": len(rows), "avg_interval_s": 0.5},
+            "burst": {"messages": len(rows), "batches": 1, "backend_calls_saved": len(rows) - 1},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+HTTPServer(("127.0.0.1", int(os.environ["HTTP_PORT"])), Health).serve_forever()
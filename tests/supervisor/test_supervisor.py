@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Supervisor Tests - config validation, per-worker isolation, restarts and
+aggregated health, using fake workers over several synthetic chat.db files
+"""
+import json
+import socket
+import sqlite3
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from supervisor import ConfigError, Supervisor, load_config, relabel_metrics, worker_env
+
+FAKE_BRIDGE = str(Path(__file__).parent / "fake_bridge.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_chat_db(path, messages):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE message (ROWID INTEGER PRIMARY KEY, text TEXT)")
+    conn.executemany("INSERT INTO message (text) VALUES (?)", [(f"m{i}",) for i in range(messages)])
+    conn.commit()
+    conn.close()
+
+
+def write_config(tmp_path, workers, env="SF_API_URL=http://backend\nSF_API_KEY=secret\n", **extra):
+    (tmp_path / ".env").write_text(env)
+    path = tmp_path / "workers.json"
+    path.write_text(json.dumps({"env_file": ".env", "workers": workers, **extra}))
+    return str(path)
+
+
+def setup_workers(tmp_path, counts, **worker_extra):
+    workers = []
+    for i, count in enumerate(counts):
+        db = tmp_path / f"chat{i}.db"
+        make_chat_db(str(db), count)
+        workers.append({"name": f"w{i}", "chat_db": str(db), "state_dir": f"state/w{i}",
+                        "http_port": free_port(), **worker_extra})
+    return load_config(write_config(tmp_path, workers, health_port=free_port()))
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_load_config_resolves_paths_relative_to_the_workers_file(tmp_path):
+    env_file, shared, _, specs = setup_workers(tmp_path, [1, 2])
+    assert env_file == str(tmp_path / ".env")
+    assert shared["SF_API_KEY"] == "secret"
+    assert [s.state_dir for s in specs] == [str(tmp_path / "state/w0"), str(tmp_path / "state/w1")]
+
+
+@pytest.mark.parametrize("workers, message", [
+    ([{"name": "a", "chat_db": "x.db", "http_port": 4001},
+      {"name": "b", "chat_db": "x.db", "http_port": 4002}], "chat_db"),
+    ([{"name": "a", "chat_db": "x.db", "http_port": 4001},
+      {"name": "b", "chat_db": "y.db", "http_port": 4001}], "http_port"),
+    ([{"name": "a", "chat_db": "x.db", "state_dir": "s"},
+      {"name": "b", "chat_db": "y.db", "state_dir": "s"}], "state_dir"),
+    ([{"name": "a", "chat_db": "x.db", "env": {"HTTP_PORT": "9"}}], "HTTP_PORT"),
+    ([{"name": "a"}], "chat_db"),
+    ([], "no workers"),
+])
+def test_load_config_rejects_shared_per_worker_resources(tmp_path, workers, message):
+    with pytest.raises(ConfigError, match=message):
+        load_config(write_config(tmp_path, workers))
+
+
+def test_shared_env_may_not_pin_per_worker_keys(tmp_path):
+    path = write_config(tmp_path, [{"name": "a", "chat_db": "x.db"}],
+                        env="SF_API_URL=u\nSF_API_KEY=k\nCHAT_DB=/tmp/one.db\n")
+    with pytest.raises(ConfigError, match="CHAT_DB"):
+        load_config(path)
+
+
+def test_worker_env_layers_identity_over_shared_config(tmp_path):
+    env_file, shared, _, specs = setup_workers(tmp_path, [1], env={"MAX_CONCURRENT_CONVERSATIONS": "2"})
+    env = worker_env(specs[0], env_file, shared, base={"PATH": "/bin", "CHAT_DB": "/inherited.db"})
+    assert env["CHAT_DB"] == specs[0].chat_db
+    assert env["BRIDGE_STATE_DIR"] == specs[0].state_dir
+    assert env["HTTP_PORT"] == str(specs[0].http_port)
+    assert env["ENV_FILE"] == env_file and env["SF_API_KEY"] == "secret"
+    assert env["MAX_CONCURRENT_CONVERSATIONS"] == "2" and env["PATH"] == "/bin"
+
+
+def test_runs_one_isolated_worker_per_database_with_aggregated_health(tmp_path):
+    env_file, shared, health_port, specs = setup_workers(tmp_path, [3, 5, 7])
+    sup = Supervisor(specs, env_file, shared, command=[sys.executable, FAKE_BRIDGE])
+    sup.serve_health(health_port)
+    sup.start()
+    try:
+        assert wait_for(lambda: sup.health()["workers_up"] == 3)
+        with urllib.request.urlopen(f"http://127.0.0.1:{health_port}/health", timeout=5) as r:
+            health = json.loads(r.read())
+        assert health["status"] == "ok"
+        assert health["totals"]["poll"]["rows"] == 15
+        assert health["totals"]["burst"]["backend_calls_saved"] == 12
+        by_name = {w["name"]: w for w in health["workers"]}
+        for i, spec in enumerate(specs):
+            own = by_name[spec.name]["health"]
+            assert own["chat_db"] == spec.chat_db
+            assert own["env_file"] == env_file and own["api_url"] == "http://backend"
+            # State and lock land in the worker's own directory
+            assert (Path(spec.state_dir) / "last_rowid.state").read_text() == str([3, 5, 7][i])
+            assert (Path(spec.state_dir) / "bridge.lock").exists()
+        assert len({w["pid"] for w in health["workers"]}) == 3
+    finally:
+        sup.stop(timeout=5)
+    assert not any(w["alive"] for w in sup.status())
+
+
+def test_crashed_worker_is_restarted_without_touching_the_others(tmp_path):
+    env_file, shared, _, specs = setup_workers(tmp_path, [1, 2])
+    specs[1].env["FAKE_CRASH_ONCE"] = "1"
+    sup = Supervisor(specs, env_file, shared, command=[sys.executable, FAKE_BRIDGE], restart_base=0.1)
+    sup.start()
+    try:
+        first_pid = sup.status()[0]["pid"]
+        assert wait_for(lambda: (sup.check(), sup.status()[1]["restarts"] == 1)[1])
+        assert wait_for(lambda: sup.health()["workers_up"] == 2)
+        status = sup.status()
+        assert status[1]["last_exit"] == 3
+        assert status[0]["pid"] == first_pid and status[0]["restarts"] == 0
+    finally:
+        sup.stop(timeout=5)
+
+
+def test_health_reports_degraded_when_a_worker_is_down(tmp_path):
+    env_file, shared, _, specs = setup_workers(tmp_path, [1, 1])
+    sup = Supervisor(specs, env_file, shared, command=[sys.executable, FAKE_BRIDGE], restart_base=60)
+    sup.start()
+    try:
+        assert wait_for(lambda: sup.health()["workers_up"] == 2)
+        sup.workers[0].process.kill()
+        sup.workers[0].process.wait()
+        sup.check()
+        health = sup.health()
+        assert health["status"] == "degraded" and health["workers_up"] == 1
+        assert health["workers"][0]["alive"] is False
+    finally:
+        sup.stop(timeout=5)
+
+
+def test_metrics_are_merged_per_family_with_a_worker_label():
+    families = {}
+    relabel_metrics('# HELP bridge_inbound_total x\n# TYPE bridge_inbound_total counter\n'
+                    'bridge_inbound_total 3\n# TYPE bridge_send_seconds histogram\n'
+                    'bridge_send_seconds_bucket{le="1"} 2\nbridge_send_seconds_sum 0.5\n', "main", families)
+    relabel_metrics('# HELP bridge_inbound_total x\n# TYPE bridge_inbound_total counter\n'
+                    'bridge_inbound_total 5\n', "support", families)
+    assert families["bridge_inbound_total"] == [
+        "# HELP bridge_inbound_total x", "# TYPE bridge_inbound_total counter",
+        'bridge_inbound_total{worker="main"} 3', 'bridge_inbound_total{worker="support"} 5',
+    ]
+    assert families["bridge_send_seconds"][1:] == [
+        'bridge_send_seconds_bucket{worker="main",le="1"} 2', 'bridge_send_seconds_sum{worker="main"} 0.5',
+    ]
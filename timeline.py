@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Timeline - Schedule reply bubbles against absolute deadlines
+
+`handle_structured_response` used to run, per bubble: sleep(delay_before),
+blocking typing-indicator script, sleep(typing_delay), blocking send script.
+Every AppleScript's latency was added on top of the intended human timing, so
+a reply planned as 1.5s + 2s gaps actually arrived as 1.5s + 0.8s + 2s + 0.6s.
+
+The timeline plans when each bubble should land, then works backwards:
+
+    deliver[i]   = deliver[i-1] + delay_before[i] + typing_delay[i]
+    typing  [i]  fired async at  deliver[i] - typing_delay[i] - est_typing_latency
+    send    [i]  fired at        deliver[i] - est_send_latency   (blocking, in order)
+
+Key principles:
+- Sends stay strictly serial and never start before that bubble's typing
+  indicator finished (the two scripts fight over the Messages window)
+- Latency estimates are a running average of what the scripts really took
+- If a send lands late, the next bubble is planned from when it actually
+  landed, so the gap the recipient sees is still the intended one (no
+  burst of catch-up bubbles)
+- Intended vs actual time is reported for every bubble, and the phases
+  (pause, typing script, typing delay, send script) can be traced as spans
+- Clock, sleep and the async runner are injectable for tests
+"""
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class BubbleTimeline:
+    """
+    Plays a list of bubbles with human timing, absorbing automation latency.
+
+    Example:
+        >>> timeline = BubbleTimeline(show_typing=show_typing_indicator, send=send_bubble)
+        >>> timeline.run("+15551234567", [
+        ...     {"text": "hey!", "delay_before": 0.5, "typing_delay": 1.2, "effect": "none"},
+        ...     {"text": "what's up", "delay_before": 0.8, "typing_delay": 1.6, "effect": "none"},
+        ... ])
+    """
+
+    def __init__(self, show_typing: Optional[Callable[[str], bool]],
+                 send: Callable[[str, int, Dict], bool],
+                 on_bubble: Optional[Callable[[Dict], None]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 run_async: Optional[Callable[..., Future]] = None,
+                 latency_alpha: float = 0.3):
+        """
+        Args:
+            show_typing: shows the typing indicator for a target (None = typing disabled)
+            send: sends one bubble (target, 1-based index, bubble dict) and returns success
+            on_bubble: called with each bubble's timing report as soon as it's sent
+            run_async: submit(fn, *args) -> Future, for the typing indicator
+            latency_alpha: weight of the newest sample in the latency estimates
+        """
+        self.show_typing = show_typing
+        self.send = send
+        self.on_bubble = on_bubble
+        self.clock = clock
+        self.sleep = sleep
+        self.latency_alpha = latency_alpha
+        if run_async is None:
+            self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="typing")
+            run_async = self._pool.submit
+        self.run_async = run_async
+
+        # Running estimates of how long each script takes, in seconds
+        self.typing_latency = 0.0
+        self.send_latency = 0.0
+
+    def _update(self, name: str, sample: float):
+        current = getattr(self, name)
+        setattr(self, name, sample if current == 0.0 else
+                current + self.latency_alpha * (sample - current))
+
+    def _sleep_until(self, deadline: float):
+        remaining = deadline - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+
+    def _timed_typing(self, target: str):
+        start = self.clock()
+        ok = self.show_typing(target)
+        end = self.clock()
+        return ok, start, end
+
+    def run(self, target: str, bubbles: List[Dict],
+            on_span: Optional[Callable[[str, float, float, int], None]] = None) -> List[Dict]:
+        """
+        Send the bubbles in order. Each needs "text" and numeric "delay_before" /
+        "typing_delay"; bubbles with empty text are skipped.
+
+        on_span(stage, start, end, index) is called per bubble for delay_before,
+        typing, typing_delay and send, with times from the timeline's clock.
+
+        Returns:
+            One timing report per sent bubble (times in seconds from the start)
+        """
+        anchor = self.clock()
+        deliver = anchor
+        last_sent = None
+        reports = []
+
+        for i, bubble in enumerate(bubbles):
+            if not bubble.get("text"):
+                continue
+            delay_before = max(0.0, float(bubble.get("delay_before") or 0.0))
+            typing_delay = max(0.0, float(bubble.get("typing_delay") or 0.0)) if self.show_typing else 0.0
+
+            deliver += delay_before + typing_delay
+            typing_at = deliver - typing_delay
+
+            typing = None
+            if self.show_typing:
+                self._sleep_until(typing_at - self.typing_latency)
+                typing = self.run_async(self._timed_typing, target)
+
+            self._sleep_until(deliver - self.send_latency)
+
+            typing_ms = None
+            typing_start = typing_end = None
+            if typing is not None:
+                # Never send over a typing script that's still driving the window
+                _, typing_start, typing_end = typing.result()
+                self._sleep_until(typing_end)
+                self._update("typing_latency", typing_end - typing_start)
+                typing_ms = round((typing_end - typing_start) * 1000, 1)
+
+            send_start = self.clock()
+            ok = self.send(target, i + 1, bubble)
+            sent = self.clock()
+            self._update("send_latency", sent - send_start)
+
+            if on_span:
+                previous = last_sent if last_sent is not None else anchor
+                if typing_start is not None:
+                    on_span("delay_before", previous, typing_start, i + 1)
+                    on_span("typing", typing_start, typing_end, i + 1)
+                    on_span("typing_delay", typing_end, send_start, i + 1)
+                else:
+                    on_span("delay_before", previous, send_start, i + 1)
+                on_span("send", send_start, sent, i + 1)
+
+            report = {
+                "message_index": i + 1,
+                "intended_s": round(deliver - anchor, 3),
+                "actual_s": round(sent - anchor, 3),
+                "deviation_ms": round((sent - deliver) * 1000, 1),
+                "intended_gap_s": round(delay_before + typing_delay, 3),
+                "actual_gap_s": round(sent - (last_sent if last_sent is not None else anchor), 3),
+                "typing_ms": typing_ms,
+                "send_ms": round((sent - send_start) * 1000, 1),
+                "ok": ok,
+            }
+            reports.append(report)
+            if self.on_bubble:
+                self.on_bubble(report)
+
+            last_sent = sent
+            # Landed late: plan the next bubble from now so its gap isn't squeezed
+            deliver = max(deliver, sent)
+
+        return reports
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Tracing - Per-message latency spans from chat.db insert to the last bubble
+
+"Why did this reply take 9 seconds?" used to mean lining up log lines by hand:
+the time is spread over the poll wait, the burst/queue wait, call_sf, the
+tapback, and per bubble the pause, the typing script, the typing delay and
+the send script. The bridge now records one span per stage, keyed by the
+message's (anchor) ROWID, and this module exports them and summarizes them.
+
+Stages (in order):
+    poll_wait     chat.db `date` of the message -> the poll that read it
+    queue         read -> a conversation worker picked it up (burst window + backlog)
+    backend       call_sf
+    tapback_delay / tapback
+    delay_before  per bubble: previous bubble (or reply start) -> typing starts
+    typing        per bubble: the typing-indicator script
+    typing_delay  per bubble: typing script done -> send starts
+    send          per bubble: the send script
+    type_and_send one script for several bubbles (TYPE_AND_SEND=true) instead
+                  of the four per-bubble stages
+    total         chat.db `date` -> last bubble delivered
+
+Usage:
+    python3 tracing.py summary --window 3600         # p50/p95/p99 per stage (from the bridge)
+    python3 tracing.py summary --file traces.jsonl
+    python3 tracing.py show 4211                     # one message's spans
+    python3 tracing.py export --format chrome -o trace.json   # open in chrome://tracing / Perfetto
+
+Key principles:
+- Spans are plain tuples in a fixed-size ring buffer (collections.deque), so
+  memory is bounded and recording is one append
+- Times are unix seconds; chat.db's `date` is the true start, and monotonic
+  timestamps (the bubble timeline) are converted with a fixed offset
+- A coalesced batch is traced under its anchor ROWID, with every ROWID in
+  the span attributes
+- Export as JSON lines (one span per line) or the Chrome trace event format
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+STAGES = ("poll_wait", "queue", "backend", "tapback_delay", "tapback",
+          "delay_before", "typing", "typing_delay", "send", "type_and_send", "total")
+
+# (trace_id, stage, start, end, bubble index or None, attrs or None)
+Span = Tuple[int, str, float, float, Optional[int], Optional[Dict]]
+
+
+class Tracer:
+    """
+    Ring buffer of stage spans keyed by ROWID.
+
+    Example:
+        >>> tracer = Tracer(capacity=20000)
+        >>> tracer.detected(rowid, sent_at)          # poll read it
+        >>> tracer.started(rowid)                    # worker picked it up
+        >>> with tracer.span(rowid, "backend"): call_sf(...)
+        >>> tracer.finished(rowid)                   # last bubble delivered
+        >>> tracer.spans(since=time.time() - 3600)
+    """
+
+    def __init__(self, capacity: int = 20000, enabled: bool = True):
+        self.enabled = enabled
+        self.capacity = capacity
+        self._spans: Deque[Span] = deque(maxlen=max(1, capacity))
+        # trace_id -> (origin, detected_at) for traces still in progress
+        self._open: Dict[int, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._mono_offset = time.time() - time.monotonic()
+        self.recorded = 0
+
+    def wall(self, monotonic_time: float) -> float:
+        """A time.monotonic() reading as unix seconds."""
+        return monotonic_time + self._mono_offset
+
+    def record(self, trace_id: int, stage: str, start: float, end: float,
+               index: Optional[int] = None, **attrs) -> None:
+        """Append one span (unix seconds)."""
+        if not self.enabled:
+            return
+        span = (trace_id, stage, start, max(start, end), index, attrs or None)
+        with self._lock:
+            self._spans.append(span)
+            self.recorded += 1
+
+    @contextmanager
+    def span(self, trace_id: int, stage: str, index: Optional[int] = None, **attrs):
+        """Time the enclosed block as one span."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(trace_id, stage, start, time.time(), index, **attrs)
+
+    def detected(self, trace_id: int, sent_at: Optional[float], now: Optional[float] = None) -> None:
+        """The poll read this message: poll_wait from its chat.db date (if known)."""
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        origin = now if sent_at is None else min(sent_at, now)
+        if sent_at is not None:
+            self.record(trace_id, "poll_wait", origin, now)
+        with self._lock:
+            self._open[trace_id] = (origin, now)
+            while len(self._open) > self.capacity:
+                del self._open[next(iter(self._open))]  # oldest never finished (e.g. crashed)
+
+    def started(self, trace_id: int, now: Optional[float] = None, **attrs) -> None:
+        """A conversation worker picked the message up: queue span since detection."""
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            opened = self._open.get(trace_id)
+        if opened is not None:
+            self.record(trace_id, "queue", opened[1], now, **attrs)
+
+    def finished(self, trace_id: int, now: Optional[float] = None, **attrs) -> None:
+        """Reply done (or nothing to send): total span from the chat.db date."""
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            opened = self._open.pop(trace_id, None)
+        if opened is not None:
+            self.record(trace_id, "total", opened[0], now, **attrs)
+
+    def discard(self, trace_id: int) -> None:
+        """Forget an in-progress trace (skipped or to be retried later)."""
+        with self._lock:
+            self._open.pop(trace_id, None)
+
+    def spans(self, since: Optional[float] = None, until: Optional[float] = None,
+              trace_id: Optional[int] = None) -> List[Dict]:
+        """Recorded spans as dicts, oldest first, optionally filtered by end time / trace."""
+        with self._lock:
+            raw = list(self._spans)
+        return [to_dict(s) for s in raw
+                if (since is None or s[3] >= since) and (until is None or s[3] <= until)
+                and (trace_id is None or s[0] == trace_id)]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"enabled": self.enabled, "capacity": self.capacity, "buffered": len(self._spans),
+                    "recorded": self.recorded, "in_progress": len(self._open)}
+
+
+def to_dict(span: Span) -> Dict:
+    trace_id, stage, start, end, index, attrs = span
+    out = {"trace_id": trace_id, "stage": stage, "start": round(start, 6), "end": round(end, 6),
+           "ms": round((end - start) * 1000, 3)}
+    if index is not None:
+        out["index"] = index
+    if attrs:
+        out["attrs"] = attrs
+    return out
+
+
+def to_jsonl(spans: Iterable[Dict]) -> str:
+    return "".join(json.dumps(s, separators=(",", ":")) + "\n" for s in spans)
+
+
+def to_chrome_trace(spans: Iterable[Dict]) -> Dict:
+    """Chrome trace event format: one row (tid) per message, one complete event per span."""
+    events = []
+    for s in spans:
+        name = s["stage"] if s.get("index") is None else f"{s['stage']} #{s['index']}"
+        events.append({
+            "name": name, "cat": s["stage"], "ph": "X", "pid": 1, "tid": s["trace_id"],
+            "ts": round(s["start"] * 1e6), "dur": max(0, round((s["end"] - s["start"]) * 1e6)),
+            "args": dict(s.get("attrs") or {}, trace_id=s["trace_id"]),
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(min(rank, len(sorted_values))) - 1]
+
+
+def summarize(spans: Iterable[Dict]) -> List[Dict]:
+    """
+    Per-stage latency over the spans, bubbles of one message summed into one
+    sample per stage (so "send" is all of a reply's sends).
+
+    Returns:
+        [{"stage", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"}] in pipeline order
+    """
+    per_trace: Dict[Tuple[str, int], float] = {}
+    for s in spans:
+        key = (s["stage"], s["trace_id"])
+        per_trace[key] = per_trace.get(key, 0.0) + s["ms"]
+    by_stage: Dict[str, List[float]] = {}
+    for (stage, _), ms in per_trace.items():
+        by_stage.setdefault(stage, []).append(ms)
+
+    order = list(STAGES) + sorted(set(by_stage) - set(STAGES))
+    rows = []
+    for stage in order:
+        values = sorted(by_stage.get(stage, []))
+        if not values:
+            continue
+        rows.append({
+            "stage": stage,
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "max_ms": round(values[-1], 1),
+        })
+    return rows
+
+
+def load_spans(url: Optional[str], path: Optional[str], since: Optional[float]) -> List[Dict]:
+    """Spans from a JSON-lines file or a running bridge's GET /traces."""
+    if path:
+        with open(path) as f:
+            spans = [json.loads(line) for line in f if line.strip()]
+    else:
+        query = f"?since={since}" if since is not None else ""
+        with urllib.request.urlopen(f"{url.rstrip('/')}/traces{query}", timeout=10) as r:
+            spans = [json.loads(line) for line in r.read().decode().splitlines() if line.strip()]
+    if since is not None:
+        spans = [s for s in spans if s["end"] >= since]
+    return spans
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-message latency traces from the bridge")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("summary", "show", "export"):
+        p = sub.add_parser(name)
+        p.add_argument("--url", default="http://127.0.0.1:3001", help="bridge HTTP server")
+        p.add_argument("--file", help="read spans from a JSON-lines export instead")
+        p.add_argument("--window", type=float, help="only spans that ended in the last N seconds")
+        if name == "show":
+            p.add_argument("rowid", type=int)
+        if name == "export":
+            p.add_argument("--format", choices=("jsonl", "chrome"), default="jsonl")
+            p.add_argument("-o", "--output", help="file to write (default stdout)")
+    args = parser.parse_args(argv)
+
+    since = time.time() - args.window if args.window else None
+    spans = load_spans(args.url, args.file, since)
+
+    if args.command == "summary":
+        rows = summarize(spans)
+        if not rows:
+            print("No spans recorded in that window")
+            return 0
+        print(f"{'stage':<14}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+        for row in rows:
+            print(f"{row['stage']:<14}{row['count']:>7}{row['p50_ms']:>11.1f}{row['p95_ms']:>11.1f}"
+                  f"{row['p99_ms']:>11.1f}{row['max_ms']:>11.1f}")
+        return 0
+
+    if args.command == "show":
+        trace = sorted((s for s in spans if s["trace_id"] == args.rowid), key=lambda s: (s["start"], s["end"]))
+        if not trace:
+            print(f"No spans for ROWID {args.rowid}")
+            return 1
+        origin = min(s["start"] for s in trace)
+        for s in trace:
+            label = s["stage"] if s.get("index") is None else f"{s['stage']} #{s['index']}"
+            print(f"+{(s['start'] - origin) * 1000:>9.1f}ms  {label:<16}{s['ms']:>10.1f}ms")
+        return 0
+
+    output = to_jsonl(spans) if args.format == "jsonl" else json.dumps(to_chrome_trace(spans))
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Wrote {len(spans)} spans to {args.output}")
+    else:
+        sys.stdout.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())